@@ -0,0 +1,5 @@
+"""
+Backend Benchmark Suite
+Synthetic data seeding (seed.py), in-process load driver (loadtest.py)
+and baseline comparison for CI (compare.py)
+"""
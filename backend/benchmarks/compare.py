@@ -0,0 +1,68 @@
+"""
+Benchmark Baseline Comparison
+Diffs a loadtest JSON report against a baseline and fails on regressions (for CI)
+
+Usage (from backend/):
+    python -m benchmarks.compare benchmarks/results/10k-main.json benchmarks/results/10k.json --tolerance 0.15
+
+No baseline is committed: latencies only compare on the same machine, so CI runs
+loadtest on the base branch first (the baseline) and then on the change.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+# Metrics where a higher value is a regression, and where a lower value is
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = 0.15) -> List[Dict]:
+    """Return one row per scenario metric; rows with regression=True breach the tolerance"""
+    rows = []
+    for name, base in baseline.get("scenarios", {}).items():
+        cur = current.get("scenarios", {}).get(name)
+        if cur is None:
+            rows.append({"scenario": name, "metric": "missing", "baseline": None,
+                         "current": None, "change": None, "regression": True})
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before, after = base.get(metric), cur.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            regression = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+            rows.append({"scenario": name, "metric": metric, "baseline": before,
+                         "current": after, "change": round(change, 4), "regression": regression})
+        if cur.get("errors", 0) > base.get("errors", 0):
+            rows.append({"scenario": name, "metric": "errors", "baseline": base.get("errors", 0),
+                         "current": cur["errors"], "change": None, "regression": True})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a benchmark report against a baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative change before a metric counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.tolerance)
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "n/a"
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['scenario']:<16} {row['metric']:<8} {row['baseline']!s:>10} -> {row['current']!s:>10} "
+              f"{change:>8}  {flag}")
+
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Import-Time Profile for the Backend App
+Summarizes `python -X importtime -c "import server"` and flags SDKs that should load lazily
+
+Usage (from backend/):
+    python -m benchmarks.importtime --top 25
+    ENABLED_ROUTERS=auth,admin python -m benchmarks.importtime --budget-ms 900
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Third-party SDKs that are only needed by a few endpoints and must be imported
+# on first use, never while a worker boots
+LAZY_MODULES = (
+    "sendgrid", "twilio", "emergentintegrations", "openai", "aiohttp",
+    "psycopg2", "passlib", "PIL",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """One entry per imported module: self/cumulative microseconds and nesting depth"""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            "module": module,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(indent) - 1) // 2,
+        })
+    return entries
+
+
+def summarize(entries: List[Dict], target: str, top: int = 20) -> Dict:
+    modules = {entry["module"]: entry for entry in entries}
+    root = modules.get(target)
+    return {
+        "module": target,
+        "total_ms": round(root["cumulative_us"] / 1000, 2) if root else None,
+        "self_ms": round(root["self_us"] / 1000, 2) if root else None,
+        "module_count": len(entries),
+        "top_cumulative": [
+            {"module": e["module"], "cumulative_ms": round(e["cumulative_us"] / 1000, 2)}
+            for e in sorted((e for e in entries if e["depth"] == 1), key=lambda e: -e["cumulative_us"])[:top]
+        ],
+        "routers": {
+            name: round(entry["cumulative_us"] / 1000, 2)
+            for name, entry in modules.items() if name.startswith("routers.")
+        },
+        "eager_heavy": sorted(
+            name for name in modules if name.split(".")[0] in LAZY_MODULES and "." not in name
+        ),
+    }
+
+
+def profile_import(target: str = "server", env: Optional[Dict[str, str]] = None, top: int = 20) -> Dict:
+    """Import target in a fresh interpreter with -X importtime and summarize the result"""
+    run_env = dict(os.environ)
+    run_env.update(env or {})
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, env=run_env, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+    return summarize(parse_importtime(result.stderr), target, top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile backend import time")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, help="Exit 1 if the import takes longer than this")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    args = parser.parse_args()
+
+    report = profile_import(args.module, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {report['module']}: {report['total_ms']} ms "
+              f"({report['self_ms']} ms self, {report['module_count']} modules)")
+        for row in report["top_cumulative"]:
+            print(f"  {row['cumulative_ms']:>9.2f} ms  {row['module']}")
+        for name, ms in sorted(report["routers"].items(), key=lambda item: -item[1]):
+            print(f"  router {name:<28} {ms:>9.2f} ms")
+        if report["eager_heavy"]:
+            print(f"  eagerly imported (should be lazy): {', '.join(report['eager_heavy'])}")
+
+    failed = bool(report["eager_heavy"])
+    if args.budget_ms is not None and report["total_ms"] and report["total_ms"] > args.budget_ms:
+        print(f"import time {report['total_ms']} ms exceeds budget {args.budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
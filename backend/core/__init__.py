@@ -0,0 +1,4 @@
+"""
+Shared API Building Blocks
+Models, auth helpers, OTP delivery and helpers used by the route modules in routers/
+"""
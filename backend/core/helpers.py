@@ -0,0 +1,55 @@
+"""
+Shared Route Helpers
+Upload directories, id coercion, JSON field parsing and response caches
+"""
+import json
+from pathlib import Path
+
+from utils.fast_json import ResponseCache
+
+# -------------------------------------------------------------------
+# Setup for serving uploaded files
+#
+# Use a directory relative to the project root instead of /app/uploads.
+# In containerized environments, /app may exist, but in preview or local
+# runs it often does not.  This ensures images are always written to
+# a place that FastAPI can serve.
+#
+ROOT_DIR = Path(__file__).parent.parent
+UPLOADS_DIR = ROOT_DIR.parent / "uploads"
+POSTS_DIR = UPLOADS_DIR / "posts"
+PROFILES_DIR = UPLOADS_DIR / "profiles"
+STORIES_DIR = UPLOADS_DIR / "stories"
+
+# Ensure the directories exist
+POSTS_DIR.mkdir(parents=True, exist_ok=True)
+PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+STORIES_DIR.mkdir(parents=True, exist_ok=True)
+
+# Short-lived per-user response caches; payloads are stored already encoded and gzipped
+trending_cache = ResponseCache("trending", ttl_seconds=300)
+explore_cache = ResponseCache("explore", ttl_seconds=60)
+story_tray_cache = ResponseCache("story_tray", ttl_seconds=30)
+
+def coerce_post_id(post_id: str):
+    """Try to convert post_id to int for PostgreSQL lookups; fallback to raw string."""
+    try:
+        return int(post_id)
+    except (ValueError, TypeError):
+        return post_id
+
+def coerce_id(raw_id):
+    """Helper to coerce a string id into int where possible"""
+    try:
+        return int(raw_id)
+    except (ValueError, TypeError):
+        return raw_id
+
+def parse_likes_comments(field_value):
+    """Parse likes or comments field which may be JSON string or list"""
+    if isinstance(field_value, str):
+        try:
+            return json.loads(field_value)
+        except Exception:
+            return []
+    return field_value if isinstance(field_value, list) else []
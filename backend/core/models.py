@@ -0,0 +1,238 @@
+"""
+Request and Response Models
+Pydantic models shared by the API route modules
+"""
+from pydantic import BaseModel, Field
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+# Models
+class User(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    fullName: str
+    username: str
+    age: int
+    gender: str
+    password_hash: Optional[str] = None  # Optional for Telegram-only users
+    email: Optional[str] = None  # For password recovery
+    mobileNumber: Optional[str] = None  # Mobile number for enhanced security
+    bio: Optional[str] = ""
+    profileImage: Optional[str] = None  # Base64 or file_id
+    
+    # Telegram Integration
+    telegramId: Optional[int] = None  # Telegram user ID
+    telegramUsername: Optional[str] = None  # @username from Telegram
+    telegramFirstName: Optional[str] = None
+    telegramLastName: Optional[str] = None
+    telegramPhotoUrl: Optional[str] = None
+    authMethod: str = "password"  # "password", "telegram", or "both"
+    
+    # Premium & Settings
+    isPremium: bool = False
+    isPrivate: bool = False  # Privacy setting for the account
+    isVerified: bool = False  # LuvHive Verified badge
+    verifiedAt: Optional[datetime] = None  # When verification was granted
+    verificationPathway: Optional[str] = None  # How user got verified (High Engagement, Moderate, etc.)
+    isFounder: bool = False  # Official LuvHive/Founder account
+    emailVerified: bool = False  # Email verification status
+    phoneVerified: bool = False  # Phone verification status
+    violationsCount: int = 0  # Number of violations/reports
+    
+    # Privacy Controls
+    publicProfile: bool = True
+    appearInSearch: bool = True
+    allowDirectMessages: bool = True
+    showOnlineStatus: bool = True
+    
+    # Interaction Preferences
+    allowTagging: bool = True
+    allowStoryReplies: bool = True
+    showVibeScore: bool = True
+    
+    # Notifications
+    pushNotifications: bool = True
+    emailNotifications: bool = True
+    
+    followers: List[str] = []  # List of user IDs
+    following: List[str] = []  # List of user IDs
+    savedPosts: List[str] = []  # List of post IDs
+    blockedUsers: List[str] = []  # List of blocked user IDs
+    mutedUsers: List[str] = []  # List of muted user IDs (silent - they won't know)
+    hiddenStoryUsers: List[str] = []  # List of user IDs whose stories are hidden
+    lastUsernameChange: Optional[datetime] = None  # Track username changes
+    country: Optional[str] = None  # User's country
+    city: Optional[str] = None  # User's city
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class UserRegister(BaseModel):
+    fullName: str
+    username: str
+    age: int
+    gender: str
+    country: str  # Mandatory country field
+    password: Optional[str] = None  # Optional for Telegram auth
+    email: Optional[str] = None  # Optional for recovery
+    authMethod: str = "password"  # "password" or "telegram"
+
+class TelegramAuthRequest(BaseModel):
+    id: int
+    first_name: str
+    last_name: Optional[str] = None
+    username: Optional[str] = None
+    photo_url: Optional[str] = None
+    auth_date: int
+    hash: str
+
+class ForgotPasswordRequest(BaseModel):
+    email: str
+
+class ResetPasswordRequest(BaseModel):
+    token: str
+    new_password: str
+
+class TelegramSigninRequest(BaseModel):
+    telegramId: int
+
+class VerifyOTPRequest(BaseModel):
+    telegramId: int
+    otp: str
+
+class EnhancedUserRegister(BaseModel):
+    fullName: str
+    username: str
+    age: int
+    gender: str
+    country: str  # Mandatory country field
+    password: str
+    email: Optional[str] = None  # Optional email
+    mobileNumber: Optional[str] = None  # Optional mobile number
+    profileImage: Optional[str] = None  # Optional profile image
+    profilePhoto: Optional[str] = None  # Alternative name for profile image (frontend compatibility)
+    bio: Optional[str] = None  # Optional bio
+    city: Optional[str] = None  # Optional city
+    interests: Optional[list] = None  # User interests
+    emailVerified: Optional[bool] = None  # Email verification status
+    mobileVerified: Optional[bool] = None  # Mobile verification status
+    personalityAnswers: Optional[dict] = None  # Personality quiz answers
+
+class EmailOTPRequest(BaseModel):
+    email: str
+
+class VerifyEmailOTPRequest(BaseModel):
+    email: str
+    otp: str
+
+class SendMobileOTPRequest(BaseModel):
+    mobileNumber: str
+
+class VerifyMobileOTPRequest(BaseModel):
+    mobileNumber: str
+    otp: str
+
+class ForgotPasswordMobileRequest(BaseModel):
+    mobileNumber: str
+
+class ResetPasswordMobileRequest(BaseModel):
+    mobileNumber: str
+    otp: str
+    new_password: str
+
+class UserProfile(BaseModel):
+    fullName: str
+    username: str
+    age: int
+    gender: str
+    bio: Optional[str] = ""
+    profileImage: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+
+class ProfileUpdate(BaseModel):
+    fullName: Optional[str] = None
+    username: Optional[str] = None
+    bio: Optional[str] = None
+    profileImage: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+
+class ReportPostRequest(BaseModel):
+    reason: str  # The report category/reason
+
+class UserLogin(BaseModel):
+    username: str
+    password: str
+
+class Story(BaseModel):
+    # Use an optional integer for the primary key. The actual value is assigned
+    # after insertion into the database via postgres serial. Avoid generating
+    # UUIDs that are never persisted (see story creation endpoints).
+    id: Optional[int] = None
+    userId: str
+    username: str
+    userProfileImage: Optional[str] = None
+    mediaType: str  # "image" or "video"
+    mediaUrl: str  # Base64 or file_id
+    caption: Optional[str] = ""
+    isArchived: bool = False
+    likes: List[str] = []  # List of user IDs who liked the story
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expiresAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(hours=24))
+
+class StoryCreate(BaseModel):
+    mediaType: str
+    mediaUrl: str
+    caption: Optional[str] = ""
+
+class Post(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    userId: str
+    username: str
+    userProfileImage: Optional[str] = None
+    mediaType: str  # "image" or "video"
+    mediaUrl: str  # Base64 or file_id
+    caption: Optional[str] = ""
+    likes: List[str] = []  # List of user IDs
+    comments: List[dict] = []
+    isArchived: bool = False
+    likesHidden: bool = False
+    commentsDisabled: bool = False
+    isPinned: bool = False
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class PostCreate(BaseModel):
+    mediaType: str
+    mediaUrl: str
+    caption: Optional[str] = ""
+
+class TelegramLink(BaseModel):
+    code: str
+    userId: str
+    telegramUserId: str
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class Notification(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    userId: str  # Who receives the notification
+    fromUserId: str  # Who triggered the notification
+    fromUsername: str
+    fromUserImage: Optional[str] = None
+    type: str  # "like", "comment", "follow"
+    postId: Optional[str] = None  # For like/comment notifications
+    isRead: bool = False
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ChatMessage(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    senderId: str
+    receiverId: str
+    message: str
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# Search functionality
+class SearchRequest(BaseModel):
+    query: str
+    type: Optional[str] = "all"  # "users", "posts", "hashtags", "all"
+    page: Optional[int] = 1
+    limit: Optional[int] = 10
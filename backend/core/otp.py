@@ -0,0 +1,639 @@
+"""
+OTP Generation and Delivery
+Telegram, email and SMS one-time codes; codes are stored hashed in Postgres, SendGrid and Twilio are imported on first send
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+import db_postgres
+from core.security import SECRET_KEY
+
+logger = logging.getLogger(__name__)
+
+# Codes live in webapp_verification_codes so any worker can verify a code issued
+# by another one and a deploy does not drop pending logins.
+OTP_HASH_SECRET = os.getenv("OTP_HASH_SECRET", SECRET_KEY)
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "3"))
+OTP_SEND_WINDOW_SECONDS = int(os.getenv("OTP_SEND_WINDOW_SECONDS", "3600"))
+OTP_SENDS_PER_IDENTIFIER = int(os.getenv("OTP_SENDS_PER_IDENTIFIER", "5"))
+OTP_SENDS_PER_IP = int(os.getenv("OTP_SENDS_PER_IP", "20"))
+OTP_RESEND_COOLDOWN_SECONDS = int(os.getenv("OTP_RESEND_COOLDOWN_SECONDS", "30"))
+OTP_PURGE_INTERVAL_SECONDS = float(os.getenv("OTP_PURGE_INTERVAL_SECONDS", "600"))
+
+_last_purge = 0.0
+_purge_task: Optional[asyncio.Task] = None
+
+def generate_otp(length: int = 6) -> str:
+    """Generate a random OTP"""
+    return ''.join(str(secrets.randbelow(10)) for _ in range(length))
+
+def hash_otp(column: str, identifier: Any, otp: str) -> str:
+    """Keyed hash of a code, bound to the identifier it was issued for"""
+    message = f"{column}:{identifier}:{otp.strip()}".encode("utf-8")
+    return hmac.new(OTP_HASH_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def client_ip(request: Optional[Request]) -> Optional[str]:
+    """Caller address for send throttling (the hop appended by our proxy, else the socket peer)"""
+    if request is None:
+        return None
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()[:45] or None
+    return request.client.host if request.client else None
+
+def _send_retry_after(usage: Dict[str, Any]) -> int:
+    """Seconds until another code may be sent for this usage (0 = allowed now)"""
+    since_last = usage.get("seconds_since_last")
+    if since_last is not None and since_last < OTP_RESEND_COOLDOWN_SECONDS:
+        return max(1, int(OTP_RESEND_COOLDOWN_SECONDS - since_last))
+    if usage["identifier_sends"] >= OTP_SENDS_PER_IDENTIFIER or usage["ip_sends"] >= OTP_SENDS_PER_IP:
+        return OTP_SEND_WINDOW_SECONDS
+    return 0
+
+def _schedule_purge():
+    global _last_purge, _purge_task
+    if time.monotonic() - _last_purge < OTP_PURGE_INTERVAL_SECONDS:
+        return
+    if _purge_task is not None and not _purge_task.done():
+        return
+    _last_purge = time.monotonic()
+    _purge_task = asyncio.create_task(purge_expired_otps())
+
+async def purge_expired_otps() -> int:
+    """Remove codes that can no longer be used nor count towards a send throttle"""
+    try:
+        removed = await db_postgres.purge_verification_codes(OTP_SEND_WINDOW_SECONDS)
+        if removed:
+            logger.info(f"Purged {removed} expired verification codes")
+        return removed
+    except Exception as e:
+        logger.error(f"Verification code purge failed: {e}")
+        return 0
+
+async def _issue(column: str, identifier: Any, otp: str, expires_in_minutes: int, ip_address: Optional[str]):
+    _schedule_purge()
+    retry_after = await db_postgres.issue_verification_code(
+        column, identifier, hash_otp(column, identifier, otp), expires_in_minutes * 60,
+        ip_address, OTP_SEND_WINDOW_SECONDS, _send_retry_after
+    )
+    if retry_after:
+        logger.warning(f"OTP send throttled for {column}={identifier} ip={ip_address}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many verification codes requested. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+async def _verify(column: str, identifier: Any, provided_otp: str) -> bool:
+    if not provided_otp:
+        return False
+    return await db_postgres.consume_verification_code(
+        column, identifier, hash_otp(column, identifier, provided_otp), OTP_MAX_ATTEMPTS
+    )
+
+async def store_otp(telegram_id: int, otp: str, expires_in_minutes: int = 10, ip_address: Optional[str] = None):
+    """Store OTP with expiration (raises 429 when the send throttle is hit)"""
+    await _issue("telegram_id", int(telegram_id), otp, expires_in_minutes, ip_address)
+
+async def verify_otp(telegram_id: int, provided_otp: str) -> bool:
+    """Verify OTP; a code is consumed on success and dies after OTP_MAX_ATTEMPTS guesses"""
+    return await _verify("telegram_id", int(telegram_id), provided_otp)
+
+async def send_telegram_otp(telegram_id: int, otp: str):
+    """Send OTP via Telegram bot"""
+    try:
+        # Import here to avoid circular imports
+        import aiohttp
+        
+        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
+        if not bot_token:
+            raise Exception("Telegram bot token not configured")
+        
+        message = f"🔐 Your LuvHive login code is: *{otp}*\n\nThis code will expire in 10 minutes.\nDo not share this code with anyone!"
+        
+        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        data = {
+            "chat_id": telegram_id,
+            "text": message,
+            "parse_mode": "Markdown"
+        }
+        
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, data=data) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to send Telegram message: {response.status}")
+                return True
+                
+    except Exception as e:
+        logger.error(f"Error sending Telegram OTP: {e}")
+        return False
+
+async def store_email_otp(email: str, otp: str, expires_in_minutes: int = 10, ip_address: Optional[str] = None):
+    """Store email OTP with expiration (raises 429 when the send throttle is hit)"""
+    await _issue("email", email.strip().lower(), otp, expires_in_minutes, ip_address)
+
+async def verify_email_otp(email: str, provided_otp: str) -> bool:
+    """Verify email OTP; a code is consumed on success and dies after OTP_MAX_ATTEMPTS guesses"""
+    return await _verify("email", email.strip().lower(), provided_otp)
+
+async def send_email_otp(email: str, otp: str):
+    """Send OTP via email using SendGrid"""
+    try:
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail
+        
+        sendgrid_api_key = os.environ.get("SENDGRID_API_KEY")
+        
+        if not sendgrid_api_key:
+            logger.error("SendGrid API key not configured")
+            logger.info(f"MOCK EMAIL: OTP {otp} sent to {email}")
+            return True
+        
+        # Create beautiful HTML email
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f8f9fa;">
+            <div style="background-color: white; padding: 40px; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                <div style="text-align: center; margin-bottom: 30px;">
+                    <h1 style="color: #e91e63; margin: 0; font-size: 28px;">💖 LuvHive</h1>
+                    <h2 style="color: #333; margin: 10px 0 0 0; font-size: 22px;">Email Verification</h2>
+                </div>
+                
+                <div style="background: linear-gradient(135deg, #e91e63, #f06292); padding: 25px; border-radius: 12px; text-align: center; margin: 25px 0;">
+                    <p style="color: white; margin: 0 0 15px 0; font-size: 16px; font-weight: 500;">Your Verification Code:</p>
+                    <div style="background-color: white; padding: 15px; border-radius: 8px; display: inline-block;">
+                        <span style="color: #e91e63; font-size: 36px; font-weight: bold; letter-spacing: 8px; font-family: 'Courier New', monospace;">{otp}</span>
+                    </div>
+                </div>
+                
+                <div style="text-align: center; margin: 25px 0;">
+                    <p style="color: #555; font-size: 16px; margin: 0 0 15px 0;">Enter this code on the registration page to verify your email address</p>
+                    <p style="color: #888; font-size: 14px; margin: 0;">⏰ This code expires in <strong>10 minutes</strong></p>
+                </div>
+                
+                <div style="border-top: 1px solid #eee; padding-top: 20px; margin-top: 30px; text-align: center;">
+                    <p style="color: #999; font-size: 13px; margin: 0;">🔒 If you didn't request this code, please ignore this email.</p>
+                    <p style="color: #999; font-size: 13px; margin: 5px 0 0 0;">This is an automated message from LuvHive.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Plain text version
+        text_content = f"""
+        LuvHive Email Verification
+        
+        Your verification code is: {otp}
+        
+        Enter this code on the registration page to verify your email address.
+        
+        This code will expire in 10 minutes.
+        Do not share this code with anyone.
+        
+        If you didn't request this code, please ignore this email.
+        
+        Best regards,
+        LuvHive Team
+        """
+        
+        # Create SendGrid message
+        message = Mail(
+            from_email="no-reply@luvhive.net",
+            to_emails=email,
+            subject="Your LuvHive Verification Code 🔐",
+            html_content=html_content,
+            plain_text_content=text_content
+        )
+        
+        # Send email
+        sg = SendGridAPIClient(sendgrid_api_key)
+        response = sg.send(message)
+        
+        if response.status_code == 202:
+            logger.info(f"SendGrid email sent successfully: OTP {otp} to {email}")
+            return True
+        else:
+            logger.error(f"SendGrid error: Status {response.status_code}")
+            return False
+                
+    except Exception as e:
+        logger.error(f"Error sending SendGrid email: {e}")
+        logger.info(f"MOCK EMAIL: OTP {otp} sent to {email}")
+        return True
+        
+        # Try Twilio Email first (with API Key if available)
+        if twilio_account_sid and (twilio_auth_token or twilio_api_key_secret):
+            try:
+                from twilio.rest import Client
+                
+                # Use API key if available, otherwise use auth token
+                if twilio_api_key_sid and twilio_api_key_secret:
+                    client = Client(twilio_api_key_sid, twilio_api_key_secret, twilio_account_sid)
+                else:
+                    client = Client(twilio_account_sid, twilio_auth_token)
+                
+                # Create HTML email content
+                html_content = f"""
+                <html>
+                <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f8f9fa;">
+                    <div style="background-color: white; padding: 40px; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                        <div style="text-align: center; margin-bottom: 30px;">
+                            <h1 style="color: #e91e63; margin: 0; font-size: 28px;">💖 LuvHive</h1>
+                            <h2 style="color: #333; margin: 10px 0 0 0; font-size: 22px;">Email Verification</h2>
+                        </div>
+                        
+                        <div style="background: linear-gradient(135deg, #e91e63, #f06292); padding: 25px; border-radius: 12px; text-align: center; margin: 25px 0;">
+                            <p style="color: white; margin: 0 0 15px 0; font-size: 16px; font-weight: 500;">Your Verification Code:</p>
+                            <div style="background-color: white; padding: 15px; border-radius: 8px; display: inline-block;">
+                                <span style="color: #e91e63; font-size: 36px; font-weight: bold; letter-spacing: 8px; font-family: 'Courier New', monospace;">{otp}</span>
+                            </div>
+                        </div>
+                        
+                        <div style="text-align: center; margin: 25px 0;">
+                            <p style="color: #555; font-size: 16px; margin: 0 0 15px 0;">Enter this code on the registration page to verify your email address</p>
+                            <p style="color: #888; font-size: 14px; margin: 0;">⏰ This code expires in <strong>10 minutes</strong></p>
+                        </div>
+                        
+                        <div style="border-top: 1px solid #eee; padding-top: 20px; margin-top: 30px; text-align: center;">
+                            <p style="color: #999; font-size: 13px; margin: 0;">🔒 If you didn't request this code, please ignore this email.</p>
+                            <p style="color: #999; font-size: 13px; margin: 5px 0 0 0;">This is an automated message from LuvHive.</p>
+                        </div>
+                    </div>
+                </body>
+                </html>
+                """
+                
+                # Try using Twilio's built-in email service
+                try:
+                    # Use Twilio's email service if available
+                    message = client.messages.create(
+                        body=f"Your LuvHive verification code is: {otp}. This code expires in 10 minutes.",
+                        from_='no-reply@luvhive.net',
+                        to=email
+                    )
+                    logger.info(f"Twilio email sent via messages API: {message.sid}")
+                    return True
+                except Exception as msg_error:
+                    logger.error(f"Twilio messages API error: {msg_error}")
+                    
+                    # Try SendGrid API via Twilio
+                    message = client.sendgrid.v3.mail.send.post(request_body={
+                        "personalizations": [
+                            {
+                                "to": [{"email": email}],
+                                "subject": "Your LuvHive Verification Code 🔐"
+                            }
+                        ],
+                        "from": {"email": "no-reply@luvhive.net", "name": "LuvHive"},
+                        "content": [
+                            {
+                                "type": "text/html",
+                                "value": html_content
+                            }
+                        ]
+                    })
+                
+                if message.status_code == 202:
+                    logger.info(f"Twilio SendGrid email sent successfully: OTP {otp} to {email}")
+                    return True
+                else:
+                    logger.error(f"Twilio SendGrid error: Status {message.status_code}")
+                    return False
+                
+            except Exception as twilio_error:
+                logger.error(f"Twilio email error: {twilio_error}")
+                # Fall through to SendGrid or mock
+        
+        # Try SendGrid as fallback
+        if sendgrid_api_key:
+            from sendgrid import SendGridAPIClient
+            from sendgrid.helpers.mail import Mail
+            
+            sender_email = "no-reply@luvhive.net"
+        
+        # Create HTML email content
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f8f9fa;">
+            <div style="background-color: white; padding: 40px; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                <div style="text-align: center; margin-bottom: 30px;">
+                    <h1 style="color: #e91e63; margin: 0; font-size: 28px;">💖 LuvHive</h1>
+                    <h2 style="color: #333; margin: 10px 0 0 0; font-size: 22px;">Email Verification</h2>
+                </div>
+                
+                <div style="background: linear-gradient(135deg, #e91e63, #f06292); padding: 25px; border-radius: 12px; text-align: center; margin: 25px 0;">
+                    <p style="color: white; margin: 0 0 15px 0; font-size: 16px; font-weight: 500;">Your Verification Code:</p>
+                    <div style="background-color: white; padding: 15px; border-radius: 8px; display: inline-block;">
+                        <span style="color: #e91e63; font-size: 36px; font-weight: bold; letter-spacing: 8px; font-family: 'Courier New', monospace;">{otp}</span>
+                    </div>
+                </div>
+                
+                <div style="text-align: center; margin: 25px 0;">
+                    <p style="color: #555; font-size: 16px; margin: 0 0 15px 0;">Enter this code on the registration page to verify your email address</p>
+                    <p style="color: #888; font-size: 14px; margin: 0;">⏰ This code expires in <strong>10 minutes</strong></p>
+                </div>
+                
+                <div style="border-top: 1px solid #eee; padding-top: 20px; margin-top: 30px; text-align: center;">
+                    <p style="color: #999; font-size: 13px; margin: 0;">🔒 If you didn't request this code, please ignore this email.</p>
+                    <p style="color: #999; font-size: 13px; margin: 5px 0 0 0;">This is an automated message from LuvHive.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Plain text version
+        text_content = f"""
+        LuvHive Email Verification
+        
+        Your verification code is: {otp}
+        
+        Enter this code on the registration page to verify your email address.
+        
+        This code will expire in 10 minutes.
+        Do not share this code with anyone.
+        
+        If you didn't request this code, please ignore this email.
+        
+        Best regards,
+        LuvHive Team
+        """
+        
+        # Create SendGrid message
+        message = Mail(
+            from_email="no-reply@luvhive.net",
+            to_emails=email,
+            subject="Your LuvHive Verification Code 🔐",
+            html_content=html_content,
+            plain_text_content=text_content
+        )
+        
+        # Send email
+        sg = SendGridAPIClient(sendgrid_api_key)
+        response = sg.send(message)
+        
+        if response.status_code == 202:
+            logger.info(f"SendGrid email sent successfully: OTP {otp} to {email}")
+            return True
+        else:
+            logger.error(f"SendGrid error: Status {response.status_code}")
+            return False
+                
+    except Exception as e:
+        logger.error(f"Error sending SendGrid email: {e}")
+        logger.info(f"MOCK EMAIL: OTP {otp} sent to {email}")
+        return True
+
+async def send_mobile_otp(mobile_number: str):
+    """Send OTP via SMS using Twilio Verify"""
+    try:
+        from twilio.rest import Client
+        
+        account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+        auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+        
+        if not account_sid or not auth_token:
+            logger.error("Twilio credentials not configured")
+            return False
+        
+        client = Client(account_sid, auth_token)
+        
+        # Format mobile number (add +91 if not present)
+        formatted_number = mobile_number.strip()
+        if not formatted_number.startswith('+'):
+            if formatted_number.startswith('91'):
+                formatted_number = '+' + formatted_number
+            else:
+                formatted_number = '+91' + formatted_number
+        
+        # Send OTP via Twilio Verify
+        verify_service_sid = os.environ.get("TWILIO_VERIFY_SERVICE_SID")
+        verification = client.verify \
+            .v2 \
+            .services(verify_service_sid) \
+            .verifications \
+            .create(to=formatted_number, channel='sms')
+        
+        logger.info(f"Twilio SMS OTP sent: {verification.status} to {formatted_number}")
+        return verification.status == 'pending'
+        
+    except Exception as e:
+        logger.error(f"Error sending mobile OTP: {e}")
+        # For demo, always return True
+        logger.info(f"MOCK SMS: OTP sent to {mobile_number}")
+        return True
+
+
+async def send_welcome_email(email: str, full_name: str, username: str):
+    """Send welcome email after successful registration"""
+    try:
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail
+        
+        sendgrid_api_key = os.environ.get("SENDGRID_API_KEY")
+        
+        if not sendgrid_api_key:
+            logger.error("SendGrid API key not configured")
+            logger.info(f"MOCK WELCOME EMAIL: Sent to {email}")
+            return True
+        
+        # Create beautiful HTML welcome email
+        html_content = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f8f9fa;">
+            <div style="background-color: white; padding: 40px; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                <!-- Header -->
+                <div style="text-align: center; margin-bottom: 30px;">
+                    <h1 style="color: #e91e63; margin: 0; font-size: 32px;">💖 Welcome to LuvHive!</h1>
+                </div>
+                
+                <!-- Welcome Banner -->
+                <div style="background: linear-gradient(135deg, #e91e63, #f06292); padding: 30px; border-radius: 12px; text-align: center; margin: 25px 0;">
+                    <h2 style="color: white; margin: 0 0 15px 0; font-size: 24px;">Hello, {full_name}! 👋</h2>
+                    <p style="color: white; margin: 0; font-size: 16px; line-height: 1.6;">
+                        We're thrilled to have you join our community of meaningful connections!
+                    </p>
+                </div>
+                
+                <!-- Account Details -->
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin: 25px 0;">
+                    <h3 style="color: #333; margin: 0 0 15px 0; font-size: 18px;">Your Account Details:</h3>
+                    <p style="color: #555; margin: 5px 0;">
+                        <strong>Username:</strong> @{username}
+                    </p>
+                    <p style="color: #555; margin: 5px 0;">
+                        <strong>Email:</strong> {email}
+                    </p>
+                </div>
+                
+                <!-- Features -->
+                <div style="margin: 30px 0;">
+                    <h3 style="color: #333; margin: 0 0 20px 0; font-size: 20px; text-align: center;">What You Can Do Now:</h3>
+                    
+                    <div style="margin: 15px 0;">
+                        <div style="display: inline-block; width: 40px; height: 40px; background: linear-gradient(135deg, #e91e63, #f06292); border-radius: 50%; text-align: center; line-height: 40px; margin-right: 15px; float: left;">
+                            <span style="color: white; font-size: 20px;">💬</span>
+                        </div>
+                        <div style="padding-left: 60px;">
+                            <h4 style="color: #333; margin: 0 0 5px 0; font-size: 16px;">Connect & Chat</h4>
+                            <p style="color: #666; margin: 0; font-size: 14px;">Start meaningful conversations and build connections</p>
+                        </div>
+                        <div style="clear: both;"></div>
+                    </div>
+                    
+                    <div style="margin: 15px 0;">
+                        <div style="display: inline-block; width: 40px; height: 40px; background: linear-gradient(135deg, #e91e63, #f06292); border-radius: 50%; text-align: center; line-height: 40px; margin-right: 15px; float: left;">
+                            <span style="color: white; font-size: 20px;">✨</span>
+                        </div>
+                        <div style="padding-left: 60px;">
+                            <h4 style="color: #333; margin: 0 0 5px 0; font-size: 16px;">Share Your Story</h4>
+                            <p style="color: #666; margin: 0; font-size: 14px;">Post updates, share moments, and express yourself</p>
+                        </div>
+                        <div style="clear: both;"></div>
+                    </div>
+                </div>
+                
+                <!-- Call to Action -->
+                <div style="text-align: center; margin: 35px 0;">
+                    <a href="https://luvhive.net" style="display: inline-block; background: linear-gradient(135deg, #e91e63, #f06292); color: white; text-decoration: none; padding: 15px 40px; border-radius: 30px; font-size: 16px; font-weight: bold; box-shadow: 0 4px 6px rgba(233, 30, 99, 0.3);">
+                        Get Started Now 🚀
+                    </a>
+                </div>
+                
+                <!-- Tips Section -->
+                <div style="background-color: #fff3e0; padding: 20px; border-radius: 10px; border-left: 4px solid #ff9800; margin: 25px 0;">
+                    <h3 style="color: #e65100; margin: 0 0 10px 0; font-size: 16px;">💡 Quick Tips:</h3>
+                    <ul style="color: #666; margin: 10px 0; padding-left: 20px; font-size: 14px;">
+                        <li style="margin: 5px 0;">Complete your profile to get better matches</li>
+                        <li style="margin: 5px 0;">Be genuine and respectful in all interactions</li>
+                        <li style="margin: 5px 0;">Upload a profile photo to increase your visibility</li>
+                        <li style="margin: 5px 0;">Share your moments with stories and posts</li>
+                    </ul>
+                </div>
+                
+                <!-- Footer -->
+                <div style="border-top: 1px solid #eee; padding-top: 20px; margin-top: 30px; text-align: center;">
+                    <p style="color: #999; font-size: 14px; margin: 0 0 10px 0;">
+                        Need help? Contact us at <a href="mailto:support@luvhive.net" style="color: #e91e63; text-decoration: none;">support@luvhive.net</a>
+                    </p>
+                    <p style="color: #999; font-size: 13px; margin: 5px 0;">
+                        Follow us on social media for updates and tips!
+                    </p>
+                    <p style="color: #999; font-size: 12px; margin: 15px 0 0 0;">
+                        © 2025 LuvHive. All rights reserved.
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Plain text version
+        text_content = f"""
+        Welcome to LuvHive!
+        
+        Hello, {full_name}!
+        
+        We're thrilled to have you join our community of meaningful connections!
+        
+        Your Account Details:
+        Username: @{username}
+        Email: {email}
+        
+        What You Can Do Now:
+        
+        🔍 Mystery Match - Find your perfect match through exciting mystery conversations
+        💬 Connect & Chat - Start meaningful conversations and build connections
+        ✨ Share Your Story - Post updates, share moments, and express yourself
+        
+        Quick Tips:
+        • Complete your profile to get better matches
+        • Be genuine and respectful in all interactions
+        • Upload a profile photo to increase your visibility
+        • Share your moments with stories and posts
+        
+        Get started now at: https://luvhive.net
+        
+        Need help? Contact us at support@luvhive.net
+        
+        Best regards,
+        The LuvHive Team
+        
+        © 2025 LuvHive. All rights reserved.
+        """
+        
+        # Create SendGrid message
+        message = Mail(
+            from_email="no-reply@luvhive.net",
+            to_emails=email,
+            subject=f"Welcome to LuvHive, {full_name}! 💖",
+            html_content=html_content,
+            plain_text_content=text_content
+        )
+        
+        # Send email
+        sg = SendGridAPIClient(sendgrid_api_key)
+        response = sg.send(message)
+        
+        if response.status_code == 202:
+            logger.info(f"Welcome email sent successfully to {email}")
+            return True
+        else:
+            logger.error(f"SendGrid welcome email error: Status {response.status_code}")
+            return False
+                
+    except Exception as e:
+        logger.error(f"Error sending welcome email: {e}")
+        logger.info(f"MOCK WELCOME EMAIL: Sent to {email}")
+        return True
+
+
+async def verify_mobile_otp(mobile_number: str, otp_code: str):
+    """Verify mobile OTP using Twilio Verify"""
+    try:
+        from twilio.rest import Client
+        
+        account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+        auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+        
+        if not account_sid or not auth_token:
+            logger.error("Twilio credentials not configured")
+            return True  # Allow in demo mode
+        
+        client = Client(account_sid, auth_token)
+        
+        # Format mobile number
+        formatted_number = mobile_number.strip()
+        if not formatted_number.startswith('+'):
+            if formatted_number.startswith('91'):
+                formatted_number = '+' + formatted_number
+            else:
+                formatted_number = '+91' + formatted_number
+        
+        # Verify OTP
+        verify_service_sid = os.environ.get("TWILIO_VERIFY_SERVICE_SID")
+        verification_check = client.verify \
+            .v2 \
+            .services(verify_service_sid) \
+            .verification_checks \
+            .create(to=formatted_number, code=otp_code)
+        
+        logger.info(f"Twilio SMS verification: {verification_check.status}")
+        return verification_check.status == 'approved'
+        
+    except Exception as e:
+        logger.error(f"Error verifying mobile OTP: {e}")
+        # For demo, accept any 6-digit code
+        if len(otp_code.strip()) == 6 and otp_code.strip().isdigit():
+            logger.info(f"DEMO MODE: Accepting OTP {otp_code} for {mobile_number}")
+            return True
+        return False
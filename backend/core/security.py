@@ -0,0 +1,161 @@
+"""
+Authentication Helpers
+Password hashing, JWT issuing, Telegram hash checks and the get_current_user dependency
+"""
+from fastapi import HTTPException, Header
+import jwt
+from jwt import PyJWTError
+
+import hashlib
+import hmac
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import db_postgres
+from core.models import User
+
+logger = logging.getLogger(__name__)
+
+# Password hashing - passlib/bcrypt are only imported once a password is hashed or checked
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+    return _pwd_context
+
+# JWT settings
+SECRET_KEY = os.environ.get("JWT_SECRET", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
+
+# Helper functions
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def verify_password(plain_password, hashed_password):
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return get_pwd_context().hash(password)
+
+def verify_telegram_hash(auth_data: dict, bot_token: str) -> bool:
+    """
+    Verify Telegram Login Widget hash for security
+    https://core.telegram.org/widgets/login#checking-authorization
+    """
+    try:
+        # Extract hash from auth_data
+        received_hash = auth_data.pop('hash', None)
+        if not received_hash:
+            return False
+        
+        # Create data check string
+        data_check_arr = []
+        for key, value in sorted(auth_data.items()):
+            if key != 'hash':
+                data_check_arr.append(f"{key}={value}")
+        
+        data_check_string = '\n'.join(data_check_arr)
+        
+        # Create secret key from bot token
+        secret_key = hashlib.sha256(bot_token.encode()).digest()
+        
+        # Calculate hash
+        calculated_hash = hmac.new(
+            secret_key,
+            data_check_string.encode(),
+            hashlib.sha256
+        ).hexdigest()
+        
+        # Compare hashes
+        return hmac.compare_digest(calculated_hash, received_hash)
+        
+    except Exception as e:
+        logger.error(f"Error verifying Telegram hash: {e}")
+        return False
+
+async def get_current_user(authorization: str = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = authorization.replace("Bearer ", "")
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id_str: str = payload.get("sub")
+        if user_id_str is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        # Convert string ID to integer for PostgreSQL
+        try:
+            user_id = int(user_id_str)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=401, detail="Invalid user ID format")
+            
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Lets the user's own writes pin their reads to the primary (read-your-writes)
+    db_postgres.bind_request_user(user_id)
+    user_data = await db_postgres.get_user_by_id(user_id)
+    if user_data is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    # Convert PostgreSQL snake_case to camelCase and integer ID to string
+    user_dict = {
+        "id": str(user_data["id"]),  # Convert int to string
+        "fullName": user_data["full_name"],
+        "username": user_data["username"],
+        "age": user_data["age"],
+        "gender": user_data["gender"],
+        "password_hash": user_data.get("password"),
+        "email": user_data.get("email"),
+        "mobileNumber": user_data.get("mobile_number"),
+        "bio": user_data.get("bio", ""),
+        "profileImage": user_data.get("profile_photo_url"),
+        "telegramId": user_data.get("telegram_id"),
+        "authMethod": user_data.get("auth_method", "password"),
+        "isPremium": user_data.get("is_premium", False),
+        "isPrivate": user_data.get("is_private", False),
+        "isVerified": user_data.get("is_verified", False),
+        "verifiedAt": user_data.get("verified_at"),
+        "verificationPathway": user_data.get("verification_pathway"),
+        "isFounder": user_data.get("is_founder", False),
+        "emailVerified": user_data.get("email_verified", False),
+        "phoneVerified": user_data.get("mobile_verified", False),
+        "violationsCount": user_data.get("violations_count", 0),
+        "publicProfile": True,  # Not in PostgreSQL, default
+        "appearInSearch": True,  # Not in PostgreSQL, default
+        "allowDirectMessages": True,  # Not in PostgreSQL, default
+        "showOnlineStatus": user_data.get("is_online", True),
+        "allowTagging": True,  # Not in PostgreSQL, default
+        "allowStoryReplies": True,  # Not in PostgreSQL, default
+        "showVibeScore": True,  # Not in PostgreSQL, default
+        "pushNotifications": True,  # Not in PostgreSQL, default
+        "emailNotifications": True,  # Not in PostgreSQL, default
+        "followers": [],  # TODO: fetch from relationship table
+        "following": [],  # TODO: fetch from relationship table
+        "savedPosts": [],  # TODO: fetch from relationship table
+        "blockedUsers": [],  # TODO: fetch from relationship table
+        "mutedUsers": [],  # TODO: fetch from relationship table
+        "hiddenStoryUsers": [],  # TODO: fetch from relationship table
+        "lastUsernameChange": user_data.get("username_changed_at"),
+        "country": user_data.get("country"),
+        "city": user_data.get("city"),
+        "createdAt": user_data.get("created_at", datetime.utcnow()),
+    }
+    
+    return User(**user_dict)
@@ -3,32 +3,552 @@ PostgreSQL Database Helper for LuvHive Backend
 Replaces MongoDB with PostgreSQL
 """
 import asyncpg
+import asyncio
 import os
-from typing import Optional, List, Dict, Any
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any, Callable, Sequence, Set, Tuple
 from datetime import datetime
 import json
 
-# Database connection pool
-_pool: Optional[asyncpg.Pool] = None
-
-async def get_pool() -> asyncpg.Pool:
-    """Get or create database connection pool"""
-    global _pool
-    if _pool is None:
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise ValueError("DATABASE_URL environment variable not set")
-        _pool = await asyncpg.create_pool(
-            database_url, 
-            min_size=5, 
-            max_size=20,
-            command_timeout=60
-        )
-    return _pool
+# ---------------------------------------------------------------------------
+# Connection pool lanes
+#
+# Traffic is split into named lanes, each with its own asyncpg pool, so a slow
+# export or admin job cannot exhaust the connections that the auth lookup on
+# every request needs.  Each lane is tunable through the environment, e.g.
+# DB_POOL_BACKGROUND_MAX_SIZE=3 or DB_POOL_INTERACTIVE_STATEMENT_TIMEOUT_MS=5000.
+# ---------------------------------------------------------------------------
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+
+_LANE_DEFAULTS: Dict[str, Dict[str, int]] = {
+    LANE_INTERACTIVE: {
+        "min_size": 5,
+        "max_size": 20,
+        "statement_timeout_ms": 15000,
+        "statement_cache_size": 256,
+    },
+    LANE_BACKGROUND: {
+        "min_size": 1,
+        "max_size": 5,
+        "statement_timeout_ms": 120000,
+        "statement_cache_size": 64,
+    },
+}
+
+# Number of recent acquire waits kept per lane for percentile gauges
+ACQUIRE_SAMPLE_SIZE = 1024
+
+_pools: Dict[str, asyncpg.Pool] = {}
+_lane_stats: Dict[str, "PoolStats"] = {}
+_pool_lock = asyncio.Lock()
+
+# Lane used by get_pool() when the caller does not ask for one explicitly.
+# Set per request by utils.db_lanes.DBLaneMiddleware.
+current_lane: ContextVar[str] = ContextVar("db_lane", default=LANE_INTERACTIVE)
+
+# ---------------------------------------------------------------------------
+# Read replicas
+#
+# With DATABASE_REPLICA_URL set, reads that ask for READ_REPLICA - per call via
+# get_pool(read=...) / read_preference(), or per route via utils.db_lanes - use
+# a replica pool for the same lane.  Writes issued through a replica pool are
+# sent to the primary.  A user who just wrote is pinned to the primary for
+# DB_READ_YOUR_WRITES_SECONDS, and all replica reads fall back to the primary
+# while measured replay lag exceeds DB_REPLICA_MAX_LAG_SECONDS.
+# ---------------------------------------------------------------------------
+READ_PRIMARY = "primary"
+READ_REPLICA = "replica"
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "2"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+# Expired pins are swept once the table grows past this many users
+PIN_SWEEP_THRESHOLD = 10000
+
+current_read_preference: ContextVar[str] = ContextVar("db_read_preference", default=READ_PRIMARY)
+
+
+class RequestRouting:
+    """Per-request routing state; mutated in place so dependencies and handlers share it"""
+    __slots__ = ("user_id", "wrote")
+
+    def __init__(self):
+        self.user_id: Optional[int] = None
+        self.wrote = False
+
+
+# Set per request by utils.db_lanes.DBLaneMiddleware
+current_routing: ContextVar[Optional[RequestRouting]] = ContextVar("db_routing", default=None)
+
+# Statements that must run on the primary (row locks included)
+_WRITE_RE = re.compile(
+    r"^\s*(INSERT|UPDATE|DELETE|MERGE|WITH\b.*\b(INSERT|UPDATE|DELETE)\b|.*\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b)",
+    re.I | re.S
+)
+
+
+def lane_config(lane: str) -> Dict[str, int]:
+    """Resolve pool settings for a lane (defaults overridden by env vars)"""
+    if lane not in _LANE_DEFAULTS:
+        raise ValueError(f"Unknown database pool lane: {lane}")
+    config = {}
+    for key, default in _LANE_DEFAULTS[lane].items():
+        env_key = f"DB_POOL_{lane.upper()}_{key.upper()}"
+        config[key] = int(os.getenv(env_key, default))
+    return config
+
+
+class PoolStats:
+    """Acquire-latency and usage counters for one pool lane"""
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.acquired = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent_waits: deque = deque(maxlen=ACQUIRE_SAMPLE_SIZE)
+
+    def record_wait(self, seconds: float):
+        self.acquired += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        self._recent_waits.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Acquire wait percentile (seconds) over the recent sample window"""
+        if not self._recent_waits:
+            return 0.0
+        ordered = sorted(self._recent_waits)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        avg_wait = self.total_wait / self.acquired if self.acquired else 0.0
+        return {
+            "acquired": self.acquired,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "acquire_wait_ms": {
+                "avg": round(avg_wait * 1000, 3),
+                "p50": round(self.percentile(50) * 1000, 3),
+                "p95": round(self.percentile(95) * 1000, 3),
+                "p99": round(self.percentile(99) * 1000, 3),
+                "max": round(self.max_wait * 1000, 3),
+            },
+        }
+
+
+# Callbacks invoked with (query, elapsed_seconds) after every statement run
+# through a LanePool.  Used by utils.sql_trace for per-request query tracing.
+_query_observers: List[Callable[[str, float], None]] = []
+
+
+def add_query_observer(observer: Callable[[str, float], None]):
+    """Register a callback that sees every statement and its duration"""
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+
+
+def remove_query_observer(observer: Callable[[str, float], None]):
+    if observer in _query_observers:
+        _query_observers.remove(observer)
+
+
+def _notify_query(query: str, elapsed: float):
+    for observer in _query_observers:
+        try:
+            observer(query, elapsed)
+        except Exception:
+            # Tracing must never break the query path
+            pass
+
+
+class TracedConnection:
+    """
+    Proxy for a connection handed out by LanePool.acquire(): statements run on
+    it are reported to the query observers like the pool-level helpers, so
+    transactions and bulk paths show up in per-request traces too. Writes and
+    transactions pin the request's user to the primary; plain reads do not.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def _run(self, method: str, query: str, *args, **kwargs):
+        if _WRITE_RE.match(query):
+            note_write()
+        started = time.perf_counter()
+        try:
+            return await getattr(self._conn, method)(query, *args, **kwargs)
+        finally:
+            _notify_query(query, time.perf_counter() - started)
+
+    async def fetch(self, query: str, *args, **kwargs):
+        return await self._run("fetch", query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        return await self._run("fetchrow", query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        return await self._run("fetchval", query, *args, **kwargs)
+
+    async def execute(self, query: str, *args, **kwargs):
+        return await self._run("execute", query, *args, **kwargs)
+
+    async def executemany(self, command: str, args, **kwargs):
+        return await self._run("executemany", command, args, **kwargs)
+
+    def transaction(self, *args, **kwargs):
+        note_write()
+        return self._conn.transaction(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # copy_*, prepare, ... go straight to asyncpg
+        return getattr(self._conn, name)
+
+
+class _TimedAcquire:
+    """Async context manager that acquires a connection and records the wait"""
+
+    def __init__(self, lane_pool: "LanePool", timeout: Optional[float], traced: bool = True):
+        self._lane_pool = lane_pool
+        self._timeout = timeout
+        self._traced = traced
+        self._conn = None
+
+    async def __aenter__(self):
+        stats = self._lane_pool.stats
+        stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            self._conn = await self._lane_pool.pool.acquire(timeout=self._timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.waiting -= 1
+        stats.record_wait(time.perf_counter() - started)
+        stats.in_use += 1
+        # The pool-level helpers report their own statement; callers get a traced proxy
+        return TracedConnection(self._conn) if self._traced else self._conn
+
+    async def __aexit__(self, *exc):
+        self._lane_pool.stats.in_use -= 1
+        await self._lane_pool.pool.release(self._conn)
+
+
+class LanePool:
+    """asyncpg pool wrapper that measures how long callers wait for a connection"""
+
+    def __init__(self, lane: str, pool: asyncpg.Pool, stats: PoolStats):
+        self.lane = lane
+        self.pool = pool
+        self.stats = stats
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        # Read-your-writes pinning happens on the connection's writes, not on acquire
+        return _TimedAcquire(self, timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            note_write()
+        async with _TimedAcquire(self, None, traced=False) as conn:
+            started = time.perf_counter()
+            try:
+                return await conn.fetch(query, *args, timeout=timeout)
+            finally:
+                _notify_query(query, time.perf_counter() - started)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            note_write()
+        async with _TimedAcquire(self, None, traced=False) as conn:
+            started = time.perf_counter()
+            try:
+                return await conn.fetchrow(query, *args, timeout=timeout)
+            finally:
+                _notify_query(query, time.perf_counter() - started)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            note_write()
+        async with _TimedAcquire(self, None, traced=False) as conn:
+            started = time.perf_counter()
+            try:
+                return await conn.fetchval(query, *args, column=column, timeout=timeout)
+            finally:
+                _notify_query(query, time.perf_counter() - started)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None):
+        note_write()
+        async with _TimedAcquire(self, None, traced=False) as conn:
+            started = time.perf_counter()
+            try:
+                return await conn.execute(query, *args, timeout=timeout)
+            finally:
+                _notify_query(query, time.perf_counter() - started)
+
+    async def executemany(self, command: str, args, *, timeout: Optional[float] = None):
+        note_write()
+        async with _TimedAcquire(self, None, traced=False) as conn:
+            started = time.perf_counter()
+            try:
+                return await conn.executemany(command, args, timeout=timeout)
+            finally:
+                _notify_query(command, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        # Anything not instrumented (get_size, close, ...) goes to asyncpg
+        return getattr(self.pool, name)
+
+
+class ReplicaLanePool(LanePool):
+    """LanePool on a read replica; writes and raw connections are sent to the primary lane"""
+
+    def __init__(self, lane: str, pool: asyncpg.Pool, stats: PoolStats, primary: LanePool):
+        super().__init__(lane, pool, stats)
+        self.primary = primary
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return self.primary.acquire(timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            return await self.primary.fetch(query, *args, timeout=timeout)
+        return await super().fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            return await self.primary.fetchrow(query, *args, timeout=timeout)
+        return await super().fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        if _WRITE_RE.match(query):
+            return await self.primary.fetchval(query, *args, column=column, timeout=timeout)
+        return await super().fetchval(query, *args, column=column, timeout=timeout)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None):
+        return await self.primary.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: Optional[float] = None):
+        return await self.primary.executemany(command, args, timeout=timeout)
+
+
+def _connection_init(statement_timeout_ms: int):
+    """Build the per-connection setup hook applying the lane's statement_timeout"""
+    async def _init(conn: asyncpg.Connection):
+        await conn.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+    return _init
+
+
+async def _create_lane_pool(lane: str, database_url: Optional[str] = None) -> asyncpg.Pool:
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable not set")
+    config = lane_config(lane)
+    return await asyncpg.create_pool(
+        database_url,
+        min_size=config["min_size"],
+        max_size=config["max_size"],
+        command_timeout=60,
+        statement_cache_size=config["statement_cache_size"],
+        init=_connection_init(config["statement_timeout_ms"]),
+    )
+
+
+async def get_pool(lane: Optional[str] = None, read: Optional[str] = None) -> LanePool:
+    """
+    Get or create the connection pool for a lane (defaults to the request's lane).
+    read=READ_REPLICA (or the request's read preference) returns the lane's replica
+    pool when one is configured, caught up and the current user has not just written.
+    """
+    lane = lane or current_lane.get()
+    if lane not in _pools:
+        async with _pool_lock:
+            if lane not in _pools:
+                _pools[lane] = await _create_lane_pool(lane)
+                _lane_stats.setdefault(lane, PoolStats(lane))
+    primary = LanePool(lane, _pools[lane], _lane_stats[lane])
+    if (read or current_read_preference.get()) != READ_REPLICA or not replica_url():
+        return primary
+    replica = await _get_replica_pool(lane, primary)
+    return replica or primary
+
+
+def replica_url() -> Optional[str]:
+    return os.getenv("DATABASE_REPLICA_URL")
+
+
+@contextmanager
+def read_preference(preference: str):
+    """Route get_pool() calls in this block (including mongo_compat reads) by preference"""
+    token = current_read_preference.set(preference)
+    try:
+        yield
+    finally:
+        current_read_preference.reset(token)
+
+
+_replica_pools: Dict[str, asyncpg.Pool] = {}
+_replica_stats: Dict[str, PoolStats] = {}
+# user_id -> monotonic time until which that user's reads stay on the primary
+_primary_pins: Dict[int, float] = {}
+
+
+class ReplicaMonitor:
+    """Cached replica replay lag, refreshed in the background every REPLICA_LAG_CHECK_SECONDS"""
+
+    LAG_QUERY = """SELECT CASE
+                       WHEN NOT pg_is_in_recovery() THEN 0
+                       WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                       ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                   END::float8"""
+
+    def __init__(self):
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self.replica_reads = 0
+        self.pinned_reads = 0
+        self.lag_fallbacks = 0
+
+    @property
+    def caught_up(self) -> bool:
+        return self.lag_seconds is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+
+    async def check(self, pool: asyncpg.Pool):
+        try:
+            self.lag_seconds = float(await pool.fetchval(self.LAG_QUERY))
+            self.last_error = None
+        except Exception as e:
+            self.lag_seconds = None
+            self.last_error = str(e)
+        self.checked_at = time.monotonic()
+
+    async def usable(self, pool: asyncpg.Pool) -> bool:
+        if not self.checked_at:
+            await self.check(pool)
+        elif time.monotonic() - self.checked_at > REPLICA_LAG_CHECK_SECONDS and (
+                self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.check(pool))
+        return self.caught_up
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "configured": bool(replica_url()),
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "caught_up": self.caught_up,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "pinned_reads": self.pinned_reads,
+            "lag_fallbacks": self.lag_fallbacks,
+            "pinned_users": len(_primary_pins),
+        }
+
+
+replica_monitor = ReplicaMonitor()
+
+
+def _reads_pinned_to_primary() -> bool:
+    routing = current_routing.get()
+    if routing is None:
+        return False
+    if routing.wrote:
+        return True
+    return routing.user_id is not None and _primary_pins.get(routing.user_id, 0.0) > time.monotonic()
+
+
+async def _get_replica_pool(lane: str, primary: LanePool) -> Optional[LanePool]:
+    if _reads_pinned_to_primary():
+        replica_monitor.pinned_reads += 1
+        return None
+    if lane not in _replica_pools:
+        async with _pool_lock:
+            if lane not in _replica_pools:
+                try:
+                    _replica_pools[lane] = await _create_lane_pool(lane, replica_url())
+                except Exception as e:
+                    replica_monitor.last_error = str(e)
+                    return None
+                _replica_stats.setdefault(lane, PoolStats(f"{lane}_replica"))
+    if not await replica_monitor.usable(_replica_pools[lane]):
+        replica_monitor.lag_fallbacks += 1
+        return None
+    replica_monitor.replica_reads += 1
+    return ReplicaLanePool(lane, _replica_pools[lane], _replica_stats[lane], primary)
+
+
+def bind_request_user(user_id: int):
+    """Attach the authenticated user to the request so their own writes pin them to the primary"""
+    routing = current_routing.get()
+    if routing is not None:
+        routing.user_id = user_id
+        if routing.wrote:
+            pin_to_primary(user_id)
+
+
+def pin_to_primary(user_id: int, seconds: Optional[float] = None):
+    """Keep user_id's reads on the primary for the read-your-writes window"""
+    if not replica_url():
+        return
+    now = time.monotonic()
+    if len(_primary_pins) > PIN_SWEEP_THRESHOLD:
+        for pinned, until in list(_primary_pins.items()):
+            if until <= now:
+                del _primary_pins[pinned]
+    _primary_pins[user_id] = now + (READ_YOUR_WRITES_SECONDS if seconds is None else seconds)
+
+
+def note_write():
+    """Record that the current request wrote (the rest of it, and the user's next reads, use the primary)"""
+    routing = current_routing.get()
+    if routing is None:
+        return
+    routing.wrote = True
+    if routing.user_id is not None:
+        pin_to_primary(routing.user_id)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-lane pool gauges for /api/health"""
+    report = {}
+    for lane, pool in _pools.items():
+        config = lane_config(lane)
+        lane_report = {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "min_size": config["min_size"],
+            "max_size": config["max_size"],
+            "statement_timeout_ms": config["statement_timeout_ms"],
+            "statement_cache_size": config["statement_cache_size"],
+        }
+        lane_report.update(_lane_stats[lane].snapshot())
+        report[lane] = lane_report
+    for lane, pool in _replica_pools.items():
+        replica_report = {"size": pool.get_size(), "idle": pool.get_idle_size()}
+        replica_report.update(_replica_stats[lane].snapshot())
+        report[f"{lane}_replica"] = replica_report
+    if replica_url():
+        report["replica_routing"] = replica_monitor.snapshot()
+    return report
 
 async def init_db():
-    """Initialize database connection"""
-    await get_pool()
+    """Initialize database connection pools"""
+    for lane in _LANE_DEFAULTS:
+        await get_pool(lane)
 
 async def create_tables():
     """Create tables if they don't exist (schema already applied)"""
@@ -36,16 +556,18 @@ async def create_tables():
     pass
 
 async def close_pool():
-    """Close database connection pool"""
-    global _pool
-    if _pool is not None:
-        await _pool.close()
-        _pool = None
+    """Close all database connection pools"""
+    for lane in list(_pools):
+        pool = _pools.pop(lane)
+        await pool.close()
+    for lane in list(_replica_pools):
+        pool = _replica_pools.pop(lane)
+        await pool.close()
 
 # User queries
 async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
-    """Get user by ID"""
-    pool = await get_pool()
+    """Get user by ID (always on the interactive lane - every request's auth lookup)"""
+    pool = await get_pool(LANE_INTERACTIVE)
     row = await pool.fetchrow("SELECT * FROM webapp_users WHERE id = $1", user_id)
     return dict(row) if row else None
 
@@ -136,6 +658,49 @@ async def update_user(user_id: int, updates: Dict[str, Any]):
     
     await pool.execute(query, *values)
 
+async def taken_usernames(usernames: List[str]) -> Set[str]:
+    """Lower-cased names from usernames that already exist - one indexed lookup for the whole batch"""
+    if not usernames:
+        return set()
+    pool = await get_pool(LANE_INTERACTIVE)
+    rows = await pool.fetch(
+        "SELECT lower(username) AS username FROM webapp_users WHERE lower(username) = ANY($1::text[])",
+        [name.lower() for name in usernames]
+    )
+    return {row["username"] for row in rows}
+
+async def get_usernames_page(after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Keyset page of (id, lower(username), last_username_change) ordered by id"""
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        """SELECT id, lower(username) AS username, last_username_change
+           FROM webapp_users WHERE id > $1 AND username IS NOT NULL
+           ORDER BY id LIMIT $2""",
+        after_id, limit
+    )
+    return [dict(row) for row in rows]
+
+async def get_usernames_changed_since(changed_since: datetime) -> List[Dict[str, Any]]:
+    """Users renamed after changed_since (same columns as get_usernames_page)"""
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        """SELECT id, lower(username) AS username, last_username_change
+           FROM webapp_users WHERE last_username_change > $1 AND username IS NOT NULL""",
+        changed_since
+    )
+    return [dict(row) for row in rows]
+
+async def get_case_duplicate_usernames() -> List[Dict[str, Any]]:
+    """Users whose username differs only by case from an older account's (oldest of each group excluded)"""
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        """SELECT id, username FROM (
+               SELECT id, username, row_number() OVER (PARTITION BY lower(username) ORDER BY id) AS rank
+               FROM webapp_users WHERE username IS NOT NULL
+           ) ranked WHERE rank > 1 ORDER BY id"""
+    )
+    return [dict(row) for row in rows]
+
 # Post queries
 async def create_post(user_id: int, caption: str, media: List) -> int:
     """Create new post"""
@@ -170,24 +735,173 @@ async def delete_post(post_id: int):
     await pool.execute("UPDATE webapp_posts SET is_deleted = TRUE WHERE id = $1", post_id)
 
 # Follow queries
-async def follow_user(follower_id: int, following_id: int, status: str = 'accepted'):
-    """Create follow relationship"""
-    pool = await get_pool()
-    await pool.execute(
-        """INSERT INTO webapp_follows (follower_id, following_id, status)
-           VALUES ($1, $2, $3)
-           ON CONFLICT (follower_id, following_id) DO UPDATE SET status = $3""",
-        follower_id, following_id, status
+# webapp_follows rows are a small state machine: (none) -> pending -> accepted,
+# or (none) -> accepted for public accounts; deleting a row returns to (none).
+# followers_count/following_count on webapp_users only count accepted rows and
+# are adjusted in the same transaction as the transition.
+FOLLOW_PENDING = "pending"
+FOLLOW_ACCEPTED = "accepted"
+
+async def _adjust_follow_counts(conn, follower_id: int, following_id: int, delta: int):
+    # One statement for both rows: they are locked in index (id) order, so two
+    # users following each other at the same time cannot deadlock
+    await conn.execute(
+        """UPDATE webapp_users SET
+               followers_count = GREATEST(COALESCE(followers_count, 0) + CASE WHEN id = $2 THEN $3 ELSE 0 END, 0),
+               following_count = GREATEST(COALESCE(following_count, 0) + CASE WHEN id = $1 THEN $3 ELSE 0 END, 0)
+           WHERE id = ANY(ARRAY[$1, $2]::int[])""",
+        follower_id, following_id, delta
     )
 
+async def follow_user(follower_id: int, following_id: int, status: str = FOLLOW_ACCEPTED) -> Dict[str, Any]:
+    """
+    Request (status='pending') or create (status='accepted') a follow.
+    An existing pending row is promoted when status='accepted' (the account went
+    public); an existing accepted row is never downgraded. Returns the row's
+    resulting status and whether this call changed it.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            row = await conn.fetchrow(
+                """INSERT INTO webapp_follows (follower_id, following_id, status)
+                   VALUES ($1, $2, $3)
+                   ON CONFLICT (follower_id, following_id) DO UPDATE SET status = EXCLUDED.status
+                   WHERE webapp_follows.status = 'pending' AND EXCLUDED.status = 'accepted'
+                   RETURNING status""",
+                follower_id, following_id, status
+            )
+            if row is None:
+                current = await conn.fetchval(
+                    "SELECT status FROM webapp_follows WHERE follower_id = $1 AND following_id = $2",
+                    follower_id, following_id
+                )
+                return {"status": current or status, "changed": False}
+            if row["status"] == FOLLOW_ACCEPTED:
+                await _adjust_follow_counts(conn, follower_id, following_id, 1)
+                await _backfill_timeline(conn, follower_id, following_id)
+            return {"status": row["status"], "changed": True}
+
+async def accept_follow_request(follower_id: int, following_id: int) -> bool:
+    """pending -> accepted; False when there was no pending request"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            accepted = await conn.fetchval(
+                """UPDATE webapp_follows SET status = 'accepted'
+                   WHERE follower_id = $1 AND following_id = $2 AND status = 'pending'
+                   RETURNING TRUE""",
+                follower_id, following_id
+            )
+            if accepted:
+                await _adjust_follow_counts(conn, follower_id, following_id, 1)
+                await _backfill_timeline(conn, follower_id, following_id)
+            return bool(accepted)
+
+async def remove_follow(follower_id: int, following_id: int, status: Optional[str] = None) -> Optional[str]:
+    """
+    Delete the follow row (only if it has `status`, when given) - covers unfollow,
+    reject and cancel. Returns the status that was removed, or None.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            removed = await conn.fetchval(
+                """DELETE FROM webapp_follows
+                   WHERE follower_id = $1 AND following_id = $2 AND ($3::varchar IS NULL OR status = $3)
+                   RETURNING status""",
+                follower_id, following_id, status
+            )
+            if removed == FOLLOW_ACCEPTED:
+                await _adjust_follow_counts(conn, follower_id, following_id, -1)
+                await conn.execute(
+                    "DELETE FROM webapp_timeline WHERE user_id = $1 AND author_id = $2",
+                    follower_id, following_id
+                )
+            return removed
+
+async def remove_user_follows(user_id: int) -> int:
+    """
+    Delete every follow row to or from user_id (account deletion) in one statement
+    that also takes the accepted ones off the other users' counters. Returns the
+    number of rows removed.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            removed = await conn.fetchval(
+                """WITH gone AS (
+                       DELETE FROM webapp_follows WHERE follower_id = $1 OR following_id = $1
+                       RETURNING follower_id, following_id, status
+                   ), delta AS (
+                       SELECT id, sum(lost_followers) AS lost_followers, sum(lost_following) AS lost_following
+                       FROM (
+                           SELECT following_id AS id, 1 AS lost_followers, 0 AS lost_following
+                           FROM gone WHERE status = 'accepted'
+                           UNION ALL
+                           SELECT follower_id, 0, 1 FROM gone WHERE status = 'accepted'
+                       ) edges GROUP BY id
+                   ), locked AS (
+                       -- Same id order as _adjust_follow_counts, so concurrent follows cannot deadlock
+                       SELECT id FROM webapp_users WHERE id IN (SELECT id FROM delta) ORDER BY id FOR UPDATE
+                   ), adjusted AS (
+                       UPDATE webapp_users u SET
+                           followers_count = GREATEST(COALESCE(u.followers_count, 0) - delta.lost_followers, 0),
+                           following_count = GREATEST(COALESCE(u.following_count, 0) - delta.lost_following, 0)
+                       FROM delta JOIN locked USING (id) WHERE u.id = delta.id
+                       RETURNING u.id
+                   )
+                   SELECT count(*) FROM gone""",
+                user_id
+            )
+            await conn.execute(
+                "DELETE FROM webapp_timeline WHERE user_id = $1 OR author_id = $1",
+                user_id
+            )
+            return removed
+
 async def unfollow_user(follower_id: int, following_id: int):
     """Remove follow relationship"""
+    await remove_follow(follower_id, following_id)
+
+async def get_follow_status(follower_id: int, following_id: int) -> Optional[str]:
+    """'pending', 'accepted' or None"""
     pool = await get_pool()
-    await pool.execute(
-        "DELETE FROM webapp_follows WHERE follower_id = $1 AND following_id = $2",
+    return await pool.fetchval(
+        "SELECT status FROM webapp_follows WHERE follower_id = $1 AND following_id = $2",
         follower_id, following_id
     )
 
+async def get_follow_statuses(follower_id: int, following_ids: List[int]) -> Dict[int, str]:
+    """Status of follower_id's follow towards each of following_ids (absent = not following)"""
+    if not following_ids:
+        return {}
+    pool = await get_pool()
+    rows = await pool.fetch(
+        """SELECT following_id, status FROM webapp_follows
+           WHERE follower_id = $1 AND following_id = ANY($2::int[])""",
+        follower_id, list(following_ids)
+    )
+    return {row["following_id"]: row["status"] for row in rows}
+
+async def get_follow_list(user_id: int, direction: str, limit: int = 1000, offset: int = 0) -> List[Dict[str, Any]]:
+    """Accepted followers ('followers') or followees ('following') of user_id with profile columns, newest first"""
+    if direction == "followers":
+        match, other = "following_id", "follower_id"
+    elif direction == "following":
+        match, other = "follower_id", "following_id"
+    else:
+        raise ValueError(f"Unknown follow direction: {direction}")
+    pool = await get_pool()
+    rows = await pool.fetch(
+        f"""SELECT u.id, u.username, u.full_name, u.profile_photo_url, u.bio
+            FROM webapp_follows f JOIN webapp_users u ON u.id = f.{other}
+            WHERE f.{match} = $1 AND f.status = 'accepted'
+            ORDER BY f.created_at DESC, f.{other} DESC LIMIT $2 OFFSET $3""",
+        user_id, limit, offset
+    )
+    return [dict(row) for row in rows]
+
 async def is_following(follower_id: int, following_id: int) -> bool:
     """Check if user is following another user"""
     pool = await get_pool()
@@ -215,6 +929,136 @@ async def get_following(user_id: int) -> List[int]:
     )
     return [row['following_id'] for row in rows]
 
+# Home timeline queries
+# webapp_timeline holds, per user, the ids of recent posts by the authors they
+# follow (and their own), pushed when a post is created.  Authors with more
+# than TIMELINE_FANOUT_MAX_FOLLOWERS followers are not pushed; their posts are
+# pulled by the timeline read instead.  Each user's rows are trimmed back to
+# TIMELINE_MAX_ENTRIES by utils.timeline.
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "500"))
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv("TIMELINE_FANOUT_MAX_FOLLOWERS", "10000"))
+# Recent posts copied into a timeline when a follow is accepted
+TIMELINE_BACKFILL_POSTS = int(os.getenv("TIMELINE_BACKFILL_POSTS", "50"))
+
+_VISIBLE_POST = "p.is_archived IS NOT TRUE AND p.is_deleted IS NOT TRUE"
+
+async def _backfill_timeline(conn, follower_id: int, following_id: int):
+    """Copy a newly followed (pushed) author's recent posts into the follower's timeline"""
+    await conn.execute(
+        f"""INSERT INTO webapp_timeline (user_id, post_id, author_id, created_at)
+            SELECT $1, p.id, p.user_id, p.created_at FROM webapp_posts p
+            WHERE p.user_id = $2 AND {_VISIBLE_POST}
+              AND (SELECT COALESCE(followers_count, 0) FROM webapp_users WHERE id = $2) <= $3
+            ORDER BY p.created_at DESC LIMIT $4
+            ON CONFLICT (user_id, post_id) DO NOTHING""",
+        follower_id, following_id, TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_BACKFILL_POSTS
+    )
+
+async def fan_out_post(post_id: int) -> List[int]:
+    """
+    Push a visible post onto its author's timeline and, unless the author is
+    pull-on-read, onto every accepted follower's. Returns the users pushed to.
+    """
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        f"""WITH post AS (
+                SELECT p.id, p.user_id, p.created_at FROM webapp_posts p
+                WHERE p.id = $1 AND {_VISIBLE_POST}
+            ), recipients AS (
+                SELECT user_id FROM post
+                UNION
+                SELECT f.follower_id FROM post
+                JOIN webapp_users u ON u.id = post.user_id AND COALESCE(u.followers_count, 0) <= $2
+                JOIN webapp_follows f ON f.following_id = post.user_id AND f.status = 'accepted'
+            )
+            INSERT INTO webapp_timeline (user_id, post_id, author_id, created_at)
+            SELECT r.user_id, post.id, post.user_id, post.created_at FROM recipients r CROSS JOIN post
+            ON CONFLICT (user_id, post_id) DO NOTHING
+            RETURNING user_id""",
+        post_id, TIMELINE_FANOUT_MAX_FOLLOWERS
+    )
+    return [row["user_id"] for row in rows]
+
+async def remove_post_from_timelines(post_id: int) -> int:
+    """Drop an archived/removed post from every timeline (hard deletes cascade on their own)"""
+    pool = await get_pool()
+    result = await pool.execute("DELETE FROM webapp_timeline WHERE post_id = $1", post_id)
+    return int(result.split()[-1])
+
+async def trim_timelines(user_ids: List[int], max_entries: int = TIMELINE_MAX_ENTRIES) -> int:
+    """Delete everything past each user's max_entries newest rows"""
+    if not user_ids:
+        return 0
+    pool = await get_pool(LANE_BACKGROUND)
+    result = await pool.execute(
+        """DELETE FROM webapp_timeline t
+           USING (
+               SELECT u.user_id, c.created_at, c.post_id
+               FROM unnest($1::int[]) AS u(user_id)
+               CROSS JOIN LATERAL (
+                   SELECT created_at, post_id FROM webapp_timeline
+                   WHERE user_id = u.user_id
+                   ORDER BY created_at DESC, post_id DESC OFFSET $2 LIMIT 1
+               ) c
+           ) cutoff
+           WHERE t.user_id = cutoff.user_id
+             AND (t.created_at, t.post_id) <= (cutoff.created_at, cutoff.post_id)""",
+        list(user_ids), max_entries
+    )
+    return int(result.split()[-1])
+
+async def get_timeline(user_id: int, limit: int, before: Optional[Tuple[datetime, int]] = None) -> List[Dict]:
+    """
+    (post_id, created_at) of the user's next timeline page, newest first: one
+    range read of webapp_timeline merged with the recent posts of the
+    pull-on-read authors they follow.
+    """
+    before_at, before_id = before if before else (None, None)
+    pool = await get_pool()
+    rows = await pool.fetch(
+        f"""SELECT post_id, created_at FROM (
+                SELECT post_id, created_at FROM webapp_timeline
+                WHERE user_id = $1
+                  AND ($2::timestamp IS NULL OR (created_at, post_id) < ($2::timestamp, $3::int))
+                ORDER BY created_at DESC, post_id DESC LIMIT $4
+            ) pushed
+            UNION
+            SELECT p.id, p.created_at
+            FROM webapp_follows f
+            JOIN webapp_users u ON u.id = f.following_id AND COALESCE(u.followers_count, 0) > $5
+            CROSS JOIN LATERAL (
+                SELECT p.id, p.created_at FROM webapp_posts p
+                WHERE p.user_id = f.following_id AND {_VISIBLE_POST}
+                  AND ($2::timestamp IS NULL OR (p.created_at, p.id) < ($2::timestamp, $3::int))
+                ORDER BY p.created_at DESC LIMIT $4
+            ) p
+            WHERE f.follower_id = $1 AND f.status = 'accepted'
+            ORDER BY created_at DESC, post_id DESC LIMIT $4""",
+        user_id, before_at, before_id, limit, TIMELINE_FANOUT_MAX_FOLLOWERS
+    )
+    return [dict(row) for row in rows]
+
+async def get_discovery_posts(user_id: int, limit: int, before: Optional[Tuple[datetime, int]] = None,
+                              exclude_user_ids: Sequence[int] = ()) -> List[Dict]:
+    """
+    (post_id, created_at) of recent visible posts by authors the user neither is
+    nor follows - the global feed shown once their timeline runs out
+    """
+    before_at, before_id = before if before else (None, None)
+    pool = await get_pool()
+    rows = await pool.fetch(
+        f"""SELECT p.id AS post_id, p.created_at FROM webapp_posts p
+            WHERE {_VISIBLE_POST} AND p.user_id <> $1 AND NOT (p.user_id = ANY($2::int[]))
+              AND NOT EXISTS (
+                  SELECT 1 FROM webapp_follows f
+                  WHERE f.follower_id = $1 AND f.following_id = p.user_id AND f.status = 'accepted'
+              )
+              AND ($3::timestamp IS NULL OR (p.created_at, p.id) < ($3::timestamp, $4::int))
+            ORDER BY p.created_at DESC, p.id DESC LIMIT $5""",
+        user_id, list(exclude_user_ids), before_at, before_id, limit
+    )
+    return [dict(row) for row in rows]
+
 # Notification queries
 async def create_notification(user_id: int, notif_type: str, from_user_id: int, 
                               from_username: str, message: str, post_id: Optional[int] = None):
@@ -237,3 +1081,214 @@ async def get_user_notifications(user_id: int, limit: int = 50) -> List[Dict]:
         user_id, limit
     )
     return [dict(row) for row in rows]
+
+# Search suggestion queries
+def like_prefix(prefix: str) -> str:
+    """LIKE pattern matching strings that start with prefix (wildcards escaped)"""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+async def suggest_users(prefix: str, exclude_ids: List[int], limit: int) -> List[Dict[str, Any]]:
+    """Searchable users whose lower(username) or lower(full_name) starts with prefix"""
+    pool = await get_pool(LANE_INTERACTIVE)
+    # Two index range scans (text_pattern_ops) instead of one OR so each side stops at LIMIT
+    rows = await pool.fetch(
+        """(SELECT id, username, full_name, profile_photo_url FROM webapp_users
+            WHERE lower(username) LIKE $1 ESCAPE '\\' AND appear_in_search IS NOT FALSE
+              AND id <> ALL($2::int[]) LIMIT $3)
+           UNION
+           (SELECT id, username, full_name, profile_photo_url FROM webapp_users
+            WHERE lower(full_name) LIKE $1 ESCAPE '\\' AND appear_in_search IS NOT FALSE
+              AND id <> ALL($2::int[]) LIMIT $3)
+           LIMIT $3""",
+        like_prefix(prefix.lower()), list(exclude_ids), limit
+    )
+    return [dict(row) for row in rows]
+
+async def suggest_hashtags(prefix: str, limit: int) -> List[Dict[str, Any]]:
+    """Most used hashtags starting with prefix (tags are stored lower-cased without '#')"""
+    pool = await get_pool(LANE_INTERACTIVE)
+    rows = await pool.fetch(
+        """SELECT tag, post_count FROM webapp_hashtags
+           WHERE tag LIKE $1 ESCAPE '\\' AND post_count > 0
+           ORDER BY post_count DESC LIMIT $2""",
+        like_prefix(prefix.lower()), limit
+    )
+    return [dict(row) for row in rows]
+
+async def bump_hashtags(tags: List[str], delta: int):
+    """Add delta to the post count of every tag (creating rows as needed, never below zero)"""
+    if not tags:
+        return
+    pool = await get_pool(LANE_BACKGROUND)
+    await pool.execute(
+        """INSERT INTO webapp_hashtags (tag, post_count, last_used_at)
+           SELECT tag, GREATEST($2::int, 0), NOW() FROM unnest($1::text[]) AS tag
+           ON CONFLICT (tag) DO UPDATE
+           SET post_count = GREATEST(webapp_hashtags.post_count + $2::int, 0),
+               last_used_at = CASE WHEN $2::int > 0 THEN NOW() ELSE webapp_hashtags.last_used_at END""",
+        list(tags), delta
+    )
+
+async def get_popular_users(limit: int) -> List[Dict[str, Any]]:
+    """Searchable users with the most accepted followers (seed for the suggestion trie)"""
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        """SELECT u.id, u.username, u.full_name, u.profile_photo_url, f.followers
+           FROM (SELECT following_id, count(*) AS followers FROM webapp_follows
+                 WHERE status = 'accepted' GROUP BY following_id
+                 ORDER BY followers DESC LIMIT $1) f
+           JOIN webapp_users u ON u.id = f.following_id
+           WHERE u.appear_in_search IS NOT FALSE
+           ORDER BY f.followers DESC""",
+        limit
+    )
+    return [dict(row) for row in rows]
+
+async def get_popular_hashtags(limit: int) -> List[Dict[str, Any]]:
+    """Hashtags with the highest post counts (seed for the suggestion trie)"""
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        "SELECT tag, post_count FROM webapp_hashtags WHERE post_count > 0 ORDER BY post_count DESC LIMIT $1",
+        limit
+    )
+    return [dict(row) for row in rows]
+
+# Verification code (OTP) queries
+# Identifier columns a code can be issued against; interpolated into SQL, so never caller-supplied
+_OTP_COLUMNS = ("email", "mobile", "telegram_id")
+
+def _otp_column(column: str) -> str:
+    if column not in _OTP_COLUMNS:
+        raise ValueError(f"Unknown verification code identifier: {column}")
+    return column
+
+async def issue_verification_code(column: str, identifier: Any, code_hash: str, ttl_seconds: int,
+                                  ip_address: Optional[str], window_seconds: int,
+                                  allow: Callable[[Dict[str, Any]], int]) -> int:
+    """
+    Supersede any active code for identifier and insert a new one, unless allow()
+    rejects the recent send usage. allow receives identifier_sends, ip_sends and
+    seconds_since_last for the window and returns 0 or a retry-after in seconds.
+    Serialized per identifier with an advisory lock so concurrent sends from
+    different workers cannot both slip under the limit.
+    """
+    column = _otp_column(column)
+    pool = await get_pool(LANE_INTERACTIVE)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", f"otp:{column}:{identifier}")
+            usage = await conn.fetchrow(
+                f"""SELECT count(*) FILTER (WHERE {column} = $1) AS identifier_sends,
+                           count(*) FILTER (WHERE ip_address = $2) AS ip_sends,
+                           EXTRACT(EPOCH FROM NOW() - max(created_at) FILTER (WHERE {column} = $1))
+                               AS seconds_since_last
+                    FROM webapp_verification_codes
+                    WHERE created_at > NOW() - make_interval(secs => $3)
+                      AND ({column} = $1 OR ip_address = $2)""",
+                identifier, ip_address, window_seconds
+            )
+            retry_after = allow(dict(usage))
+            if retry_after:
+                return retry_after
+            await conn.execute(
+                f"""UPDATE webapp_verification_codes SET expires_at = NOW()
+                    WHERE {column} = $1 AND consumed_at IS NULL AND expires_at > NOW()""",
+                identifier
+            )
+            await conn.execute(
+                f"""INSERT INTO webapp_verification_codes ({column}, code_hash, ip_address, expires_at)
+                    VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))""",
+                identifier, code_hash, ip_address, ttl_seconds
+            )
+    return 0
+
+async def consume_verification_code(column: str, identifier: Any, code_hash: str, max_attempts: int) -> bool:
+    """
+    Count one attempt against the newest live code for identifier and consume it
+    if code_hash matches. The row lock makes concurrent guesses from different
+    workers queue up, so at most max_attempts guesses are ever checked.
+    """
+    column = _otp_column(column)
+    pool = await get_pool(LANE_INTERACTIVE)
+    row = await pool.fetchrow(
+        f"""UPDATE webapp_verification_codes v
+            SET attempts = v.attempts + 1,
+                consumed_at = CASE WHEN v.code_hash = $2 THEN NOW() END
+            FROM (SELECT id FROM webapp_verification_codes
+                  WHERE {column} = $1 AND consumed_at IS NULL AND expires_at > NOW()
+                  ORDER BY created_at DESC LIMIT 1
+                  FOR UPDATE) latest
+            WHERE v.id = latest.id AND v.attempts < $3
+            RETURNING v.consumed_at IS NOT NULL AS matched""",
+        identifier, code_hash, max_attempts
+    )
+    return bool(row and row["matched"])
+
+async def purge_verification_codes(retain_seconds: int, batch_size: int = 5000) -> int:
+    """Delete codes expired or used more than retain_seconds ago, in batches; returns rows removed"""
+    pool = await get_pool(LANE_BACKGROUND)
+    removed = 0
+    while True:
+        status = await pool.execute(
+            """DELETE FROM webapp_verification_codes WHERE id IN (
+                   SELECT id FROM webapp_verification_codes
+                   WHERE expires_at < NOW() - make_interval(secs => $1)
+                      OR consumed_at < NOW() - make_interval(secs => $1)
+                   LIMIT $2)""",
+            retain_seconds, batch_size
+        )
+        deleted = int(status.split()[-1])
+        removed += deleted
+        if deleted < batch_size:
+            return removed
+
+# Counter reconciliation queries
+# Denormalized counter -> (table, counter column, count over its source rows for row t).
+# Interpolated into SQL, so names are only ever looked up here, never caller-supplied.
+RECONCILED_COUNTERS = {
+    "user_followers": ("webapp_users", "followers_count",
+                       "SELECT count(*) FROM webapp_follows f WHERE f.following_id = t.id AND f.status = 'accepted'"),
+    "user_following": ("webapp_users", "following_count",
+                       "SELECT count(*) FROM webapp_follows f WHERE f.follower_id = t.id AND f.status = 'accepted'"),
+    # Likes and comments live as JSON arrays on the post row
+    "post_likes": ("webapp_posts", "likes_count",
+                   "SELECT coalesce(jsonb_array_length(t.likes), 0)"),
+    "post_comments": ("webapp_posts", "comments_count",
+                      "SELECT coalesce(jsonb_array_length(t.comments), 0)"),
+    "story_views": ("webapp_stories", "views_count",
+                    "SELECT coalesce(jsonb_array_length(t.viewers), 0)"),
+}
+
+def _reconciled_counter(name: str):
+    if name not in RECONCILED_COUNTERS:
+        raise ValueError(f"Unknown counter: {name}")
+    return RECONCILED_COUNTERS[name]
+
+async def scan_counter(name: str, after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Next keyset page of (id, stored, actual) for a counter, ordered by id"""
+    table, column, source = _reconciled_counter(name)
+    pool = await get_pool(LANE_BACKGROUND)
+    rows = await pool.fetch(
+        f"""SELECT t.id, t.{column} AS stored, ({source})::int AS actual
+            FROM {table} t WHERE t.id > $1 ORDER BY t.id LIMIT $2""",
+        after_id, limit
+    )
+    return [dict(row) for row in rows]
+
+async def repair_counter(name: str, ids: List[int], stored: List[Optional[int]]) -> int:
+    """
+    Recompute the counter for ids, skipping rows whose counter no longer holds the value
+    scanned (a concurrent transition moved it; the next run re-checks). Returns rows fixed.
+    """
+    if not ids:
+        return 0
+    table, column, source = _reconciled_counter(name)
+    pool = await get_pool(LANE_BACKGROUND)
+    status = await pool.execute(
+        f"""UPDATE {table} t SET {column} = ({source})
+            FROM unnest($1::int[], $2::int[]) AS v(id, stored)
+            WHERE t.id = v.id AND t.{column} IS NOT DISTINCT FROM v.stored""",
+        ids, stored
+    )
+    return int(status.split()[-1])
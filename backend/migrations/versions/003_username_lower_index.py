@@ -0,0 +1,64 @@
+"""
+Case-insensitive unique usernames
+Unique functional index on lower(username) for webapp_users, plus a partial
+index on last_username_change for the username filter's rename refresh
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '003_username_lower_index'
+down_revision = '002_fantasy_tables'
+branch_labels = None
+depends_on = None
+
+
+def _drop_invalid_index(name):
+    """
+    A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, and
+    IF NOT EXISTS would then skip the rebuild - drop it so the retry is real
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def _check_duplicate_usernames():
+    rows = op.get_bind().execute(sa.text(
+        "SELECT lower(username), array_agg(username ORDER BY id) FROM webapp_users "
+        "WHERE username IS NOT NULL GROUP BY lower(username) HAVING count(*) > 1 "
+        "ORDER BY 1 LIMIT 50"
+    )).fetchall()
+    if rows:
+        listed = "; ".join(f"{key}: {', '.join(names)}" for key, names in rows)
+        raise RuntimeError(
+            f"{len(rows)}{'+' if len(rows) == 50 else ''} usernames differ only by case ({listed}). "
+            "Run POST /api/admin/fix-duplicate-usernames (renames all but the oldest of each group), "
+            "then re-apply this migration."
+        )
+
+
+def upgrade():
+    """Create username indexes without blocking writes"""
+    _check_duplicate_usernames()
+    with op.get_context().autocommit_block():
+        for name in ("idx_users_username_lower", "idx_users_last_username_change"):
+            _drop_invalid_index(name)
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_users_username_lower "
+            "ON webapp_users (lower(username))"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_last_username_change "
+            "ON webapp_users (last_username_change) WHERE last_username_change IS NOT NULL"
+        )
+
+
+def downgrade():
+    """Drop username indexes"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_last_username_change")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_username_lower")
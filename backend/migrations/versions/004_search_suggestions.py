@@ -0,0 +1,62 @@
+"""
+Search suggestion indexes
+Prefix (text_pattern_ops) indexes on lower(username) / lower(full_name) and the
+webapp_hashtags frequency table, backfilled from existing post captions
+"""
+from alembic import op
+
+# revision identifiers
+revision = '004_search_suggestions'
+down_revision = '003_username_lower_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the hashtag table, backfill it and build prefix indexes without blocking writes"""
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS webapp_hashtags (
+            tag TEXT PRIMARY KEY,
+            post_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    op.execute(r"""
+        INSERT INTO webapp_hashtags (tag, post_count, last_used_at)
+        SELECT tag, count(*), max(created_at)
+        FROM (
+            SELECT DISTINCT p.id, p.created_at, lower(m[1]) AS tag
+            FROM webapp_posts p, regexp_matches(p.caption, '#(\w+)', 'g') AS m
+            WHERE p.is_deleted IS NOT TRUE AND p.is_archived IS NOT TRUE
+        ) tags
+        GROUP BY tag
+        ON CONFLICT (tag) DO UPDATE
+        SET post_count = EXCLUDED.post_count, last_used_at = EXCLUDED.last_used_at
+    """)
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_username_prefix "
+            "ON webapp_users (lower(username) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_full_name_prefix "
+            "ON webapp_users (lower(full_name) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hashtags_tag_prefix "
+            "ON webapp_hashtags (tag text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hashtags_post_count "
+            "ON webapp_hashtags (post_count DESC) WHERE post_count > 0"
+        )
+
+
+def downgrade():
+    """Drop suggestion indexes and the hashtag table"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_hashtags_post_count")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_hashtags_tag_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_full_name_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_username_prefix")
+    op.execute("DROP TABLE IF EXISTS webapp_hashtags")
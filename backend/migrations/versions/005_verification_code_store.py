@@ -0,0 +1,39 @@
+"""
+Shared OTP store
+Hashed codes, consumption and caller IP on webapp_verification_codes so every
+worker verifies against the same rows, plus indexes for the send throttles
+"""
+from alembic import op
+
+# revision identifiers
+revision = '005_verification_code_store'
+down_revision = '004_search_suggestions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add hash/consumption/IP columns and throttle indexes"""
+    op.execute("ALTER TABLE webapp_verification_codes ALTER COLUMN code DROP NOT NULL")
+    op.execute("ALTER TABLE webapp_verification_codes ADD COLUMN IF NOT EXISTS code_hash VARCHAR(64)")
+    op.execute("ALTER TABLE webapp_verification_codes ADD COLUMN IF NOT EXISTS ip_address VARCHAR(45)")
+    op.execute("ALTER TABLE webapp_verification_codes ADD COLUMN IF NOT EXISTS consumed_at TIMESTAMP")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_verification_ip_created "
+            "ON webapp_verification_codes (ip_address, created_at) WHERE ip_address IS NOT NULL"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_verification_expires_at "
+            "ON webapp_verification_codes (expires_at)"
+        )
+
+
+def downgrade():
+    """Drop throttle indexes and the shared-store columns"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_verification_expires_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_verification_ip_created")
+    op.execute("ALTER TABLE webapp_verification_codes DROP COLUMN IF EXISTS consumed_at")
+    op.execute("ALTER TABLE webapp_verification_codes DROP COLUMN IF EXISTS ip_address")
+    op.execute("ALTER TABLE webapp_verification_codes DROP COLUMN IF EXISTS code_hash")
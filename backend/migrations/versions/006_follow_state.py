@@ -0,0 +1,52 @@
+"""
+Follow state machine
+Constrains webapp_follows.status to pending/accepted, folds the old
+webapp_follow_requests rows in as pending follows and backfills the
+denormalized followers_count/following_count columns on webapp_users
+"""
+from alembic import op
+
+# revision identifiers
+revision = '006_follow_state'
+down_revision = '005_verification_code_store'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add counters and the status constraint, then backfill both"""
+    op.execute("ALTER TABLE webapp_users ADD COLUMN IF NOT EXISTS followers_count INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE webapp_users ADD COLUMN IF NOT EXISTS following_count INTEGER NOT NULL DEFAULT 0")
+    op.execute("UPDATE webapp_follows SET status = 'accepted' WHERE status IS NULL OR status NOT IN ('pending', 'accepted')")
+    op.execute("ALTER TABLE webapp_follows ALTER COLUMN status SET NOT NULL")
+    op.execute("""
+        ALTER TABLE webapp_follows ADD CONSTRAINT webapp_follows_status_check
+        CHECK (status IN ('pending', 'accepted'))
+    """)
+    op.execute("""
+        INSERT INTO webapp_follows (follower_id, following_id, status, created_at)
+        SELECT requester_id, requested_id, 'pending', created_at FROM webapp_follow_requests
+        ON CONFLICT (follower_id, following_id) DO NOTHING
+    """)
+    op.execute("""
+        UPDATE webapp_users u SET
+            followers_count = (SELECT count(*) FROM webapp_follows f
+                               WHERE f.following_id = u.id AND f.status = 'accepted'),
+            following_count = (SELECT count(*) FROM webapp_follows f
+                               WHERE f.follower_id = u.id AND f.status = 'accepted')
+    """)
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_follows_following_status "
+            "ON webapp_follows (following_id, status)"
+        )
+
+
+def downgrade():
+    """Drop the constraint, index and counters (pending rows stay in webapp_follows)"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_follows_following_status")
+    op.execute("ALTER TABLE webapp_follows DROP CONSTRAINT IF EXISTS webapp_follows_status_check")
+    op.execute("ALTER TABLE webapp_follows ALTER COLUMN status DROP NOT NULL")
+    op.execute("ALTER TABLE webapp_users DROP COLUMN IF EXISTS following_count")
+    op.execute("ALTER TABLE webapp_users DROP COLUMN IF EXISTS followers_count")
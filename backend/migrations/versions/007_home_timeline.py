@@ -0,0 +1,61 @@
+"""
+Home timeline
+webapp_timeline (user_id, post_id) rows pushed on post create, read newest-first
+per user, backfilled with each user's 500 newest followed/own posts
+"""
+from alembic import op
+
+# revision identifiers
+revision = '007_home_timeline'
+down_revision = '006_follow_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the timeline table and its read index, then backfill it"""
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS webapp_timeline (
+            user_id INTEGER NOT NULL REFERENCES webapp_users(id) ON DELETE CASCADE,
+            post_id INTEGER NOT NULL REFERENCES webapp_posts(id) ON DELETE CASCADE,
+            author_id INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (user_id, post_id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO webapp_timeline (user_id, post_id, author_id, created_at)
+        SELECT user_id, post_id, author_id, created_at FROM (
+            SELECT r.user_id, p.id AS post_id, p.user_id AS author_id, p.created_at,
+                   row_number() OVER (PARTITION BY r.user_id ORDER BY p.created_at DESC, p.id DESC) AS rn
+            FROM (
+                SELECT id AS user_id, id AS author_id FROM webapp_users
+                UNION
+                SELECT follower_id, following_id FROM webapp_follows WHERE status = 'accepted'
+            ) r
+            JOIN webapp_posts p ON p.user_id = r.author_id
+            WHERE p.is_archived IS NOT TRUE AND p.is_deleted IS NOT TRUE AND p.created_at IS NOT NULL
+        ) ranked
+        WHERE rn <= 500
+        ON CONFLICT (user_id, post_id) DO NOTHING
+    """)
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_timeline_user_created "
+            "ON webapp_timeline (user_id, created_at DESC, post_id DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_timeline_post "
+            "ON webapp_timeline (post_id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_posts_user_created "
+            "ON webapp_posts (user_id, created_at DESC)"
+        )
+
+
+def downgrade():
+    """Drop the timeline table (posts are untouched)"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_posts_user_created")
+    op.execute("DROP TABLE IF EXISTS webapp_timeline")
@@ -0,0 +1,408 @@
+"""
+Aggregation Pipeline Compiler for the MongoDB compatibility layer
+Translates a subset of aggregation stages into a single PostgreSQL statement
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SUPPORTED_STAGES = ("$match", "$group", "$sort", "$limit", "$skip", "$project", "$unwind", "$lookup")
+ACCUMULATORS = {"$sum": "SUM", "$avg": "AVG", "$min": "MIN", "$max": "MAX", "$count": "COUNT"}
+
+# App field names whose column is not the plain snake_case form
+FIELD_COLUMNS = {
+    'password_hash': 'password',
+    'profileImage': 'profile_photo_url',
+    'phoneVerified': 'mobile_verified',
+}
+
+# (sql, is_jsonb) - nested paths, unwound elements and lookup results are jsonb
+Expr = Tuple[str, bool]
+
+
+class UnsupportedPipelineError(ValueError):
+    """Raised for stages, operators or expressions aggregate() cannot translate to SQL"""
+
+
+def column_name(field: str) -> str:
+    if field in FIELD_COLUMNS:
+        return FIELD_COLUMNS[field]
+    if field.startswith('_'):
+        return field
+    return ''.join(['_' + c.lower() if c.isupper() else c for c in field]).lstrip('_')
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _field_path(value: Any) -> Optional[str]:
+    if isinstance(value, str) and value.startswith('$') and not value.startswith('$$'):
+        return value[1:]
+    return None
+
+
+class _Select:
+    """One SELECT level; stages are folded into it until one needs a subquery"""
+
+    def __init__(self, source: str, alias: str, outputs: Optional[Dict[str, bool]] = None):
+        self.source = source
+        self.alias = alias
+        # Column name -> is_jsonb for a subquery source; None for the base table (columns unknown)
+        self.outputs = outputs
+        self.joins: List[str] = []
+        # Fields replaced or added by $unwind/$lookup: name -> (sql, is_jsonb)
+        self.fields: Dict[str, Expr] = {}
+        self.shadowing = False
+        self.where: List[str] = []
+        self.group_by: Optional[List[str]] = None
+        self.columns: Optional[List[Tuple[str, str, bool]]] = None
+        self.order: List[str] = []
+        self.limit: Optional[int] = None
+        self.offset: Optional[int] = None
+
+    @property
+    def shaped(self) -> bool:
+        return self.columns is not None
+
+    def ref(self, path: str) -> Expr:
+        head, *rest = path.split('.')
+        head = column_name(head)
+        if head in self.fields:
+            sql, is_json = self.fields[head]
+        else:
+            is_json = bool(self.outputs and self.outputs.get(head))
+            sql = f"{self.alias}.{quote(head)}"
+        if rest:
+            if not is_json:
+                sql = f"to_jsonb({sql})"
+            for key in rest:
+                sql = f"({sql} -> '{column_name(key)}')"
+            is_json = True
+        return sql, is_json
+
+    def output_names(self) -> Dict[str, bool]:
+        if self.columns is not None:
+            return {name: is_json for _, name, is_json in self.columns}
+        names = dict(self.outputs or {})
+        names.update({name: is_json for name, (_, is_json) in self.fields.items()})
+        return names
+
+    def render(self) -> str:
+        if self.columns is not None:
+            select = ', '.join(f"{sql} AS {quote(name)}" for sql, name, _ in self.columns)
+        else:
+            select = ', '.join([f"{self.alias}.*"] + [f"{sql} AS {quote(name)}" for name, (sql, _) in self.fields.items()])
+        query = f"SELECT {select} FROM {self.source}"
+        if self.joins:
+            query += ' ' + ' '.join(self.joins)
+        if self.where:
+            query += f" WHERE {' AND '.join(self.where)}"
+        if self.group_by:
+            query += f" GROUP BY {', '.join(self.group_by)}"
+        if self.order:
+            query += f" ORDER BY {', '.join(self.order)}"
+        if self.limit is not None:
+            query += f" LIMIT {self.limit}"
+        if self.offset:
+            query += f" OFFSET {self.offset}"
+        return query
+
+
+class PipelineCompiler:
+    """
+    Compiles an aggregation pipeline against one table into (sql, params, jsonb output columns).
+    Stages fold into the current SELECT where SQL allows and are wrapped in a subquery otherwise.
+    """
+
+    def __init__(self, table_name: str, resolve_table: Callable[[str], str]):
+        self.table_name = table_name
+        self.resolve_table = resolve_table
+        self.params: List[Any] = []
+        self._aliases = 0
+
+    def _param(self, value: Any, is_json: bool = False) -> str:
+        if is_json:
+            self.params.append(json.dumps(value, default=str))
+            return f"${len(self.params)}::jsonb"
+        self.params.append(value)
+        return f"${len(self.params)}"
+
+    def _alias(self, prefix: str = 's') -> str:
+        alias = f"{prefix}{self._aliases}"
+        self._aliases += 1
+        return alias
+
+    def compile(self, pipeline: List[Dict[str, Any]]) -> Tuple[str, List[Any], List[str]]:
+        alias = self._alias()
+        select = _Select(f"{self.table_name} AS {alias}", alias)
+        for stage in pipeline:
+            if not isinstance(stage, dict) or len(stage) != 1:
+                raise UnsupportedPipelineError(f"Each pipeline stage must be a single-key dict, got {stage!r}")
+            (name, spec), = stage.items()
+            if name not in SUPPORTED_STAGES:
+                raise UnsupportedPipelineError(
+                    f"{name} is not supported by aggregate() (supported stages: {', '.join(SUPPORTED_STAGES)})")
+            select = getattr(self, f"_stage_{name[1:]}")(select, spec)
+        json_columns = [name for name, is_json in select.output_names().items() if is_json]
+        return select.render(), self.params, json_columns
+
+    def _wrap(self, select: _Select) -> _Select:
+        if select.shadowing:
+            raise UnsupportedPipelineError(
+                "$unwind of a table column can only be followed by $match, $sort, $limit, $skip, "
+                "$project or $group before the first subquery; add a $project after the $unwind")
+        alias = self._alias()
+        return _Select(f"({select.render()}) AS {alias}", alias, select.output_names())
+
+    # Expressions
+
+    def _expr(self, select: _Select, value: Any) -> Expr:
+        path = _field_path(value)
+        if path is not None:
+            return select.ref(path)
+        if isinstance(value, dict) and len(value) == 1 and next(iter(value)).startswith('$'):
+            (op, arg), = value.items()
+            if op == '$literal':
+                is_json = not isinstance(arg, (str, int, float, bool))
+                return self._param(arg, is_json), is_json
+            if op in ('$toLower', '$toUpper'):
+                sql = self._text(select, arg)
+                return f"{'lower' if op == '$toLower' else 'upper'}({sql})", False
+            if op == '$size':
+                sql, is_json = self._expr(select, arg)
+                return f"jsonb_array_length({sql if is_json else f'to_jsonb({sql})'})", False
+            if op == '$regexFindAll':
+                if not isinstance(arg, dict) or 'input' not in arg or 'regex' not in arg:
+                    raise UnsupportedPipelineError("$regexFindAll needs {'input': ..., 'regex': ...}")
+                flags = 'gi' if 'i' in arg.get('options', '') else 'g'
+                sql = self._text(select, arg['input'])
+                regex = self._param(arg['regex'])
+                return (f"(SELECT coalesce(jsonb_agg(jsonb_build_object('match', m[1])), '[]'::jsonb) "
+                        f"FROM regexp_matches({sql}, '(' || {regex} || ')', '{flags}') AS m)"), True
+            raise UnsupportedPipelineError(f"Expression operator {op} is not supported by aggregate()")
+        if isinstance(value, (dict, list)):
+            raise UnsupportedPipelineError(f"Unsupported expression {value!r} (use $literal for constants)")
+        return self._param(value), False
+
+    def _text(self, select: _Select, value: Any) -> str:
+        sql, is_json = self._expr(select, value)
+        return f"({sql} #>> '{{}}')" if is_json else f"{sql}::text"
+
+    # Stages
+
+    def _stage_match(self, select: _Select, spec: Dict[str, Any]) -> _Select:
+        if select.shaped or select.group_by is not None or select.order or select.limit is not None or select.offset:
+            select = self._wrap(select)
+        select.where.append(self._condition(select, spec))
+        return select
+
+    def _condition(self, select: _Select, spec: Dict[str, Any]) -> str:
+        parts = []
+        for key, value in spec.items():
+            if key in ('$and', '$or', '$nor'):
+                subs = [f"({self._condition(select, sub)})" for sub in value] or ['TRUE']
+                joined = (' OR ' if key != '$and' else ' AND ').join(subs)
+                parts.append(f"NOT ({joined})" if key == '$nor' else f"({joined})")
+            elif key.startswith('$'):
+                raise UnsupportedPipelineError(f"Query operator {key} is not supported in $match")
+            else:
+                sql, is_json = select.ref(key)
+                if isinstance(value, dict) and value and all(op.startswith('$') for op in value):
+                    parts.extend(self._comparison(sql, is_json, key, op, arg, value) for op, arg in value.items()
+                                 if op != '$options')
+                else:
+                    parts.append(self._comparison(sql, is_json, key, '$eq', value, {}))
+        return ' AND '.join(parts) if parts else 'TRUE'
+
+    def _comparison(self, sql: str, is_json: bool, key: str, op: str, arg: Any, spec: Dict[str, Any]) -> str:
+        arg = self._coerce_id(key, arg)
+        if op in ('$eq', '$ne') and arg is None:
+            return f"{sql} IS {'NOT ' if op == '$ne' else ''}NULL"
+        if op == '$eq':
+            return f"{sql} = {self._param(arg, is_json)}"
+        if op == '$ne':
+            return f"{sql} IS DISTINCT FROM {self._param(arg, is_json)}"
+        if op in ('$gt', '$gte', '$lt', '$lte'):
+            symbol = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}[op]
+            return f"{sql} {symbol} {self._param(arg, is_json)}"
+        if op in ('$in', '$nin'):
+            if not arg:
+                return 'FALSE' if op == '$in' else 'TRUE'
+            if is_json:
+                self.params.append([json.dumps(item, default=str) for item in arg])
+                array = f"${len(self.params)}::jsonb[]"
+            else:
+                array = self._param(list(arg))
+            return f"{sql} = ANY({array})" if op == '$in' else f"({sql} = ANY({array})) IS NOT TRUE"
+        if op == '$exists':
+            return f"{sql} IS {'NOT ' if arg else ''}NULL"
+        if op == '$regex':
+            text = f"({sql} #>> '{{}}')" if is_json else sql
+            return f"{text} {'~*' if 'i' in spec.get('$options', '') else '~'} {self._param(arg)}"
+        raise UnsupportedPipelineError(f"Query operator {op} is not supported in $match")
+
+    @staticmethod
+    def _coerce_id(key: str, value: Any) -> Any:
+        # Same id/user_id coercion as the rest of the compatibility layer
+        if column_name(key) not in ('id', 'user_id'):
+            return value
+        if isinstance(value, str):
+            try:
+                return int(value)
+            except ValueError:
+                return value
+        if isinstance(value, (list, tuple)):
+            return [PipelineCompiler._coerce_id(key, item) for item in value]
+        return value
+
+    def _stage_group(self, select: _Select, spec: Dict[str, Any]) -> _Select:
+        if '_id' not in spec:
+            raise UnsupportedPipelineError("$group requires an _id expression (use None for a single group)")
+        if select.shaped or select.group_by is not None or select.order or select.limit is not None or select.offset:
+            select = self._wrap(select)
+
+        key = spec['_id']
+        columns, group_by = [], []
+        if key is None:
+            columns.append(("NULL", "_id", False))
+        elif isinstance(key, dict) and not any(k.startswith('$') for k in key):
+            pairs = []
+            for name, value in key.items():
+                sql, is_json = self._expr(select, value)
+                group_by.append(sql)
+                pairs.append(f"'{name}', {sql}")
+            columns.append((f"jsonb_build_object({', '.join(pairs)})", "_id", True))
+        else:
+            sql, is_json = self._expr(select, key)
+            group_by.append(sql)
+            columns.append((sql, "_id", is_json))
+
+        for name, accumulator in spec.items():
+            if name == '_id':
+                continue
+            if not isinstance(accumulator, dict) or len(accumulator) != 1:
+                raise UnsupportedPipelineError(f"$group field {name!r} needs a single accumulator")
+            (op, arg), = accumulator.items()
+            if op not in ACCUMULATORS:
+                raise UnsupportedPipelineError(
+                    f"Accumulator {op} is not supported (supported: {', '.join(ACCUMULATORS)})")
+            if op == '$count' or (op == '$sum' and arg == 1):
+                sql = "COUNT(*)"
+            elif op == '$sum' and isinstance(arg, (int, float)) and not isinstance(arg, bool):
+                sql = f"COUNT(*) * {self._param(arg)}"
+            else:
+                value, is_json = self._expr(select, arg)
+                if is_json:
+                    value = f"({value})::numeric" if op in ('$sum', '$avg') else value
+                sql = f"{ACCUMULATORS[op]}({value})"
+                if op == '$sum':
+                    sql = f"coalesce({sql}, 0)"
+                columns.append((sql, column_name(name), is_json and op in ('$min', '$max')))
+                continue
+            columns.append((sql, column_name(name), False))
+
+        select.columns = columns
+        select.group_by = group_by
+        return select
+
+    def _stage_sort(self, select: _Select, spec: Dict[str, int]) -> _Select:
+        if select.limit is not None or select.offset:
+            select = self._wrap(select)
+        if select.shaped and not all('.' not in field and column_name(field) in select.output_names() for field in spec):
+            select = self._wrap(select)
+        order = []
+        for field, direction in spec.items():
+            if direction not in (1, -1):
+                raise UnsupportedPipelineError(f"$sort direction for {field!r} must be 1 or -1")
+            sql = quote(column_name(field)) if select.shaped else select.ref(field)[0]
+            order.append(f"{sql} {'ASC' if direction == 1 else 'DESC'}")
+        select.order = order
+        return select
+
+    def _stage_limit(self, select: _Select, spec: int) -> _Select:
+        if not isinstance(spec, int) or isinstance(spec, bool) or spec <= 0:
+            raise UnsupportedPipelineError("$limit must be a positive integer")
+        select.limit = spec if select.limit is None else min(select.limit, spec)
+        return select
+
+    def _stage_skip(self, select: _Select, spec: int) -> _Select:
+        if not isinstance(spec, int) or isinstance(spec, bool) or spec < 0:
+            raise UnsupportedPipelineError("$skip must be a non-negative integer")
+        if select.limit is not None:
+            select = self._wrap(select)
+        select.offset = (select.offset or 0) + spec
+        return select
+
+    def _stage_project(self, select: _Select, spec: Dict[str, Any]) -> _Select:
+        if select.shaped or select.group_by is not None:
+            select = self._wrap(select)
+        columns = []
+        if '_id' not in spec and '_id' in select.output_names():
+            sql, is_json = select.ref('_id')
+            columns.append((sql, '_id', is_json))
+        for field, value in spec.items():
+            if '.' in field:
+                raise UnsupportedPipelineError(
+                    f"Dotted $project field {field!r} is not supported; name it, e.g. {{'x': '${field}'}}")
+            if value in (0, False):
+                if field == '_id':
+                    continue
+                raise UnsupportedPipelineError(f"$project exclusion of {field!r} is not supported (only _id: 0)")
+            if value in (1, True):
+                sql, is_json = select.ref(field)
+            elif isinstance(value, dict) and not all(k.startswith('$') for k in value):
+                raise UnsupportedPipelineError(f"Nested $project spec for {field!r} is not supported")
+            else:
+                sql, is_json = self._expr(select, value)
+            columns.append((sql, column_name(field), is_json))
+        select.columns = columns
+        return select
+
+    def _stage_unwind(self, select: _Select, spec: Any) -> _Select:
+        if isinstance(spec, str):
+            spec = {'path': spec}
+        path = _field_path(spec.get('path'))
+        if path is None or '.' in path:
+            raise UnsupportedPipelineError("$unwind path must be a top-level field such as '$tags'")
+        if select.shaped or select.group_by is not None or select.limit is not None or select.offset:
+            select = self._wrap(select)
+
+        name = column_name(path)
+        sql, is_json = select.ref(path)
+        array = sql if is_json else f"to_jsonb({sql})"
+        alias = self._alias('u')
+        index = spec.get('includeArrayIndex')
+        elements = f"jsonb_array_elements(CASE WHEN jsonb_typeof({array}) = 'array' THEN {array} END)"
+        if index:
+            lateral = f"{elements} WITH ORDINALITY AS {alias}(value, idx)"
+        else:
+            lateral = f"{elements} AS {alias}(value)"
+        if spec.get('preserveNullAndEmptyArrays'):
+            select.joins.append(f"LEFT JOIN LATERAL {lateral} ON TRUE")
+        else:
+            select.joins.append(f"CROSS JOIN LATERAL {lateral}")
+        if name not in select.fields:
+            # alias.* still carries the array column under the same name
+            select.shadowing = True
+        select.fields[name] = (f"{alias}.value", True)
+        if index:
+            select.fields[column_name(index)] = (f"({alias}.idx - 1)", False)
+        return select
+
+    def _stage_lookup(self, select: _Select, spec: Dict[str, Any]) -> _Select:
+        missing = {'from', 'localField', 'foreignField', 'as'} - set(spec)
+        if missing or 'pipeline' in spec or 'let' in spec:
+            raise UnsupportedPipelineError(
+                "$lookup supports only {from, localField, foreignField, as} (a single equality join)")
+        if select.shaped or select.group_by is not None or select.limit is not None or select.offset:
+            select = self._wrap(select)
+
+        local, is_json = select.ref(spec['localField'])
+        foreign = f"f.{quote(column_name(spec['foreignField']))}"
+        condition = f"{foreign}::text = ({local} #>> '{{}}')" if is_json else f"{foreign} = {local}"
+        alias = self._alias('l')
+        select.joins.append(
+            f"LEFT JOIN LATERAL (SELECT coalesce(jsonb_agg(to_jsonb(f)), '[]'::jsonb) AS docs "
+            f"FROM {self.resolve_table(spec['from'])} AS f WHERE {condition}) AS {alias} ON TRUE")
+        select.fields[column_name(spec['as'])] = (f"{alias}.docs", True)
+        return select
@@ -5,19 +5,69 @@ to minimize changes to existing server.py code
 """
 import asyncpg
 import json
-from typing import Optional, List, Dict, Any
+import os
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from db_postgres import get_pool
+from mongo_aggregate import PipelineCompiler, UnsupportedPipelineError
+
+# Rows per multi-row INSERT; PostgreSQL caps a statement at 32767 bind parameters
+INSERT_CHUNK_ROWS = int(os.getenv("MONGO_COMPAT_INSERT_CHUNK_ROWS", "500"))
+MAX_BIND_PARAMS = 32767
+# Same-shape batches at least this large go through COPY instead of INSERT ... VALUES
+COPY_THRESHOLD = int(os.getenv("MONGO_COMPAT_COPY_THRESHOLD", "1000"))
+
+
+class InsertOne:
+    """bulk_write operation: insert one document"""
+    def __init__(self, document: Dict[str, Any]):
+        self.document = document
+
+
+class UpdateOne:
+    """bulk_write operation: $set on rows matching an equality filter, optionally upserting"""
+    def __init__(self, filter_dict: Dict[str, Any], update_dict: Dict[str, Any], upsert: bool = False):
+        self.filter = filter_dict
+        self.update = update_dict
+        self.upsert = upsert
+
+
+class UpdateMany(UpdateOne):
+    """bulk_write operation: same as UpdateOne (the compat layer never limits updates to one row)"""
+
+
+class DeleteOne:
+    """bulk_write operation: delete rows matching an equality filter"""
+    def __init__(self, filter_dict: Dict[str, Any]):
+        self.filter = filter_dict
+
+
+class DeleteMany(DeleteOne):
+    """bulk_write operation: same as DeleteOne"""
+
+
+class BulkWriteError(Exception):
+    """Raised by bulk_write when a batch fails; details holds counts and per-batch errors"""
+    def __init__(self, details: Dict[str, Any]):
+        super().__init__(f"bulk write error: {details['writeErrors']}")
+        self.details = details
+
 
 class Collection:
     """Simulates MongoDB collection with PostgreSQL backend"""
     
-    def __init__(self, table_name: str):
+    def __init__(self, table_name: str, read_preference: Optional[str] = None):
         self.table_name = table_name
+        # None follows the request's read preference; writes always go to the primary
+        self.read_preference = read_preference
+    
+    def with_options(self, read_preference: Optional[str] = None):
+        """Copy of this collection with its reads routed per read_preference (pymongo-style)"""
+        return Collection(self.table_name, read_preference)
     
     async def find_one(self, filter_dict: Dict[str, Any], projection: Dict[str, Any] = None) -> Optional[Dict]:
         """Find single document matching filter (projection parameter ignored for now)"""
-        pool = await get_pool()
+        pool = await get_pool(read=self.read_preference)
         
         # Use the same advanced query building logic as Cursor class
         where_clause, values = self._build_where_clause(filter_dict)
@@ -134,11 +184,15 @@ class Collection:
         """Find multiple documents - returns a cursor-like object"""
         if filter_dict is None:
             filter_dict = {}
-        return Cursor(self.table_name, filter_dict)
+        return Cursor(self.table_name, filter_dict, self.read_preference)
+    
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        """Run an aggregation pipeline as one SQL statement - returns a cursor-like object"""
+        return AggregateCursor(self.table_name, pipeline, self.read_preference)
     
     async def count_documents(self, filter_dict: Dict[str, Any] = None):
         """Count documents matching filter"""
-        pool = await get_pool()
+        pool = await get_pool(read=self.read_preference)
         
         if filter_dict is None or not filter_dict:
             # Simple count all
@@ -159,10 +213,8 @@ class Collection:
             print(f"Query: {query}")
             return 0
     
-    async def insert_one(self, document: Dict[str, Any]):
-        """Insert single document"""
-        pool = await get_pool()
-        
+    def _to_row(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a document to {column: value} for this table (unknown fields and id are dropped)"""
         # Define valid columns for each table
         table_columns = {
             'webapp_users': {
@@ -297,6 +349,14 @@ class Collection:
             
             db_document[db_key] = value
         
+        return db_document
+    
+    async def insert_one(self, document: Dict[str, Any]):
+        """Insert single document"""
+        pool = await get_pool()
+        
+        db_document = self._to_row(document)
+        
         # Build INSERT query
         columns = list(db_document.keys())
         placeholders = [f'${i+1}' for i in range(len(columns))]
@@ -317,10 +377,75 @@ class Collection:
             print(f"Values: {values}")
             raise
     
-    async def update_one(self, filter_dict: Dict[str, Any], update_dict: Dict[str, Any]):
-        """Update single document"""
+    async def insert_many(self, documents: List[Dict[str, Any]]):
+        """
+        Insert documents in one transaction. Rows with the same columns go out as
+        multi-row INSERT ... VALUES chunks, or through COPY past COPY_THRESHOLD.
+        """
+        rows = [self._to_row(document) for document in documents]
+        if not rows:
+            return {'inserted_ids': [], 'inserted_count': 0}
+        
         pool = await get_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    inserted_ids = await self._insert_rows(conn, rows)
+            return {'inserted_ids': inserted_ids, 'inserted_count': len(inserted_ids)}
+        except Exception as e:
+            print(f"Error in insert_many: {e}")
+            raise
+    
+    async def _insert_rows(self, conn, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Insert converted rows on conn, returning ids in input order"""
+        inserted_ids = [None] * len(rows)
+        shapes: Dict[Tuple[str, ...], List[int]] = {}
+        for position, row in enumerate(rows):
+            shapes.setdefault(tuple(row), []).append(position)
         
+        for columns, positions in shapes.items():
+            records = [tuple(rows[position][col] for col in columns) for position in positions]
+            if not columns:
+                ids = [await conn.fetchval(f"INSERT INTO {self.table_name} DEFAULT VALUES RETURNING id")
+                       for _ in records]
+            elif len(records) >= COPY_THRESHOLD:
+                ids = await self._copy_insert(conn, columns, records)
+            else:
+                chunk = max(1, min(INSERT_CHUNK_ROWS, MAX_BIND_PARAMS // len(columns)))
+                ids = []
+                for start in range(0, len(records), chunk):
+                    ids.extend(await self._values_insert(conn, columns, records[start:start + chunk]))
+            for position, inserted_id in zip(positions, ids):
+                inserted_ids[position] = inserted_id
+        return inserted_ids
+    
+    async def _values_insert(self, conn, columns: Tuple[str, ...], records: List[tuple]) -> List[Any]:
+        width = len(columns)
+        tuples = ', '.join(
+            '(' + ', '.join(f'${row * width + col + 1}' for col in range(width)) + ')'
+            for row in range(len(records))
+        )
+        query = f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES {tuples} RETURNING id"
+        rows = await conn.fetch(query, *[value for record in records for value in record])
+        return [row['id'] for row in rows]
+    
+    async def _copy_insert(self, conn, columns: Tuple[str, ...], records: List[tuple]) -> List[Any]:
+        # COPY can't return ids, so stage into a temp table and move the rows with one INSERT ... SELECT
+        staging = f"_bulk_{self.table_name}"
+        column_list = ', '.join(columns)
+        await conn.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {self.table_name} WITH NO DATA"
+        )
+        await conn.copy_records_to_table(staging, records=records, columns=list(columns))
+        rows = await conn.fetch(
+            f"INSERT INTO {self.table_name} ({column_list}) SELECT {column_list} FROM {staging} RETURNING id"
+        )
+        await conn.execute(f"DROP TABLE {staging}")
+        return [row['id'] for row in rows]
+    
+    def _set_pairs(self, update_dict: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """(column, value) pairs for the $set part of an update document"""
         # Field mappings from MongoDB/App names to PostgreSQL column names
         field_mappings = {
             'password_hash': 'password',
@@ -367,11 +492,7 @@ class Collection:
         else:
             update_fields = update_dict
         
-        # Build SET clause
-        set_parts = []
-        values = []
-        param_num = 1
-        
+        pairs = []
         for key, value in update_fields.items():
             # First check if there's a specific mapping
             if key in field_mappings:
@@ -386,12 +507,12 @@ class Collection:
             elif isinstance(value, datetime):
                 value = value.isoformat()
             
-            set_parts.append(f"{db_key} = ${param_num}")
-            values.append(value)
-            param_num += 1
-        
-        # Build WHERE clause
-        where_parts = []
+            pairs.append((db_key, value))
+        return pairs
+    
+    def _filter_pairs(self, filter_dict: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """(column, value) pairs for a plain equality filter"""
+        pairs = []
         for key, value in filter_dict.items():
             db_key = ''.join(['_' + c.lower() if c.isupper() else c for c in key]).lstrip('_')
             
@@ -401,15 +522,53 @@ class Collection:
                     value = int(value)
                 except (ValueError, TypeError):
                     pass
-                    
-            where_parts.append(f"{db_key} = ${param_num}")
-            values.append(value)
-            param_num += 1
-        
+            
+            pairs.append((db_key, value))
+        return pairs
+    
+    def _update_statement(self, set_pairs: List[Tuple[str, Any]], filter_pairs: List[Tuple[str, Any]]):
+        """UPDATE text and argument list for one set/filter shape"""
+        set_parts = [f"{col} = ${i + 1}" for i, (col, _) in enumerate(set_pairs)]
+        offset = len(set_pairs)
+        where_parts = [f"{col} = ${offset + i + 1}" for i, (col, _) in enumerate(filter_pairs)]
         set_clause = ", ".join(set_parts)
         where_clause = " AND ".join(where_parts) if where_parts else "TRUE"
-        
         query = f"UPDATE {self.table_name} SET {set_clause} WHERE {where_clause}"
+        return query, [value for _, value in set_pairs] + [value for _, value in filter_pairs]
+    
+    @staticmethod
+    def _upsert_row(set_pairs: List[Tuple[str, Any]], filter_pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """Row inserted by an upsert: filter fields (already id-coerced) plus $set fields"""
+        row = dict(filter_pairs)
+        for col, value in set_pairs:
+            row.setdefault(col, value)
+        return row
+    
+    def _upsert_statement(self, set_pairs: List[Tuple[str, Any]], filter_pairs: List[Tuple[str, Any]]):
+        """
+        INSERT ... ON CONFLICT (filter columns) DO UPDATE for one set/filter shape.
+        Needs a unique index on exactly the filter columns.
+        """
+        conflict_cols = [col for col, _ in filter_pairs]
+        row = self._upsert_row(set_pairs, filter_pairs)
+        columns = list(row)
+        placeholders = ', '.join(f'${i + 1}' for i in range(len(columns)))
+        updates = [f"{col} = EXCLUDED.{col}" for col, _ in set_pairs if col not in conflict_cols]
+        action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+        query = (f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({placeholders}) "
+                 f"ON CONFLICT ({', '.join(conflict_cols)}) {action}")
+        return query, [row[col] for col in columns]
+    
+    async def update_one(self, filter_dict: Dict[str, Any], update_dict: Dict[str, Any], upsert: bool = False):
+        """Update single document (upsert=True inserts filter + $set fields when nothing matches)"""
+        pool = await get_pool()
+        
+        set_pairs = self._set_pairs(update_dict)
+        filter_pairs = self._filter_pairs(filter_dict)
+        if upsert:
+            return await self._upsert(pool, set_pairs, filter_pairs)
+        
+        query, values = self._update_statement(set_pairs, filter_pairs)
         
         try:
             await pool.execute(query, *values)
@@ -420,6 +579,112 @@ class Collection:
             print(f"Values: {values}")
             raise
     
+    async def _upsert(self, pool, set_pairs: List[Tuple[str, Any]], filter_pairs: List[Tuple[str, Any]]):
+        query, values = self._upsert_statement(set_pairs, filter_pairs)
+        try:
+            await pool.execute(query, *values)
+            return {'modified_count': 1, 'upserted': True}
+        except asyncpg.exceptions.InvalidColumnReferenceError:
+            # No unique index on the filter columns - update, then insert if nothing
+            # matched, in one transaction
+            pass
+        update_query, update_values = self._update_statement(set_pairs, filter_pairs)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                status = await conn.execute(update_query, *update_values)
+                if status.split()[-1] != '0':
+                    return {'modified_count': int(status.split()[-1]), 'upserted': False}
+                row = self._upsert_row(set_pairs, filter_pairs)
+                columns = list(row)
+                placeholders = ', '.join(f'${i + 1}' for i in range(len(columns)))
+                await conn.execute(
+                    f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+                    *[row[col] for col in columns]
+                )
+        return {'modified_count': 0, 'upserted': True}
+    
+    def _compile_operation(self, op) -> Tuple[str, Optional[str], Any]:
+        """(kind, statement, payload) for one bulk_write operation; same statement = same batch"""
+        if isinstance(op, InsertOne):
+            return 'insert', None, self._to_row(op.document)
+        if isinstance(op, UpdateOne):
+            set_pairs = self._set_pairs(op.update)
+            filter_pairs = self._filter_pairs(op.filter)
+            if op.upsert:
+                query, values = self._upsert_statement(set_pairs, filter_pairs)
+                return 'upsert', query, values
+            query, values = self._update_statement(set_pairs, filter_pairs)
+            return 'update', query, values
+        if isinstance(op, DeleteOne):
+            filter_pairs = self._filter_pairs(op.filter)
+            if len(filter_pairs) == 1:
+                # Single-key deletes collapse into one "= ANY($1)" statement
+                return 'delete_any', filter_pairs[0][0], filter_pairs[0][1]
+            where_clause = " AND ".join(f"{col} = ${i + 1}" for i, (col, _) in enumerate(filter_pairs)) or "TRUE"
+            return 'delete', f"DELETE FROM {self.table_name} WHERE {where_clause}", [v for _, v in filter_pairs]
+        raise TypeError(f"Unsupported bulk_write operation: {op!r}")
+    
+    async def _run_batch(self, conn, kind: str, statement: Optional[str], payloads: List[Any], result: Dict[str, Any]):
+        if kind == 'insert':
+            inserted_ids = await self._insert_rows(conn, payloads)
+            result['inserted_ids'].extend(inserted_ids)
+            result['inserted_count'] += len(inserted_ids)
+        elif kind == 'delete_any':
+            status = await conn.execute(f"DELETE FROM {self.table_name} WHERE {statement} = ANY($1)", payloads)
+            result['deleted_count'] += int(status.split()[-1])
+        else:
+            # executemany pipelines the batch in one round-trip but reports no per-row status
+            await conn.executemany(statement, payloads)
+            counter = {'update': 'modified_count', 'upsert': 'upserted_count', 'delete': 'deleted_count'}[kind]
+            result[counter] += len(payloads)
+    
+    async def bulk_write(self, operations: List[Any], ordered: bool = True):
+        """
+        Run InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany operations in one transaction.
+        Operations that compile to the same statement are sent as one batch: consecutive runs
+        when ordered, every matching operation when not. Each batch runs under a savepoint;
+        ordered stops at the first failed batch, unordered carries on. Batches that succeeded
+        are committed and BulkWriteError reports the rest.
+        """
+        batches: List[Tuple[Tuple[str, Optional[str]], int, List[Any]]] = []
+        by_key: Dict[Tuple[str, Optional[str]], List[Any]] = {}
+        for index, op in enumerate(operations):
+            kind, statement, payload = self._compile_operation(op)
+            key = (kind, statement)
+            if ordered:
+                if batches and batches[-1][0] == key:
+                    batches[-1][2].append(payload)
+                else:
+                    batches.append((key, index, [payload]))
+            elif key in by_key:
+                by_key[key].append(payload)
+            else:
+                by_key[key] = [payload]
+                batches.append((key, index, by_key[key]))
+        
+        result = {'inserted_ids': [], 'inserted_count': 0, 'modified_count': 0,
+                  'upserted_count': 0, 'deleted_count': 0}
+        errors = []
+        if not batches:
+            return result
+        
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for (kind, statement), first_index, payloads in batches:
+                    try:
+                        async with conn.transaction():
+                            await self._run_batch(conn, kind, statement, payloads, result)
+                    except asyncpg.PostgresError as e:
+                        print(f"Error in bulk_write ({kind}): {e}")
+                        errors.append({'index': first_index, 'kind': kind, 'count': len(payloads), 'errmsg': str(e)})
+                        if ordered:
+                            break
+        
+        if errors:
+            raise BulkWriteError({**result, 'writeErrors': errors})
+        return result
+    
     async def delete_one(self, filter_dict: Dict[str, Any]):
         """Delete single document"""
         pool = await get_pool()
@@ -593,7 +858,7 @@ class Collection:
         if filter_dict is None:
             filter_dict = {}
         
-        pool = await get_pool()
+        pool = await get_pool(read=self.read_preference)
         
         # Build WHERE clause
         where_parts = []
@@ -686,9 +951,10 @@ class Collection:
 class Cursor:
     """Simulates MongoDB cursor for find() operations"""
     
-    def __init__(self, table_name: str, filter_dict: Dict[str, Any]):
+    def __init__(self, table_name: str, filter_dict: Dict[str, Any], read_preference: Optional[str] = None):
         self.table_name = table_name
         self.filter_dict = filter_dict
+        self.read_preference = read_preference
         self._sort_field = None
         self._sort_order = None
         self._limit_value = None
@@ -712,7 +978,7 @@ class Cursor:
     
     async def to_list(self, length: int = None):
         """Convert cursor to list"""
-        pool = await get_pool()
+        pool = await get_pool(read=self.read_preference)
         
         # Build WHERE clause with support for complex queries
         where_clause, values = self._build_where_clause(self.filter_dict)
@@ -802,6 +1068,65 @@ class Cursor:
         return result
 
 
+class AggregateCursor:
+    """
+    Cursor for aggregate(). Supports $match, $group ($sum/$count/$avg/$min/$max), $sort,
+    $limit, $skip, $project, $unwind and a single-join $lookup; anything else raises
+    UnsupportedPipelineError before a query is sent.
+    """
+    
+    def __init__(self, table_name: str, pipeline: List[Dict[str, Any]], read_preference: Optional[str] = None):
+        self.table_name = table_name
+        self.pipeline = list(pipeline)
+        self.read_preference = read_preference
+    
+    def compile(self, length: int = None):
+        """(query, values, jsonb columns) for the pipeline, capped at length rows"""
+        pipeline = self.pipeline + ([{"$limit": length}] if length else [])
+        compiler = PipelineCompiler(self.table_name, _collection_table)
+        return compiler.compile(pipeline)
+    
+    async def to_list(self, length: int = None):
+        """Run the pipeline and return camelCase documents"""
+        query, values, json_columns = self.compile(length)
+        pool = await get_pool(read=self.read_preference)
+        
+        try:
+            rows = await pool.fetch(query, *values)
+        except Exception as e:
+            print(f"Error in aggregate: {e}")
+            print(f"Query: {query}")
+            print(f"Values: {values}")
+            raise
+        
+        results = []
+        for row in rows:
+            # items() keeps the last of duplicate names, so an $unwind element wins over its array
+            result = dict(row.items())
+            for name in json_columns:
+                if isinstance(result.get(name), str):
+                    result[name] = json.loads(result[name])
+            results.append(_document_keys(result))
+        return results
+
+
+def _collection_table(name: str) -> str:
+    """Table behind a $lookup 'from' collection name (users -> webapp_users)"""
+    return name if name.startswith('webapp_') else f"webapp_{name}"
+
+
+def _document_keys(value: Any) -> Any:
+    """snake_case -> camelCase keys, recursively (lookup results are nested rows)"""
+    if isinstance(value, list):
+        return [_document_keys(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    converted = Collection._snake_to_camel(None, {k: v for k, v in value.items() if k != '_id'})
+    if '_id' in value:
+        converted = {'_id': value['_id'], **converted}
+    return {key: _document_keys(item) for key, item in converted.items()}
+
+
 class Database:
     """Simulates MongoDB database with collections"""
     
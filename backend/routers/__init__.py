@@ -0,0 +1,69 @@
+"""
+API Router Registry
+Route modules are listed by import path and only imported when registered with the app
+"""
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, FastAPI
+
+logger = logging.getLogger(__name__)
+
+# name -> "module" (exports `router`) or "module:attribute".
+# Registration order matters where paths overlap, e.g. /api/posts/feed must be
+# matched before /api/posts/{post_id} - keep those in the same module.
+ROUTER_MODULES: Dict[str, str] = {
+    "auth": "routers.auth",
+    "stories": "routers.stories",
+    "posts": "routers.posts",
+    "media": "routers.media",
+    "users": "routers.users",
+    "notifications": "routers.notifications",
+    "search": "routers.search",
+    "admin": "routers.admin",
+    "social": "social_features:social_router",
+}
+
+# Import + route-building time per registered router, in milliseconds
+load_times: Dict[str, float] = {}
+
+
+def register(name: str, target: str) -> None:
+    """Add (or replace) a router plugin; must be called before register_routers()"""
+    ROUTER_MODULES[name] = target
+
+
+def enabled_routers() -> List[str]:
+    """
+    Routers to load, from ENABLED_ROUTERS (comma separated, default: all).
+    Lets a worker pool that only serves part of the API skip importing the rest.
+    """
+    raw = os.getenv("ENABLED_ROUTERS", "").strip()
+    if not raw:
+        return list(ROUTER_MODULES)
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ROUTER_MODULES]
+    if unknown:
+        raise ValueError(f"Unknown router(s) in ENABLED_ROUTERS: {', '.join(unknown)}")
+    # Keep registry order so overlapping paths resolve the same way as a full deploy
+    return [name for name in ROUTER_MODULES if name in names]
+
+
+def load_router(name: str) -> APIRouter:
+    module_path, _, attribute = ROUTER_MODULES[name].partition(":")
+    # __import__ (not importlib.import_module) so the modules show up in -X importtime reports
+    module = __import__(module_path, fromlist=["_"])
+    return getattr(module, attribute or "router")
+
+
+def register_routers(app: FastAPI, names: Optional[List[str]] = None) -> List[str]:
+    """Import each enabled router module and include it in the app; returns the names loaded"""
+    names = enabled_routers() if names is None else names
+    for name in names:
+        started = time.perf_counter()
+        app.include_router(load_router(name))
+        load_times[name] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(f"Registered routers: {', '.join(f'{n} ({load_times[n]}ms)' for n in names)}")
+    return names
@@ -0,0 +1,212 @@
+"""
+Admin and Ops Routes
+Manual verification, founder flag, username cleanup, counter reconciliation, health, load-shedding and slow-request reports
+"""
+from fastapi import APIRouter, HTTPException
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+import db_postgres
+from mongo_compat import UpdateOne, db
+from core.helpers import explore_cache, story_tray_cache, trending_cache
+from utils.admission import admission_controller
+from utils.counter_reconcile import counter_reconciler
+from utils.sql_trace import get_slow_requests
+from utils.timeline import home_timeline
+from utils.search_suggest import suggestion_index
+from utils.username_filter import username_filter
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["admin"])
+
+@router.post("/admin/verify-user/{username}")
+async def admin_verify_user(username: str):
+    """Admin endpoint to manually verify users (for testing)"""
+    # Public endpoint for testing - in production add proper admin auth
+    
+    target_user = await db.users.find_one({"username": username})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await db.users.update_one(
+        {"username": username},
+        {"$set": {
+            "isVerified": True,
+            "verifiedAt": datetime.now(timezone.utc).isoformat(),
+            "verificationPathway": "Manually Verified"
+        }}
+    )
+    
+    return {"message": f"User {username} has been manually verified", "success": True}
+
+@router.post("/admin/set-founder/{username}")
+async def set_founder_account(username: str):
+    """Set an account as official founder/company account"""
+    
+    # Find user by username
+    target_user = await db.users.find_one({"username": {"$regex": f"^{username}$", "$options": "i"}})
+    
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Update user as founder and verify
+    await db.users.update_one(
+        {"id": target_user["id"]},
+        {
+            "$set": {
+                "isFounder": True,
+                "isVerified": True,
+                "verifiedAt": datetime.now(timezone.utc),
+                "verificationPathway": "Official LuvHive Account"
+            }
+        }
+    )
+    
+    return {"message": f"User {username} has been set as founder/official account", "success": True}
+
+@router.post("/admin/fix-duplicate-usernames")
+async def fix_duplicate_usernames():
+    """
+    Admin endpoint to fix duplicate usernames caused by whitespace or differing only
+    by case (the oldest account keeps the name, later ones get a numeric suffix)
+    """
+    try:
+        # Find users with whitespace in usernames
+        users_with_whitespace = await db.users.find({
+            "$or": [
+                {"username": {"$regex": "^\\s+|\\s+$"}},  # Leading or trailing spaces
+                {"fullName": {"$regex": "^\\s+|\\s+$"}}   # Leading or trailing spaces in fullName
+            ]
+        }).to_list(1000)
+        
+        fixed_count = 0
+        deleted_users = False
+        for user in users_with_whitespace:
+            clean_username = user["username"].strip()
+            clean_fullname = user["fullName"].strip()
+            
+            # Check if cleaned username already exists
+            existing_clean = await db.users.find_one({
+                "username": clean_username,
+                "id": {"$ne": user["id"]}
+            })
+            
+            if existing_clean:
+                # If clean version exists, we need to handle the duplicate
+                # Option 1: Delete the whitespace version if it has no activity
+                user_posts = await db.posts.count_documents({"userId": user["id"]})
+                user_followers = user.get("followersCount") or 0
+                
+                if user_posts == 0 and user_followers == 0:
+                    # Delete the inactive duplicate
+                    await db.users.delete_one({"id": user["id"]})
+                    deleted_users = True
+                    fixed_count += 1
+                else:
+                    # Rename the duplicate by adding a number
+                    new_username = await username_filter.first_free(clean_username, start=1)
+                    
+                    await db.users.update_one(
+                        {"id": user["id"]},
+                        {"$set": {"username": new_username, "fullName": clean_fullname}}
+                    )
+                    username_filter.add(new_username)
+                    fixed_count += 1
+            else:
+                # Just clean the whitespace
+                await db.users.update_one(
+                    {"id": user["id"]},
+                    {"$set": {"username": clean_username, "fullName": clean_fullname}}
+                )
+                username_filter.add(clean_username)
+                fixed_count += 1
+        
+        # Names that differ only by case block the lower(username) unique index; the
+        # renames go out as one batch, so names picked earlier in it count as taken
+        renames, claimed = [], set()
+        for user in await db_postgres.get_case_duplicate_usernames():
+            start = 1
+            while True:
+                new_username = await username_filter.first_free(user["username"], start=start)
+                if new_username.lower() not in claimed:
+                    break
+                start = int(new_username[len(user["username"]):]) + 1
+            claimed.add(new_username.lower())
+            renames.append(UpdateOne({"id": user["id"]}, {"$set": {"username": new_username}}))
+        if renames:
+            await db.users.bulk_write(renames)
+            for op in renames:
+                username_filter.add(op.update["$set"]["username"])
+            fixed_count += len(renames)
+        
+        # Cascaded follow rows leave the other side's counters stale
+        if deleted_users:
+            counter_reconciler.start(["user_followers", "user_following"])
+        
+        return {
+            "message": f"Fixed {fixed_count} duplicate usernames",
+            "fixed_count": fixed_count
+        }
+        
+    except Exception as e:
+        logger.error(f"Error fixing duplicates: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fixing duplicates: {str(e)}")
+
+@router.post("/admin/reconcile-counters")
+async def reconcile_counters(dry_run: bool = True, counters: Optional[str] = None):
+    """
+    Recompute denormalized counters (comma-separated names, default all) from their source
+    rows in the background. dry_run only reports drift; results at /admin/counter-drift.
+    """
+    names = [name.strip() for name in counters.split(",") if name.strip()] if counters else None
+    unknown = sorted(set(names or []) - set(db_postgres.RECONCILED_COUNTERS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown counters: {', '.join(unknown)}")
+    if not counter_reconciler.start(names, dry_run):
+        raise HTTPException(status_code=409, detail="A reconciliation run is already in progress")
+    return {"started": True, "dry_run": dry_run, "counters": names or list(db_postgres.RECONCILED_COUNTERS)}
+
+@router.get("/admin/counter-drift")
+async def get_counter_drift():
+    """Drift metrics from the latest reconciliation of each counter"""
+    return counter_reconciler.stats()
+
+# Health check endpoint
+@router.get("/health")
+async def health_check():
+    try:
+        # Test database connection
+        user_count = await db.users.count_documents({})
+        return {
+            "status": "healthy",
+            "database": "postgresql",
+            "user_count": user_count,
+            "db_url": "postgresql://neondb",
+            "pools": db_postgres.pool_stats(),
+            "admission": admission_controller.stats(),
+            "home_timeline": home_timeline.stats(),
+            "response_caches": {cache.name: cache.stats() for cache in (trending_cache, explore_cache, story_tray_cache)},
+            "username_filter": username_filter.stats(),
+            "search_suggestions": suggestion_index.stats()
+        }
+    except Exception as e:
+        logger.error(f"Health check failed: {str(e)}")
+        return {
+            "status": "unhealthy",
+            "error": str(e),
+            "database": "postgresql",
+            "pools": db_postgres.pool_stats()
+        }
+
+@router.get("/admin/admission")
+async def get_admission_stats():
+    """Concurrency, queueing and shedding counters per route class (see utils.admission)"""
+    return admission_controller.stats()
+
+@router.get("/admin/slow-requests")
+async def get_slow_requests_report(limit: int = 50):
+    """Recent requests flagged by the SQL tracer (too many queries, slow DB time or N+1 repeats)"""
+    return {"requests": get_slow_requests(limit)}
@@ -0,0 +1,81 @@
+"""
+Media Routes
+Profile images, Telegram media proxy and uploaded file serving
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+import logging
+import os
+
+from core.helpers import PROFILES_DIR
+from core.telegram_media import get_telegram_file_path
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["media"])
+
+# Media serving endpoint
+@router.get("/media/profiles/{filename}", response_class=FileResponse)
+async def get_profile_image(filename: str):
+    """
+    Serve a saved profile image. Returns 404 if the file does not exist.
+    This endpoint ensures images are always served by the app, regardless of deployment context.
+    """
+    file_path = PROFILES_DIR / filename
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(file_path)
+
+@router.get("/media/{file_id}")
+async def get_media_proxy(file_id: str):
+    """
+    Media proxy endpoint to avoid exposing bot token to frontend
+    Redirects to actual Telegram file URL
+    """
+    try:
+        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
+        if not bot_token:
+            raise HTTPException(status_code=500, detail="Bot token not configured")
+        
+        # Get file_path from Telegram
+        file_path = await get_telegram_file_path(file_id, bot_token)
+        if not file_path:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        # Build Telegram file URL
+        telegram_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
+        
+        # Redirect to Telegram URL
+        from fastapi.responses import RedirectResponse
+        return RedirectResponse(url=telegram_url)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Media proxy error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve media")
+
+# Serve uploaded files endpoint
+@router.get("/uploads/{file_type}/{filename}")
+async def serve_upload(file_type: str, filename: str):
+    """Serve uploaded files (posts, profiles, stories)"""
+    try:
+        # Validate file type
+        if file_type not in ["posts", "profiles", "stories"]:
+            raise HTTPException(status_code=400, detail="Invalid file type")
+        
+        # Build file path
+        file_path = f"/app/uploads/{file_type}/{filename}"
+        
+        # Check if file exists
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        # Return file
+        return FileResponse(file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error serving file: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
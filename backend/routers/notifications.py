@@ -0,0 +1,163 @@
+"""
+Notification Routes
+Listing, unread counts and read markers
+"""
+from fastapi import APIRouter, HTTPException, Depends
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from mongo_compat import db
+from core.models import User
+from core.security import get_current_user
+from utils.fast_json import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["notifications"])
+
+# Notifications
+@router.get("/notifications")
+async def get_notifications(current_user: User = Depends(get_current_user)):
+    notifications = await db.notifications.find({"userId": current_user.id}).sort("createdAt", -1).to_list(100)
+    
+    notifications_list = []
+    for notif in notifications:
+        notifications_list.append({
+            "id": notif["id"],
+            "fromUserId": notif["fromUserId"],
+            "fromUsername": notif["fromUsername"],
+            "fromUserImage": notif.get("fromUserImage"),
+            "type": notif["type"],
+            "postId": notif.get("postId"),
+            "isRead": notif.get("isRead", False),
+            "createdAt": notif["createdAt"]
+        })
+    
+    return FastJSONResponse({"notifications": notifications_list})
+
+@router.get("/notifications/unread-count")
+async def get_unread_count(current_user: User = Depends(get_current_user)):
+    count = await db.notifications.count_documents({"userId": current_user.id, "isRead": False})
+    return {"count": count}
+
+@router.post("/notifications/{notification_id}/read")
+async def mark_notification_read(notification_id: str, current_user: User = Depends(get_current_user)):
+    await db.notifications.update_one(
+        {"id": notification_id, "userId": current_user.id},
+        {"$set": {"isRead": True}}
+    )
+    return {"message": "Notification marked as read"}
+
+@router.post("/notifications/read-all")
+async def mark_all_read(current_user: User = Depends(get_current_user)):
+    await db.notifications.update_many(
+        {"userId": current_user.id},
+        {"$set": {"isRead": True}}
+    )
+    return {"message": "All notifications marked as read"}
+
+# Get unread notification count
+@router.get("/notifications/unread-count")
+async def get_unread_notification_count(current_user: dict = Depends(get_current_user)):
+    try:
+        count = await db.notifications.count_documents({
+            "userId": current_user["id"],
+            "isRead": False
+        })
+        return {"count": count}
+    except Exception as e:
+        logger.error(f"Error fetching notification count: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Get all notifications for current user
+@router.get("/notifications")
+async def get_notifications(
+    skip: int = 0,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        notifications = await db.notifications.find({
+            "userId": current_user["id"]
+        }).sort("createdAt", -1).skip(skip).limit(limit).to_list(length=limit)
+        
+        return {"notifications": notifications}
+    except Exception as e:
+        logger.error(f"Error fetching notifications: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Mark notification as read
+@router.put("/notifications/{notification_id}/read")
+async def mark_notification_read(
+    notification_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        result = await db.notifications.update_one(
+            {"id": notification_id, "userId": current_user["id"]},
+            {"$set": {"isRead": True}}
+        )
+        
+        if result.modified_count == 0:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        
+        return {"success": True, "message": "Notification marked as read"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error marking notification as read: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Mark all notifications as read
+@router.put("/notifications/read-all")
+async def mark_all_notifications_read(current_user: dict = Depends(get_current_user)):
+    try:
+        await db.notifications.update_many(
+            {"userId": current_user["id"], "isRead": False},
+            {"$set": {"isRead": True}}
+        )
+        
+        return {"success": True, "message": "All notifications marked as read"}
+    except Exception as e:
+        logger.error(f"Error marking all notifications as read: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Helper function to create notification
+async def create_notification(
+    user_id: str,
+    from_user_id: str,
+    notification_type: str,
+    post_id: Optional[str] = None,
+    comment_text: Optional[str] = None
+):
+    """Helper function to create a notification"""
+    try:
+        # Get from_user details
+        from_user = await db.users.find_one({"id": from_user_id})
+        if not from_user:
+            return
+        
+        # Don't notify if user is notifying themselves
+        if user_id == from_user_id:
+            return
+        
+        notification = {
+            "id": str(uuid.uuid4()),
+            "userId": user_id,
+            "fromUserId": from_user_id,
+            "fromUsername": from_user.get("username", "Unknown"),
+            "fromUserImage": from_user.get("profileImage"),
+            "type": notification_type,
+            "postId": post_id,
+            "commentText": comment_text,
+            "isRead": False,
+            "createdAt": datetime.now(timezone.utc)
+        }
+        
+        await db.notifications.insert_one(notification)
+        logger.info(f"Created {notification_type} notification for user {user_id}")
+    except Exception as e:
+        logger.error(f"Error creating notification: {e}")
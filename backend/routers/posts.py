@@ -0,0 +1,709 @@
+"""
+Post Routes
+Post creation, feed, likes, comments, saves, reports and owner actions
+"""
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+
+import db_postgres
+from mongo_compat import db
+from core.helpers import coerce_id, coerce_post_id, explore_cache, parse_likes_comments
+from core.models import Notification, Post, PostCreate, ReportPostRequest, User
+from core.security import get_current_user
+from core.telegram_media import send_media_to_telegram_channel
+from utils.fast_json import FastJSONResponse
+from utils.search_suggest import record_hashtags
+from utils.timeline import home_timeline
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["posts"])
+
+# Posts Routes
+@router.post("/posts")
+async def create_post_with_file(
+    caption: str = Form(""),
+    media: Optional[UploadFile] = File(None),
+    media_type: str = Form("image"),
+    current_user: User = Depends(get_current_user)
+):
+    """Create post with actual file upload (multipart/form-data)"""
+    file_id = None
+    file_path = None
+    telegram_url = None
+
+    try:
+        if media:
+            # Read the actual file
+            file_content = await media.read()
+            mime_type = media.content_type or "image/jpeg"
+
+            # Convert to base64 data URL for send_media_to_telegram_channel
+            import base64
+            encoded = base64.b64encode(file_content).decode('utf-8')
+            media_url = f"data:{mime_type};base64,{encoded}"
+
+            logger.info(f"Received file upload: {media.filename}, size: {len(file_content)} bytes, type: {mime_type}")
+
+            # Upload to Telegram
+            file_id, file_path, telegram_url = await send_media_to_telegram_channel(
+                media_url=media_url,
+                media_type=media_type,
+                caption=caption,
+                username=current_user.username
+            )
+
+            if telegram_url:
+                logger.info(f"✅ File uploaded to Telegram: {telegram_url}")
+            else:
+                logger.warning("⚠️ Failed to upload to Telegram, using base64 fallback")
+                telegram_url = media_url
+        else:
+            # No media uploaded
+            logger.warning("No media file received")
+            telegram_url = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+    except Exception as e:
+        logger.error(f"Failed to process file upload: {e}")
+        import traceback
+        traceback.print_exc()
+        telegram_url = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+    # Create post
+    post = Post(
+        userId=current_user.id,
+        username=current_user.username,
+        userProfileImage=current_user.profileImage,
+        mediaType=media_type,
+        mediaUrl=telegram_url,
+        caption=caption
+    )
+
+    post_dict = post.dict()
+    if file_id:
+        post_dict["telegramFileId"] = file_id
+        post_dict["telegramFilePath"] = file_path
+
+    result = await db.posts.insert_one(post_dict)
+    await record_hashtags(None, caption)
+    home_timeline.post_created(result.get("inserted_id"))
+
+    if "_id" in post_dict:
+        del post_dict["_id"]
+
+    return {"message": "Post created successfully", "post": post_dict}
+
+@router.post("/posts/create")
+async def create_post(post_data: PostCreate, current_user: User = Depends(get_current_user)):
+    # Send media to Telegram channel first to get file_id and file_path
+    file_id = None
+    file_path = None
+    telegram_url = None
+
+    try:
+        file_id, file_path, telegram_url = await send_media_to_telegram_channel(
+            media_url=post_data.mediaUrl,
+            media_type=post_data.mediaType,
+            caption=post_data.caption or "",
+            username=current_user.username
+        )
+
+        if telegram_url:
+            logger.info(f"Media uploaded to Telegram: {telegram_url}")
+        else:
+            logger.warning("Failed to upload media to Telegram, using base64 fallback")
+    except Exception as e:
+        logger.error(f"Failed to send post media to Telegram: {e}")
+        # Don't fail the post creation if Telegram upload fails
+
+    # Create post with Telegram URL if available, otherwise use base64
+    post = Post(
+        userId=current_user.id,
+        username=current_user.username,
+        userProfileImage=current_user.profileImage,
+        mediaType=post_data.mediaType,
+        mediaUrl=telegram_url if telegram_url else post_data.mediaUrl,  # Use Telegram URL if available
+        caption=post_data.caption
+    )
+
+    # Add Telegram metadata if available
+    post_dict = post.dict()
+    if file_id:
+        post_dict["telegramFileId"] = file_id
+        post_dict["telegramFilePath"] = file_path
+
+    result = await db.posts.insert_one(post_dict)
+    await record_hashtags(None, post_data.caption)
+    home_timeline.post_created(result.get("inserted_id"))
+
+    # Remove MongoDB ObjectId from response
+    if "_id" in post_dict:
+        del post_dict["_id"]
+
+    return {"message": "Post created successfully", "post": post_dict}
+
+@router.get("/posts/feed")
+async def get_posts_feed(limit: int = 100, cursor: Optional[str] = None,
+                         current_user: User = Depends(get_current_user)):
+    """
+    Home feed: one page of the user's timeline (posts by followed authors and their own),
+    newest first, continuing into recent posts from everyone else once the timeline runs
+    out. Pass the returned nextCursor to get the following page.
+    """
+    limit = max(1, min(limit, db_postgres.TIMELINE_MAX_ENTRIES))
+    # Get current user's full data to access blockedUsers and mutedUsers
+    user = await db.users.find_one({"id": int(current_user.id)})
+    blocked_users = user.get("blockedUsers", [])
+    muted_users = user.get("mutedUsers", [])
+    saved_posts = user.get("savedPosts", [])
+
+    # Combine blocked and muted users to exclude from feed
+    excluded_users = {str(u) for u in blocked_users + muted_users}
+
+    try:
+        post_ids, next_cursor = await home_timeline.feed_page(
+            int(current_user.id), limit, cursor,
+            exclude_user_ids=[int(u) for u in excluded_users if u.isdigit()]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    posts = []
+    if post_ids:
+        # Batched hydration: one query for the posts, one for their authors
+        rows = await db.posts.find({"id": {"$in": post_ids}}).to_list(len(post_ids))
+        by_id = {row["id"]: row for row in rows}
+        posts = [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+    posts = [post for post in posts if not post.get("isArchived") and str(post["userId"]) not in excluded_users]
+    author_ids = list({post["userId"] for post in posts})
+    authors = await db.users.find({"id": {"$in": author_ids}}).to_list(len(author_ids)) if author_ids else []
+    authors_by_id = {str(author["id"]): author for author in authors}
+
+    posts_list = []
+    for post in posts:
+        # Post author's current profile picture, verification status, and founder status
+        post_author = authors_by_id.get(str(post["userId"]))
+        is_verified = post_author.get("isVerified", False) if post_author else False
+        is_founder = post_author.get("isFounder", False) if post_author else False
+        current_profile_image = post_author.get("profileImage") if post_author else post.get("userProfileImage")
+
+        # Parse likes and comments which may be JSON strings
+        raw_likes = post.get("likes", [])
+        likes_list = parse_likes_comments(raw_likes)
+        likes_list = [str(l) for l in likes_list] if isinstance(likes_list, list) else []
+
+        raw_comments = post.get("comments", [])
+        comments_list = parse_likes_comments(raw_comments)
+
+        post_data = {
+            "id": post["id"],
+            # Cast userId to string to avoid type mismatch in frontend
+            "userId": str(post["userId"]),
+            "username": post["username"],
+            "userProfileImage": current_profile_image,  # Use current profile picture
+            "isVerified": is_verified,
+            "isFounder": is_founder,
+            "mediaType": post.get("mediaType", "image"),
+            "mediaUrl": post.get("mediaUrl", ""),
+            "imageUrl": post.get("imageUrl", ""),  # Include legacy field for older posts
+            "caption": post.get("caption", ""),
+            "likes": likes_list,
+            "comments": comments_list,
+            "createdAt": post["createdAt"],
+            "isLiked": str(current_user.id) in likes_list,
+            "isSaved": post["id"] in saved_posts
+        }
+
+        # Add Telegram fields if they exist
+        if post.get("telegramFileId"):
+            post_data["telegramFileId"] = post["telegramFileId"]
+        if post.get("telegramFilePath"):
+            post_data["telegramFilePath"] = post["telegramFilePath"]
+
+        posts_list.append(post_data)
+
+    return FastJSONResponse({"posts": posts_list, "nextCursor": next_cursor})
+
+@router.get("/posts/{post_id}")
+async def get_single_post(post_id: str, current_user: User = Depends(get_current_user)):
+    """Get a single post by ID"""
+    lookup_id = coerce_post_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Get current user's saved posts
+    user = await db.users.find_one({"id": int(current_user.id)})
+    saved_posts = user.get("savedPosts", [])
+
+    # Normalize likes/comments to lists. They may be stored as JSON strings.
+    likes = post.get("likes", [])
+    if isinstance(likes, str):
+        try:
+            likes = json.loads(likes)
+        except Exception:
+            likes = []
+    comments = post.get("comments", [])
+    if isinstance(comments, str):
+        try:
+            comments = json.loads(comments)
+        except Exception:
+            comments = []
+    return {
+        "id": post["id"],
+        "userId": str(post["userId"]),
+        "username": post["username"],
+        "userProfileImage": post.get("userProfileImage"),
+        "imageUrl": post.get("imageUrl"),
+        "mediaType": post.get("mediaType", "image"),
+        "mediaUrl": post.get("mediaUrl", ""),
+        "caption": post.get("caption", ""),
+        "likesCount": len(likes),
+        "commentsCount": len(comments),
+        "userLiked": str(current_user.id) in [str(l) for l in likes],
+        "isSaved": post["id"] in saved_posts,
+        "likesHidden": post.get("likesHidden", False),
+        "commentsDisabled": post.get("commentsDisabled", False),
+        "createdAt": post["createdAt"].isoformat() if hasattr(post["createdAt"], 'isoformat') else post["createdAt"]
+    }
+
+@router.post("/posts/{post_id}/like")
+async def like_post(post_id: str, current_user: User = Depends(get_current_user)):
+    # Coerce post_id to int for DB lookup
+    try:
+        lookup_id = int(post_id)
+    except (ValueError, TypeError):
+        lookup_id = post_id
+
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    likes = post.get("likes", [])
+    # Parse JSON string if needed
+    if isinstance(likes, str):
+        try:
+            likes = json.loads(likes)
+        except Exception:
+            likes = []
+
+    # Normalize all IDs to string for consistent comparison
+    likes = [str(l) for l in likes]
+    user_id_str = str(current_user.id)
+
+    if user_id_str in likes:
+        likes.remove(user_id_str)
+    else:
+        likes.append(user_id_str)
+        # Create notification when liking someone else's post
+        if str(post["userId"]) != user_id_str:
+            notification = Notification(
+                userId=str(post["userId"]),
+                fromUserId=user_id_str,
+                fromUsername=current_user.username,
+                fromUserImage=current_user.profileImage,
+                type="like",
+                postId=post_id
+            )
+            await db.notifications.insert_one(notification.dict())
+
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"likes": likes}}
+    )
+    # The caller's explore grid shows userLiked, so drop their cached copies
+    explore_cache.invalidate(f"{current_user.id}:")
+    return {"message": "Success", "likes": len(likes)}
+
+@router.post("/posts/{post_id}/unlike")
+async def unlike_post(post_id: str, current_user: User = Depends(get_current_user)):
+    """Alias for like endpoint - toggles like/unlike"""
+    return await like_post(post_id, current_user)
+
+@router.get("/posts/{post_id}/comments")
+async def get_post_comments(post_id: str, current_user: User = Depends(get_current_user)):
+    """Get all comments for a post"""
+    # Coerce post_id to int for DB lookup
+    try:
+        lookup_id = int(post_id)
+    except (ValueError, TypeError):
+        lookup_id = post_id
+
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    comments = post.get("comments", [])
+    # Comments may be stored as JSON string; convert to list
+    if isinstance(comments, str):
+        try:
+            comments = json.loads(comments)
+        except Exception:
+            comments = []
+    return {"comments": comments}
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+@router.post("/posts/{post_id}/comment/{comment_id}/like")
+async def like_comment(post_id: str, comment_id: str, current_user: User = Depends(get_current_user)):
+    """Like/unlike a comment"""
+    # Coerce post_id to int for DB lookup
+    try:
+        lookup_id = int(post_id)
+    except (ValueError, TypeError):
+        lookup_id = post_id
+
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Parse comments JSON string to list
+    comments = post.get("comments", [])
+    if isinstance(comments, str):
+        try:
+            comments = json.loads(comments)
+        except Exception:
+            comments = []
+
+    comment_found = False
+    user_id_str = str(current_user.id)
+
+    for comment in comments:
+        if comment["id"] == comment_id:
+            comment_found = True
+            likes = comment.get("likes", [])
+            # Parse likes JSON string if necessary and normalize
+            if isinstance(likes, str):
+                try:
+                    likes = json.loads(likes)
+                except Exception:
+                    likes = []
+            likes = [str(l) for l in likes]
+
+            if user_id_str in likes:
+                likes.remove(user_id_str)
+            else:
+                likes.append(user_id_str)
+
+            comment["likes"] = likes
+            comment["likesCount"] = len(likes)
+            break
+
+    if not comment_found:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"comments": comments}}
+    )
+
+    return {"message": "Success", "likes": len(likes)}
+
+@router.delete("/posts/{post_id}/comment/{comment_id}")
+async def delete_comment(post_id: str, comment_id: str, current_user: User = Depends(get_current_user)):
+    """Delete a comment (only by comment owner)"""
+    # Coerce post_id to int for DB lookup
+    try:
+        lookup_id = int(post_id)
+    except (ValueError, TypeError):
+        lookup_id = post_id
+
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Parse comments from JSON string if necessary
+    comments = post.get("comments", [])
+    if isinstance(comments, str):
+        try:
+            comments = json.loads(comments)
+        except Exception:
+            comments = []
+
+    comment_to_delete = None
+
+    for comment in comments:
+        if comment["id"] == comment_id:
+            if comment["userId"] != current_user.id:
+                raise HTTPException(status_code=403, detail="You can only delete your own comments")
+            comment_to_delete = comment
+            break
+
+    if not comment_to_delete:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    # Remove comment and its replies
+    updated_comments = [c for c in comments if c["id"] != comment_id and c.get("parentCommentId") != comment_id]
+
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"comments": updated_comments}}
+    )
+
+    return {"message": "Comment deleted successfully"}
+
+@router.post("/posts/{post_id}/comment/{comment_id}/report")
+async def report_comment(post_id: str, comment_id: str, reason: str = Form(...), current_user: User = Depends(get_current_user)):
+    """Report a comment"""
+    post = await db.posts.find_one({"id": post_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Store report
+    report = {
+        "id": str(uuid4()),
+        "postId": post_id,
+        "commentId": comment_id,
+        "reportedBy": current_user.id,
+        "reason": reason,
+        "createdAt": datetime.now(timezone.utc).isoformat()
+    }
+
+    await db.reports.insert_one(report)
+
+    return {"message": "Report submitted successfully"}
+
+# Save/Unsave Post
+@router.post("/posts/{post_id}/save")
+async def save_post(post_id: str, current_user: User = Depends(get_current_user)):
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Check if already saved - use string post_id for savedPosts array
+    user = await db.users.find_one({"id": int(current_user.id)})
+    saved_posts = user.get("savedPosts", [])
+
+    # Convert post_id to string for consistent comparison
+    post_id_str = str(post["id"])
+
+    if post_id_str in saved_posts:
+        # Unsave
+        await db.users.update_one(
+            {"id": current_user.id},
+            {"$pull": {"savedPosts": post_id_str}}
+        )
+        return {"message": "Post unsaved", "isSaved": False}
+    else:
+        # Save
+        await db.users.update_one(
+            {"id": current_user.id},
+            {"$addToSet": {"savedPosts": post_id_str}}
+        )
+        return {"message": "Post saved", "isSaved": True}
+
+@router.post("/posts/{post_id}/unsave")
+async def unsave_post(post_id: str, current_user: User = Depends(get_current_user)):
+    """Alias for save_post (toggles save/unsave)"""
+    return await save_post(post_id, current_user)
+
+@router.post("/posts/{post_id}/report")
+async def report_post(post_id: str, report_data: ReportPostRequest, current_user: User = Depends(get_current_user)):
+    """Report a post with specified reason"""
+    post = await db.posts.find_one({"id": post_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Store report
+    report = {
+        "id": str(uuid4()),
+        "postId": post_id,
+        "postUserId": post.get("userId"),
+        "reportedBy": current_user.id,
+        "reporterUsername": current_user.username,
+        "reason": report_data.reason,
+        "createdAt": datetime.now(timezone.utc).isoformat()
+    }
+
+    await db.post_reports.insert_one(report)
+
+    return {"message": "Report submitted successfully", "success": True}
+
+@router.delete("/posts/{post_id}")
+async def delete_post(post_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Delete a post owned by the current user. Accept both numeric IDs or legacy
+    UUIDs. Coerce the post_id to int when possible for PostgreSQL match.
+    """
+    # Try to coerce the path parameter to int (for numeric primary keys)
+    try:
+        lookup_id = int(post_id)
+    except (ValueError, TypeError):
+        lookup_id = post_id
+
+    # Fetch the post
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Authorization: allow deletion if userId or username matches current_user
+    owner_id_matches = str(post.get("userId")) == str(current_user.id)
+    owner_username_matches = str(post.get("username")).lower() == str(current_user.username).lower()
+    if not (owner_id_matches or owner_username_matches):
+        raise HTTPException(status_code=403, detail="Not authorized to delete this post")
+
+    # Perform deletion (webapp_timeline rows go with it via ON DELETE CASCADE)
+    await db.posts.delete_one({"id": lookup_id})
+    if not post.get("isArchived"):
+        await record_hashtags(post.get("caption"), None)
+    return {"message": "Post deleted successfully"}
+
+# Post Management (Own Posts)
+@router.post("/posts/{post_id}/archive")
+async def archive_post(post_id: str, current_user: User = Depends(get_current_user)):
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if str(post["userId"]) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    is_archived = post.get("isArchived", False)
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"isArchived": not is_archived}}
+    )
+    if is_archived:
+        await record_hashtags(None, post.get("caption"))
+        home_timeline.post_created(lookup_id)
+    else:
+        await record_hashtags(post.get("caption"), None)
+        await home_timeline.post_removed(lookup_id)
+    return {"message": "Post archived" if not is_archived else "Post unarchived", "isArchived": not is_archived}
+
+@router.post("/posts/{post_id}/hide-likes")
+async def hide_likes(post_id: str, current_user: User = Depends(get_current_user)):
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if str(post["userId"]) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    likes_hidden = post.get("likesHidden", False)
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"likesHidden": not likes_hidden}}
+    )
+    return {"message": "Likes hidden" if not likes_hidden else "Likes shown", "likesHidden": not likes_hidden}
+
+@router.post("/posts/{post_id}/toggle-comments")
+async def toggle_comments(post_id: str, current_user: User = Depends(get_current_user)):
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if str(post["userId"]) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    comments_disabled = post.get("commentsDisabled", False)
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"commentsDisabled": not comments_disabled}}
+    )
+    return {"message": "Comments disabled" if not comments_disabled else "Comments enabled", "commentsDisabled": not comments_disabled}
+
+@router.put("/posts/{post_id}")
+async def edit_post_caption(post_id: str, caption: str = Form(...), current_user: User = Depends(get_current_user)):
+    """Edit post caption"""
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    if str(post["userId"]) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="You can only edit your own posts")
+
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"caption": caption}}
+    )
+    if not post.get("isArchived"):
+        await record_hashtags(post.get("caption"), caption)
+
+    return {"message": "Caption updated successfully", "caption": caption}
+
+@router.post("/posts/{post_id}/pin")
+async def pin_post(post_id: str, current_user: User = Depends(get_current_user)):
+    lookup_id = coerce_id(post_id)
+    post = await db.posts.find_one({"id": lookup_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if str(post["userId"]) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    is_pinned = post.get("isPinned", False)
+
+    if not is_pinned:
+        # Unpin all other posts first
+        await db.posts.update_many(
+            {"userId": current_user.id, "isPinned": True},
+            {"$set": {"isPinned": False}}
+        )
+
+    await db.posts.update_one(
+        {"id": lookup_id},
+        {"$set": {"isPinned": not is_pinned}}
+    )
+    return {"message": "Post pinned" if not is_pinned else "Post unpinned", "isPinned": not is_pinned}
@@ -0,0 +1,336 @@
+"""
+Search Routes
+Search, trending, explore and suggestions
+"""
+from fastapi import APIRouter, HTTPException, Depends, Request
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import db_postgres
+from db_postgres import FOLLOW_ACCEPTED
+from mongo_compat import db
+from core.helpers import coerce_id, explore_cache, trending_cache
+from core.models import SearchRequest, User
+from core.security import get_current_user
+from utils.fast_json import FastJSONResponse
+from utils.search_suggest import suggestion_index
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["search"])
+
+@router.post("/search")
+async def search_content(search_request: SearchRequest, current_user: User = Depends(get_current_user)):
+    """
+    Search for users, posts, and hashtags
+    """
+    query = search_request.query.strip()
+    search_type = search_request.type
+    page = max(1, search_request.page)
+    limit = min(50, max(1, search_request.limit))  # Limit between 1-50
+    skip = (page - 1) * limit
+    
+    if not query:
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    
+    # Escape special regex characters for safe searching
+    escaped_query = query.replace('.', r'\.')
+    
+    results = {
+        "users": [],
+        "posts": [],
+        "hashtags": [],
+        "query": query
+    }
+    
+    # Search users (if type is "users" or "all")
+    if search_type in ["users", "all"]:
+        logger.info(f"🔍 Search: Starting user search for query '{query}' by user {current_user.username}")
+        
+        # Create a more intelligent search with exact match priority
+        base_filter = {
+            "$and": [
+                # Allow users to find themselves in search (removed self-exclusion)
+                {"id": {"$nin": current_user.blockedUsers}},  # Exclude blocked users
+                {"appearInSearch": True}  # Only users who appear in search
+            ]
+        }
+        
+        # First, search for exact matches using optimized queries
+        exact_filter = {**base_filter}
+        
+        # Use text search for better performance with indexing
+        text_search_filter = {**base_filter}
+        text_search_filter["$and"].append({
+            "$text": {"$search": f'"{query}"'}  # Exact phrase search
+        })
+        
+        # Fallback regex for exact matches if text search doesn't work
+        regex_filter = {**base_filter}
+        regex_filter["$and"].append({
+            "$or": [
+                {"username": {"$regex": f"^\\s*{escaped_query}\\s*$", "$options": "i"}},
+                {"fullName": {"$regex": f"^\\s*{escaped_query}\\s*$", "$options": "i"}}
+            ]
+        })
+        
+        # Try text search first, fallback to regex
+        try:
+            exact_users = await db.users.find(text_search_filter).skip(skip).limit(limit).to_list(limit)
+            logger.info(f"🔍 Search: Text search for '{query}' found {len(exact_users)} exact matches")
+        except:
+            exact_users = await db.users.find(regex_filter).skip(skip).limit(limit).to_list(limit)
+            logger.info(f"🔍 Search: Regex search for '{query}' found {len(exact_users)} exact matches")
+        user_ids_found = {user["id"] for user in exact_users}
+        
+        # Then, search for partial matches, excluding exact matches
+        partial_filter = {**base_filter}
+        partial_filter["$and"].extend([
+            {"id": {"$nin": list(user_ids_found)}},  # Exclude already found users
+            {
+                "$or": [
+                    {"fullName": {"$regex": escaped_query, "$options": "i"}},
+                    {"username": {"$regex": escaped_query, "$options": "i"}},
+                    {"bio": {"$regex": escaped_query, "$options": "i"}}
+                ]
+            }
+        ])
+        
+        partial_users = await db.users.find(partial_filter).limit(10).to_list(10)
+        logger.info(f"🔍 Search: Partial search for '{query}' found {len(partial_users)} additional matches")
+        
+        # Combine results with exact matches first
+        all_users = exact_users + partial_users
+        statuses = await db_postgres.get_follow_statuses(
+            int(current_user.id), [user["id"] for user in all_users[:20]]
+        )
+        
+        for user in all_users[:20]:  # Limit to 20 total results
+            results["users"].append({
+                "id": user["id"],
+                "fullName": user["fullName"],
+                "username": user["username"],
+                "profileImage": user.get("profileImage"),
+                "bio": user.get("bio", "")[:100],  # Limit bio length for performance
+                "followersCount": user.get("followersCount") or 0,
+                "isFollowing": statuses.get(user["id"]) == FOLLOW_ACCEPTED,
+                "isPremium": user.get("isPremium", False)
+            })
+        
+        logger.info(f"✅ Search: Total users returned for '{query}': {len(results['users'])}")
+        if results['users']:
+            logger.info(f"👤 First user result: {results['users'][0]['username']} ({results['users'][0]['fullName']})")
+    
+    # Search posts (if type is "posts" or "all")
+    if search_type in ["posts", "all"]:
+        # Find posts from non-blocked users and non-private accounts (unless following)
+        blocked_users = current_user.blockedUsers
+        
+        # Private accounts, minus those the current user follows (and their own)
+        private_users = await db.users.find({"isPrivate": True}).to_list(10000)
+        statuses = await db_postgres.get_follow_statuses(int(current_user.id), [u["id"] for u in private_users])
+        private_non_following_users = [
+            u["id"] for u in private_users
+            if statuses.get(u["id"]) != FOLLOW_ACCEPTED and str(u["id"]) != str(current_user.id)
+        ]
+        
+        post_filter = {
+            "$and": [
+                {"userId": {"$nin": blocked_users + private_non_following_users}},  # Exclude blocked + private non-following
+                {"isArchived": {"$ne": True}},
+                {
+                    "$or": [
+                        {"caption": {"$regex": query, "$options": "i"}},
+                        {"username": {"$regex": query, "$options": "i"}}
+                    ]
+                }
+            ]
+        }
+        
+        posts = await db.posts.find(post_filter).sort("createdAt", -1).limit(20).to_list(20)
+        for post in posts:
+            results["posts"].append({
+                "id": post["id"],
+                "userId": post["userId"],
+                "username": post["username"],
+                "userProfileImage": post.get("userProfileImage"),
+                "postType": post.get("postType", "text"),
+                "imageUrl": post.get("imageUrl"),
+                "content": post.get("content", ""),
+                "likes": len(post.get("likes", [])),
+                "comments": len(post.get("comments", [])),
+                "createdAt": post.get("createdAt"),
+                "isLiked": current_user.id in post.get("likes", []),
+                "isSaved": post["id"] in current_user.savedPosts
+            })
+    
+    # Extract hashtags from posts (if type is "hashtags" or "all")
+    if search_type in ["hashtags", "all"] and query.startswith("#"):
+        hashtag_query = query[1:]  # Remove # symbol
+        hashtag_filter = {
+            "$and": [
+                {"userId": {"$nin": current_user.blockedUsers}},
+                {"isArchived": {"$ne": True}},
+                {"caption": {"$regex": f"#{hashtag_query}", "$options": "i"}}
+            ]
+        }
+        
+        hashtag_posts = await db.posts.find(hashtag_filter).sort("createdAt", -1).limit(10).to_list(10)
+        hashtags_found = set()
+        
+        for post in hashtag_posts:
+            caption = post.get("caption", "")
+            # Extract hashtags from caption
+            import re
+            hashtags = re.findall(r'#\w+', caption, re.IGNORECASE)
+            for hashtag in hashtags:
+                if hashtag_query.lower() in hashtag.lower():
+                    hashtags_found.add(hashtag.lower())
+        
+        results["hashtags"] = list(hashtags_found)[:10]
+    
+    return FastJSONResponse(results)
+
+@router.get("/search/trending")
+async def get_trending_content(request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Get trending hashtags and users from recent posts
+    """
+    cache_key = str(current_user.id)
+    cached = trending_cache.get(cache_key)
+    if cached:
+        return cached.response(request)
+
+    # Trending hashtags from recent posts (last 7 days), counted in Postgres
+    since = (datetime.now(timezone.utc) - timedelta(days=7)).replace(tzinfo=None)
+    trending_hashtags = await db.posts.aggregate([
+        {"$match": {
+            "userId": {"$nin": current_user.blockedUsers},
+            "isArchived": {"$ne": True},
+            "createdAt": {"$gte": since}
+        }},
+        {"$project": {"tags": {"$regexFindAll": {"input": "$caption", "regex": r"#\w+"}}}},
+        {"$unwind": "$tags"},
+        {"$group": {"_id": {"$toLower": "$tags.match"}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 20}
+    ]).to_list(20)
+    
+    # Trending users (users with most followers)
+    trending_users = await db.users.aggregate([
+        {"$match": {
+            "id": {"$ne": current_user.id, "$nin": current_user.blockedUsers},
+            "appearInSearch": True
+        }},
+        {"$sort": {"followersCount": -1}},
+        {"$limit": 10}
+    ]).to_list(10)
+    
+    statuses = await db_postgres.get_follow_statuses(int(current_user.id), [user["id"] for user in trending_users])
+    trending_users_list = []
+    for user in trending_users:
+        trending_users_list.append({
+            "id": user["id"],
+            "fullName": user["fullName"],
+            "username": user["username"],
+            "profileImage": user.get("profileImage"),
+            "bio": user.get("bio", ""),
+            "followersCount": user.get("followersCount") or 0,
+            "isFollowing": statuses.get(user["id"]) == FOLLOW_ACCEPTED,
+            "isPremium": user.get("isPremium", False)
+        })
+    
+    return trending_cache.put(cache_key, {
+        "trending_users": trending_users_list,
+        "trending_hashtags": [{"hashtag": row["_id"], "count": row["count"]} for row in trending_hashtags]
+    }).response(request)
+
+@router.get("/search/explore")
+async def get_explore_posts(request: Request, current_user: User = Depends(get_current_user), limit: int = 30):
+    """
+    Get explore posts for the search page (Instagram-style)
+    Returns posts from public accounts, excluding blocked and muted users
+    """
+    cache_key = f"{current_user.id}:{limit}"
+    cached = explore_cache.get(cache_key)
+    if cached:
+        return cached.response(request)
+
+    try:
+        # Get blocked and muted users to exclude
+        blocked_users = current_user.blockedUsers or []
+        muted_users = getattr(current_user, 'mutedUsers', []) or []
+        excluded_users = list(set(blocked_users + muted_users))
+        
+        # Posts from public authors, excluding blocked and muted users, joined in one query
+        posts = await db.posts.aggregate([
+            {"$match": {
+                "userId": {"$nin": excluded_users},
+                "isArchived": {"$ne": True}
+            }},
+            {"$lookup": {"from": "users", "localField": "userId", "foreignField": "id", "as": "author"}},
+            {"$unwind": "$author"},
+            {"$match": {"author.isPrivate": {"$ne": True}}},
+            {"$sort": {"createdAt": -1}},
+            {"$limit": limit}
+        ]).to_list(limit)
+        
+        explore_posts = []
+        for post in posts:
+            explore_posts.append({
+                "id": post["id"],
+                "userId": post["userId"],
+                "username": post.get("username") or post["author"].get("username"),
+                "userProfileImage": post.get("userProfileImage") or post["author"].get("profileImage"),
+                "caption": post.get("caption", ""),
+                "imageUrl": post.get("imageUrl"),
+                "mediaUrl": post.get("mediaUrl"),
+                "mediaType": post.get("mediaType", "image"),
+                "likesCount": len(post.get("likes", [])),
+                "commentsCount": len(post.get("comments", [])),
+                "userLiked": current_user.id in post.get("likes", []),
+                "createdAt": post.get("createdAt")
+            })
+        
+        logger.info(f"✅ Explore: Returned {len(explore_posts)} posts for user {current_user.username}")
+        return explore_cache.put(cache_key, {"posts": explore_posts}).response(request)
+        
+    except Exception as e:
+        logger.error(f"Error fetching explore posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search/suggestions")
+async def get_search_suggestions(q: str = "", current_user: User = Depends(get_current_user)):
+    """
+    Get search suggestions based on partial query (literal prefix match, no regex)
+    """
+    q = q.strip()
+    if not q or len(q) < 2:
+        return {"suggestions": []}
+    
+    suggestions = []
+    
+    # Hashtag suggestions from the webapp_hashtags frequency table
+    if q.startswith("#"):
+        for row in await suggestion_index.hashtags(q[1:], limit=5):
+            suggestions.append({
+                "type": "hashtag",
+                "text": f"#{row['tag']}",
+                "value": f"#{row['tag']}"
+            })
+        return {"suggestions": suggestions}
+    
+    # User suggestions
+    # Legacy non-numeric ids can never match a webapp_users row
+    exclude_ids = [uid for uid in map(coerce_id, [current_user.id, *current_user.blockedUsers])
+                   if isinstance(uid, int)]
+    for user in await suggestion_index.users(q, limit=5, exclude_ids=exclude_ids):
+        suggestions.append({
+            "type": "user",
+            "text": f"{user['full_name']} (@{user['username']})",
+            "value": user["username"],
+            "avatar": user.get("profile_photo_url")
+        })
+    
+    return {"suggestions": suggestions}
@@ -0,0 +1,378 @@
+"""
+Story Routes
+Story creation, deletion, likes, archive and the story tray
+"""
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+
+from mongo_compat import db
+from core.helpers import story_tray_cache
+from core.models import Story, StoryCreate, User
+from core.security import get_current_user
+from core.telegram_media import send_media_to_telegram_channel
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["stories"])
+
+# Stories Routes
+@router.post("/stories")
+async def create_story_with_file(
+    caption: str = Form(""),
+    media: Optional[UploadFile] = File(None),
+    media_type: str = Form("image"),
+    current_user: User = Depends(get_current_user)
+):
+    """Create story with actual file upload (multipart/form-data)"""
+    file_id = None
+    file_path = None
+    telegram_url = None
+    
+    try:
+        if media:
+            # Read the actual file
+            file_content = await media.read()
+            mime_type = media.content_type or "image/jpeg"
+            
+            # Convert to base64 data URL for send_media_to_telegram_channel
+            import base64
+            encoded = base64.b64encode(file_content).decode('utf-8')
+            media_url = f"data:{mime_type};base64,{encoded}"
+            
+            logger.info(f"Received story file: {media.filename}, size: {len(file_content)} bytes, type: {mime_type}")
+            
+            # Upload to Telegram
+            file_id, file_path, telegram_url = await send_media_to_telegram_channel(
+                media_url=media_url,
+                media_type=media_type,
+                caption=caption,
+                username=current_user.username
+            )
+            
+            if telegram_url:
+                logger.info(f"✅ Story uploaded to Telegram: {telegram_url}")
+            else:
+                logger.warning("⚠️ Failed to upload story to Telegram")
+                telegram_url = media_url
+        else:
+            logger.warning("No media file received for story")
+            telegram_url = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+    
+    except Exception as e:
+        logger.error(f"Failed to process story file: {e}")
+        import traceback
+        traceback.print_exc()
+        telegram_url = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+    
+    # Create story
+    story = Story(
+        userId=current_user.id,
+        username=current_user.username,
+        userProfileImage=current_user.profileImage,
+        mediaType=media_type,
+        mediaUrl=telegram_url,
+        caption=caption
+    )
+    
+    story_dict = story.dict()
+    if file_id:
+        story_dict["telegramFileId"] = file_id
+        story_dict["telegramFilePath"] = file_path
+    
+    await db.stories.insert_one(story_dict)
+    
+    if "_id" in story_dict:
+        del story_dict["_id"]
+    
+    story_tray_cache.invalidate()
+    return {"message": "Story created successfully", "story": story_dict}
+
+@router.post("/stories/create")
+async def create_story(story_data: StoryCreate, current_user: User = Depends(get_current_user)):
+    # Send media to Telegram channel first to get file_id and file_path
+    file_id = None
+    file_path = None
+    telegram_url = None
+    
+    try:
+        file_id, file_path, telegram_url = await send_media_to_telegram_channel(
+            media_url=story_data.mediaUrl,
+            media_type=story_data.mediaType,
+            caption=story_data.caption or "",
+            username=current_user.username
+        )
+        
+        if telegram_url:
+            logger.info(f"Story media uploaded to Telegram: {telegram_url}")
+        else:
+            logger.warning("Failed to upload story media to Telegram, using base64 fallback")
+    except Exception as e:
+        logger.error(f"Failed to send story media to Telegram: {e}")
+        # Don't fail the story creation if Telegram upload fails
+    
+    # Create story with Telegram URL if available, otherwise use base64
+    story = Story(
+        userId=current_user.id,
+        username=current_user.username,
+        userProfileImage=current_user.profileImage,
+        mediaType=story_data.mediaType,
+        mediaUrl=telegram_url if telegram_url else story_data.mediaUrl,  # Use Telegram URL if available
+        caption=story_data.caption
+    )
+    
+    # Add Telegram metadata if available
+    story_dict = story.dict()
+    if file_id:
+        story_dict["telegramFileId"] = file_id
+        story_dict["telegramFilePath"] = file_path
+    
+    await db.stories.insert_one(story_dict)
+    
+    # Remove MongoDB ObjectId from response
+    if "_id" in story_dict:
+        del story_dict["_id"]
+    
+    story_tray_cache.invalidate()
+    return {"message": "Story created successfully", "story": story_dict}
+
+@router.delete("/stories/{story_id}")
+async def delete_story(story_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Delete a story owned by the current user. Accept either numeric IDs or
+    legacy UUID identifiers. We attempt to coerce the provided story_id into
+    an integer to match the PostgreSQL serial primary key. If conversion
+    fails we fall back to the raw string.
+    """
+    # Determine the lookup ID (int if possible, otherwise the original string)
+    try:
+        lookup_id = int(story_id)
+    except (ValueError, TypeError):
+        lookup_id = story_id
+
+    # Fetch the story by its identifier
+    story = await db.stories.find_one({"id": lookup_id})
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+
+    # Ensure the current user owns the story. We compare both the userId and
+    # the username to cover potential type mismatches or historical data.
+    owner_id_matches = str(story.get("userId")) == str(current_user.id)
+    owner_username_matches = str(story.get("username")).lower() == str(current_user.username).lower()
+    if not (owner_id_matches or owner_username_matches):
+        raise HTTPException(status_code=403, detail="Not authorized to delete this story")
+
+    # Perform the deletion
+    await db.stories.delete_one({"id": lookup_id})
+    story_tray_cache.invalidate()
+
+    return {"message": "Story deleted successfully"}
+
+@router.post("/stories/{story_id}/like")
+async def like_story(story_id: str, current_user: User = Depends(get_current_user)):
+    """Like a story and send notification to story owner"""
+    story = await db.stories.find_one({"id": story_id})
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+    
+    # Add like to story
+    await db.stories.update_one(
+        {"id": story_id},
+        {"$addToSet": {"likes": current_user.id}}
+    )
+    
+    # Send notification to story owner if it's not their own story
+    if story["userId"] != current_user.id:
+        notification = {
+            "id": str(uuid4()),
+            "userId": story["userId"],  # Story owner receives notification
+            "fromUserId": current_user.id,
+            "fromUsername": current_user.username,
+            "type": "story_like",
+            "message": f"{current_user.username} liked your story",
+            "storyId": story_id,
+            "read": False,
+            "createdAt": datetime.now(timezone.utc).isoformat()
+        }
+        await db.notifications.insert_one(notification)
+    
+    return {"message": "Story liked successfully"}
+
+@router.delete("/stories/{story_id}/like")
+async def unlike_story(story_id: str, current_user: User = Depends(get_current_user)):
+    """Unlike a story"""
+    story = await db.stories.find_one({"id": story_id})
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+    
+    # Remove like from story
+    await db.stories.update_one(
+        {"id": story_id},
+        {"$pull": {"likes": current_user.id}}
+    )
+    
+    return {"message": "Story unliked successfully"}
+
+@router.get("/stories/feed")
+async def get_stories_feed(request: Request, current_user: User = Depends(get_current_user)):
+    cache_key = str(current_user.id)
+    cached = story_tray_cache.get(cache_key)
+    if cached:
+        return cached.response(request)
+
+    # Get all stories that haven't expired AND are not archived
+    now = datetime.now(timezone.utc)
+    stories = await db.stories.find({
+        "expiresAt": {"$gt": now},
+        "isArchived": False
+    }).sort("createdAt", -1).to_list(1000)
+    
+    # Group stories by user and separate current user's stories
+    stories_by_user = {}
+    my_stories = []
+    
+    # Convert current_user.id to string for consistent comparison
+    current_user_id_str = str(current_user.id)
+    
+    for story in stories:
+        user_id = story["userId"]
+        user_id_str = str(user_id)  # Ensure userId is also string for comparison
+        
+        # Separate current user's stories - compare as strings
+        if user_id_str == current_user_id_str:
+            # Unified URL: try all possible field names
+            unified_url = (
+                story.get("mediaUrl") or 
+                story.get("media_url") or 
+                story.get("imageUrl") or 
+                story.get("image_url") or 
+                ""
+            )
+            # Unified Type: try all possible field names
+            unified_type = (
+                story.get("mediaType") or 
+                story.get("media_type") or 
+                story.get("storyType") or 
+                story.get("story_type") or 
+                "image"
+            )
+            # Unified Caption: try caption and content
+            unified_caption = story.get("caption") or story.get("content") or ""
+            
+            my_stories.append({
+                "id": story["id"],
+                "mediaType": unified_type,
+                "mediaUrl": unified_url,
+                "imageUrl": unified_url,  # Include for compatibility
+                "storyType": unified_type,  # Include for compatibility
+                "caption": unified_caption,
+                "createdAt": story["createdAt"]
+            })
+            continue
+        
+        # Use stringified userId as key to avoid type mismatches
+        if user_id_str not in stories_by_user:
+            # Get user's current profile picture, verification, and founder status
+            story_author = await db.users.find_one({"id": user_id})
+            is_verified = story_author.get("isVerified", False) if story_author else False
+            is_founder = story_author.get("isFounder", False) if story_author else False
+            current_profile_image = story_author.get("profileImage") if story_author else story.get("userProfileImage")
+            
+            stories_by_user[user_id_str] = {
+                "userId": user_id_str,
+                "username": story["username"],
+                "userProfileImage": current_profile_image,  # Use current profile picture
+                "isVerified": is_verified,
+                "isFounder": is_founder,
+                "stories": []
+            }
+        stories_by_user[user_id_str]["stories"].append({
+            "id": story["id"],
+            "mediaType": (
+                story.get("mediaType") or 
+                story.get("media_type") or 
+                story.get("storyType") or 
+                story.get("story_type") or 
+                "image"
+            ),
+            "mediaUrl": (
+                story.get("mediaUrl") or 
+                story.get("media_url") or 
+                story.get("imageUrl") or 
+                story.get("image_url") or 
+                ""
+            ),
+            "imageUrl": (
+                story.get("mediaUrl") or 
+                story.get("media_url") or 
+                story.get("imageUrl") or 
+                story.get("image_url") or 
+                ""
+            ),
+            "storyType": (
+                story.get("mediaType") or 
+                story.get("media_type") or 
+                story.get("storyType") or 
+                story.get("story_type") or 
+                "image"
+            ),
+            "caption": story.get("caption") or story.get("content") or "",
+            "createdAt": story["createdAt"]
+        })
+    
+    # Prepare myStory object if user has stories
+    my_story_obj = None
+    if my_stories:
+        my_story_obj = {
+            "userId": str(current_user.id),  # Convert to string for consistency
+            "username": current_user.username,
+            "userProfileImage": current_user.profileImage,
+            "isVerified": current_user.isVerified,
+            "isFounder": current_user.isFounder,
+            "stories": my_stories
+        }
+    
+    return story_tray_cache.put(cache_key, {
+        "myStory": my_story_obj,
+        "stories": list(stories_by_user.values())
+    }).response(request)
+
+# Archive story
+@router.post("/stories/{story_id}/archive")
+async def archive_story(story_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Toggle the archived state of a story. Accept numeric IDs or legacy UUIDs.
+    Coerce the story_id to an integer when possible so that the lookup
+    matches the PostgreSQL serial primary key.
+    """
+    # Attempt to convert the provided ID to an integer for lookup
+    try:
+        lookup_id = int(story_id)
+    except (ValueError, TypeError):
+        lookup_id = story_id
+
+    # Locate the story
+    story = await db.stories.find_one({"id": lookup_id})
+    if not story:
+        raise HTTPException(status_code=404, detail="Story not found")
+
+    # Authorize the request: user must own the story by userId or username
+    owner_id_matches = str(story.get("userId")) == str(current_user.id)
+    owner_username_matches = str(story.get("username")).lower() == str(current_user.username).lower()
+    if not (owner_id_matches or owner_username_matches):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    is_archived = story.get("isArchived", False)
+    # Toggle the archived flag
+    await db.stories.update_one(
+        {"id": lookup_id},
+        {"$set": {"isArchived": not is_archived}}
+    )
+    story_tray_cache.invalidate()
+    return {
+        "message": "Story archived" if not is_archived else "Story unarchived",
+        "isArchived": not is_archived
+    }
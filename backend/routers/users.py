@@ -0,0 +1,900 @@
+"""
+User Routes
+Profiles, follows, blocks/mutes, direct messages and compatibility scoring
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from dotenv import load_dotenv
+
+import logging
+from datetime import datetime, timezone
+from typing import Tuple
+
+import db_postgres
+from db_postgres import FOLLOW_ACCEPTED, FOLLOW_PENDING
+from mongo_compat import DeleteMany, InsertOne, db
+from core.helpers import ROOT_DIR
+from core.models import ChatMessage, Notification, User
+from core.security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["users"])
+
+# Largest page served by /users/{id}/followers and /users/{id}/following
+FOLLOW_LIST_MAX_PAGE = 500
+
+# Chat Routes
+@router.post("/chat/send")
+async def send_message(receiverId: str, message: str, current_user: User = Depends(get_current_user)):
+    # Check if sender has premium
+    if not current_user.isPremium:
+        raise HTTPException(status_code=403, detail="Premium required to send messages")
+    
+    chat_message = ChatMessage(
+        senderId=current_user.id,
+        receiverId=receiverId,
+        message=message
+    )
+    
+    await db.messages.insert_one(chat_message.dict())
+    
+    return {"message": "Message sent successfully"}
+
+@router.get("/chat/messages/{userId}")
+async def get_messages(userId: str, current_user: User = Depends(get_current_user)):
+    # Get messages between current user and specified user
+    messages = await db.messages.find({
+        "$or": [
+            {"senderId": current_user.id, "receiverId": userId},
+            {"senderId": userId, "receiverId": current_user.id}
+        ]
+    }).sort("createdAt", 1).to_list(1000)
+    
+    messages_list = []
+    for msg in messages:
+        messages_list.append({
+            "id": msg["id"],
+            "senderId": msg["senderId"],
+            "receiverId": msg["receiverId"],
+            "message": msg["message"],
+            "createdAt": msg["createdAt"].isoformat()
+        })
+    
+    return {"messages": messages_list}
+
+@router.get("/users/list")
+async def get_users(current_user: User = Depends(get_current_user)):
+    users = await db.users.find({"id": {"$ne": current_user.id}}).to_list(1000)
+    statuses = await db_postgres.get_follow_statuses(int(current_user.id), [user["id"] for user in users])
+    
+    users_list = []
+    for user in users:
+        users_list.append({
+            "id": user["id"],
+            "username": user["username"],
+            "fullName": user["fullName"],
+            "profileImage": user.get("profileImage"),
+            "bio": user.get("bio", ""),
+            "followersCount": user.get("followersCount") or 0,
+            "followingCount": user.get("followingCount") or 0,
+            "isFollowing": statuses.get(user["id"]) == FOLLOW_ACCEPTED
+        })
+    
+    return {"users": users_list}
+
+@router.get("/users/blocked")
+async def get_blocked_users(current_user: User = Depends(get_current_user)):
+    """Get list of blocked users with their profile information"""
+    blocked_user_ids = current_user.blockedUsers
+    
+    if not blocked_user_ids:
+        return {"blockedUsers": []}
+    
+    # Get blocked users information
+    blocked_users = await db.users.find({"id": {"$in": blocked_user_ids}}).to_list(100)
+    
+    blocked_users_list = []
+    for user in blocked_users:
+        blocked_users_list.append({
+            "id": user["id"],
+            "username": user["username"],
+            "fullName": user["fullName"],
+            "profileImage": user.get("profileImage"),
+            "blockedAt": user.get("blockedAt", "Unknown")
+        })
+    
+    return {"blockedUsers": blocked_users_list}
+
+@router.get("/users/{userId}")
+async def get_user_profile(userId: str, current_user: User = Depends(get_current_user)):
+    # Try to find by MongoDB id first, then by tg_user_id
+    user = await db.users.find_one({"id": userId})
+    if not user:
+        # Try finding by tg_user_id (for Mystery Match compatibility)
+        try:
+            tg_id = int(userId)
+            user = await db.users.find_one({"tg_user_id": tg_id})
+        except ValueError:
+            pass
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Count the user's posts in the database instead of loading them
+    posts_count = await db.posts.count_documents({"userId": user["id"]})
+    
+    # Follow state of the current user towards this profile (pending = requested, for private accounts)
+    follow_status = await db_postgres.get_follow_status(int(current_user.id), user["id"])
+    
+    return {
+        "id": user["id"],
+        "username": user["username"],
+        "fullName": user["fullName"],
+        "profileImage": user.get("profileImage"),
+        "bio": user.get("bio", ""),
+        "isPrivate": user.get("isPrivate", False),
+        "followersCount": user.get("followersCount") or 0,
+        "followingCount": user.get("followingCount") or 0,
+        "isFollowing": follow_status == FOLLOW_ACCEPTED,
+        "hasRequested": follow_status == FOLLOW_PENDING,
+        "postsCount": posts_count
+    }
+
+# Follow/Unfollow Routes
+def _follow_pair(follower_id, following_id) -> Tuple[int, int]:
+    """webapp_follows keys for a follow edge (non-numeric legacy ids cannot exist there)"""
+    try:
+        return int(follower_id), int(following_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=404, detail="User not found")
+
+@router.post("/users/{userId}/follow")
+async def follow_user(userId: str, current_user: User = Depends(get_current_user)):
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot follow yourself")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    follower_id, following_id = _follow_pair(current_user.id, target_user["id"])
+    if follower_id == following_id:
+        raise HTTPException(status_code=400, detail="Cannot follow yourself")
+    
+    # Private accounts get a pending request, public ones an accepted follow;
+    # one INSERT ... ON CONFLICT, counters updated in the same transaction
+    is_private = target_user.get("isPrivate", False)
+    result = await db_postgres.follow_user(
+        follower_id, following_id, FOLLOW_PENDING if is_private else FOLLOW_ACCEPTED
+    )
+    
+    if result["status"] == FOLLOW_PENDING:
+        if not result["changed"]:
+            # Already requested - do nothing, return success
+            return {"message": "Follow request already sent", "requested": True}
+        
+        # Replace any existing follow request notification with a NEW one (one transaction)
+        notification = Notification(
+            userId=userId,
+            fromUserId=current_user.id,
+            fromUsername=current_user.username,
+            fromUserImage=current_user.profileImage,
+            type="follow_request"
+        )
+        await db.notifications.bulk_write([
+            DeleteMany({"userId": userId, "fromUserId": current_user.id, "type": "follow_request"}),
+            InsertOne(notification.dict())
+        ])
+        
+        return {"message": "Follow request sent", "requested": True}
+    
+    if result["changed"]:
+        # Create notification
+        notification = Notification(
+            userId=userId,
+            fromUserId=current_user.id,
+            fromUsername=current_user.username,
+            fromUserImage=current_user.profileImage,
+            type="follow"
+        )
+        await db.notifications.insert_one(notification.dict())
+    
+    return {"message": "User followed successfully", "requested": False}
+
+@router.post("/users/{userId}/unfollow")
+async def unfollow_user(userId: str, current_user: User = Depends(get_current_user)):
+    # Removes an accepted follow or a pending request
+    await db_postgres.remove_follow(*_follow_pair(current_user.id, userId))
+    
+    return {"message": "User unfollowed successfully"}
+
+@router.post("/users/{userId}/accept-follow-request")
+async def accept_follow_request(userId: str, current_user: User = Depends(get_current_user)):
+    """Accept a follow request from another user"""
+    requester_id, accepter_id = _follow_pair(userId, current_user.id)
+    if not await db_postgres.accept_follow_request(requester_id, accepter_id):
+        raise HTTPException(status_code=404, detail="Follow request not found")
+    
+    # DELETE the follow request notification; the new notifications go out in the same batch
+    writes = [DeleteMany({"userId": current_user.id, "fromUserId": userId, "type": "follow_request"})]
+    
+    # Create notification for REQUESTER: "User accepted your follow request"
+    requester = await db.users.find_one({"id": userId})
+    if requester:
+        notification_for_requester = Notification(
+            userId=userId,  # Notification goes to requester
+            fromUserId=current_user.id,  # From the person who accepted
+            fromUsername=current_user.username,
+            fromUserImage=current_user.profileImage,
+            type="follow_request_accepted"
+        )
+        writes.append(InsertOne(notification_for_requester.dict()))
+    
+    # Create notification for ACCEPTER: "User started following you" with Follow back option
+    # ONLY if accepter is NOT already following the requester
+    # (If they already follow each other, no need for "follow back" notification)
+    accepter_already_follows_requester = (
+        await db_postgres.get_follow_status(accepter_id, requester_id) == FOLLOW_ACCEPTED
+    )
+    
+    if not accepter_already_follows_requester:
+        notification_for_accepter = Notification(
+            userId=current_user.id,  # Notification goes to accepter (person who accepted)
+            fromUserId=userId,  # From the requester who is now following
+            fromUsername=requester.get("username", "Unknown") if requester else "Unknown",
+            fromUserImage=requester.get("profileImage") if requester else None,
+            type="started_following"
+        )
+        writes.append(InsertOne(notification_for_accepter.dict()))
+    
+    await db.notifications.bulk_write(writes)
+    return {"message": "Follow request accepted"}
+
+@router.post("/users/{userId}/reject-follow-request")
+async def reject_follow_request(userId: str, current_user: User = Depends(get_current_user)):
+    """Reject/delete a follow request from another user"""
+    await db_postgres.remove_follow(*_follow_pair(userId, current_user.id), status=FOLLOW_PENDING)
+    
+    return {"message": "Follow request rejected"}
+
+@router.post("/users/{userId}/cancel-follow-request")
+async def cancel_follow_request(userId: str, current_user: User = Depends(get_current_user)):
+    """Cancel a follow request that was sent to another user"""
+    await db_postgres.remove_follow(*_follow_pair(current_user.id, userId), status=FOLLOW_PENDING)
+    
+    # Delete the follow request notification
+    await db.notifications.delete_many({
+        "userId": userId,
+        "fromUserId": current_user.id,
+        "type": "follow_request"
+    })
+    
+    return {"message": "Follow request cancelled"}
+
+async def _follow_list_response(userId: str, direction: str, current_user: User, limit: int, offset: int):
+    user = await db.users.find_one({"id": userId})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    viewer_id, owner_id = _follow_pair(current_user.id, user["id"])
+    
+    # Check privacy
+    is_private = user.get("isPrivate", False)
+    is_following = await db_postgres.get_follow_status(viewer_id, owner_id) == FOLLOW_ACCEPTED
+    
+    # Can only view if: own profile, public account, or following private account
+    if is_private and viewer_id != owner_id and not is_following:
+        raise HTTPException(status_code=403, detail="This account is private")
+    
+    # One join for the page and one batched lookup for the viewer's follow state
+    limit = max(1, min(limit, FOLLOW_LIST_MAX_PAGE))
+    offset = max(0, offset)
+    rows = await db_postgres.get_follow_list(owner_id, direction, limit, offset)
+    statuses = await db_postgres.get_follow_statuses(viewer_id, [row["id"] for row in rows])
+    
+    people = [
+        {
+            "id": row["id"],
+            "username": row["username"],
+            "fullName": row["full_name"],
+            "profileImage": row.get("profile_photo_url"),
+            "isFollowing": statuses.get(row["id"]) == FOLLOW_ACCEPTED,
+            "hasRequested": statuses.get(row["id"]) == FOLLOW_PENDING
+        }
+        for row in rows
+    ]
+    return people, offset + len(rows) if len(rows) == limit else None
+
+@router.get("/users/{userId}/followers")
+async def get_followers_list(userId: str, limit: int = 100, offset: int = 0,
+                             current_user: User = Depends(get_current_user)):
+    """Get one page of followers for a user, newest first (pass nextOffset for the next page)"""
+    people, next_offset = await _follow_list_response(userId, "followers", current_user, limit, offset)
+    return {"followers": people, "nextOffset": next_offset}
+
+@router.get("/users/{userId}/following")
+async def get_following_list(userId: str, limit: int = 100, offset: int = 0,
+                             current_user: User = Depends(get_current_user)):
+    """Get one page of users that this user is following, newest first (pass nextOffset for the next page)"""
+    people, next_offset = await _follow_list_response(userId, "following", current_user, limit, offset)
+    return {"following": people, "nextOffset": next_offset}
+
+# My Profile Routes
+@router.get("/profile/posts")
+async def get_my_posts(current_user: User = Depends(get_current_user)):
+    # Get all non-archived posts
+    posts = await db.posts.find({"userId": current_user.id, "isArchived": {"$ne": True}}).to_list(1000)
+    
+    # Sort: pinned first, then by date
+    posts.sort(key=lambda x: (not x.get("isPinned", False), -x["createdAt"].timestamp()))
+    
+    posts_list = []
+    for post in posts:
+        posts_list.append({
+            "id": post["id"],
+            "mediaType": post.get("mediaType", "image"),  # Use .get() with default
+            "mediaUrl": post.get("mediaUrl"),
+            "imageUrl": post.get("imageUrl"),  # Add imageUrl support
+            "caption": post.get("caption", ""),
+            "likes": post.get("likes", []),
+            "comments": post.get("comments", []),
+            "createdAt": post["createdAt"].isoformat(),
+            "likesCount": len(post.get("likes", [])),
+            "commentsCount": len(post.get("comments", [])),
+            "isLiked": current_user.id in post.get("likes", []),
+            "isSaved": post["id"] in current_user.savedPosts
+        })
+    
+    return {"posts": posts_list}
+
+@router.get("/profile/saved")
+async def get_saved_posts(current_user: User = Depends(get_current_user)):
+    if not current_user.savedPosts:
+        return {"posts": []}
+    
+    # Get all saved posts
+    posts = await db.posts.find({"id": {"$in": current_user.savedPosts}}).sort("createdAt", -1).to_list(1000)
+    
+    posts_list = []
+    for post in posts:
+        posts_list.append({
+            "id": post["id"],
+            "userId": post["userId"],
+            "username": post["username"],
+            "userProfileImage": post.get("userProfileImage"),
+            "mediaType": post.get("mediaType", "image"),
+            "mediaUrl": post.get("mediaUrl"),
+            "imageUrl": post.get("imageUrl"),
+            "caption": post.get("caption", ""),
+            "likes": post.get("likes", []),
+            "comments": post.get("comments", []),
+            "likesCount": len(post.get("likes", [])),
+            "commentsCount": len(post.get("comments", [])),
+            "createdAt": post["createdAt"].isoformat(),
+            "isLiked": current_user.id in post.get("likes", []),
+            "isSaved": True
+        })
+    
+    return {"posts": posts_list}
+
+# Get archived posts
+@router.get("/profile/archived")
+async def get_archived(current_user: User = Depends(get_current_user)):
+    posts = await db.posts.find({"userId": current_user.id, "isArchived": True}).sort("createdAt", -1).to_list(1000)
+    stories = await db.stories.find({"userId": current_user.id, "isArchived": True}).sort("createdAt", -1).to_list(1000)
+    
+    posts_list = []
+    for post in posts:
+        posts_list.append({
+            "id": post["id"],
+            "type": "post",
+            "mediaType": post.get("mediaType", "image"),
+            "mediaUrl": post.get("mediaUrl"),
+            "imageUrl": post.get("imageUrl"),
+            "caption": post.get("caption", ""),
+            "likesCount": len(post.get("likes", [])),
+            "commentsCount": len(post.get("comments", [])),
+            "createdAt": post["createdAt"].isoformat()
+        })
+    
+    for story in stories:
+        posts_list.append({
+            "id": story["id"],
+            "type": "story",
+            "mediaType": story.get("mediaType", "image"),
+            "mediaUrl": story.get("mediaUrl"),
+            "imageUrl": story.get("imageUrl"),
+            "caption": story.get("caption", ""),
+            "createdAt": story["createdAt"].isoformat()
+        })
+    
+    # Sort by date
+    posts_list.sort(key=lambda x: x["createdAt"], reverse=True)
+    
+    return {"archived": posts_list}
+
+@router.get("/users/{userId}/profile")
+async def get_user_profile(userId: str, current_user: User = Depends(get_current_user)):
+    """Get detailed profile of a specific user"""
+    user = await db.users.find_one({"id": userId})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    viewer_id, owner_id = _follow_pair(current_user.id, user["id"])
+    
+    # Follow state in both directions (pending = requested, for private accounts);
+    # the reverse direction drives the "Follow back" button
+    follow_status = await db_postgres.get_follow_status(viewer_id, owner_id)
+    is_following_me = await db_postgres.get_follow_status(owner_id, viewer_id) == FOLLOW_ACCEPTED
+    
+    # Check if account is private
+    is_private = user.get("isPrivate", False)
+    
+    # Always show the post count. We restrict actual post content in the
+    # /users/{userId}/posts endpoint, but the number of posts should be
+    # visible even for private accounts (similar to Instagram and other social apps).
+    posts_count = await db.posts.count_documents({
+        "userId": userId,
+        "isArchived": {"$ne": True}
+    })
+    
+    followers_count = user.get("followersCount") or 0
+    following_count = user.get("followingCount") or 0
+    
+    logger.info(f"Profile API called for user {user.get('username')} - Followers: {followers_count}, Following: {following_count}")
+    
+    return {
+        "id": user["id"],
+        "username": user["username"],
+        "fullName": user["fullName"],
+        "profileImage": user.get("profileImage"),
+        "bio": user.get("bio", ""),
+        "age": user.get("age"),
+        "gender": user.get("gender"),
+        "isPremium": user.get("isPremium", False),
+        "isVerified": user.get("isVerified", False),
+        "isFounder": user.get("isFounder", False),
+        "verificationPathway": user.get("verificationPathway"),
+        "isPrivate": is_private,
+        "followersCount": followers_count,
+        "followingCount": following_count,
+        "isFollowing": follow_status == FOLLOW_ACCEPTED,
+        "isFollowingMe": is_following_me,
+        "hasRequested": follow_status == FOLLOW_PENDING,
+        "postsCount": posts_count,
+        "createdAt": user.get("createdAt") if isinstance(user.get("createdAt"), str) else user.get("createdAt").isoformat() if user.get("createdAt") else None
+    }
+
+@router.get("/users/{userId}/verification-details")
+async def get_user_verification_details(
+    userId: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get verification details for a user"""
+    user = await db.users.find_one({"id": userId})
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if not user.get("isVerified", False):
+        raise HTTPException(status_code=404, detail="User is not verified")
+    
+    return {
+        "pathway": user.get("verificationPathway", "High Engagement Pathway"),
+        "verifiedAt": user.get("verifiedAt", datetime.now(timezone.utc)).isoformat() if isinstance(user.get("verifiedAt"), datetime) else user.get("verifiedAt", datetime.now(timezone.utc).isoformat()),
+        "isVerified": True
+    }
+
+@router.get("/users/{userId}/account-info")
+async def get_user_account_info(
+    userId: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get account info for 'About this account' section (like Instagram)"""
+    user = await db.users.find_one({"id": userId})
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Format createdAt as "Month Year" (e.g., "May 2015")
+    created_at = user.get("createdAt")
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    date_joined = created_at.strftime("%B %Y") if created_at else "Unknown"
+    
+    response = {
+        "dateJoined": date_joined,
+        "country": user.get("country", "Not specified"),
+        "isVerified": user.get("isVerified", False),
+        "isFounder": user.get("isFounder", False)
+    }
+    
+    # Add verification details if user is verified
+    if user.get("isVerified", False):
+        response["verificationPathway"] = user.get("verificationPathway", "High Engagement Pathway")
+        verified_at = user.get("verifiedAt")
+        if isinstance(verified_at, str):
+            verified_at = datetime.fromisoformat(verified_at)
+        response["verifiedAt"] = verified_at.strftime("%B %Y") if verified_at else "Unknown"
+    
+    return response
+
+
+@router.get("/users/{userId}/posts")
+async def get_user_posts(userId: str, current_user: User = Depends(get_current_user)):
+    """Get posts by a specific user (accepts UUID or username)"""
+    # Find the user by id or by username
+    user = await db.users.find_one({"$or": [{"id": userId}, {"username": userId}]})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # If the account is private and the requester isn't following and isn't the owner, hide posts
+    is_private = user.get("isPrivate", False)
+    viewer_id, owner_id = _follow_pair(current_user.id, user["id"])
+    if is_private and viewer_id != owner_id:
+        if await db_postgres.get_follow_status(viewer_id, owner_id) != FOLLOW_ACCEPTED:
+            return {"posts": []}
+    
+    # Get user's non-archived posts by either userId or username
+    # Use $ne: True to include posts without isArchived field (default behavior)
+    posts = await db.posts.find({
+        "$and": [
+            {"isArchived": {"$ne": True}},
+            {"$or": [{"userId": user["id"]}, {"username": user["username"]}]}
+        ]
+    }).sort("createdAt", -1).to_list(50)
+    
+    posts_list = []
+    for post in posts:
+        # Check if current user liked this post
+        is_liked = current_user.id in post.get("likes", [])
+        # Check if current user saved this post
+        is_saved = post["id"] in current_user.savedPosts
+        
+        # Handle createdAt - could be datetime object or string
+        created_at_val = post.get("createdAt")
+        if isinstance(created_at_val, datetime):
+            created_at_str = created_at_val.isoformat()
+        else:
+            # Already a string or None
+            created_at_str = created_at_val if created_at_val else ""
+        
+        # Get media URL with fallback to Telegram proxy
+        media_url = post.get("mediaUrl")
+        image_url = post.get("imageUrl")
+        telegram_id = post.get("telegramFileId")
+        
+        # If neither mediaUrl nor imageUrl exists but we have a Telegram file ID, build a media proxy URL
+        if not media_url and not image_url and telegram_id:
+            media_url = f"/api/media/{telegram_id}"
+        
+        posts_list.append({
+            "id": post.get("id"),
+            "userId": post.get("userId"),
+            "username": post.get("username"),
+            "userProfileImage": post.get("userProfileImage"),
+            "mediaType": post.get("mediaType", "image"),  # Default to image if missing
+            "mediaUrl": media_url,
+            "imageUrl": image_url,  # Legacy field for backward compatibility
+            "telegramFileId": telegram_id,  # Include for frontend fallback
+            "caption": post.get("caption", ""),
+            "likes": post.get("likes", []),
+            "comments": post.get("comments", []),
+            "isLiked": is_liked,
+            "isSaved": is_saved,
+            "likesHidden": post.get("likesHidden", False),
+            "commentsDisabled": post.get("commentsDisabled", False),
+            "isPinned": post.get("isPinned", False),
+            "createdAt": created_at_str
+        })
+    
+    return {"posts": posts_list}
+
+@router.post("/ai/vibe-compatibility")
+async def calculate_vibe_compatibility(
+    request: dict,
+    current_user: User = Depends(get_current_user)
+):
+    """Calculate AI-powered vibe compatibility between users"""
+    target_user_id = request.get("targetUserId")
+    
+    if not target_user_id:
+        raise HTTPException(status_code=400, detail="Target user ID required")
+    
+    target_user = await db.users.find_one({"id": target_user_id})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="Target user not found")
+    
+    try:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+        import os
+        import uuid
+        
+        # Load environment variable
+        load_dotenv(ROOT_DIR / '.env')
+        api_key = os.environ.get('EMERGENT_LLM_KEY')
+        
+        if not api_key:
+            raise HTTPException(status_code=500, detail="AI service not configured")
+        
+        # Initialize AI chat with GPT-5
+        chat = LlmChat(
+            api_key=api_key,
+            session_id=f"vibe-{current_user.id}-{target_user_id}",
+            system_message="You are an AI compatibility analyst for a dating app. Analyze user profiles and provide compatibility scores with explanations."
+        ).with_model("openai", "gpt-5")
+        
+        # Create prompt with user data
+        user1_profile = f"""
+User 1 Profile:
+- Full Name: {current_user.fullName}
+- Age: {current_user.age}
+- Gender: {current_user.gender}
+- Bio: {current_user.bio or "No bio provided"}
+"""
+        
+        user2_profile = f"""
+User 2 Profile:
+- Full Name: {target_user['fullName']}
+- Age: {target_user['age']}  
+- Gender: {target_user['gender']}
+- Bio: {target_user.get('bio', 'No bio provided')}
+"""
+        
+        analysis_prompt = f"""
+Analyze the compatibility between these two users:
+
+{user1_profile}
+
+{user2_profile}
+
+Please provide:
+1. A compatibility percentage (0-100)
+2. Brief analysis of their compatibility
+
+Focus on age compatibility, interests from bios, and general compatibility factors.
+Respond in this exact format:
+COMPATIBILITY: [percentage]
+ANALYSIS: [your analysis here]
+
+Keep the analysis positive and encouraging, even for lower compatibility scores.
+"""
+        
+        user_message = UserMessage(text=analysis_prompt)
+        response = await chat.send_message(user_message)
+        
+        # Parse AI response
+        response_text = str(response)
+        compatibility_score = 75  # Default fallback
+        analysis_text = "AI-powered compatibility analysis based on profiles and interests."
+        
+        if "COMPATIBILITY:" in response_text and "ANALYSIS:" in response_text:
+            try:
+                compatibility_line = response_text.split("COMPATIBILITY:")[1].split("ANALYSIS:")[0].strip()
+                analysis_line = response_text.split("ANALYSIS:")[1].strip()
+                
+                # Extract percentage from compatibility line
+                import re
+                score_match = re.search(r'(\d+)', compatibility_line)
+                if score_match:
+                    compatibility_score = min(100, max(0, int(score_match.group(1))))
+                
+                if analysis_line:
+                    analysis_text = analysis_line
+                    
+            except Exception as parse_error:
+                logger.error(f"Error parsing AI response: {parse_error}")
+                # Use fallback values
+                pass
+        
+        return {
+            "compatibility": compatibility_score,
+            "analysis": analysis_text
+        }
+        
+    except Exception as e:
+        logger.error(f"Error calculating vibe compatibility: {e}")
+        # Fallback to random score if AI fails
+        import random
+        return {
+            "compatibility": random.randint(65, 90),
+            "analysis": "Compatibility analysis based on profile information. AI service temporarily unavailable - showing estimated compatibility."
+        }
+
+@router.post("/users/{userId}/block")
+async def block_user(userId: str, current_user: User = Depends(get_current_user)):
+    """Block a user"""
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot block yourself")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Add to blocked users list and drop any follow (or request) in either direction
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$addToSet": {"blockedUsers": userId}}
+    )
+    blocker_id, blocked_id = _follow_pair(current_user.id, target_user["id"])
+    await db_postgres.remove_follow(blocker_id, blocked_id)
+    await db_postgres.remove_follow(blocked_id, blocker_id)
+    
+    return {"message": "User blocked successfully"}
+
+@router.post("/users/{userId}/hide-story")
+async def hide_user_story(userId: str, current_user: User = Depends(get_current_user)):
+    """Hide stories from a specific user"""
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot hide your own stories")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Add to hidden stories list (add this field to User model if needed)
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$addToSet": {"hiddenStoryUsers": userId}}
+    )
+    
+    return {"message": "Stories hidden successfully"}
+
+
+
+@router.post("/users/{userId}/unblock")
+async def unblock_user(userId: str, current_user: User = Depends(get_current_user)):
+    """Unblock a user"""
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot unblock yourself")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Remove from blocked users list
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$pull": {"blockedUsers": userId}}
+    )
+    
+    return {"message": "User unblocked successfully"}
+
+@router.post("/users/{userId}/mute")
+async def mute_user(userId: str, current_user: User = Depends(get_current_user)):
+    """
+    Mute a user - their posts won't appear in your feed but they won't know
+    Different from blocking: they can still see your posts and interact
+    """
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot mute yourself")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Add to muted users list
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$addToSet": {"mutedUsers": userId}}
+    )
+    
+    return {"message": "User muted successfully"}
+
+@router.post("/users/{userId}/unmute")
+async def unmute_user(userId: str, current_user: User = Depends(get_current_user)):
+    """Unmute a user"""
+    if userId == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot unmute yourself")
+    
+    target_user = await db.users.find_one({"id": userId})
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Remove from muted users list
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$pull": {"mutedUsers": userId}}
+    )
+    
+    return {"message": "User unmuted successfully"}
+
+# Mystery Match Registration Endpoint - Creates user in both MongoDB AND PostgreSQL
+# Calculate Vibe Compatibility between two users
+@router.get("/auth/calculate-compatibility/{other_user_id}")
+async def calculate_compatibility(
+    other_user_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Calculate vibe compatibility between current user and another user
+    Based on interests (30%) and personality answers (70%)
+    """
+    try:
+        # Get current user's full data from database
+        user1_data = await db.users.find_one({"id": int(current_user.id)})
+        if not user1_data:
+            raise HTTPException(status_code=404, detail="Current user not found")
+        
+        # Get other user
+        other_user = await db.users.find_one({"id": other_user_id})
+        if not other_user:
+            # Try finding by tg_user_id
+            try:
+                tg_id = int(other_user_id)
+                other_user = await db.users.find_one({"tg_user_id": tg_id})
+            except:
+                pass
+        
+        if not other_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Get user data
+        user1_interests = user1_data.get("interests", "").split(", ") if isinstance(user1_data.get("interests"), str) else []
+        user2_interests = other_user.get("interests", "").split(", ") if isinstance(other_user.get("interests"), str) else []
+        
+        user1_personality = user1_data.get("personalityAnswers", {})
+        user2_personality = other_user.get("personalityAnswers", {})
+        
+        # Calculate interest match (30% weight)
+        interest_score = 0
+        if user1_interests and user2_interests:
+            common_interests = set(user1_interests) & set(user2_interests)
+            total_interests = set(user1_interests) | set(user2_interests)
+            if total_interests:
+                interest_score = len(common_interests) / len(total_interests)
+        
+        # Calculate personality match (70% weight)
+        personality_score = 0
+        matching_answers = []
+        
+        if user1_personality and user2_personality:
+            total_questions = len(user1_personality)
+            matches = 0
+            
+            for question_id, answer1 in user1_personality.items():
+                answer2 = user2_personality.get(question_id)
+                if answer2 and answer1 == answer2:
+                    matches += 1
+                    matching_answers.append({
+                        "question_id": question_id,
+                        "answer": answer1
+                    })
+            
+            if total_questions > 0:
+                personality_score = matches / total_questions
+        
+        # Calculate total compatibility (weighted average)
+        total_score = (interest_score * 0.3) + (personality_score * 0.7)
+        compatibility_percentage = int(total_score * 100)
+        
+        # Generate compatibility message
+        if compatibility_percentage >= 80:
+            message = "Amazing match! 🔥 You two are incredibly compatible!"
+        elif compatibility_percentage >= 60:
+            message = "Great match! ✨ You have a lot in common!"
+        elif compatibility_percentage >= 40:
+            message = "Good match! 💫 You share some interesting similarities!"
+        else:
+            message = "Opposites attract! 🌟 You might discover new perspectives!"
+        
+        # Get common interests
+        common_interests_list = list(set(user1_interests) & set(user2_interests))
+        
+        return {
+            "compatibility_percentage": compatibility_percentage,
+            "message": message,
+            "interest_score": int(interest_score * 100),
+            "personality_score": int(personality_score * 100),
+            "common_interests": common_interests_list,
+            "matching_answers": matching_answers,
+            "details": {
+                "interests_weight": 30,
+                "personality_weight": 70
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error calculating compatibility: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
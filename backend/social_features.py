@@ -15,7 +15,9 @@ import logging
 from uuid import uuid4
 
 # Import PostgreSQL-backed MongoDB compatibility layer
+import db_postgres
 from mongo_compat import db
+from utils.timeline import home_timeline
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -122,6 +124,9 @@ async def create_post(
         # Insert and get the database-generated ID
         insert_result = await db.posts.insert_one(post_data)
         post_id = insert_result.get('inserted_id')
+        if not isAnonymous:
+            # Anonymous posts stay out of followers' timelines so they can't be traced back
+            home_timeline.post_created(post_id)
 
         return {
             "success": True,
@@ -795,28 +800,17 @@ async def follow_user(userId: str = Form(...), targetUserId: str = Form(...)):
         if not user or not target:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Add to following list
-        following = user.get("following", [])
-        if targetUserId not in following:
-            following.append(targetUserId)
-            await db.users.update_one(
-                {"id": userId},
-                {"$set": {"following": following}}
-            )
-        
-        # Add to followers list
-        followers = target.get("followers", [])
-        if userId not in followers:
-            followers.append(userId)
-            await db.users.update_one(
-                {"id": targetUserId},
-                {"$set": {"followers": followers}}
-            )
+        # Single webapp_follows row (pending for private accounts); counters move in the same transaction
+        result = await db_postgres.follow_user(
+            int(user["id"]), int(target["id"]),
+            db_postgres.FOLLOW_PENDING if target.get("isPrivate", False) else db_postgres.FOLLOW_ACCEPTED
+        )
+        following = result["status"] == db_postgres.FOLLOW_ACCEPTED
         
         return {
             "success": True,
-            "message": "Followed successfully",
-            "following": True
+            "message": "Followed successfully" if following else "Follow request sent",
+            "following": following
         }
         
     except Exception as e:
@@ -832,23 +826,7 @@ async def unfollow_user(userId: str = Form(...), targetUserId: str = Form(...)):
         if not user or not target:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Remove from following list
-        following = user.get("following", [])
-        if targetUserId in following:
-            following.remove(targetUserId)
-            await db.users.update_one(
-                {"id": userId},
-                {"$set": {"following": following}}
-            )
-        
-        # Remove from followers list
-        followers = target.get("followers", [])
-        if userId in followers:
-            followers.remove(userId)
-            await db.users.update_one(
-                {"id": targetUserId},
-                {"$set": {"followers": followers}}
-            )
+        await db_postgres.remove_follow(int(user["id"]), int(target["id"]))
         
         return {
             "success": True,
@@ -867,20 +845,18 @@ async def get_followers(userId: str):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        follower_ids = user.get("followers", [])
-        
-        # Get follower details
-        followers = []
-        for fid in follower_ids:
-            follower = await db.users.find_one({"id": fid})
-            if follower:
-                followers.append({
-                    "id": follower["id"],
-                    "username": follower.get("username"),
-                    "fullName": follower.get("fullName"),
-                    "profileImage": follower.get("profileImage"),
-                    "bio": follower.get("bio", "")
-                })
+        # One join over webapp_follows instead of a lookup per id
+        rows = await db_postgres.get_follow_list(int(user["id"]), "followers")
+        followers = [
+            {
+                "id": row["id"],
+                "username": row["username"],
+                "fullName": row["full_name"],
+                "profileImage": row["profile_photo_url"],
+                "bio": row["bio"] or ""
+            }
+            for row in rows
+        ]
         
         return {
             "success": True,
@@ -899,20 +875,18 @@ async def get_following(userId: str):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        following_ids = user.get("following", [])
-        
-        # Get following details
-        following = []
-        for fid in following_ids:
-            followed_user = await db.users.find_one({"id": fid})
-            if followed_user:
-                following.append({
-                    "id": followed_user["id"],
-                    "username": followed_user.get("username"),
-                    "fullName": followed_user.get("fullName"),
-                    "profileImage": followed_user.get("profileImage"),
-                    "bio": followed_user.get("bio", "")
-                })
+        # One join over webapp_follows instead of a lookup per id
+        rows = await db_postgres.get_follow_list(int(user["id"]), "following")
+        following = [
+            {
+                "id": row["id"],
+                "username": row["username"],
+                "fullName": row["full_name"],
+                "profileImage": row["profile_photo_url"],
+                "bio": row["bio"] or ""
+            }
+            for row in rows
+        ]
         
         return {
             "success": True,
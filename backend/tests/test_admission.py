@@ -0,0 +1,138 @@
+"""
+Tests for admission control - route classes, priority queueing and 503 shedding
+Endpoints are stand-ins that block on an event - no database required
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils import admission
+from utils.admission import (
+    PRIORITY_CRITICAL, PRIORITY_LOW, PRIORITY_NORMAL,
+    AdmissionController, AdmissionGate, AdmissionMiddleware, classify,
+)
+
+
+class TestClassify:
+    def test_route_classes_and_priorities(self):
+        assert classify("/api/auth/me") == ("auth", PRIORITY_CRITICAL)
+        assert classify("/api/chat/send") == ("feed", PRIORITY_CRITICAL)
+        assert classify("/api/auth/register") == ("auth", PRIORITY_NORMAL)
+        assert classify("/api/posts/feed") == ("feed", PRIORITY_NORMAL)
+        assert classify("/api/posts/create", "POST") == ("uploads", PRIORITY_NORMAL)
+        assert classify("/api/search/explore") == ("search", PRIORITY_LOW)
+        assert classify("/api/admin/reconcile-counters") == ("admin", PRIORITY_LOW)
+        assert classify("/api/follow") == ("other", PRIORITY_NORMAL)
+
+    def test_file_serving_is_not_an_upload(self):
+        assert classify("/uploads/x.jpg") == ("media", PRIORITY_NORMAL)
+        assert classify("/api/uploads/posts/x.jpg") == ("media", PRIORITY_NORMAL)
+        assert classify("/api/media/AgADBAAD") == ("media", PRIORITY_NORMAL)
+        assert classify("/api/posts", "GET") == ("feed", PRIORITY_NORMAL)
+        assert classify("/api/stories", "POST") == ("uploads", PRIORITY_NORMAL)
+        assert classify("/api/social/posts", "POST") == ("uploads", PRIORITY_NORMAL)
+
+    def test_env_override(self, monkeypatch):
+        monkeypatch.setenv("ADMISSION_SEARCH_LIMIT", "3")
+        monkeypatch.setenv("ADMISSION_SEARCH_QUEUE_TIMEOUT", "0.25")
+        config = admission.class_config("search")
+        assert config["limit"] == 3 and config["queue_timeout"] == 0.25
+
+
+class TestGate:
+    @pytest.mark.asyncio
+    async def test_waiters_served_by_priority(self):
+        gate = AdmissionGate("test", limit=1, max_queue=10)
+        assert await gate.acquire(PRIORITY_NORMAL, 1) is None
+        order = []
+
+        async def wait(priority, label):
+            assert await gate.acquire(priority, 1) is None
+            order.append(label)
+            gate.release()
+
+        tasks = [asyncio.create_task(wait(PRIORITY_LOW, "search")),
+                 asyncio.create_task(wait(PRIORITY_NORMAL, "feed")),
+                 asyncio.create_task(wait(PRIORITY_CRITICAL, "me"))]
+        await asyncio.sleep(0)
+        assert gate.waiting == 3
+        gate.release()
+        await asyncio.gather(*tasks)
+        assert order == ["me", "feed", "search"]
+        assert gate.active == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_and_full_queue(self):
+        gate = AdmissionGate("test", limit=1, max_queue=1)
+        await gate.acquire(PRIORITY_NORMAL, 1)
+        waiter = asyncio.create_task(gate.acquire(PRIORITY_NORMAL, 0.02))
+        await asyncio.sleep(0)
+        assert await gate.acquire(PRIORITY_NORMAL, 1) == "queue_full"
+        assert await waiter == "queue_timeout"
+        assert gate.stats()["shed_timeout"] == 1 and gate.stats()["shed_queue_full"] == 1
+        gate.release()
+        assert gate.active == 0 and gate.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_low_priority_capped_below_limit(self):
+        gate = AdmissionGate("global", limit=4, max_queue=10,
+                             ceilings={PRIORITY_CRITICAL: 4, PRIORITY_NORMAL: 3, PRIORITY_LOW: 2})
+        assert await gate.acquire(PRIORITY_LOW, 0) is None
+        assert await gate.acquire(PRIORITY_LOW, 0) is None
+        assert await gate.acquire(PRIORITY_LOW, 0) == "queue_timeout"
+        assert await gate.acquire(PRIORITY_NORMAL, 0) is None
+        assert await gate.acquire(PRIORITY_NORMAL, 0) == "queue_timeout"
+        assert await gate.acquire(PRIORITY_CRITICAL, 0) is None
+
+
+def _app(controller):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/api/search/explore")
+    async def explore():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/api/auth/me")
+    async def me():
+        return {"id": "1"}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app, release
+
+
+class TestMiddleware:
+    @pytest.mark.asyncio
+    async def test_search_shed_while_login_admitted(self, monkeypatch):
+        monkeypatch.setenv("ADMISSION_SEARCH_LIMIT", "1")
+        monkeypatch.setenv("ADMISSION_SEARCH_QUEUE_TIMEOUT", "0.05")
+        monkeypatch.setenv("ADMISSION_SEARCH_RETRY_AFTER", "7")
+        controller = AdmissionController(global_limit=4)
+        app, release = _app(controller)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/search/explore"))
+            await asyncio.sleep(0.01)
+            shed = await client.get("/api/search/explore")
+            me = await client.get("/api/auth/me")
+            health = await client.get("/api/health")
+            release.set()
+            assert (await slow).status_code == 200
+
+        assert shed.status_code == 503 and shed.headers["retry-after"] == "7"
+        assert me.status_code == 200 and health.status_code == 200
+        stats = controller.stats()
+        assert stats["classes"]["search"]["shed_timeout"] == 1
+        assert stats["shed_by_priority"] == {"critical": 0, "normal": 0, "low": 1}
+        assert stats["global"]["active"] == 0 and stats["classes"]["search"]["active"] == 0
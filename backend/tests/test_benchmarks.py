@@ -0,0 +1,66 @@
+"""
+Tests for the benchmark harness (generators, percentile math, baseline diffing)
+No database required
+"""
+import json
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.compare import compare_reports
+from benchmarks.loadtest import percentile, summarize
+from benchmarks.seed import generate_follows, generate_posts_and_likes
+
+TINY = {"users": 50, "posts": 200, "follows": 500, "likes": 1000, "stories": 10, "notifications": 20}
+
+
+class TestGenerators:
+    def test_post_likes_match_like_rows(self):
+        rng = random.Random(1)
+        for post, like_rows in generate_posts_and_likes(TINY, rng, datetime.utcnow()):
+            likers = sorted(json.loads(post["likes"]), key=int)
+            assert likers == sorted((str(row["user_id"]) for row in like_rows), key=int)
+            assert post["likes_count"] == len(like_rows)
+
+    def test_follows_unique_and_no_self_follow(self):
+        rows = list(generate_follows(TINY, random.Random(1), datetime.utcnow()))
+        pairs = [(row["follower_id"], row["following_id"]) for row in rows]
+        assert len(pairs) == len(set(pairs))
+        assert all(a != b for a, b in pairs)
+
+    def test_deterministic(self):
+        first = [post for post, _ in generate_posts_and_likes(TINY, random.Random(5), datetime(2025, 1, 1))]
+        second = [post for post, _ in generate_posts_and_likes(TINY, random.Random(5), datetime(2025, 1, 1))]
+        assert first == second
+
+
+class TestReporting:
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 99) == 0.0
+
+    def test_summarize(self):
+        summary = summarize([0.01] * 99 + [1.0], errors=2, elapsed=2.0)
+        assert summary["requests"] == 100
+        assert summary["rps"] == 50.0
+        assert summary["p50_ms"] == 10.0
+        assert summary["p99_ms"] == 10.0
+        assert summary["max_ms"] == 1000.0
+
+    def test_compare_flags_regressions(self):
+        baseline = {"scenarios": {"posts_feed": {"p95_ms": 100.0, "rps": 200.0, "errors": 0}}}
+        slower = {"scenarios": {"posts_feed": {"p95_ms": 130.0, "rps": 195.0, "errors": 0}}}
+        rows = compare_reports(baseline, slower, tolerance=0.15)
+        flagged = {row["metric"] for row in rows if row["regression"]}
+        assert flagged == {"p95_ms"}
+
+    def test_compare_missing_scenario(self):
+        baseline = {"scenarios": {"search": {"p95_ms": 10.0}}}
+        rows = compare_reports(baseline, {"scenarios": {}})
+        assert rows[0]["regression"]
@@ -0,0 +1,95 @@
+"""
+Tests for database pool lanes and acquire-latency gauges
+No database required - asyncpg pool is replaced by an in-memory stand-in
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from utils.db_lanes import lane_for_path
+
+
+class _FakeConn:
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        return 1
+
+
+class _FakePool:
+    """Single-connection pool so a second acquire has to wait"""
+
+    def __init__(self):
+        self._sem = asyncio.Semaphore(1)
+
+    async def acquire(self, timeout=None):
+        await asyncio.wait_for(self._sem.acquire(), timeout)
+        return _FakeConn()
+
+    async def release(self, conn):
+        self._sem.release()
+
+
+class TestLaneConfig:
+    def test_defaults(self):
+        config = db_postgres.lane_config(db_postgres.LANE_INTERACTIVE)
+        assert config["max_size"] == 20
+        assert config["statement_timeout_ms"] > 0
+
+    def test_env_override(self, monkeypatch):
+        monkeypatch.setenv("DB_POOL_BACKGROUND_MAX_SIZE", "2")
+        assert db_postgres.lane_config(db_postgres.LANE_BACKGROUND)["max_size"] == 2
+
+    def test_unknown_lane(self):
+        with pytest.raises(ValueError):
+            db_postgres.lane_config("bogus")
+
+    def test_route_lanes(self):
+        assert lane_for_path("/api/auth/me") == db_postgres.LANE_INTERACTIVE
+        assert lane_for_path("/api/posts/feed") == db_postgres.LANE_INTERACTIVE
+        assert lane_for_path("/api/auth/download-data") == db_postgres.LANE_BACKGROUND
+        assert lane_for_path("/api/search/explore") == db_postgres.LANE_BACKGROUND
+        assert lane_for_path("/api/admin/fix-duplicate-usernames") == db_postgres.LANE_BACKGROUND
+
+
+class TestAcquireGauges:
+    @pytest.mark.asyncio
+    async def test_records_wait_and_in_use(self):
+        stats = db_postgres.PoolStats("test")
+        lane_pool = db_postgres.LanePool("test", _FakePool(), stats)
+
+        async with lane_pool.acquire():
+            assert stats.in_use == 1
+            # Second caller queues behind the only connection
+            waiter = asyncio.create_task(lane_pool.fetchval("SELECT 1"))
+            await asyncio.sleep(0.05)
+            assert stats.waiting == 1
+        assert await waiter == 1
+
+        snapshot = stats.snapshot()
+        assert snapshot["acquired"] == 2
+        assert snapshot["in_use"] == 0
+        assert snapshot["waiting"] == 0
+        assert snapshot["acquire_wait_ms"]["max"] >= 40
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout_counted(self):
+        stats = db_postgres.PoolStats("test")
+        lane_pool = db_postgres.LanePool("test", _FakePool(), stats)
+
+        async with lane_pool.acquire():
+            with pytest.raises(asyncio.TimeoutError):
+                async with lane_pool.acquire(timeout=0.01):
+                    pass
+        assert stats.timeouts == 1
+        assert stats.waiting == 0
+
+    def test_percentiles(self):
+        stats = db_postgres.PoolStats("test")
+        for ms in range(1, 101):
+            stats.record_wait(ms / 1000)
+        assert stats.percentile(50) == pytest.approx(0.050, abs=0.002)
+        assert stats.percentile(99) == pytest.approx(0.099, abs=0.002)
@@ -0,0 +1,118 @@
+"""
+Tests for the orjson response class and pre-compressed response cache
+No database required
+"""
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from starlette.middleware.gzip import GZipMiddleware
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils import fast_json
+from utils.fast_json import FastJSONResponse, ResponseCache
+
+
+def _build_app(cache: ResponseCache, calls: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/feed")
+    async def feed():
+        return FastJSONResponse({"posts": [{"id": i, "createdAt": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+                                           for i in range(100)]})
+
+    @app.get("/trending")
+    async def trending(request: Request):
+        cached = cache.get("1")
+        if cached:
+            return cached.response(request)
+        calls.append(1)
+        return cache.put("1", {"hashtags": [f"#tag{i}" for i in range(200)]}).response(request)
+
+    app.add_middleware(GZipMiddleware, minimum_size=fast_json.GZIP_MINIMUM_SIZE,
+                       compresslevel=fast_json.GZIP_COMPRESS_LEVEL)
+    return app
+
+
+class TestFastJSONResponse:
+    def test_datetimes_match_isoformat(self):
+        naive = datetime(2025, 3, 4, 5, 6, 7, 891011)
+        aware = datetime(2025, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+        body = json.loads(FastJSONResponse({"a": naive, "b": aware}).body)
+        assert body == {"a": naive.isoformat(), "b": aware.isoformat()}
+
+    def test_non_native_types(self):
+        body = json.loads(fast_json.dumps({"d": Decimal("1.5"), "s": {3}, 7: "int key"}))
+        assert body == {"d": 1.5, "s": [3], "7": "int key"}
+
+    def test_unknown_type_raises(self):
+        with pytest.raises(TypeError):
+            fast_json.dumps({"x": object()})
+
+
+class TestResponseCache:
+    def test_expiry(self, monkeypatch):
+        cache = ResponseCache("t", ttl_seconds=10)
+        clock = [100.0]
+        monkeypatch.setattr(fast_json.time, "monotonic", lambda: clock[0])
+        cache.put("1", {"x": 1})
+        assert cache.get("1") is not None
+        clock[0] += 11
+        assert cache.get("1") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_cap(self):
+        cache = ResponseCache("t", ttl_seconds=60, max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+    def test_prefix_invalidation(self):
+        cache = ResponseCache("t", ttl_seconds=60)
+        cache.put("1:30", 1)
+        cache.put("1:60", 1)
+        cache.put("12:30", 1)
+        assert cache.invalidate("1:") == 2
+        assert cache.get("12:30") is not None
+        assert cache.invalidate() == 1
+
+    def test_small_payloads_not_compressed(self):
+        cache = ResponseCache("t", ttl_seconds=60)
+        assert cache.put("1", {"x": 1}).gzipped is None
+
+
+class TestCachedResponses:
+    @pytest.mark.asyncio
+    async def test_precompressed_body_served_once_encoded(self):
+        cache = ResponseCache("trending", ttl_seconds=60)
+        calls = []
+        transport = ASGITransport(app=_build_app(cache, calls))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/trending", headers={"Accept-Encoding": "gzip"})
+            second = await client.get("/trending", headers={"Accept-Encoding": "gzip"})
+            plain = await client.get("/trending", headers={"Accept-Encoding": "identity"})
+
+        assert calls == [1]
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.json() == second.json() == plain.json()
+        assert "content-encoding" not in plain.headers
+        # GZipMiddleware must not compress the cached gzip bytes a second time
+        assert gzip.decompress(cache.get("1").gzipped) == cache.get("1").body
+
+    @pytest.mark.asyncio
+    async def test_feed_response_compressed_by_middleware(self):
+        transport = ASGITransport(app=_build_app(ResponseCache("t", 60), []))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/feed", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["posts"][0]["createdAt"] == "2025-01-01T00:00:00+00:00"
@@ -0,0 +1,218 @@
+"""
+Tests for the follow state machine endpoints (pending/accepted rows in webapp_follows)
+Database calls are replaced with in-memory tables - no database required
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from core.models import User
+from core.security import get_current_user
+from db_postgres import FOLLOW_ACCEPTED, FOLLOW_PENDING
+from mongo_compat import InsertOne
+
+
+class FakeFollows:
+    """Same transitions as the SQL in db_postgres, keyed by (follower, following)"""
+
+    def __init__(self, users):
+        self.users = users
+        self.rows = {}
+
+    def _count(self, follower_id, following_id, delta):
+        self.users[following_id]["followers_count"] += delta
+        self.users[follower_id]["following_count"] += delta
+
+    async def follow_user(self, follower_id, following_id, status=FOLLOW_ACCEPTED):
+        await asyncio.sleep(0)
+        current = self.rows.get((follower_id, following_id))
+        if current is None or (current == FOLLOW_PENDING and status == FOLLOW_ACCEPTED):
+            self.rows[(follower_id, following_id)] = status
+            if status == FOLLOW_ACCEPTED:
+                self._count(follower_id, following_id, 1)
+            return {"status": status, "changed": True}
+        return {"status": current, "changed": False}
+
+    async def accept_follow_request(self, follower_id, following_id):
+        if self.rows.get((follower_id, following_id)) != FOLLOW_PENDING:
+            return False
+        self.rows[(follower_id, following_id)] = FOLLOW_ACCEPTED
+        self._count(follower_id, following_id, 1)
+        return True
+
+    async def remove_follow(self, follower_id, following_id, status=None):
+        current = self.rows.get((follower_id, following_id))
+        if current is None or (status and current != status):
+            return None
+        del self.rows[(follower_id, following_id)]
+        if current == FOLLOW_ACCEPTED:
+            self._count(follower_id, following_id, -1)
+        return current
+
+    async def get_follow_status(self, follower_id, following_id):
+        return self.rows.get((follower_id, following_id))
+
+    async def get_follow_statuses(self, follower_id, following_ids):
+        return {fid: self.rows[(follower_id, fid)] for fid in following_ids if (follower_id, fid) in self.rows}
+
+    async def get_follow_list(self, user_id, direction, limit=1000, offset=0):
+        if direction == "followers":
+            ids = [a for (a, b), st in self.rows.items() if b == user_id and st == FOLLOW_ACCEPTED]
+        else:
+            ids = [b for (a, b), st in self.rows.items() if a == user_id and st == FOLLOW_ACCEPTED]
+        return [{"id": i, "username": self.users[i]["username"], "full_name": self.users[i]["username"].title(),
+                 "profile_photo_url": None} for i in ids][offset:offset + limit]
+
+
+class FakeCollection:
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else {}
+        self.inserted = []
+
+    async def find_one(self, query):
+        try:
+            row = self.rows.get(int(query["id"]))
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        return {"id": row["id"], "username": row["username"], "fullName": row["username"].title(),
+                "isPrivate": row["private"], "followersCount": row["followers_count"],
+                "followingCount": row["following_count"]}
+
+    async def insert_one(self, document):
+        self.inserted.append(document)
+
+    async def delete_many(self, query):
+        return None
+
+    async def bulk_write(self, operations):
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self.inserted.append(op.document)
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = FakeCollection(users)
+        self.notifications = FakeCollection()
+        self.posts = None
+
+
+@pytest.fixture
+def world(monkeypatch):
+    from routers import users as users_router
+    table = {i: {"id": i, "username": name, "private": private, "followers_count": 0, "following_count": 0}
+             for i, (name, private) in enumerate([("ann", False), ("ben", False), ("cat", True)], start=1)}
+    follows = FakeFollows(table)
+    for name in ("follow_user", "accept_follow_request", "remove_follow", "get_follow_status",
+                 "get_follow_statuses", "get_follow_list"):
+        monkeypatch.setattr(db_postgres, name, getattr(follows, name))
+    fake_db = FakeDB(table)
+    monkeypatch.setattr(users_router, "db", fake_db)
+
+    app = FastAPI()
+    app.include_router(users_router.router)
+    viewer = {"user": None}
+    app.dependency_overrides[get_current_user] = lambda: viewer["user"]
+
+    def login(user_id):
+        row = table[user_id]
+        viewer["user"] = User(id=str(user_id), username=row["username"], fullName=row["username"].title(),
+                              age=25, gender="female")
+
+    return app, table, follows, fake_db, login
+
+
+async def post(app, path):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post(path)
+
+
+class TestFollowStateMachine:
+    @pytest.mark.asyncio
+    async def test_public_follow_is_idempotent(self, world):
+        app, table, follows, fake_db, login = world
+        login(1)
+        first = (await post(app, "/api/users/2/follow")).json()
+        second = (await post(app, "/api/users/2/follow")).json()
+        assert first["requested"] is False and second["requested"] is False
+        assert table[2]["followers_count"] == 1 and table[1]["following_count"] == 1
+        assert [n["type"] for n in fake_db.notifications.inserted] == ["follow"]
+
+    @pytest.mark.asyncio
+    async def test_private_request_then_accept(self, world):
+        app, table, follows, fake_db, login = world
+        login(1)
+        assert (await post(app, "/api/users/3/follow")).json()["requested"] is True
+        assert (await post(app, "/api/users/3/follow")).json()["message"] == "Follow request already sent"
+        assert table[3]["followers_count"] == 0
+
+        login(3)
+        assert (await post(app, "/api/users/1/accept-follow-request")).status_code == 200
+        assert follows.rows[(1, 3)] == FOLLOW_ACCEPTED
+        assert table[3]["followers_count"] == 1
+        assert [n["type"] for n in fake_db.notifications.inserted] == [
+            "follow_request", "follow_request_accepted", "started_following"]
+        assert (await post(app, "/api/users/1/accept-follow-request")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_reject_and_cancel_only_touch_pending(self, world):
+        app, table, follows, fake_db, login = world
+        login(1)
+        await post(app, "/api/users/2/follow")
+        await post(app, "/api/users/3/follow")
+        await post(app, "/api/users/2/cancel-follow-request")
+        assert follows.rows[(1, 2)] == FOLLOW_ACCEPTED
+        await post(app, "/api/users/3/cancel-follow-request")
+        assert (1, 3) not in follows.rows
+
+        await post(app, "/api/users/3/follow")
+        login(3)
+        await post(app, "/api/users/1/reject-follow-request")
+        assert (1, 3) not in follows.rows and table[3]["followers_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unfollow_decrements_counts(self, world):
+        app, table, follows, fake_db, login = world
+        login(1)
+        await post(app, "/api/users/2/follow")
+        await post(app, "/api/users/2/unfollow")
+        await post(app, "/api/users/2/unfollow")
+        assert table[2]["followers_count"] == 0 and table[1]["following_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_follower_list_and_private_gate(self, world):
+        app, table, follows, fake_db, login = world
+        login(2)
+        await post(app, "/api/users/1/follow")
+        login(1)
+        await post(app, "/api/users/2/follow")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            followers = (await client.get("/api/users/1/followers")).json()["followers"]
+            private = await client.get("/api/users/3/following")
+        assert followers == [{"id": 2, "username": "ben", "fullName": "Ben", "profileImage": None,
+                              "isFollowing": True, "hasRequested": False}]
+        assert private.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_follower_list_pages(self, world):
+        app, table, follows, fake_db, login = world
+        for follower in (2, 3):
+            login(follower)
+            await post(app, "/api/users/1/follow")
+        login(1)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = (await client.get("/api/users/1/followers", params={"limit": 1})).json()
+            rest = (await client.get("/api/users/1/followers",
+                                     params={"limit": 1, "offset": first["nextOffset"]})).json()
+            last = (await client.get("/api/users/1/followers", params={"limit": 1, "offset": 2})).json()
+        assert [p["id"] for p in first["followers"] + rest["followers"]] == [2, 3]
+        assert first["nextOffset"] == 1 and last == {"followers": [], "nextOffset": None}
@@ -0,0 +1,126 @@
+"""
+Tests for mongo_compat aggregate() - pipeline to SQL compilation and result decoding
+Queries are compiled and inspected, fetch is served by a fake pool - no database required
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import mongo_compat
+from mongo_aggregate import UnsupportedPipelineError
+from mongo_compat import db
+
+TRENDING_TAGS = [
+    {"$match": {"userId": {"$nin": ["3"]}, "isArchived": {"$ne": True}}},
+    {"$project": {"tags": {"$regexFindAll": {"input": "$caption", "regex": r"#\w+"}}}},
+    {"$unwind": "$tags"},
+    {"$group": {"_id": {"$toLower": "$tags.match"}, "count": {"$sum": 1}}},
+    {"$sort": {"count": -1}},
+    {"$limit": 20},
+]
+
+
+class FakeRecord:
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def items(self):
+        return iter(self.pairs)
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        return self.rows
+
+
+def fake_pool(monkeypatch, rows):
+    pool = FakePool(rows)
+
+    async def get_pool(lane=None, read=None):
+        return pool
+
+    monkeypatch.setattr(mongo_compat, "get_pool", get_pool)
+    return pool
+
+
+class TestCompile:
+    def test_match_sort_limit_fold_into_one_select(self):
+        query, values, _ = db.users.aggregate([
+            {"$match": {"id": {"$ne": "7", "$nin": ["8", "9"]}, "appearInSearch": True}},
+            {"$sort": {"followersCount": -1}},
+            {"$limit": 10},
+        ]).compile()
+        assert query == (
+            'SELECT s0.* FROM webapp_users AS s0 WHERE s0."id" IS DISTINCT FROM $1 '
+            'AND (s0."id" = ANY($2)) IS NOT TRUE AND s0."appear_in_search" = $3 '
+            'ORDER BY s0."followers_count" DESC LIMIT 10')
+        assert values == [7, [8, 9], True]
+
+    def test_hashtag_counts_are_one_grouped_statement(self):
+        query, values, json_columns = db.posts.aggregate(TRENDING_TAGS).compile()
+        assert query.count("SELECT") == 3
+        assert "CROSS JOIN LATERAL jsonb_array_elements" in query
+        assert "GROUP BY lower(" in query and query.endswith('ORDER BY "count" DESC LIMIT 20')
+        assert values == [[3], True, r"#\w+"]
+        assert json_columns == []
+
+    def test_group_after_limit_uses_subquery(self):
+        query, _, _ = db.posts.aggregate([
+            {"$sort": {"createdAt": -1}},
+            {"$limit": 100},
+            {"$group": {"_id": "$userId", "posts": {"$count": {}}, "avgLikes": {"$avg": "$likesCount"}}},
+        ]).compile()
+        assert query.startswith('SELECT s1."user_id" AS "_id", COUNT(*) AS "posts", AVG(s1."likes_count") AS "avg_likes" '
+                                'FROM (SELECT s0.* FROM webapp_posts AS s0 ORDER BY')
+        assert query.endswith('GROUP BY s1."user_id"')
+
+    def test_lookup_is_a_lateral_join(self):
+        query, values, json_columns = db.posts.aggregate([
+            {"$lookup": {"from": "users", "localField": "userId", "foreignField": "id", "as": "author"}},
+            {"$unwind": "$author"},
+            {"$match": {"author.isPrivate": {"$ne": True}}},
+        ]).compile(length=30)
+        assert "LEFT JOIN LATERAL (SELECT coalesce(jsonb_agg(to_jsonb(f))" in query
+        assert 'FROM webapp_users AS f WHERE f."id" = s0."user_id"' in query
+        assert "(u2.value -> 'is_private') IS DISTINCT FROM $1::jsonb" in query
+        assert query.endswith("LIMIT 30") and values == ["true"] and json_columns == ["author"]
+
+    @pytest.mark.parametrize("pipeline, message", [
+        ([{"$facet": {}}], "$facet is not supported"),
+        ([{"$group": {"_id": "$userId", "ids": {"$push": "$id"}}}], "Accumulator $push"),
+        ([{"$lookup": {"from": "users", "pipeline": [], "as": "x"}}], "single equality join"),
+        ([{"$unwind": "$media"}, {"$limit": 5}, {"$group": {"_id": None}}], "add a $project"),
+        ([{"$match": {"caption": {"$where": "x"}}}], "Query operator $where"),
+    ])
+    def test_unsupported_stages_raise(self, pipeline, message):
+        with pytest.raises(UnsupportedPipelineError) as exc:
+            db.posts.aggregate(pipeline).compile()
+        assert message in str(exc.value)
+
+
+class TestToList:
+    @pytest.mark.asyncio
+    async def test_rows_decoded_to_camel_case(self, monkeypatch):
+        pool = fake_pool(monkeypatch, [FakeRecord([
+            ("id", 1), ("user_id", 2), ("author", '[1]'),
+            ("author", '{"id": 2, "full_name": "Ann", "is_private": false}'),
+        ])])
+        rows = await db.posts.aggregate([
+            {"$lookup": {"from": "users", "localField": "userId", "foreignField": "id", "as": "author"}},
+            {"$unwind": "$author"},
+        ]).to_list(5)
+        assert rows == [{"id": 1, "userId": 2, "author": {"id": 2, "fullName": "Ann", "isPrivate": False}}]
+        assert pool.queries[0][0].endswith("LIMIT 5")
+
+    @pytest.mark.asyncio
+    async def test_group_id_kept(self, monkeypatch):
+        fake_pool(monkeypatch, [FakeRecord([("_id", "#tea"), ("count", 4)])])
+        assert await db.posts.aggregate(TRENDING_TAGS).to_list(20) == [{"_id": "#tea", "count": 4}]
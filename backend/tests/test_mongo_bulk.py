@@ -0,0 +1,176 @@
+"""
+Tests for mongo_compat bulk writes (insert_many, bulk_write, update_one upserts)
+The asyncpg pool is replaced with a connection that records statements - no database required
+"""
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import mongo_compat
+from mongo_compat import BulkWriteError, Collection, DeleteOne, InsertOne, UpdateOne
+
+
+class FakeConnection:
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.next_id = 1
+        self.fail_on = fail_on
+        self.savepoints = 0
+
+    def _check(self, query):
+        if self.fail_on and self.fail_on in query:
+            raise asyncpg.PostgresError("boom")
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.savepoints += 1
+        yield
+
+    def _ids(self, count):
+        ids = [{"id": self.next_id + i} for i in range(count)]
+        self.next_id += count
+        return ids
+
+    async def fetch(self, query, *args):
+        self.calls.append(("fetch", query, args))
+        self._check(query)
+        if "SELECT" in query:
+            return self._ids(self.copied)
+        return self._ids(query.count("(") - 1)
+
+    async def fetchval(self, query, *args):
+        self.calls.append(("fetchval", query, args))
+        return self._ids(1)[0]["id"]
+
+    async def execute(self, query, *args):
+        self.calls.append(("execute", query, args))
+        self._check(query)
+        if query.startswith("DELETE"):
+            return f"DELETE {len(args[0])}"
+        return "UPDATE 1"
+
+    async def executemany(self, query, args):
+        self.calls.append(("executemany", query, list(args)))
+        self._check(query)
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.calls.append(("copy", table, columns))
+        self.copied = len(records)
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+    async def execute(self, query, *args):
+        return await self.conn.execute(query, *args)
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    fake = FakeConnection()
+
+    async def get_pool(lane=None, read=None):
+        return FakePool(fake)
+
+    monkeypatch.setattr(mongo_compat, "get_pool", get_pool)
+    return fake
+
+
+class TestInsertMany:
+    @pytest.mark.asyncio
+    async def test_one_statement_per_chunk(self, conn, monkeypatch):
+        monkeypatch.setattr(mongo_compat, "INSERT_CHUNK_ROWS", 2)
+        docs = [{"userId": "1", "message": f"m{i}", "type": "like", "unknownField": 1} for i in range(5)]
+        result = await Collection("webapp_notifications").insert_many(docs)
+        assert result == {"inserted_ids": [1, 2, 3, 4, 5], "inserted_count": 5}
+        inserts = [call for call in conn.calls if call[0] == "fetch"]
+        assert len(inserts) == 3
+        assert "unknown" not in inserts[0][1] and inserts[0][2][0] == 1
+
+    @pytest.mark.asyncio
+    async def test_mixed_shapes_keep_input_order(self, conn):
+        docs = [{"userId": 1, "type": "like"}, {"userId": 2, "type": "follow", "postId": 9},
+                {"userId": 3, "type": "like"}]
+        result = await Collection("webapp_notifications").insert_many(docs)
+        assert result["inserted_ids"] == [1, 3, 2]
+
+    @pytest.mark.asyncio
+    async def test_large_batch_uses_copy(self, conn, monkeypatch):
+        monkeypatch.setattr(mongo_compat, "COPY_THRESHOLD", 3)
+        result = await Collection("webapp_notifications").insert_many(
+            [{"userId": i, "type": "like"} for i in range(4)])
+        assert result["inserted_count"] == 4
+        assert [call[0] for call in conn.calls] == ["execute", "copy", "fetch", "execute"]
+
+    @pytest.mark.asyncio
+    async def test_empty_is_noop(self, conn):
+        assert await Collection("webapp_posts").insert_many([]) == {"inserted_ids": [], "inserted_count": 0}
+        assert conn.calls == []
+
+
+class TestBulkWrite:
+    @pytest.mark.asyncio
+    async def test_groups_by_statement(self, conn):
+        ops = [
+            UpdateOne({"id": "1"}, {"$set": {"isRead": True}}),
+            UpdateOne({"id": "2"}, {"$set": {"isRead": True}}),
+            DeleteOne({"id": "7"}),
+            DeleteOne({"id": "8"}),
+            InsertOne({"userId": 1, "type": "like"}),
+        ]
+        result = await Collection("webapp_notifications").bulk_write(ops)
+        assert [call[0] for call in conn.calls] == ["executemany", "execute", "fetch"]
+        assert conn.calls[0][2] == [[True, 1], [True, 2]]
+        assert conn.calls[1][2] == ([7, 8],)
+        assert result["modified_count"] == 2 and result["deleted_count"] == 2 and result["inserted_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unordered_merges_non_adjacent_ops(self, conn):
+        ops = [DeleteOne({"id": 1}), InsertOne({"userId": 1}), DeleteOne({"id": 2})]
+        await Collection("webapp_notifications").bulk_write(ops, ordered=False)
+        assert [call[0] for call in conn.calls] == ["execute", "fetch"]
+
+        conn.calls.clear()
+        await Collection("webapp_notifications").bulk_write(ops, ordered=True)
+        assert [call[0] for call in conn.calls] == ["execute", "fetch", "execute"]
+
+    @pytest.mark.asyncio
+    async def test_ordered_stops_at_failed_batch(self, conn):
+        conn.fail_on = "UPDATE"
+        ops = [DeleteOne({"id": 1}), UpdateOne({"id": 2}, {"$set": {"isRead": True}}), DeleteOne({"id": 3})]
+        with pytest.raises(BulkWriteError) as exc:
+            await Collection("webapp_notifications").bulk_write(ops)
+        assert exc.value.details["deleted_count"] == 1
+        assert exc.value.details["writeErrors"][0]["index"] == 1
+
+        conn.calls.clear()
+        with pytest.raises(BulkWriteError) as exc:
+            await Collection("webapp_notifications").bulk_write(ops, ordered=False)
+        assert exc.value.details["deleted_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_upserts_batch_on_conflict(self, conn):
+        ops = [UpdateOne({"userId": "5", "type": "email"}, {"$set": {"code": c}}, upsert=True) for c in "ab"]
+        result = await Collection("webapp_verification_codes").bulk_write(ops)
+        statement = conn.calls[0][1]
+        assert "ON CONFLICT (user_id, type) DO UPDATE SET code = EXCLUDED.code" in statement
+        assert result["upserted_count"] == 2
+
+
+class TestUpdateOneUpsert:
+    @pytest.mark.asyncio
+    async def test_upsert_keyword_accepted(self, conn):
+        result = await Collection("webapp_verification_codes").update_one(
+            {"userId": "5", "type": "email"}, {"$set": {"userId": "5", "code": "123"}}, upsert=True)
+        assert result["upserted"] is True
+        assert conn.calls[0][1].startswith("INSERT INTO webapp_verification_codes (user_id, type, code)")
@@ -0,0 +1,133 @@
+"""
+Tests for the shared OTP store (hashed codes, attempt limits and send throttles)
+Database calls are replaced with an in-memory verification_codes table - no database required
+"""
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from core import otp
+
+
+class FakeVerificationCodes:
+    """Mirrors the row semantics of issue/consume_verification_code"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def issue_verification_code(self, column, identifier, code_hash, ttl_seconds,
+                                      ip_address, window_seconds, allow):
+        now = time.time()
+        recent = [row for row in self.rows if row["created_at"] > now - window_seconds]
+        mine = [row for row in recent if row[column] == identifier]
+        usage = {
+            "identifier_sends": len(mine),
+            "ip_sends": sum(1 for row in recent if ip_address and row["ip_address"] == ip_address),
+            "seconds_since_last": now - max(row["created_at"] for row in mine) if mine else None,
+        }
+        retry_after = allow(usage)
+        if retry_after:
+            return retry_after
+        for row in mine:
+            if row["consumed_at"] is None:
+                row["expires_at"] = now
+        self.rows.append({"email": None, "mobile": None, "telegram_id": None, column: identifier,
+                          "code_hash": code_hash, "ip_address": ip_address, "attempts": 0,
+                          "created_at": now, "expires_at": now + ttl_seconds, "consumed_at": None})
+        return 0
+
+    async def consume_verification_code(self, column, identifier, code_hash, max_attempts):
+        now = time.time()
+        live = [row for row in self.rows
+                if row[column] == identifier and row["consumed_at"] is None and row["expires_at"] > now]
+        if not live or live[-1]["attempts"] >= max_attempts:
+            return False
+        row = live[-1]
+        row["attempts"] += 1
+        if row["code_hash"] == code_hash:
+            row["consumed_at"] = now
+            return True
+        return False
+
+    async def purge_verification_codes(self, retain_seconds):
+        return 0
+
+
+@pytest.fixture
+def codes(monkeypatch):
+    fake = FakeVerificationCodes()
+    for name in ("issue_verification_code", "consume_verification_code", "purge_verification_codes"):
+        monkeypatch.setattr(db_postgres, name, getattr(fake, name))
+    monkeypatch.setattr(otp, "OTP_RESEND_COOLDOWN_SECONDS", 0)
+    return fake
+
+
+def make_request(headers=None, host="10.0.0.1"):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "client": (host, 1234)})
+
+
+class TestOTPStore:
+    @pytest.mark.asyncio
+    async def test_code_stored_hashed_and_single_use(self, codes):
+        await otp.store_email_otp("User@Example.com", "123456")
+        assert "123456" not in codes.rows[0]["code_hash"]
+        assert codes.rows[0]["email"] == "user@example.com"
+        assert await otp.verify_email_otp("user@example.com ", "123456")
+        assert not await otp.verify_email_otp("user@example.com", "123456")
+
+    @pytest.mark.asyncio
+    async def test_attempts_capped(self, codes):
+        await otp.store_otp(42, "111111")
+        for _ in range(otp.OTP_MAX_ATTEMPTS):
+            assert not await otp.verify_otp(42, "000000")
+        assert not await otp.verify_otp(42, "111111")
+
+    @pytest.mark.asyncio
+    async def test_new_code_supersedes_old(self, codes):
+        await otp.store_otp(42, "111111")
+        await otp.store_otp(42, "222222")
+        assert not await otp.verify_otp(42, "111111")
+        assert await otp.verify_otp(42, "222222")
+
+    @pytest.mark.asyncio
+    async def test_identifier_throttle_returns_429(self, codes):
+        for _ in range(otp.OTP_SENDS_PER_IDENTIFIER):
+            await otp.store_email_otp("a@b.co", otp.generate_otp())
+        with pytest.raises(HTTPException) as exc:
+            await otp.store_email_otp("a@b.co", otp.generate_otp())
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == str(otp.OTP_SEND_WINDOW_SECONDS)
+
+    @pytest.mark.asyncio
+    async def test_ip_throttle_spans_identifiers(self, codes, monkeypatch):
+        monkeypatch.setattr(otp, "OTP_SENDS_PER_IP", 2)
+        await otp.store_email_otp("one@b.co", "1", ip_address="1.2.3.4")
+        await otp.store_otp(7, "2", ip_address="1.2.3.4")
+        with pytest.raises(HTTPException):
+            await otp.store_email_otp("three@b.co", "3", ip_address="1.2.3.4")
+        await otp.store_email_otp("three@b.co", "3", ip_address="5.6.7.8")
+
+
+class TestThrottlePolicy:
+    def test_resend_cooldown(self, monkeypatch):
+        monkeypatch.setattr(otp, "OTP_RESEND_COOLDOWN_SECONDS", 30)
+        assert otp._send_retry_after({"identifier_sends": 1, "ip_sends": 1, "seconds_since_last": 10.5}) == 19
+        assert otp._send_retry_after({"identifier_sends": 1, "ip_sends": 1, "seconds_since_last": 31}) == 0
+        assert otp._send_retry_after({"identifier_sends": 0, "ip_sends": 0, "seconds_since_last": None}) == 0
+
+    def test_client_ip_prefers_proxy_hop(self):
+        assert otp.client_ip(make_request({"X-Forwarded-For": "6.6.6.6, 203.0.113.9"})) == "203.0.113.9"
+        assert otp.client_ip(make_request()) == "10.0.0.1"
+        assert otp.client_ip(None) is None
+
+    def test_generate_otp_digits(self):
+        code = otp.generate_otp()
+        assert len(code) == 6 and code.isdigit()
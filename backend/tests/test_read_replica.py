@@ -0,0 +1,184 @@
+"""
+Tests for read-replica routing (read preference, read-your-writes pinning, lag fallback)
+Both pools are in-memory stand-ins that record the statements they run - no database required
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+import mongo_compat
+from utils.db_lanes import read_preference_for_path
+
+
+class _FakeConn:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, query, *args, timeout=None):
+        self.pool.queries.append(query)
+        return []
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        self.pool.queries.append(query)
+        return 0
+
+    async def execute(self, query, *args, timeout=None):
+        self.pool.queries.append(query)
+        return "UPDATE 1"
+
+    def transaction(self):
+        return "txn"
+
+
+class _FakePool:
+    def __init__(self, name, lag=0.0):
+        self.name = name
+        self.lag = lag
+        self.queries = []
+
+    async def acquire(self, timeout=None):
+        return _FakeConn(self)
+
+    async def release(self, conn):
+        pass
+
+    async def fetchval(self, query):
+        # Only the replica monitor talks to the raw pool
+        return self.lag
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary, replica = _FakePool("primary"), _FakePool("replica")
+
+    async def create_lane_pool(lane, database_url=None):
+        return replica if database_url else primary
+
+    monkeypatch.setenv("DATABASE_REPLICA_URL", "postgresql://replica/db")
+    monkeypatch.setattr(db_postgres, "_create_lane_pool", create_lane_pool)
+    monkeypatch.setattr(db_postgres, "_pools", {})
+    monkeypatch.setattr(db_postgres, "_replica_pools", {})
+    monkeypatch.setattr(db_postgres, "_primary_pins", {})
+    monkeypatch.setattr(db_postgres, "replica_monitor", db_postgres.ReplicaMonitor())
+    return primary, replica
+
+
+@pytest.fixture
+def request_routing():
+    token = db_postgres.current_routing.set(db_postgres.RequestRouting())
+    yield
+    db_postgres.current_routing.reset(token)
+
+
+class TestReadPreference:
+    @pytest.mark.asyncio
+    async def test_primary_by_default(self, pools):
+        primary, replica = pools
+        pool = await db_postgres.get_pool()
+        await pool.fetch("SELECT 1")
+        assert primary.queries == ["SELECT 1"] and replica.queries == []
+
+    @pytest.mark.asyncio
+    async def test_replica_per_call_and_per_block(self, pools):
+        primary, replica = pools
+        await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch("SELECT 1")
+        with db_postgres.read_preference(db_postgres.READ_REPLICA):
+            await (await db_postgres.get_pool()).fetch("SELECT 2")
+        assert replica.queries == ["SELECT 1", "SELECT 2"]
+        assert db_postgres.replica_monitor.replica_reads == 2
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_replica_uses_primary(self, pools, monkeypatch):
+        primary, replica = pools
+        monkeypatch.delenv("DATABASE_REPLICA_URL")
+        await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch("SELECT 1")
+        assert primary.queries == ["SELECT 1"]
+
+    @pytest.mark.asyncio
+    async def test_writes_through_replica_pool_go_to_primary(self, pools):
+        primary, replica = pools
+        pool = await db_postgres.get_pool(read=db_postgres.READ_REPLICA)
+        await pool.execute("UPDATE webapp_users SET bio = $1")
+        await pool.fetch("SELECT id FROM webapp_posts FOR UPDATE")
+        await pool.fetch("INSERT INTO webapp_posts (id) VALUES (1) RETURNING id")
+        assert len(primary.queries) == 3 and replica.queries == []
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back(self, pools):
+        primary, replica = pools
+        replica.lag = db_postgres.REPLICA_MAX_LAG_SECONDS + 1
+        await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch("SELECT 1")
+        assert primary.queries == ["SELECT 1"]
+        assert db_postgres.replica_monitor.lag_fallbacks == 1
+        assert db_postgres.replica_monitor.snapshot()["caught_up"] is False
+
+    @pytest.mark.asyncio
+    async def test_mongo_compat_with_options(self, pools):
+        primary, replica = pools
+        users = mongo_compat.db.users.with_options(read_preference=db_postgres.READ_REPLICA)
+        await users.find({"isPrivate": False}).to_list(10)
+        await mongo_compat.db.users.find({"isPrivate": False}).to_list(10)
+        assert len(replica.queries) == 1 and len(primary.queries) == 1
+
+
+class TestReadYourWrites:
+    @pytest.mark.asyncio
+    async def test_write_pins_rest_of_request(self, pools, request_routing):
+        primary, replica = pools
+        await (await db_postgres.get_pool()).execute("UPDATE webapp_users SET bio = ''")
+        await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch("SELECT bio")
+        assert primary.queries[-1] == "SELECT bio" and replica.queries == []
+
+    @pytest.mark.asyncio
+    async def test_user_pinned_for_next_requests(self, pools):
+        primary, replica = pools
+        token = db_postgres.current_routing.set(db_postgres.RequestRouting())
+        db_postgres.bind_request_user(7)
+        await (await db_postgres.get_pool()).execute("UPDATE webapp_users SET bio = ''")
+        db_postgres.current_routing.reset(token)
+
+        for user_id, expected in ((7, primary), (8, replica)):
+            token = db_postgres.current_routing.set(db_postgres.RequestRouting())
+            db_postgres.bind_request_user(user_id)
+            await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch(f"SELECT {user_id}")
+            db_postgres.current_routing.reset(token)
+            assert expected.queries[-1] == f"SELECT {user_id}"
+        assert db_postgres.replica_monitor.pinned_reads == 1
+
+    @pytest.mark.asyncio
+    async def test_acquired_connection_pins_only_on_write(self, pools, request_routing):
+        routing = db_postgres.current_routing.get()
+        db_postgres.bind_request_user(7)
+        pool = await db_postgres.get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetch("SELECT 1")
+        assert routing.wrote is False and 7 not in db_postgres._primary_pins
+
+        async with pool.acquire() as conn:
+            await conn.execute("DELETE FROM webapp_follows WHERE follower_id = $1", 7)
+        assert routing.wrote is True and 7 in db_postgres._primary_pins
+
+    @pytest.mark.asyncio
+    async def test_transaction_pins(self, pools, request_routing):
+        routing = db_postgres.current_routing.get()
+        async with (await db_postgres.get_pool()).acquire() as conn:
+            assert conn.transaction() == "txn"
+        assert routing.wrote is True
+
+    @pytest.mark.asyncio
+    async def test_pin_expires(self, pools, request_routing):
+        primary, replica = pools
+        db_postgres.pin_to_primary(7, seconds=-1)
+        db_postgres.bind_request_user(7)
+        await (await db_postgres.get_pool(read=db_postgres.READ_REPLICA)).fetch("SELECT 1")
+        assert replica.queries == ["SELECT 1"]
+
+    def test_route_read_preferences(self):
+        assert read_preference_for_path("/api/search/explore") == db_postgres.READ_REPLICA
+        assert read_preference_for_path("/api/users/list") == db_postgres.READ_REPLICA
+        assert read_preference_for_path("/api/auth/me") == db_postgres.READ_PRIMARY
+        assert read_preference_for_path("/api/posts/feed") == db_postgres.READ_PRIMARY
@@ -0,0 +1,67 @@
+"""
+Tests for the router registry and the import-time profile
+The import-time checks run `python -X importtime -c "import server"` in a subprocess
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import routers
+from benchmarks.importtime import LAZY_MODULES, parse_importtime, profile_import
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _json
+import time:      2100 |       2220 |   json
+import time:     30000 |      30000 |     routers.auth
+import time:      5000 |      37220 | server
+"""
+
+
+class TestRouterRegistry:
+    def test_all_routers_by_default(self, monkeypatch):
+        monkeypatch.delenv("ENABLED_ROUTERS", raising=False)
+        assert routers.enabled_routers() == list(routers.ROUTER_MODULES)
+
+    def test_subset_keeps_registry_order(self, monkeypatch):
+        monkeypatch.setenv("ENABLED_ROUTERS", "admin, auth")
+        assert routers.enabled_routers() == ["auth", "admin"]
+
+    def test_unknown_router_rejected(self, monkeypatch):
+        monkeypatch.setenv("ENABLED_ROUTERS", "auth,billing")
+        with pytest.raises(ValueError, match="billing"):
+            routers.enabled_routers()
+
+    def test_load_router_attribute_syntax(self):
+        from social_features import social_router
+        assert routers.load_router("social") is social_router
+
+    def test_feed_registered_before_post_detail(self):
+        from server import app
+        paths = [route.path for route in app.routes]
+        assert paths.index("/api/posts/feed") < paths.index("/api/posts/{post_id}")
+        assert paths.index("/api/users/list") < paths.index("/api/users/{userId}")
+
+
+class TestImportTime:
+    def test_parse(self):
+        entries = parse_importtime(SAMPLE)
+        assert [e["module"] for e in entries] == ["_json", "json", "routers.auth", "server"]
+        assert entries[-1]["depth"] == 0 and entries[1]["depth"] == 1
+        assert entries[-1]["cumulative_us"] == 37220
+
+    def test_server_import_keeps_sdks_lazy(self):
+        report = profile_import("server", env={"ENABLED_ROUTERS": ""})
+        assert report["eager_heavy"] == [], f"imported at boot: {report['eager_heavy']}"
+        assert set(report["routers"]) >= {"routers.auth", "routers.posts", "routers.admin"}
+
+    def test_enabled_routers_skip_imports(self):
+        report = profile_import("server", env={"ENABLED_ROUTERS": "auth,admin"})
+        assert "routers.posts" not in report["routers"]
+        assert "routers.auth" in report["routers"]
+
+    def test_lazy_list_covers_messaging_sdks(self):
+        assert {"sendgrid", "twilio", "emergentintegrations"} <= set(LAZY_MODULES)
@@ -0,0 +1,152 @@
+"""
+Tests for the search suggestion trie, prefix cache and /search/suggestions
+Database calls are replaced with in-memory tables - no database required
+"""
+import os
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from core.models import User
+from core.security import get_current_user
+from utils.search_suggest import PrefixTrie, SuggestionIndex, extract_hashtags, record_hashtags
+
+USERS = [
+    {"id": 1, "username": "alice", "full_name": "Alice Smith", "profile_photo_url": None, "followers": 900},
+    {"id": 2, "username": "alina_k", "full_name": "Alina K", "profile_photo_url": None, "followers": 50},
+    {"id": 3, "username": "al_x", "full_name": "Xavier", "profile_photo_url": None, "followers": 10},
+    {"id": 4, "username": "bob", "full_name": "Albert Bob", "profile_photo_url": None, "followers": 5},
+]
+
+
+class FakeSuggestTables:
+    def __init__(self):
+        self.users = [dict(row) for row in USERS]
+        self.tags = {"travel": 40, "travelgram": 12, "tea": 3}
+        self.calls = []
+
+    async def suggest_users(self, prefix, exclude_ids, limit):
+        self.calls.append(("users", prefix, list(exclude_ids)))
+        return [row for row in self.users
+                if row["id"] not in exclude_ids
+                and (row["username"].lower().startswith(prefix) or row["full_name"].lower().startswith(prefix))][:limit]
+
+    async def suggest_hashtags(self, prefix, limit):
+        self.calls.append(("tags", prefix))
+        return self._top_tags(prefix, limit)
+
+    def _top_tags(self, prefix, limit):
+        rows = [{"tag": tag, "post_count": count} for tag, count in self.tags.items()
+                if tag.startswith(prefix) and count > 0]
+        return sorted(rows, key=lambda row: -row["post_count"])[:limit]
+
+    async def bump_hashtags(self, tags, delta):
+        for tag in tags:
+            self.tags[tag] = max(self.tags.get(tag, 0) + delta, 0)
+
+    async def get_popular_users(self, limit):
+        return sorted(self.users, key=lambda row: -row["followers"])[:limit]
+
+    async def get_popular_hashtags(self, limit):
+        return self._top_tags("", limit)
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    fake = FakeSuggestTables()
+    for name in ("suggest_users", "suggest_hashtags", "bump_hashtags",
+                 "get_popular_users", "get_popular_hashtags"):
+        monkeypatch.setattr(db_postgres, name, getattr(fake, name))
+    return fake
+
+
+class TestPrefixHelpers:
+    def test_like_prefix_escapes_wildcards(self):
+        assert db_postgres.like_prefix("a_b%c\\") == "a\\_b\\%c\\\\%"
+
+    def test_extract_hashtags(self):
+        assert extract_hashtags("Sunset #Travel #travel #tea!") == ["travel", "tea"]
+        assert extract_hashtags(None) == []
+
+    def test_trie_keeps_best_per_prefix(self):
+        trie = PrefixTrie(fanout=2)
+        for row in USERS:
+            trie.insert(row["username"], str(row["id"]), row["followers"], row)
+        assert [row["id"] for row in trie.lookup("al")] == [1, 2]
+        assert [row["id"] for row in trie.lookup("al_")] == [3]
+        assert trie.lookup("zz") == []
+
+
+class TestSuggestionIndex:
+    @pytest.mark.asyncio
+    async def test_popular_prefix_served_from_trie(self, tables):
+        index = SuggestionIndex()
+        await index.rebuild()
+        rows = await index.users("AL", limit=2)
+        assert [row["id"] for row in rows] == [1, 2]
+        assert tables.calls == []
+
+    @pytest.mark.asyncio
+    async def test_shorter_prefix_narrowed_without_query(self, tables):
+        index = SuggestionIndex()
+        index._schedule_refresh = lambda: None
+        assert len(await index.users("ali", limit=5)) == 2
+        assert [row["id"] for row in await index.users("alin", limit=5)] == [2]
+        assert tables.calls == [("users", "ali", [])]
+
+    @pytest.mark.asyncio
+    async def test_regex_metacharacters_are_literal(self, tables):
+        index = SuggestionIndex()
+        index._schedule_refresh = lambda: None
+        tables.users.append({"id": 9, "username": "a.*", "full_name": "Dot Star", "profile_photo_url": None,
+                             "followers": 0})
+        assert [row["id"] for row in await index.users("a.*", limit=5)] == [9]
+        assert await index.users("(a+)+$", limit=5) == []
+
+    @pytest.mark.asyncio
+    async def test_blocked_users_excluded(self, tables):
+        index = SuggestionIndex(fanout=2)
+        index._schedule_refresh = lambda: None
+        rows = await index.users("al", limit=2, exclude_ids=[1, 2])
+        assert [row["id"] for row in rows] == [3, 4]
+        assert tables.calls[-1] == ("users", "al", [1, 2])
+
+    @pytest.mark.asyncio
+    async def test_hashtag_counts_follow_captions(self, tables):
+        await record_hashtags(None, "#Tea time #new")
+        await record_hashtags("#Tea time #new", "#new only")
+        assert tables.tags["tea"] == 3 and tables.tags["new"] == 1
+        index = SuggestionIndex()
+        index._schedule_refresh = lambda: None
+        assert [row["tag"] for row in await index.hashtags("tr")] == ["travel", "travelgram"]
+
+
+class TestSuggestionsEndpoint:
+    @pytest.mark.asyncio
+    async def test_response_shape_and_latency(self, tables, monkeypatch):
+        from routers import search
+        index = SuggestionIndex()
+        await index.rebuild()
+        monkeypatch.setattr(search, "suggestion_index", index)
+        app = FastAPI()
+        app.include_router(search.router)
+        app.dependency_overrides[get_current_user] = lambda: User(
+            id="4", username="bob", fullName="Albert Bob", age=30, gender="male", blockedUsers=["2"])
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            users = (await client.get("/api/search/suggestions", params={"q": "al"})).json()
+            started = time.perf_counter()
+            tags = (await client.get("/api/search/suggestions", params={"q": "#tra"})).json()
+            elapsed = time.perf_counter() - started
+
+        assert [s["value"] for s in users["suggestions"]] == ["alice", "al_x"]
+        assert users["suggestions"][0] == {"type": "user", "text": "Alice Smith (@alice)",
+                                           "value": "alice", "avatar": None}
+        assert [s["value"] for s in tags["suggestions"]] == ["#travel", "#travelgram"]
+        assert elapsed < 0.05
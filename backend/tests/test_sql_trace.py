@@ -0,0 +1,156 @@
+"""
+Tests for the per-request SQL tracer
+Queries are simulated through db_postgres' observer hook - no database required
+"""
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from utils import sql_trace
+
+
+def _build_app(queries_per_request: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/users/{user_id}/followers")
+    async def followers(user_id: int):
+        # Simulates an N+1 loop: one lookup per follower
+        db_postgres._notify_query("SELECT * FROM webapp_users WHERE id = $1 LIMIT 1", 0.002)
+        for follower_id in range(queries_per_request - 1):
+            db_postgres._notify_query(f"SELECT * FROM webapp_users WHERE id = {follower_id} LIMIT 1", 0.001)
+        return {"ok": True}
+
+    app.add_middleware(sql_trace.SQLTraceMiddleware)
+    return app
+
+
+class TestStatementShape:
+    def test_parameters_collapse(self):
+        a = sql_trace.statement_shape("SELECT * FROM webapp_users WHERE id = $1 LIMIT 1")
+        b = sql_trace.statement_shape("SELECT *  FROM webapp_users\n WHERE id = 42 LIMIT 1")
+        assert a == b
+
+    def test_in_lists_collapse(self):
+        a = sql_trace.statement_shape("SELECT * FROM webapp_posts WHERE user_id IN ($1,$2,$3)")
+        b = sql_trace.statement_shape("SELECT * FROM webapp_posts WHERE user_id IN ($1, $2)")
+        assert a == b
+
+    def test_string_literals(self):
+        shape = sql_trace.statement_shape("SELECT 1 FROM t WHERE name = 'it''s'")
+        assert "it" not in shape
+
+
+class TestRequestTrace:
+    def test_repeated_shapes_flagged(self):
+        trace = sql_trace.RequestTrace("GET", "/api/posts/feed")
+        for i in range(sql_trace.REPEAT_THRESHOLD):
+            trace.record(f"SELECT * FROM webapp_users WHERE id = {i}", 0.001)
+        repeated = trace.repeated()
+        assert repeated and repeated[0]["count"] == sql_trace.REPEAT_THRESHOLD
+        assert trace.is_flagged()
+
+    def test_quiet_request_not_flagged(self):
+        trace = sql_trace.RequestTrace("GET", "/api/auth/me")
+        trace.record("SELECT * FROM webapp_users WHERE id = $1", 0.001)
+        assert not trace.is_flagged()
+
+    def test_slowest_bounded(self):
+        trace = sql_trace.RequestTrace("GET", "/x")
+        for i in range(20):
+            trace.record(f"SELECT {i} FROM t{i}", i / 1000)
+        slowest = trace.summary()["slowest"]
+        assert len(slowest) == sql_trace.SLOWEST_KEPT
+        assert slowest[0]["ms"] == pytest.approx(19.0)
+
+
+class TestMiddleware:
+    @pytest.mark.asyncio
+    async def test_flagged_request_buffered_with_headers(self, monkeypatch):
+        monkeypatch.setattr(sql_trace, "DEBUG_HEADERS", True)
+        sql_trace.slow_requests.clear()
+
+        transport = ASGITransport(app=_build_app(queries_per_request=8))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/users/1/followers")
+
+        assert response.headers["x-db-query-count"] == "8"
+        assert int(response.headers["x-db-repeated-statements"]) == 1
+
+        recent = sql_trace.get_slow_requests()
+        # Route template, not the concrete path (which can carry emails/tokens)
+        assert recent[0]["path"] == "/api/users/{user_id}/followers"
+        assert recent[0]["query_count"] == 8
+        assert recent[0]["repeated"][0]["count"] == 8
+
+    @pytest.mark.asyncio
+    async def test_headers_hidden_outside_debug(self, monkeypatch):
+        monkeypatch.setattr(sql_trace, "DEBUG_HEADERS", False)
+        transport = ASGITransport(app=_build_app(queries_per_request=1))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/users/1/followers")
+        assert "x-db-query-count" not in response.headers
+
+
+class _FakeConn:
+    def __init__(self):
+        self.ran = []
+
+    async def execute(self, query, *args, timeout=None):
+        self.ran.append(query)
+        return "INSERT 0 1"
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        self.ran.append(query)
+        return 1
+
+    def transaction(self):
+        return "txn"
+
+
+class _FakePool:
+    def __init__(self):
+        self.conn = _FakeConn()
+
+    async def acquire(self, timeout=None):
+        return self.conn
+
+    async def release(self, conn):
+        assert conn is self.conn
+
+
+class TestAcquiredConnections:
+    @pytest.mark.asyncio
+    async def test_statements_on_acquired_connection_are_traced(self):
+        seen = []
+        observer = lambda query, elapsed: seen.append(query)
+        db_postgres.add_query_observer(observer)
+        try:
+            lane_pool = db_postgres.LanePool("test", _FakePool(), db_postgres.PoolStats("test"))
+            async with lane_pool.acquire() as conn:
+                assert conn.transaction() == "txn"
+                await conn.execute("INSERT INTO webapp_follows VALUES ($1, $2)", 1, 2)
+                assert await conn.fetchval("SELECT 1") == 1
+        finally:
+            db_postgres.remove_query_observer(observer)
+        assert seen == ["INSERT INTO webapp_follows VALUES ($1, $2)", "SELECT 1"]
+
+    @pytest.mark.asyncio
+    async def test_pool_helpers_report_once(self):
+        seen = []
+        observer = lambda query, elapsed: seen.append(query)
+        db_postgres.add_query_observer(observer)
+        try:
+            lane_pool = db_postgres.LanePool("test", _FakePool(), db_postgres.PoolStats("test"))
+            await lane_pool.fetchval("SELECT 1")
+        finally:
+            db_postgres.remove_query_observer(observer)
+        assert seen == ["SELECT 1"]
+
+    def test_unmatched_route(self):
+        assert sql_trace.route_path({"path": "/api/auth/verify/me@example.com"}) == "<unmatched>"
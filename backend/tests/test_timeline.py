@@ -0,0 +1,212 @@
+"""
+Tests for the fan-out-on-write home timeline and the feed endpoint built on it
+Timeline queries are replaced with an in-memory table - no database required
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from core.models import User
+from core.security import get_current_user
+from utils.timeline import HomeTimeline, decode_cursor
+
+BASE = datetime(2026, 1, 1)
+
+
+class FakeTimelineStore:
+    """Same push/pull/trim rules as the SQL in db_postgres over dicts"""
+
+    def __init__(self, followers, pull_authors=()):
+        self.followers = followers          # author -> [follower ids]
+        self.pull_authors = set(pull_authors)
+        self.posts = {}                     # post id -> (author, created_at)
+        self.rows = {}                      # user -> {post id: created_at}
+        self.trimmed = []
+
+    def add_post(self, post_id, author, minutes):
+        self.posts[post_id] = (author, BASE + timedelta(minutes=minutes))
+
+    async def fan_out_post(self, post_id):
+        author, created_at = self.posts[post_id]
+        recipients = [author] + ([] if author in self.pull_authors else self.followers.get(author, []))
+        for user_id in recipients:
+            self.rows.setdefault(user_id, {})[post_id] = created_at
+        return recipients
+
+    async def trim_timelines(self, user_ids, max_entries):
+        self.trimmed.append(list(user_ids))
+        removed = 0
+        for user_id in user_ids:
+            keep = sorted(self.rows[user_id].items(), key=lambda kv: (kv[1], kv[0]), reverse=True)[:max_entries]
+            removed += len(self.rows[user_id]) - len(keep)
+            self.rows[user_id] = dict(keep)
+        return removed
+
+    async def remove_post_from_timelines(self, post_id):
+        return sum(1 for rows in self.rows.values() if rows.pop(post_id, None) is not None)
+
+    async def get_timeline(self, user_id, limit, before=None):
+        entries = dict(self.rows.get(user_id, {}))
+        for post_id, (author, created_at) in self.posts.items():
+            if author in self.pull_authors and user_id in self.followers.get(author, []):
+                entries[post_id] = created_at
+        ordered = sorted(((c, p) for p, c in entries.items()), reverse=True)
+        if before:
+            ordered = [(c, p) for c, p in ordered if (c, p) < before]
+        return [{"post_id": p, "created_at": c} for c, p in ordered[:limit]]
+
+    async def get_discovery_posts(self, user_id, limit, before=None, exclude_user_ids=()):
+        followed = {author for author, followers in self.followers.items() if user_id in followers}
+        skipped = followed | {user_id} | set(exclude_user_ids)
+        ordered = sorted(((c, p) for p, (author, c) in self.posts.items() if author not in skipped), reverse=True)
+        if before:
+            ordered = [(c, p) for c, p in ordered if (c, p) < before]
+        return [{"post_id": p, "created_at": c} for c, p in ordered[:limit]]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = FakeTimelineStore({1: [2, 3], 4: [2]}, pull_authors=[4])
+    for name in ("fan_out_post", "trim_timelines", "remove_post_from_timelines", "get_timeline",
+                 "get_discovery_posts"):
+        monkeypatch.setattr(db_postgres, name, getattr(fake, name))
+    return fake
+
+
+class TestHomeTimeline:
+    @pytest.mark.asyncio
+    async def test_push_and_pull_merge(self, store):
+        timeline = HomeTimeline(trim_every=100)
+        for post_id, author, minutes in ((10, 1, 1), (11, 4, 2), (12, 1, 3)):
+            store.add_post(post_id, author, minutes)
+            timeline.post_created(post_id)
+        await timeline.drain()
+        assert 11 not in store.rows[2]          # pull-on-read author is not pushed
+        ids, cursor = await timeline.page(2, 10)
+        assert ids == [12, 11, 10] and cursor is None
+        assert (await timeline.page(3, 10))[0] == [12, 10]
+        assert timeline.stats()["rows_pushed"] == 3 + 1 + 3
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages(self, store):
+        timeline = HomeTimeline()
+        for post_id in range(1, 6):
+            store.add_post(post_id, 1, post_id)
+            await timeline.fan_out(post_id)
+        first, cursor = await timeline.page(2, 2)
+        second, cursor = await timeline.page(2, 2, cursor)
+        last, end = await timeline.page(2, 2, cursor)
+        assert (first, second, last, end) == ([5, 4], [3, 2], [1], None)
+        assert decode_cursor("2026-01-01T00:03:00|3") == (BASE + timedelta(minutes=3), 3)
+        with pytest.raises(ValueError):
+            decode_cursor("garbage")
+
+    @pytest.mark.asyncio
+    async def test_feed_page_tops_up_with_global_posts(self, store):
+        timeline = HomeTimeline()
+        for post_id, author, minutes in ((1, 1, 1), (2, 5, 2), (3, 6, 3), (4, 1, 4), (5, 7, 5)):
+            store.add_post(post_id, author, minutes)
+            await timeline.fan_out(post_id)
+        first, cursor = await timeline.feed_page(2, 2)
+        assert first == [4, 1] and not cursor.startswith("discover:")
+        second, cursor = await timeline.feed_page(2, 2, cursor)
+        assert second == [5, 3] and cursor.startswith("discover:")
+        last, end = await timeline.feed_page(2, 2, cursor)
+        assert (last, end) == ([2], None)
+        # Blocked/muted authors never show up in the global part
+        assert (await timeline.feed_page(3, 10, exclude_user_ids=[7]))[0] == [4, 1, 3, 2]
+
+    @pytest.mark.asyncio
+    async def test_trimmed_every_n_pushes(self, store, monkeypatch):
+        monkeypatch.setattr(db_postgres, "TIMELINE_MAX_ENTRIES", 2)
+        timeline = HomeTimeline(trim_every=3)
+        for post_id in range(1, 7):
+            store.add_post(post_id, 1, post_id)
+            await timeline.fan_out(post_id)
+        assert store.trimmed == [[1, 2, 3], [1, 2, 3]]
+        assert sorted(store.rows[2]) == [5, 6]
+
+    @pytest.mark.asyncio
+    async def test_removed_post_purged(self, store):
+        timeline = HomeTimeline()
+        store.add_post(10, 1, 1)
+        await timeline.fan_out(10)
+        await timeline.post_removed(10)
+        assert store.rows == {1: {}, 2: {}, 3: {}}
+        assert timeline.stats()["rows_purged"] == 3
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, field, order):
+        self.rows = sorted(self.rows, key=lambda row: row[field], reverse=order == -1)
+        return self
+
+    async def to_list(self, length):
+        return self.rows[:length]
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def find_one(self, query):
+        return self.rows.get(query["id"])
+
+    def find(self, query):
+        self.queries.append(query)
+        ids = query.get("id", {}).get("$in")
+        rows = [row for key, row in self.rows.items() if ids is None or key in ids]
+        return FakeCursor(rows)
+
+
+class FakeDB:
+    def __init__(self):
+        self.users = FakeCollection({
+            i: {"id": i, "username": f"u{i}", "profileImage": f"p{i}", "isVerified": i == 1,
+                "blockedUsers": [], "mutedUsers": [3] if i == 2 else [], "savedPosts": [12]}
+            for i in (1, 2, 3, 4)
+        })
+        self.posts = FakeCollection({})
+
+
+class TestFeedEndpoint:
+    @pytest.mark.asyncio
+    async def test_feed_hydrates_in_batches(self, store, monkeypatch):
+        from routers import posts as posts_router
+        from utils import timeline as timeline_module
+        fake_db = FakeDB()
+        for post_id, author, minutes in ((10, 1, 1), (11, 4, 2), (12, 1, 3), (13, 3, 4)):
+            store.add_post(post_id, author, minutes)
+            fake_db.posts.rows[post_id] = {"id": post_id, "userId": author, "username": f"u{author}",
+                                           "caption": "", "likes": "[\"2\"]", "comments": [],
+                                           "createdAt": store.posts[post_id][1].isoformat()}
+            store.followers[3] = [2]
+            await timeline_module.home_timeline.fan_out(post_id)
+        monkeypatch.setattr(posts_router, "db", fake_db)
+
+        app = FastAPI()
+        app.include_router(posts_router.router)
+        app.dependency_overrides[get_current_user] = lambda: User(
+            id="2", username="u2", fullName="U2", age=25, gender="female")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            body = (await client.get("/api/posts/feed", params={"limit": 10})).json()
+            bad = await client.get("/api/posts/feed", params={"cursor": "nope"})
+
+        # Muted author 3 is filtered out; pulled post 11 is merged in order
+        assert [post["id"] for post in body["posts"]] == [12, 11, 10]
+        assert body["posts"][0]["isSaved"] is True and body["posts"][0]["isLiked"] is True
+        assert body["posts"][0]["isVerified"] is True and body["nextCursor"] is None
+        assert fake_db.posts.queries == [{"id": {"$in": [13, 12, 11, 10]}}]
+        assert len(fake_db.users.queries) == 1
+        assert bad.status_code == 400
@@ -0,0 +1,135 @@
+"""
+Tests for the taken-username Bloom filter and the batched availability check
+Database calls are replaced with an in-memory user table - no database required
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import db_postgres
+from utils import username_filter as username_filter_module
+from utils.username_filter import BloomFilter, UsernameFilter
+
+
+class FakeUserTable:
+    def __init__(self, names):
+        self.rows = [{"id": i + 1, "username": name.lower(), "last_username_change": None}
+                     for i, name in enumerate(names)]
+        self.taken_calls = []
+
+    async def taken_usernames(self, usernames):
+        self.taken_calls.append(list(usernames))
+        existing = {row["username"] for row in self.rows}
+        return {name.lower() for name in usernames if name.lower() in existing}
+
+    async def get_usernames_page(self, after_id, limit):
+        return [row for row in self.rows if row["id"] > after_id][:limit]
+
+    async def get_usernames_changed_since(self, changed_since):
+        return [row for row in self.rows
+                if row["last_username_change"] and row["last_username_change"] > changed_since]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    fake = FakeUserTable(["alice", "Bob", "carol_", "dave123"])
+    monkeypatch.setattr(db_postgres, "taken_usernames", fake.taken_usernames)
+    monkeypatch.setattr(db_postgres, "get_usernames_page", fake.get_usernames_page)
+    monkeypatch.setattr(db_postgres, "get_usernames_changed_since", fake.get_usernames_changed_since)
+    monkeypatch.setattr(username_filter_module, "LOAD_BATCH_SIZE", 2)
+    return fake
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(5000, 0.01)
+        names = [f"user_{i}" for i in range(5000)]
+        for name in names:
+            bloom.add(name)
+        assert all(name in bloom for name in names)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(f"user_{i}")
+        false_positives = sum(f"other_{i}" in bloom for i in range(20000))
+        assert false_positives / 20000 < 0.03
+
+
+class TestUsernameFilter:
+    @pytest.mark.asyncio
+    async def test_falls_back_to_db_until_built(self, table):
+        f = UsernameFilter(capacity=100)
+        assert await f.taken(["ALICE", "zed"]) == {"alice"}
+        assert table.taken_calls == [["alice", "zed"]]
+        await f._task
+
+    @pytest.mark.asyncio
+    async def test_free_names_skip_db(self, table):
+        f = UsernameFilter(capacity=100)
+        await f.rebuild()
+        assert f.stats()["names"] == 4
+        assert await f.taken(["zed", "yan", "xo"]) == set()
+        assert table.taken_calls == []
+        assert await f.taken(["bob", "zed"]) == {"bob"}
+        assert table.taken_calls == [["bob"]]
+
+    @pytest.mark.asyncio
+    async def test_refresh_picks_up_new_and_renamed_users(self, table):
+        f = UsernameFilter(capacity=100)
+        table.rows[0]["last_username_change"] = datetime(2025, 1, 1)
+        await f.rebuild()
+        table.rows.append({"id": 5, "username": "erin", "last_username_change": None})
+        table.rows[1].update(username="bobby", last_username_change=datetime(2025, 1, 1) + timedelta(days=1))
+        await f.refresh()
+        assert not f.definitely_free("erin")
+        assert not f.definitely_free("bobby")
+
+    @pytest.mark.asyncio
+    async def test_local_registration_visible_immediately(self, table):
+        f = UsernameFilter(capacity=100)
+        await f.rebuild()
+        f.add("  NewName ")
+        assert not f.definitely_free("newname")
+
+    @pytest.mark.asyncio
+    async def test_first_free_ignores_case(self, table):
+        f = UsernameFilter(capacity=100)
+        await f.rebuild()
+        table.rows.append({"id": 5, "username": "bob1", "last_username_change": None})
+        f.add("bob1")
+        assert await f.first_free("BOB") == "BOB2"
+        assert await f.first_free("Dave", start=1) == "Dave1"
+        assert await f.first_free("zed") == "zed"
+
+
+class TestCheckUsernameEndpoint:
+    @pytest.mark.asyncio
+    async def test_taken_name_uses_one_query(self, table, monkeypatch):
+        from routers import auth
+        f = UsernameFilter(capacity=100)
+        monkeypatch.setattr(auth, "username_filter", f)
+        app = FastAPI()
+        app.include_router(auth.router)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/auth/check-username/Alice")
+        await asyncio.sleep(0)
+
+        body = response.json()
+        assert body["available"] is False
+        assert len(body["suggestions"]) == 5 and "alice_" in body["suggestions"]
+        assert len(table.taken_calls) == 1
+
+        table.taken_calls.clear()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/auth/check-username/brand_new")
+        assert response.json()["available"] is True
+        assert table.taken_calls == []
@@ -0,0 +1,292 @@
+"""
+Admission Control
+Per-route-class concurrency limits with priority queues; overload sheds low-priority requests with 503 first
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_CRITICAL: "critical", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+# Per class: concurrent requests, seconds a request may queue before a 503,
+# requests allowed to queue, and the Retry-After sent when shedding.
+# Overridable as ADMISSION_<CLASS>_<KEY>, e.g. ADMISSION_SEARCH_LIMIT=5.
+_CLASS_DEFAULTS: Dict[str, Dict[str, float]] = {
+    "auth": {"limit": 40, "queue_timeout": 3.0, "max_queue": 200, "retry_after": 1},
+    "feed": {"limit": 40, "queue_timeout": 2.0, "max_queue": 200, "retry_after": 2},
+    "search": {"limit": 10, "queue_timeout": 1.0, "max_queue": 50, "retry_after": 5},
+    "uploads": {"limit": 8, "queue_timeout": 5.0, "max_queue": 20, "retry_after": 5},
+    "media": {"limit": 48, "queue_timeout": 2.0, "max_queue": 400, "retry_after": 1},
+    "admin": {"limit": 4, "queue_timeout": 2.0, "max_queue": 10, "retry_after": 10},
+    "other": {"limit": 30, "queue_timeout": 2.0, "max_queue": 100, "retry_after": 2},
+}
+
+# Multipart create endpoints; only their writes count as uploads
+UPLOAD_ROUTES = frozenset({
+    "/api/posts", "/api/posts/create",
+    "/api/stories", "/api/stories/create",
+    "/api/social/posts", "/api/social/stories",
+})
+UPLOAD_METHODS = frozenset({"POST", "PUT"})
+
+# Checked in order after the upload routes; anything unmatched is "other".
+# "media" is file serving (static /uploads mount, media proxy), cheap and frequent.
+ROUTE_CLASS_PREFIXES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("admin", ("/api/admin/",)),
+    ("search", ("/api/search",)),
+    ("media", ("/api/media/", "/api/uploads/", "/uploads/")),
+    ("auth", ("/api/auth/",)),
+    ("feed", ("/api/posts", "/api/stories", "/api/feed", "/api/profile", "/api/users",
+              "/api/notifications", "/api/chat/")),
+)
+
+# Served first and allowed the whole global budget: session checks, login and message sends
+CRITICAL_ROUTE_PREFIXES: Tuple[str, ...] = (
+    "/api/auth/me",
+    "/api/auth/login",
+    "/api/auth/telegram",
+    "/api/chat/send",
+)
+# First to be shed: only admitted while the server has spare capacity
+LOW_PRIORITY_ROUTE_PREFIXES: Tuple[str, ...] = (
+    "/api/search",
+    "/api/admin/",
+    "/api/auth/download-data",
+)
+# Never queued or shed (load balancer health checks)
+EXEMPT_ROUTE_PREFIXES: Tuple[str, ...] = ("/api/health",)
+
+# Concurrent requests across all classes, and the share of it each priority may use
+GLOBAL_LIMIT = int(os.getenv("ADMISSION_GLOBAL_LIMIT", "64"))
+NORMAL_PRIORITY_SHARE = float(os.getenv("ADMISSION_NORMAL_PRIORITY_SHARE", "0.85"))
+LOW_PRIORITY_SHARE = float(os.getenv("ADMISSION_LOW_PRIORITY_SHARE", "0.5"))
+
+
+def class_config(route_class: str) -> Dict[str, float]:
+    """Resolve admission settings for a route class (defaults overridden by env vars)"""
+    if route_class not in _CLASS_DEFAULTS:
+        raise ValueError(f"Unknown admission route class: {route_class}")
+    config = {}
+    for key, default in _CLASS_DEFAULTS[route_class].items():
+        raw = os.getenv(f"ADMISSION_{route_class.upper()}_{key.upper()}")
+        config[key] = type(default)(raw) if raw else default
+    return config
+
+
+def classify(path: str, method: str = "GET") -> Tuple[str, int]:
+    """(route class, priority) for a request path and method"""
+    route_class = "other"
+    if method in UPLOAD_METHODS and path.rstrip("/") in UPLOAD_ROUTES:
+        route_class = "uploads"
+    else:
+        for name, prefixes in ROUTE_CLASS_PREFIXES:
+            if path.startswith(prefixes):
+                route_class = name
+                break
+    if path.startswith(CRITICAL_ROUTE_PREFIXES):
+        return route_class, PRIORITY_CRITICAL
+    if path.startswith(LOW_PRIORITY_ROUTE_PREFIXES):
+        return route_class, PRIORITY_LOW
+    return route_class, PRIORITY_NORMAL
+
+
+class AdmissionRejected(Exception):
+    """Request shed instead of admitted"""
+
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f"{route_class}: {reason}")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Counting semaphore whose waiters are served by priority, then arrival order.
+    ceilings[priority] caps how many slots that priority may occupy, so low-priority
+    work stops being admitted well before the gate is full.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, ceilings: Optional[Dict[int, int]] = None):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.ceilings = ceilings or {priority: limit for priority in PRIORITY_NAMES}
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.shed_timeout = 0
+        self.shed_queue_full = 0
+        self.max_wait = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _drop_finished(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+    def _can_admit(self, priority: int) -> bool:
+        self._drop_finished()
+        if self._waiters and self._waiters[0][0] <= priority:
+            # Someone at least as important is already queued
+            return False
+        return self.active < self.ceilings[priority]
+
+    def _wake(self):
+        self._drop_finished()
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.active >= self.ceilings[priority]:
+                break
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(True)
+
+    async def acquire(self, priority: int, timeout: float) -> Optional[str]:
+        """Take a slot; returns None when admitted, else the reason it was shed"""
+        if self._can_admit(priority):
+            self.active += 1
+            self.admitted += 1
+            return None
+        if self.waiting >= self.max_queue:
+            self.shed_queue_full += 1
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            # asyncio.wait (not wait_for) so a slot handed over at the deadline is not lost
+            await asyncio.wait({future}, timeout=max(timeout, 0))
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+        self.max_wait = max(self.max_wait, time.monotonic() - started)
+        if future.done():
+            self.admitted += 1
+            return None
+        future.cancel()
+        self.shed_timeout += 1
+        return "queue_timeout"
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_timeout": self.shed_timeout,
+            "shed_queue_full": self.shed_queue_full,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class AdmissionController:
+    """A gate per route class in front of one global gate shared by priority"""
+
+    def __init__(self, global_limit: int = GLOBAL_LIMIT, normal_share: float = NORMAL_PRIORITY_SHARE,
+                 low_share: float = LOW_PRIORITY_SHARE):
+        self.configs = {name: class_config(name) for name in _CLASS_DEFAULTS}
+        self.gates = {
+            name: AdmissionGate(name, int(config["limit"]), int(config["max_queue"]))
+            for name, config in self.configs.items()
+        }
+        ceilings = {
+            PRIORITY_CRITICAL: global_limit,
+            PRIORITY_NORMAL: max(1, int(global_limit * normal_share)),
+            PRIORITY_LOW: max(1, int(global_limit * low_share)),
+        }
+        self.global_gate = AdmissionGate("global", global_limit, global_limit * 4, ceilings)
+        self.shed_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    async def acquire(self, route_class: str, priority: int):
+        """Admit a request or raise AdmissionRejected; pair with release(route_class)"""
+        config = self.configs[route_class]
+        deadline = time.monotonic() + config["queue_timeout"]
+        gate = self.gates[route_class]
+        reason = await gate.acquire(priority, config["queue_timeout"])
+        if reason is None:
+            try:
+                reason = await self.global_gate.acquire(priority, deadline - time.monotonic())
+            except asyncio.CancelledError:
+                gate.release()
+                raise
+            if reason is not None:
+                gate.release()
+        if reason is not None:
+            self.shed_by_priority[PRIORITY_NAMES[priority]] += 1
+            raise AdmissionRejected(route_class, reason, int(config["retry_after"]))
+
+    def release(self, route_class: str):
+        self.global_gate.release()
+        self.gates[route_class].release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "global": self.global_gate.stats(),
+            "classes": {name: gate.stats() for name, gate in self.gates.items()},
+            "shed_by_priority": dict(self.shed_by_priority),
+        }
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware that queues or sheds each HTTP request by route class and priority"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not ADMISSION_ENABLED or path.startswith(EXEMPT_ROUTE_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        route_class, priority = classify(path, scope.get("method", "GET"))
+        try:
+            await self.controller.acquire(route_class, priority)
+        except AdmissionRejected as e:
+            logger.warning(f"Shed {scope.get('method', '')} {path} ({e.route_class}/{e.reason})")
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,169 @@
+"""
+Counter Reconciliation
+Recomputes denormalized counters from their source rows and repairs drift at a bounded write rate
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import db_postgres
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "1000"))
+# Repaired rows per second across all counters; keeps the job from competing with user writes
+RECONCILE_MAX_WRITES_PER_SECOND = float(os.getenv("RECONCILE_MAX_WRITES_PER_SECOND", "200"))
+# 0 disables the periodic run; the admin endpoint can still start one
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "0"))
+# Drifted rows kept per counter in the report, for eyeballing a dry run
+DRIFT_SAMPLE_SIZE = 20
+
+
+class CounterReport:
+    """Drift found (and repaired) for one counter in one run"""
+
+    def __init__(self, name: str, dry_run: bool):
+        self.name = name
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.drifted = 0
+        self.repaired = 0
+        self.skipped = 0
+        self.total_abs_drift = 0
+        self.max_abs_drift = 0
+        self.samples: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self.duration_seconds = 0.0
+
+    def record(self, rows: List[Dict[str, Any]]):
+        self.scanned += len(rows)
+        for row in rows:
+            if row["stored"] == row["actual"]:
+                continue
+            drift = row["actual"] - (row["stored"] or 0)
+            self.drifted += 1
+            self.total_abs_drift += abs(drift)
+            self.max_abs_drift = max(self.max_abs_drift, abs(drift))
+            if len(self.samples) < DRIFT_SAMPLE_SIZE:
+                self.samples.append({"id": row["id"], "stored": row["stored"], "actual": row["actual"]})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "drifted": self.drifted,
+            "repaired": self.repaired,
+            "skipped": self.skipped,
+            "drift_rate": round(self.drifted / self.scanned, 6) if self.scanned else 0.0,
+            "total_abs_drift": self.total_abs_drift,
+            "max_abs_drift": self.max_abs_drift,
+            "samples": self.samples,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+
+class CounterReconciler:
+    """
+    Walks each counter's table in keyset-paginated id order, compares the stored counter
+    with a count of its source rows and rewrites only the rows that differ. Repairs are
+    compare-and-set against the scanned value, so a concurrent like/follow is never undone.
+    """
+
+    def __init__(self, batch_size: int = RECONCILE_BATCH_SIZE,
+                 max_writes_per_second: float = RECONCILE_MAX_WRITES_PER_SECOND,
+                 interval_seconds: float = RECONCILE_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self.max_writes_per_second = max_writes_per_second
+        self.interval_seconds = interval_seconds
+        self.reports: Dict[str, CounterReport] = {}
+        self.runs = 0
+        self._write_budget_at = 0.0
+        self._run_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_task is not None and not self._run_task.done()
+
+    async def _throttle(self, writes: int):
+        """Sleep so repairs average at most max_writes_per_second"""
+        if self.max_writes_per_second <= 0:
+            return
+        now = time.monotonic()
+        start = max(now, self._write_budget_at)
+        self._write_budget_at = start + writes / self.max_writes_per_second
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def reconcile(self, name: str, dry_run: bool = False) -> CounterReport:
+        report = CounterReport(name, dry_run)
+        self.reports[name] = report
+        started = time.perf_counter()
+        after_id = 0
+        while True:
+            rows = await db_postgres.scan_counter(name, after_id, self.batch_size)
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+            report.record(rows)
+            drifted = [row for row in rows if row["stored"] != row["actual"]]
+            if drifted and not dry_run:
+                await self._throttle(len(drifted))
+                fixed = await db_postgres.repair_counter(
+                    name, [row["id"] for row in drifted], [row["stored"] for row in drifted])
+                report.repaired += fixed
+                report.skipped += len(drifted) - fixed
+            if len(rows) < self.batch_size:
+                break
+        report.duration_seconds = time.perf_counter() - started
+        if report.drifted:
+            logger.warning(f"Counter {name}: {report.drifted}/{report.scanned} rows drifted "
+                           f"(max {report.max_abs_drift}), repaired {report.repaired}"
+                           f"{' [dry run]' if dry_run else ''}")
+        return report
+
+    async def run(self, names: Optional[Iterable[str]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Reconcile the given counters (default: all) one after another"""
+        names = list(names or db_postgres.RECONCILED_COUNTERS)
+        for name in names:
+            if name not in db_postgres.RECONCILED_COUNTERS:
+                raise ValueError(f"Unknown counter: {name}")
+        self.runs += 1
+        for name in names:
+            try:
+                await self.reconcile(name, dry_run)
+            except Exception as e:
+                logger.error(f"Counter reconciliation failed for {name}: {e}")
+        return {name: self.reports[name].as_dict() for name in names if name in self.reports}
+
+    def start(self, names: Optional[Iterable[str]] = None, dry_run: bool = False) -> bool:
+        """Start a run in the background; False if one is already in progress"""
+        if self.running:
+            return False
+        self._run_task = asyncio.create_task(self.run(names, dry_run))
+        return True
+
+    def start_periodic(self):
+        """Run every interval_seconds (no-op when the interval is 0)"""
+        if self.interval_seconds <= 0 or (self._loop_task is not None and not self._loop_task.done()):
+            return
+        self._loop_task = asyncio.create_task(self._periodic())
+
+    async def _periodic(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            if self.start():
+                await self._run_task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "counters": {name: report.as_dict() for name, report in self.reports.items()},
+        }
+
+
+counter_reconciler = CounterReconciler()
@@ -0,0 +1,63 @@
+"""
+Database Pool Lane Routing
+Pins heavy endpoints (exports, admin jobs, search) to the background pool lane and read-mostly ones to replicas
+"""
+from typing import Tuple
+
+import db_postgres
+
+# Path prefixes whose queries run on the background lane.  Everything else
+# (auth, feeds, likes, messaging) stays on the interactive lane.
+BACKGROUND_ROUTE_PREFIXES: Tuple[str, ...] = (
+    "/api/admin/",
+    "/api/auth/download-data",
+    "/api/auth/wipe-all-data",
+    "/api/auth/cleanup-account/",
+    "/api/search",
+)
+
+
+# Path prefixes whose reads prefer a read replica (when DATABASE_REPLICA_URL is set).
+# Writes on these routes still go to the primary, see db_postgres.ReplicaLanePool.
+REPLICA_ROUTE_PREFIXES: Tuple[str, ...] = (
+    "/api/search",
+    "/api/auth/download-data",
+    "/api/users/list",
+)
+
+
+def read_preference_for_path(path: str) -> str:
+    """Pick the read preference for a request path"""
+    if path.startswith(REPLICA_ROUTE_PREFIXES):
+        return db_postgres.READ_REPLICA
+    return db_postgres.READ_PRIMARY
+
+
+def lane_for_path(path: str) -> str:
+    """Pick the pool lane for a request path"""
+    if path.startswith(BACKGROUND_ROUTE_PREFIXES):
+        return db_postgres.LANE_BACKGROUND
+    return db_postgres.LANE_INTERACTIVE
+
+
+class DBLaneMiddleware:
+    """Pure ASGI middleware that sets the db_postgres lane, read preference and routing state for each request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        token = db_postgres.current_lane.set(lane_for_path(path))
+        read_token = db_postgres.current_read_preference.set(read_preference_for_path(path))
+        routing_token = db_postgres.current_routing.set(db_postgres.RequestRouting())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            db_postgres.current_routing.reset(routing_token)
+            db_postgres.current_read_preference.reset(read_token)
+            db_postgres.current_lane.reset(token)
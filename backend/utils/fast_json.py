@@ -0,0 +1,127 @@
+"""
+Fast JSON Responses and Pre-compressed Response Cache
+orjson rendering for list endpoints and short-TTL caches that keep gzip bytes alongside raw bytes
+"""
+import gzip
+import os
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+# GZipMiddleware defaults to level 9; level 5 compresses JSON nearly as well at a fraction of the CPU
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not serialize natively (datetime, date, UUID and dataclasses are native)"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Returning it from an endpoint skips
+    FastAPI's jsonable_encoder pass, and datetimes are encoded natively
+    (same ISO 8601 output as .isoformat()).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+class CachedPayload:
+    """One encoded response body plus its gzip form, compressed once at insert time"""
+
+    __slots__ = ("body", "gzipped", "expires_at")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL) if len(body) >= GZIP_MINIMUM_SIZE else None
+        self.expires_at = expires_at
+
+    def response(self, request: Request) -> Response:
+        # GZipMiddleware passes responses that already carry Content-Encoding through untouched
+        if self.gzipped is not None and accepts_gzip(request):
+            return Response(
+                content=self.gzipped,
+                media_type="application/json",
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+        return Response(content=self.body, media_type="application/json")
+
+
+class ResponseCache:
+    """
+    Small in-process TTL cache of encoded responses, keyed by strings such as
+    "<user_id>:<limit>". Oldest entries are evicted past max_entries.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 5000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedPayload]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, content: Any) -> CachedPayload:
+        entry = CachedPayload(dumps(content), time.monotonic() + self.ttl_seconds)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop entries whose key starts with prefix (all entries by default)"""
+        if not prefix:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        stale = [key for key in self._entries if key.startswith(prefix)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
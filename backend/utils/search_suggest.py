@@ -0,0 +1,282 @@
+"""
+Search Suggestion Index
+Prefix trie of popular users and hashtags, backed by indexed prefix queries and a per-prefix cache
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import db_postgres
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_TOP_USERS = int(os.getenv("SUGGEST_TOP_USERS", "5000"))
+SUGGEST_TOP_TAGS = int(os.getenv("SUGGEST_TOP_TAGS", "5000"))
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "300"))
+# Typing "ali" -> "alic" -> "alice" hits the cache for every keystroke after the first
+SUGGEST_CACHE_TTL_SECONDS = float(os.getenv("SUGGEST_CACHE_TTL_SECONDS", "30"))
+SUGGEST_CACHE_MAX_ENTRIES = int(os.getenv("SUGGEST_CACHE_MAX_ENTRIES", "20000"))
+# Results kept per trie node / fetched per cached prefix; extra rows absorb per-user filtering
+SUGGEST_FANOUT = 10
+MAX_PREFIX_LENGTH = 32
+
+HASHTAG_RE = re.compile(r"#(\w+)")
+
+
+def extract_hashtags(caption: Optional[str]) -> List[str]:
+    """Distinct lower-cased hashtags (without '#') in caption order"""
+    if not caption:
+        return []
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_RE.findall(caption)))
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.top: List[Tuple[float, str, dict]] = []
+
+
+class PrefixTrie:
+    """
+    Character trie where every node keeps the best `fanout` entries below it,
+    so a prefix lookup is one walk down the key - no subtree scan.
+    """
+
+    def __init__(self, fanout: int = SUGGEST_FANOUT, max_depth: int = MAX_PREFIX_LENGTH):
+        self.fanout = fanout
+        self.max_depth = max_depth
+        self.root = _TrieNode()
+        self.size = 0
+
+    def insert(self, key: str, entry_id: str, score: float, payload: dict):
+        node = self.root
+        item = (score, entry_id, payload)
+        for char in key[:self.max_depth]:
+            node = node.children.setdefault(char, _TrieNode())
+            if any(existing[1] == entry_id for existing in node.top):
+                continue
+            if len(node.top) < self.fanout or score > node.top[-1][0]:
+                node.top.append(item)
+                node.top.sort(key=lambda entry: -entry[0])
+                del node.top[self.fanout:]
+        self.size += 1
+
+    def lookup(self, prefix: str) -> List[dict]:
+        """Payloads of the best entries starting with prefix, highest score first"""
+        if len(prefix) > self.max_depth:
+            return []
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [payload for _, _, payload in node.top]
+
+
+class PrefixCache:
+    """TTL + LRU cache of suggestion rows keyed by (kind, prefix)"""
+
+    def __init__(self, ttl_seconds: float = SUGGEST_CACHE_TTL_SECONDS,
+                 max_entries: int = SUGGEST_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[dict]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: Tuple[str, str]) -> Optional[List[dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, kind: str, prefix: str, fanout: int, match) -> Optional[List[dict]]:
+        """
+        Rows for prefix, or None on a miss. A cached shorter prefix that came back
+        short (fewer than fanout rows) already holds every match, so it is narrowed
+        locally instead of going to the database.
+        """
+        rows = self._get((kind, prefix))
+        if rows is not None:
+            self.hits += 1
+            return rows
+        for cut in range(len(prefix) - 1, 0, -1):
+            shorter = self._get((kind, prefix[:cut]))
+            if shorter is not None and len(shorter) < fanout:
+                self.hits += 1
+                narrowed = [row for row in shorter if match(row, prefix)]
+                self.put(kind, prefix, narrowed)
+                return narrowed
+        self.misses += 1
+        return None
+
+    def put(self, kind: str, prefix: str, rows: List[dict]):
+        self._entries[(kind, prefix)] = (time.monotonic() + self.ttl_seconds, rows)
+        self._entries.move_to_end((kind, prefix))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _user_matches(row: dict, prefix: str) -> bool:
+    return ((row.get("username") or "").lower().startswith(prefix)
+            or (row.get("full_name") or "").lower().startswith(prefix))
+
+
+def _tag_matches(row: dict, prefix: str) -> bool:
+    return row["tag"].startswith(prefix)
+
+
+class SuggestionIndex:
+    """
+    Answers /search/suggestions in three tiers:
+
+    1. an in-memory trie of the most followed users and most used hashtags,
+       rebuilt in the background every SUGGEST_REFRESH_SECONDS;
+    2. a per-prefix cache of database results shared by all viewers;
+    3. escaped LIKE prefix queries on text_pattern_ops indexes and the
+       webapp_hashtags frequency table.
+
+    Prefixes are matched literally - user input never reaches a regex.
+    """
+
+    def __init__(self, top_users: int = SUGGEST_TOP_USERS, top_tags: int = SUGGEST_TOP_TAGS,
+                 refresh_seconds: float = SUGGEST_REFRESH_SECONDS, fanout: int = SUGGEST_FANOUT):
+        self.top_users = top_users
+        self.top_tags = top_tags
+        self.refresh_seconds = refresh_seconds
+        self.fanout = fanout
+        self.cache = PrefixCache()
+        self._users: Optional[PrefixTrie] = None
+        self._tags: Optional[PrefixTrie] = None
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.trie_answers = 0
+        self.db_lookups = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._users is not None
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        users = PrefixTrie(self.fanout)
+        for row in await db_postgres.get_popular_users(self.top_users):
+            entry_id = str(row["id"])
+            for key in (row.get("username"), row.get("full_name")):
+                if key:
+                    users.insert(key.strip().lower(), entry_id, row["followers"], row)
+        tags = PrefixTrie(self.fanout)
+        for row in await db_postgres.get_popular_hashtags(self.top_tags):
+            tags.insert(row["tag"], row["tag"], row["post_count"], row)
+        self._users, self._tags = users, tags
+        self._refreshed_at = time.monotonic()
+        logger.info(f"Suggestion trie built: {users.size} user keys, {tags.size} tags "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def _schedule_refresh(self):
+        if self._task is not None and not self._task.done():
+            return
+        if self.ready and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        self._task = asyncio.create_task(self._run_refresh())
+
+    async def _run_refresh(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Suggestion trie refresh failed: {e}")
+
+    @staticmethod
+    def _merge(groups: Iterable[List[dict]], key: str, exclude: Set, limit: int) -> List[dict]:
+        merged, seen = [], set()
+        for rows in groups:
+            for row in rows:
+                if row[key] in seen or row[key] in exclude:
+                    continue
+                seen.add(row[key])
+                merged.append(row)
+                if len(merged) == limit:
+                    return merged
+        return merged
+
+    async def users(self, prefix: str, limit: int = 5, exclude_ids: Iterable[int] = ()) -> List[dict]:
+        """Up to limit user rows (id, username, full_name, profile_photo_url) for prefix"""
+        self._schedule_refresh()
+        prefix = prefix.strip().lower()[:MAX_PREFIX_LENGTH]
+        exclude = set(exclude_ids)
+        popular = self._users.lookup(prefix) if self._users else []
+        found = self._merge([popular], "id", exclude, limit)
+        if len(found) == limit:
+            self.trie_answers += 1
+            return found
+
+        cached = self.cache.get("user", prefix, self.fanout, _user_matches)
+        if cached is None:
+            self.db_lookups += 1
+            cached = await db_postgres.suggest_users(prefix, [], self.fanout)
+            self.cache.put("user", prefix, cached)
+        found = self._merge([popular, cached], "id", exclude, limit)
+        if len(found) == limit or len(cached) < self.fanout:
+            return found
+
+        # The viewer blocked enough of the shared results - ask again with their exclusions
+        self.db_lookups += 1
+        rows = await db_postgres.suggest_users(prefix, list(exclude), limit)
+        return self._merge([found, rows], "id", exclude, limit)
+
+    async def hashtags(self, prefix: str, limit: int = 5) -> List[dict]:
+        """Up to limit hashtag rows (tag, post_count) for prefix, most used first"""
+        self._schedule_refresh()
+        prefix = prefix.strip().lower()[:MAX_PREFIX_LENGTH]
+        popular = self._tags.lookup(prefix) if self._tags else []
+        if len(popular) >= limit:
+            self.trie_answers += 1
+            return popular[:limit]
+
+        cached = self.cache.get("tag", prefix, self.fanout, _tag_matches)
+        if cached is None:
+            self.db_lookups += 1
+            cached = await db_postgres.suggest_hashtags(prefix, self.fanout)
+            self.cache.put("tag", prefix, cached)
+        return self._merge([popular, cached], "tag", set(), limit)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "user_keys": self._users.size if self._users else 0,
+            "tags": self._tags.size if self._tags else 0,
+            "cached_prefixes": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "trie_answers": self.trie_answers,
+            "db_lookups": self.db_lookups,
+        }
+
+
+async def record_hashtags(old_caption: Optional[str], new_caption: Optional[str]):
+    """Keep webapp_hashtags counts in step with a caption change (None = post absent)"""
+    old_tags, new_tags = set(extract_hashtags(old_caption)), set(extract_hashtags(new_caption))
+    try:
+        await db_postgres.bump_hashtags(sorted(new_tags - old_tags), 1)
+        await db_postgres.bump_hashtags(sorted(old_tags - new_tags), -1)
+    except Exception as e:
+        logger.error(f"Failed to update hashtag counts: {e}")
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,174 @@
+"""
+Per-Request SQL Tracing
+Counts queries, DB time and repeated statement shapes per request to surface N+1 patterns
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import db_postgres
+
+logger = logging.getLogger(__name__)
+
+# Flag a request that runs more than this many queries
+QUERY_COUNT_THRESHOLD = int(os.getenv("SQL_TRACE_QUERY_THRESHOLD", "20"))
+# Flag a statement shape executed at least this many times in one request (N+1)
+REPEAT_THRESHOLD = int(os.getenv("SQL_TRACE_REPEAT_THRESHOLD", "5"))
+# Flag a request whose total DB time exceeds this many milliseconds
+SLOW_DB_MS = float(os.getenv("SQL_TRACE_SLOW_DB_MS", "250"))
+# Add X-DB-* headers to every response (debug only - leaks query counts)
+DEBUG_HEADERS = os.getenv("SQL_TRACE_DEBUG_HEADERS", "0") == "1"
+# Flagged requests kept for /api/admin/slow-requests
+BUFFER_SIZE = int(os.getenv("SQL_TRACE_BUFFER_SIZE", "200"))
+# Slowest statements kept per request
+SLOWEST_KEPT = 5
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("sql_trace", default=None)
+slow_requests: deque = deque(maxlen=BUFFER_SIZE)
+
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PARAM_RE = re.compile(r"\$\d+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(query: str) -> str:
+    """Normalize a statement so calls differing only in parameters compare equal"""
+    shape = _STRING_RE.sub("?", query)
+    shape = _PARAM_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _PLACEHOLDER_LIST_RE.sub("(?+)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class RequestTrace:
+    """Query statistics collected for a single HTTP request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.shapes: Dict[str, List[float]] = {}
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, query: str, elapsed: float):
+        self.query_count += 1
+        self.db_time += elapsed
+        shape = statement_shape(query)
+        entry = self.shapes.setdefault(shape, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        self.slowest.append((elapsed, shape))
+        if len(self.slowest) > SLOWEST_KEPT:
+            self.slowest.sort(reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self) -> List[Dict]:
+        """Statement shapes executed often enough to look like an N+1 loop"""
+        repeats = [
+            {"statement": shape, "count": count, "total_ms": round(total * 1000, 2)}
+            for shape, (count, total) in self.shapes.items()
+            if count >= REPEAT_THRESHOLD
+        ]
+        return sorted(repeats, key=lambda r: r["count"], reverse=True)
+
+    def is_flagged(self) -> bool:
+        return (
+            self.query_count > QUERY_COUNT_THRESHOLD
+            or self.db_time * 1000 > SLOW_DB_MS
+            or bool(self.repeated())
+        )
+
+    def summary(self, status: Optional[int] = None) -> Dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "timestamp": time.time(),
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "query_count": self.query_count,
+            "db_time_ms": round(self.db_time * 1000, 2),
+            "slowest": [
+                {"statement": shape, "ms": round(elapsed * 1000, 2)}
+                for elapsed, shape in sorted(self.slowest, reverse=True)
+            ],
+            "repeated": self.repeated(),
+        }
+
+
+def _observe_query(query: str, elapsed: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(query, elapsed)
+
+
+def route_path(scope) -> str:
+    """
+    Route template the request matched (/api/users/{user_id}), never the
+    concrete path - those can carry emails and tokens
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def get_slow_requests(limit: int = 50) -> List[Dict]:
+    """Most recent flagged requests, newest first"""
+    return list(reversed(slow_requests))[:limit]
+
+
+class SQLTraceMiddleware:
+    """Pure ASGI middleware that attaches a RequestTrace to each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+        db_postgres.add_query_observer(_observe_query)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # path is replaced by the route template once routing has run
+        trace = RequestTrace(scope.get("method", ""), "")
+        token = _current_trace.set(trace)
+        status = {"code": None}
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message.get("status")
+                if DEBUG_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(trace.query_count).encode()))
+                    headers.append((b"x-db-time-ms", f"{trace.db_time * 1000:.2f}".encode()))
+                    headers.append((b"x-db-repeated-statements", str(len(trace.repeated())).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_trace.reset(token)
+            trace.path = route_path(scope)
+            if trace.is_flagged():
+                summary = trace.summary(status["code"])
+                slow_requests.append(summary)
+                logger.warning("sql_trace %s", json.dumps({
+                    "event": "sql_trace_flagged",
+                    "method": summary["method"],
+                    "path": summary["path"],
+                    "status": summary["status"],
+                    "query_count": summary["query_count"],
+                    "db_time_ms": summary["db_time_ms"],
+                    "repeated": [
+                        {"count": r["count"], "statement": r["statement"][:200]}
+                        for r in summary["repeated"][:3]
+                    ],
+                }))
@@ -0,0 +1,155 @@
+"""
+Home Timeline
+Fan-out-on-write feed: post ids pushed to followers' webapp_timeline rows, read back as one keyset page
+(topped up with global posts once the timeline runs out)
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import db_postgres
+
+logger = logging.getLogger(__name__)
+
+# A user's rows are trimmed back to TIMELINE_MAX_ENTRIES after this many pushes
+TIMELINE_TRIM_EVERY = int(os.getenv("TIMELINE_TRIM_EVERY", "50"))
+# Users trimmed per statement
+TIMELINE_TRIM_BATCH = 500
+
+
+# Cursor prefix for feed pages past the end of the timeline (global posts)
+DISCOVER_CURSOR_PREFIX = "discover:"
+
+
+def encode_cursor(entry: Dict[str, Any]) -> str:
+    """Keyset cursor for the page after entry: '<created_at iso>|<post id>'"""
+    return f"{entry['created_at'].isoformat()}|{entry['post_id']}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    created_at, _, post_id = cursor.rpartition("|")
+    try:
+        return datetime.fromisoformat(created_at), int(post_id)
+    except ValueError:
+        raise ValueError(f"Invalid timeline cursor: {cursor}")
+
+
+class HomeTimeline:
+    """
+    Pushes new posts to follower timelines off the request path and keeps each
+    timeline bounded. Pushes per user are counted in process; a user is trimmed
+    once they have received TIMELINE_TRIM_EVERY posts since their last trim.
+    """
+
+    def __init__(self, trim_every: int = TIMELINE_TRIM_EVERY):
+        self.trim_every = trim_every
+        self._pushes_since_trim: Dict[int, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.fanouts = 0
+        self.rows_pushed = 0
+        self.rows_trimmed = 0
+        self.rows_purged = 0
+        self.failures = 0
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def fan_out(self, post_id: int) -> List[int]:
+        try:
+            recipients = await db_postgres.fan_out_post(post_id)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Timeline fan-out failed for post {post_id}: {e}")
+            return []
+        self.fanouts += 1
+        self.rows_pushed += len(recipients)
+        due = []
+        for user_id in recipients:
+            pushes = self._pushes_since_trim.get(user_id, 0) + 1
+            if pushes >= self.trim_every:
+                due.append(user_id)
+                self._pushes_since_trim.pop(user_id, None)
+            else:
+                self._pushes_since_trim[user_id] = pushes
+        for start in range(0, len(due), TIMELINE_TRIM_BATCH):
+            await self.trim(due[start:start + TIMELINE_TRIM_BATCH])
+        return recipients
+
+    def post_created(self, post_id: Optional[int]):
+        """Schedule fan-out for a new (or unarchived) post"""
+        if isinstance(post_id, int):
+            self._spawn(self.fan_out(post_id))
+
+    async def trim(self, user_ids: List[int]) -> int:
+        try:
+            trimmed = await db_postgres.trim_timelines(user_ids, db_postgres.TIMELINE_MAX_ENTRIES)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Timeline trim failed for {len(user_ids)} users: {e}")
+            return 0
+        self.rows_trimmed += trimmed
+        return trimmed
+
+    async def post_removed(self, post_id: Any):
+        """Purge an archived or removed post from every timeline"""
+        if not isinstance(post_id, int):
+            return
+        try:
+            self.rows_purged += await db_postgres.remove_post_from_timelines(post_id)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Timeline purge failed for post {post_id}: {e}")
+
+    async def page(self, user_id: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[int], Optional[str]]:
+        """Post ids of one feed page, newest first, and the cursor for the next page"""
+        entries = await db_postgres.get_timeline(user_id, limit, decode_cursor(cursor))
+        next_cursor = encode_cursor(entries[-1]) if len(entries) == limit else None
+        return [entry["post_id"] for entry in entries], next_cursor
+
+    async def feed_page(self, user_id: int, limit: int, cursor: Optional[str] = None,
+                        exclude_user_ids: Sequence[int] = ()) -> Tuple[List[int], Optional[str]]:
+        """
+        Timeline page, topped up with recent posts from everyone else once the
+        timeline runs out (new users, users who follow few people). Pages past
+        that point carry a discover: cursor and read only the global posts.
+        """
+        if cursor and cursor.startswith(DISCOVER_CURSOR_PREFIX):
+            post_ids, next_cursor = [], None
+            before = decode_cursor(cursor[len(DISCOVER_CURSOR_PREFIX):])
+        else:
+            post_ids, next_cursor = await self.page(user_id, limit, cursor)
+            before = None
+        if next_cursor is not None:
+            return post_ids, next_cursor
+        room = limit - len(post_ids)
+        entries = await db_postgres.get_discovery_posts(user_id, room, before, exclude_user_ids) if room else []
+        if entries and len(entries) == room:
+            next_cursor = DISCOVER_CURSOR_PREFIX + encode_cursor(entries[-1])
+        return post_ids + [entry["post_id"] for entry in entries], next_cursor
+
+    async def drain(self):
+        """Wait for scheduled fan-outs (shutdown and tests)"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fanouts": self.fanouts,
+            "rows_pushed": self.rows_pushed,
+            "rows_trimmed": self.rows_trimmed,
+            "rows_purged": self.rows_purged,
+            "failures": self.failures,
+            "pending_fanouts": len(self._tasks),
+            "max_entries": db_postgres.TIMELINE_MAX_ENTRIES,
+            "fanout_max_followers": db_postgres.TIMELINE_FANOUT_MAX_FOLLOWERS,
+        }
+
+
+home_timeline = HomeTimeline()
@@ -0,0 +1,176 @@
+"""
+Taken-Username Bloom Filter
+Answers "definitely free" for most availability probes without a database round trip
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Set
+
+import db_postgres
+
+logger = logging.getLogger(__name__)
+
+USERNAME_FILTER_CAPACITY = int(os.getenv("USERNAME_FILTER_CAPACITY", "2000000"))
+USERNAME_FILTER_ERROR_RATE = float(os.getenv("USERNAME_FILTER_ERROR_RATE", "0.01"))
+# New registrations / renames from other workers are pulled in this often
+USERNAME_FILTER_REFRESH_SECONDS = float(os.getenv("USERNAME_FILTER_REFRESH_SECONDS", "30"))
+LOAD_BATCH_SIZE = 50_000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class UsernameFilter:
+    """
+    Bloom filter of every taken username (lower-cased).
+
+    A miss means the name is free; a hit still goes to the database because
+    of false positives and renamed-away names. The filter is built lazily in
+    the background on first use, so lookups fall through to the database
+    until it is ready. The unique index on lower(username) remains the
+    authority at registration time.
+    """
+
+    def __init__(self, capacity: int = USERNAME_FILTER_CAPACITY,
+                 error_rate: float = USERNAME_FILTER_ERROR_RATE,
+                 refresh_seconds: float = USERNAME_FILTER_REFRESH_SECONDS):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._bloom: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._last_change: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.skipped_lookups = 0
+        self.db_lookups = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def add(self, username: Optional[str]):
+        """Record a newly registered or renamed username"""
+        if username and self._bloom is not None:
+            self._bloom.add(username.strip().lower())
+
+    def definitely_free(self, username: str) -> bool:
+        return self._bloom is not None and username.lower() not in self._bloom
+
+    def _absorb(self, bloom: BloomFilter, rows: List[dict]):
+        for row in rows:
+            bloom.add(row["username"])
+            self._last_id = max(self._last_id, row["id"])
+            changed = row.get("last_username_change")
+            if changed and (self._last_change is None or changed > self._last_change):
+                self._last_change = changed
+
+    async def rebuild(self):
+        """Load every username into a fresh filter (keyset pages on the background lane)"""
+        started = time.perf_counter()
+        capacity = self.capacity
+        if self._bloom is not None and self._bloom.count > self._bloom.capacity:
+            capacity = self._bloom.count * 2
+        bloom = BloomFilter(capacity, self.error_rate)
+        self._last_id, self._last_change = 0, None
+        while True:
+            rows = await db_postgres.get_usernames_page(self._last_id, LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            self._absorb(bloom, rows)
+        self._bloom = bloom
+        self._refreshed_at = time.monotonic()
+        logger.info(f"Username filter built: {bloom.count} names, {len(bloom._bits) // 1024} KiB "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    async def refresh(self):
+        """Pull registrations and renames made since the last load (e.g. by other workers)"""
+        if self._bloom is None or self._bloom.count > self._bloom.capacity:
+            await self.rebuild()
+            return
+        while True:
+            rows = await db_postgres.get_usernames_page(self._last_id, LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            self._absorb(self._bloom, rows)
+        if self._last_change is not None:
+            self._absorb(self._bloom, await db_postgres.get_usernames_changed_since(self._last_change))
+        self._refreshed_at = time.monotonic()
+
+    def _schedule_refresh(self):
+        if self._task is not None and not self._task.done():
+            return
+        if self.ready and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        self._task = asyncio.create_task(self._run_refresh())
+
+    async def _run_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Username filter refresh failed: {e}")
+
+    async def taken(self, usernames: List[str]) -> Set[str]:
+        """Lower-cased subset of usernames that are taken; one query for all filter hits"""
+        self._schedule_refresh()
+        candidates = list(dict.fromkeys(name.lower() for name in usernames))
+        to_check = [name for name in candidates if not self.definitely_free(name)]
+        self.skipped_lookups += len(candidates) - len(to_check)
+        if not to_check:
+            return set()
+        self.db_lookups += 1
+        taken = await db_postgres.taken_usernames(to_check)
+        for name in taken:
+            self.add(name)
+        return taken
+
+    async def first_free(self, base: str, start: int = 0, batch: int = 10) -> str:
+        """base, or base1, base2, ... - the first name free regardless of case, checked a batch at a time"""
+        while True:
+            candidates = [base if n == 0 else f"{base}{n}" for n in range(start, start + batch)]
+            taken = await self.taken(candidates)
+            for name in candidates:
+                if name.lower() not in taken:
+                    return name
+            start += batch
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "names": self._bloom.count if self._bloom else 0,
+            "bytes": len(self._bloom._bits) if self._bloom else 0,
+            "skipped_lookups": self.skipped_lookups,
+            "db_lookups": self.db_lookups,
+        }
+
+
+username_filter = UsernameFilter()
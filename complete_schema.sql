@@ -53,6 +53,8 @@ CREATE TABLE IF NOT EXISTS webapp_users (
     interests JSONB DEFAULT '[]',
     personality_answers JSONB DEFAULT '{}',
     last_username_change TIMESTAMP,
+    followers_count INTEGER NOT NULL DEFAULT 0,
+    following_count INTEGER NOT NULL DEFAULT 0,
     is_online BOOLEAN DEFAULT TRUE,
     last_seen TIMESTAMP DEFAULT NOW(),
     created_at TIMESTAMP DEFAULT NOW(),
@@ -61,6 +63,10 @@ CREATE TABLE IF NOT EXISTS webapp_users (
 
 -- Indexes for webapp_users
 CREATE INDEX IF NOT EXISTS idx_users_username ON webapp_users(username);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_lower ON webapp_users(lower(username));
+CREATE INDEX IF NOT EXISTS idx_users_last_username_change ON webapp_users(last_username_change) WHERE last_username_change IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_users_username_prefix ON webapp_users(lower(username) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_full_name_prefix ON webapp_users(lower(full_name) text_pattern_ops);
 CREATE INDEX IF NOT EXISTS idx_users_email ON webapp_users(email);
 CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON webapp_users(telegram_id);
 CREATE INDEX IF NOT EXISTS idx_users_is_premium ON webapp_users(is_premium);
@@ -80,6 +86,17 @@ CREATE TABLE IF NOT EXISTS webapp_posts (
 
 CREATE INDEX IF NOT EXISTS idx_posts_user_id ON webapp_posts(user_id);
 CREATE INDEX IF NOT EXISTS idx_posts_created_at ON webapp_posts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_user_created ON webapp_posts(user_id, created_at DESC);
+
+-- Hashtag frequency table (search suggestions)
+CREATE TABLE IF NOT EXISTS webapp_hashtags (
+    tag TEXT PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_hashtags_tag_prefix ON webapp_hashtags(tag text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_hashtags_post_count ON webapp_hashtags(post_count DESC) WHERE post_count > 0;
 
 -- Stories table
 CREATE TABLE IF NOT EXISTS webapp_stories (
@@ -118,13 +135,26 @@ CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON webapp_notifications(
 CREATE TABLE IF NOT EXISTS webapp_follows (
     follower_id INTEGER REFERENCES webapp_users(id) ON DELETE CASCADE,
     following_id INTEGER REFERENCES webapp_users(id) ON DELETE CASCADE,
-    status VARCHAR(20) DEFAULT 'accepted',
+    status VARCHAR(20) NOT NULL DEFAULT 'accepted' CHECK (status IN ('pending', 'accepted')),
     created_at TIMESTAMP DEFAULT NOW(),
     PRIMARY KEY (follower_id, following_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_follows_follower ON webapp_follows(follower_id);
 CREATE INDEX IF NOT EXISTS idx_follows_following ON webapp_follows(following_id);
+CREATE INDEX IF NOT EXISTS idx_follows_following_status ON webapp_follows(following_id, status);
+
+-- Home timeline (post ids pushed to followers on create, see db_postgres.fan_out_post)
+CREATE TABLE IF NOT EXISTS webapp_timeline (
+    user_id INTEGER NOT NULL REFERENCES webapp_users(id) ON DELETE CASCADE,
+    post_id INTEGER NOT NULL REFERENCES webapp_posts(id) ON DELETE CASCADE,
+    author_id INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, post_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_timeline_user_created ON webapp_timeline(user_id, created_at DESC, post_id DESC);
+CREATE INDEX IF NOT EXISTS idx_timeline_post ON webapp_timeline(post_id);
 
 -- Likes table
 CREATE TABLE IF NOT EXISTS webapp_likes (
@@ -188,15 +218,20 @@ CREATE TABLE IF NOT EXISTS webapp_verification_codes (
     email VARCHAR(255),
     mobile VARCHAR(20),
     telegram_id BIGINT,
-    code VARCHAR(10) NOT NULL,
+    code VARCHAR(10),
+    code_hash VARCHAR(64),
+    ip_address VARCHAR(45),
     created_at TIMESTAMP DEFAULT NOW(),
     expires_at TIMESTAMP DEFAULT NOW() + INTERVAL '10 minutes',
+    consumed_at TIMESTAMP,
     attempts INTEGER DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_verification_email ON webapp_verification_codes(email);
 CREATE INDEX IF NOT EXISTS idx_verification_mobile ON webapp_verification_codes(mobile);
 CREATE INDEX IF NOT EXISTS idx_verification_telegram ON webapp_verification_codes(telegram_id);
+CREATE INDEX IF NOT EXISTS idx_verification_ip_created ON webapp_verification_codes(ip_address, created_at) WHERE ip_address IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_verification_expires_at ON webapp_verification_codes(expires_at);
 
 -- Hidden story users table
 CREATE TABLE IF NOT EXISTS webapp_hidden_story_users (
@@ -4,6 +4,8 @@ from __future__ import annotations
 from typing import List, Optional, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+from utils.user_snapshot import invalidate_user
+
 # --- Admin IDs ---
 ADMIN_IDS = {1437934486, 647778438}
 
@@ -109,6 +111,7 @@ def set_premium(tg_id: int, value: bool) -> None:
             SET is_premium = FALSE,
                 premium_until = NULL;
         """, (tg_id,))
+    invalidate_user(tg_id)
 
 def user_info(tg_id: int) -> Optional[dict]:
     row = q_one("""SELECT tg_user_id, gender, age, country, city, language,
@@ -155,6 +158,7 @@ def reset_user_metrics(tg_id: int) -> None:
     # wipe ratings and reports logs
     q_exec("DELETE FROM chat_ratings WHERE rater_id=%s OR ratee_id=%s;", (tg_id, tg_id))
     q_exec("DELETE FROM reports WHERE reported_user_id=%s OR reporter_user_id=%s;", (tg_id, tg_id))
+    invalidate_user(tg_id)
 
 def runtime_counts() -> Tuple[int, int]:
     active = waiting = 0
@@ -11,11 +11,10 @@ import asyncio
 import logging
 import random
 import re
-from collections import deque
 from typing import Set
 
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 
 from telegram import (
     Update,
@@ -41,42 +40,32 @@ from utils.display import safe_display_name
 from utils.cb import cb_match, CBError
 from utils.input_validation import validate_and_sanitize_input
 from handlers.text_framework import FEATURE_KEY, MODE_KEY
+from utils.matchmaking import MatchIndex, MatchProfile
+from utils.user_snapshot import user_snapshots
+from utils import db_repo
+from utils.counter_buffer import chat_counters, friendship_interactions
+from utils.send_scheduler import Priority, outbound
+from utils.timers import delete_message_later, timers
+from utils.chat_state import chat_state
+from utils.match_backend import IN_CHAT, MATCH_BACKEND, SEARCHING, create_backend
 
 log = logging.getLogger("luvbot.chat")
 
 # Enhanced send wrapper with rate limiting and network resilience  
-async def send_safe(bot, *args, **kwargs):
-    from telegram.error import TimedOut, NetworkError, RetryAfter
-    from utils.rate_limiter import allow_send
-    import asyncio, random
-    
-    # Extract user_id for rate limiting (from chat_id or first positional arg)
-    user_id = kwargs.get('chat_id') or (args[0] if args else None)
-    
-    # Apply rate limiting if user_id available
-    if user_id and not allow_send(user_id):
-        log.warning(f"Rate limit prevented send to user {user_id}")
-        return None  # Silently drop rate-limited messages
-    
-    # Retry with exponential backoff and jitter
-    for attempt in range(3):
-        try:
-            return await bot.send_message(*args, **kwargs)
-        except RetryAfter as e:
-            # Telegram flood control - respect the retry_after
-            log.warning(f"FloodWait: sleeping {e.retry_after}s for user {user_id}")
-            await asyncio.sleep(e.retry_after + 0.5)
-        except (TimedOut, NetworkError) as e:
-            # Transient network errors - retry with backoff
-            delay = 0.5 * (attempt + 1) + random.random() / 3
-            log.warning(f"Network error on attempt {attempt+1}: {e}, retrying in {delay:.1f}s")
-            await asyncio.sleep(delay)
-    
-    # Final attempt (let it raise if still failing)
-    try:
+async def send_safe(bot, *args, priority: Priority = Priority.NUDGE, **kwargs):
+    """
+    bot.send_message through the outbound scheduler: waits its turn under the
+    per-chat / global limits instead of being dropped, and FloodWait pauses
+    every send rather than just this handler. Returns None only when the
+    scheduler's bounded queue refused the message (counted in outbound.stats()).
+    """
+    chat_id = kwargs.get('chat_id') or (args[0] if args else None)
+    if chat_id is None:
         return await bot.send_message(*args, **kwargs)
+    try:
+        return await outbound.call(chat_id, lambda: bot.send_message(*args, **kwargs), priority)
     except Exception as e:
-        log.error(f"send_safe final failure for user {user_id}: {e}")
+        log.error(f"send_safe final failure for user {chat_id}: {e}")
         raise
 
 # exact button texts (reply keyboard) ko skip karne ke liye
@@ -99,46 +88,79 @@ def _check_content_moderation(text: str, user_id: int) -> dict:
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
 FAST_INTRO = os.getenv("FAST_INTRO", "0") == "1"  # set FAST_INTRO=1 for instant first message
 
+# Runtime state is held in utils.chat_state maps: entries idle this long are evicted
+PAIR_IDLE_TTL = float(os.getenv("CHAT_PAIR_IDLE_TTL", str(24 * 3600)))      # pairs, secret sessions
+PREF_IDLE_TTL = float(os.getenv("CHAT_PREF_IDLE_TTL", str(7 * 24 * 3600)))  # last mode / city
+STATE_MAX_USERS = int(os.getenv("CHAT_STATE_MAX_USERS", "100000"))          # LRU cap for cache-like maps
+
 # ------------------------------------------------------------------------------
 # Runtime state (search queue + active pairs)
 # ------------------------------------------------------------------------------
 
-queue: deque[int] = deque()
+# Waiting users, bucketed by profile snapshot (see utils.matchmaking)
+queue = MatchIndex()
 queue_lock = asyncio.Lock()
-peers: dict[int, int] = {}
+
+def _evict_other_side(state_name: str):
+    """on_evict for symmetric uid -> uid maps: an idle pair goes as a whole"""
+    def on_evict(uid: int, other: int):
+        state = chat_state.maps[state_name]
+        if state.peek(other) == uid:
+            state.pop(other, None)
+    return on_evict
+
+peers = chat_state.map("peers", idle_ttl=PAIR_IDLE_TTL, on_evict=_evict_other_side("peers"))
+
+# Queue/pair mutations go through the backend (MATCH_BACKEND=memory|postgres);
+# peers above is the local view it keeps in sync
+match_backend = create_backend(MATCH_BACKEND, queue, peers, queue_lock)
+if match_backend.name == "postgres":
+    # peers mirrors chat_pairs, which every worker shares: only an ended pair
+    # (end_pair/release_pair + NOTIFY) may drop it, never a local idle sweep
+    peers.idle_ttl = None
 
 # uid -> target_uid (mutual rematch intent)
-REMATCH_TARGET: dict[int, int] = {}
+REMATCH_TARGET = chat_state.map("rematch_target", idle_ttl=PAIR_IDLE_TTL,
+                                on_evict=_evict_other_side("rematch_target"))
 
 def in_chat(user_id: int) -> bool:
     return user_id in peers
 
 def partner_of(user_id: int) -> int | None:
-    return peers.get(user_id)
+    partner = peers.get(user_id)
+    if partner is not None:
+        # activity from either side keeps the pair from idling out
+        peers.touch(partner)
+    return partner
 
 # --- Secret Chat runtime state -----------------------------------------------
 import datetime
 
+def _evict_secret_partner(uid: int, session: dict):
+    """on_evict for secret_sessions: the partner's half of an idle session goes too"""
+    partner = session.get("partner")
+    other = secret_sessions.peek(partner)
+    if other is not None and other.get("partner") == uid:
+        secret_sessions.pop(partner, None)
+
 # uid -> {"partner": int, "expires_at": datetime, "ttl": int, "inviter": int}
-secret_sessions: dict[int, dict] = {}
+secret_sessions = chat_state.map("secret_sessions", idle_ttl=PAIR_IDLE_TTL, on_evict=_evict_secret_partner)
 
 # (uid, sender_msg_id) -> stored media awaiting approval
-pending_secret_media: dict[tuple[int, int], dict] = {}
+pending_secret_media = chat_state.map("pending_secret_media", idle_ttl=3600, max_entries=STATE_MAX_USERS)
 
-# Boost cooldown tracking
-_last_boost_at: dict[int, float] = {}
+# Boost cooldown tracking (5 min cooldown, so older entries are meaningless)
+_last_boost_at = chat_state.map("last_boost_at", idle_ttl=300, max_entries=STATE_MAX_USERS)
 
-def _seconds_until(dt: datetime.datetime) -> float:
-    """UTC aware seconds from now until dt (never negative)."""
-    now = datetime.datetime.utcnow()
-    return max(0.0, (dt - now).total_seconds())
+def _secret_timer_key(uid_a: int, uid_b: int) -> str:
+    return f"secret_end:{min(uid_a, uid_b)}:{max(uid_a, uid_b)}"
 
-async def _auto_end_secret(uid_a: int, uid_b: int, expires_at: datetime.datetime, app):
+async def _auto_end_secret(bot, payload: dict):
     """
-    Sleep until expiry, then end secret for both sides and notify.
+    utils.timers handler fired at expiry: end secret for both sides and notify.
     Safe if already ended manually (checks session state).
     """
-    await asyncio.sleep(_seconds_until(expires_at))
+    uid_a, uid_b = payload["a"], payload["b"]
 
     # both still in secret session and paired to each other?
     s_a = secret_sessions.get(uid_a)
@@ -155,17 +177,19 @@ async def _auto_end_secret(uid_a: int, uid_b: int, expires_at: datetime.datetime
     text = ("⏳ Secret Chat ended. Back to normal chat.\n"
             "🛡️ To report a user type /report")
     try:
-        await app.bot.send_message(uid_a, text)
+        await bot.send_message(uid_a, text)
     except Exception as e:
         log.warning(f"Failed to send secret end notification to {uid_a}: {e}")
     try:
-        await app.bot.send_message(uid_b, text)
+        await bot.send_message(uid_b, text)
     except Exception as e:
         log.warning(f"Failed to send secret end notification to {uid_b}: {e}")
 
+timers.register("secret_end", _auto_end_secret)
+
 # --- Last chat partner tracking (for post-chat reports) ---
 # uid -> {"partner": int, "in_secret": bool, "ts": datetime}
-last_chat_partner: dict[int, dict] = {}
+last_chat_partner = chat_state.map("last_chat_partner", idle_ttl=PAIR_IDLE_TTL, max_entries=STATE_MAX_USERS)
 
 def _remember_last_partner(a: int, b: int, in_secret: bool):
     now = datetime.datetime.utcnow()
@@ -175,14 +199,16 @@ def _remember_last_partner(a: int, b: int, in_secret: bool):
 # utility: auto delete after X sec
 async def send_and_delete(bot, chat_id, text, delay=5):
     msg = await bot.send_message(chat_id, text)
-    await asyncio.sleep(delay)
-    try:
-        await bot.delete_message(chat_id, msg.message_id)
-    except:
-        pass
+    delete_message_later(chat_id, msg.message_id, delay)
 
 # Invite composer state (choices before sending)
-pending_secret_invites: dict[int, dict] = {} # inviter_uid -> {"ttl": int|None, "dur": int|None}
+pending_secret_invites = chat_state.map("pending_secret_invites", idle_ttl=3600) # inviter_uid -> {"ttl": int|None, "dur": int|None}
+
+# State that spans a pair (or must survive a restart) lives in the backend too,
+# so every worker sees both halves; values are replaced, never mutated in place
+for _shared in (REMATCH_TARGET, secret_sessions, last_chat_partner, pending_secret_invites):
+    match_backend.share(_shared)
+match_backend.share(pending_secret_media, user_of=lambda key: key[0])
 
 def _secret_active(uid: int) -> bool:
     s = secret_sessions.get(uid)
@@ -204,10 +230,10 @@ def _secret_partner(uid: int) -> int | None:
 # Small Postgres connection pool (kills connect latency on Replit)
 # ------------------------------------------------------------------------------
 
-DB_POOL: SimpleConnectionPool | None = None
+DB_POOL: ThreadedConnectionPool | None = None
 if DATABASE_URL:
     try:
-        DB_POOL = SimpleConnectionPool(1, 5, dsn=DATABASE_URL, connect_timeout=3)
+        DB_POOL = ThreadedConnectionPool(1, 5, dsn=DATABASE_URL, connect_timeout=3)
     except Exception as e:
         DB_POOL = None
         log.warning(f"DB pool not created: {e}")
@@ -269,53 +295,34 @@ def init_db():
         log.error(f"❌ DB tables error: {e}")
 
 # ------------------------------------------------------------------------------
-# Metrics helpers (pooled; never block user-visible sends)
+# Metrics helpers (write-behind; flushed in batches by utils.counter_buffer)
 # ------------------------------------------------------------------------------
 
 def increment_sent(user_id: int):
-    _exec_noresult(
-        "UPDATE users SET messages_sent = COALESCE(messages_sent,0)+1 WHERE tg_user_id=%s",
-        (user_id,),
-    )
+    chat_counters.add(user_id, messages_sent=1)
 
 def increment_received(user_id: int):
-    _exec_noresult(
-        "UPDATE users SET messages_recv = COALESCE(messages_recv,0)+1 WHERE tg_user_id=%s",
-        (user_id,),
-    )
+    chat_counters.add(user_id, messages_recv=1)
 
 def increment_dialogs(user_id: int):
-    _exec_noresult(
-        "UPDATE users "
-        "SET dialogs_total = COALESCE(dialogs_total,0)+1, dialogs_today = COALESCE(dialogs_today,0)+1 "
-        "WHERE tg_user_id=%s",
-        (user_id,),
-    )
+    chat_counters.add(user_id, dialogs_total=1, dialogs_today=1)
 
 def bump_rating_counters(ratee_id: int, value: int):
     up = 1 if value > 0 else 0
     down = 1 if value < 0 else 0
     if not up and not down:
         return
-    _exec_noresult(
-        "UPDATE users "
-        "SET rating_up = COALESCE(rating_up,0)+%s, rating_down = COALESCE(rating_down,0)+%s "
-        "WHERE tg_user_id=%s",
-        (up, down, ratee_id),
-    )
+    chat_counters.add(ratee_id, rating_up=up, rating_down=down)
 
 def bump_report_counter(target_id: int):
-    _exec_noresult(
-        "UPDATE users SET report_count = COALESCE(report_count,0)+1 WHERE tg_user_id=%s",
-        (target_id,),
-    )
+    chat_counters.add(target_id, report_count=1)
 
 # ------------------------------------------------------------------------------
 # Menu deduplication helper
 # ------------------------------------------------------------------------------
 
 # --- de-duplicate "What would you like to do next?" across flows ---
-_last_menu_at: dict[int, float] = {}
+_last_menu_at = chat_state.map("last_menu_at", idle_ttl=600, max_entries=STATE_MAX_USERS)
 
 def _menu_recent(chat_id: int, ttl: float = 60.0) -> bool:
     """
@@ -560,20 +567,11 @@ async def _send_details_async(viewer_id: int, partner_id: int, context: ContextT
 # Internal helpers
 # ------------------------------------------------------------------------------
 
-async def _remove_from_queue(uid: int):
-    try:
-        queue.remove(uid)
-    except ValueError:
-        pass
-
 async def _end_pair(uid: int, context: ContextTypes.DEFAULT_TYPE, notify_partner=True):
-    async with queue_lock:
-        await _remove_from_queue(uid)
-        partner = peers.pop(uid, None)
-        if partner is not None:
-            peers.pop(partner, None)
-            # Remember last partner for post-chat reports
-            _remember_last_partner(uid, partner, bool(secret_sessions.get(uid)))
+    partner = await match_backend.end_pair(uid)
+    if partner is not None:
+        # Remember last partner for post-chat reports
+        _remember_last_partner(uid, partner, bool(secret_sessions.get(uid)))
     if partner and notify_partner:
         try:
             await context.bot.send_message(partner, "⚠️ Your partner left.")
@@ -589,8 +587,8 @@ MODE_RANDOM = "random"
 MODE_GIRLS  = "girls"
 MODE_BOYS   = "boys"
 MODE_CITY   = "city"
-_last_mode: dict[int, str] = {}
-_city_search: dict[int, str] = {}
+_last_mode = chat_state.map("last_mode", idle_ttl=PREF_IDLE_TTL, max_entries=STATE_MAX_USERS)
+_city_search = chat_state.map("city_search", idle_ttl=PREF_IDLE_TTL, max_entries=STATE_MAX_USERS)
 
 # --- NEW HELPERS: mutual preference checks ---
 def _user_mode(uid: int) -> str:
@@ -604,85 +602,122 @@ def _gender_of(uid: int) -> str:
     except Exception:
         return ""
 
-def _candidate_verified(uid: int) -> bool:
+async def _viewer_wants_verified_only(uid: int) -> bool:
     try:
-        p = reg.get_profile(uid) or {}
-        return bool(p.get("is_verified"))
-    except Exception:
-        return False
-
-def _viewer_wants_verified_only(uid: int) -> bool:
-    try:
-        return reg.get_match_verified_only(uid)
+        return await db_repo.get_match_verified_only(uid)
     except Exception:
         return False
 
-def _age_pref(uid: int) -> tuple[int, int]:
+async def _age_pref(uid: int) -> tuple[int, int]:
     try:
-        return reg.get_age_pref(uid)
+        return await db_repo.get_age_pref(uid)
     except Exception:
         return (18, 99)
 
-def _allows(viewer_id: int, cand_id: int) -> bool:
+async def _match_profile(uid: int) -> MatchProfile:
     """
-    Does *viewer* accept *candidate* based on viewer's mode and (if premium) age window?
+    Snapshot of what matching needs about uid. Hits the DB, so build it before
+    taking queue_lock; candidates are then checked against snapshots only.
     """
-    # sticky re-match bypass — if both want each other, bypass filters
-    if REMATCH_TARGET.get(viewer_id) == cand_id and REMATCH_TARGET.get(cand_id) == viewer_id:
-        return True
-
-    mode = _user_mode(viewer_id)
-
-    # city filter - match by active search OR profile city
-    if mode == MODE_CITY:
-        viewer_city = _city_search.get(viewer_id, "").strip().lower()
-        if not viewer_city:
-            return False
-            
-        cand_mode = _user_mode(cand_id)
-        
-        # Check if candidate is also searching for same city
-        if cand_mode == MODE_CITY:
-            cand_city = _city_search.get(cand_id, "").strip().lower()
-            if viewer_city != cand_city:
-                return False
-        else:
-            # Candidate not in city mode - check their profile city
-            cand_profile = reg.get_profile(cand_id) or {}
-            cand_profile_city = (cand_profile.get("city") or "").strip().lower()
-            if viewer_city != cand_profile_city:
-                return False
-
-    # gender filter from viewer mode (STRICT)
-    if mode in (MODE_GIRLS, MODE_BOYS):
-        need = "f" if mode == MODE_GIRLS else "m"
-        g = (reg.get_profile(cand_id) or {}).get("gender", "")
-        gkey = (g or "").strip().lower()[:1]
-        if gkey != need:
-            return False
-
-    # premium viewer age window
+    mode = _user_mode(uid)
     try:
-        if reg.has_active_premium(viewer_id):
-            lo, hi = _age_pref(viewer_id)
-            if (lo, hi) != (18, 99):
-                cp = reg.get_profile(cand_id) or {}
-                a = cp.get("age")
-                if a is None or not (int(lo) <= int(a) <= int(hi)):
-                    return False
+        p = await db_repo.get_profile(uid) or {}
+    except Exception:
+        p = {}
+    city = _city_search.get(uid, "") if mode == MODE_CITY else (p.get("city") or "")
+    age_window = None
+    try:
+        if await db_repo.has_active_premium(uid):
+            age_window = await _age_pref(uid)
     except Exception:
         # fail open if profile lookup fails
         pass
+    return MatchProfile(
+        uid,
+        mode=mode,
+        gender=p.get("gender") or "",
+        city=city,
+        age=p.get("age"),
+        verified=bool(p.get("is_verified")),
+        age_window=age_window,
+        verified_only=await _viewer_wants_verified_only(uid),
+    )
+
+_REMATCH_ICEBREAKERS = [
+    "Two truths and a lie?",
+    "Go-to comfort food?",
+    "Teleport once today — where?",
+    "What tiny thing made you smile this week?"
+]
+
+_MATCH_ICEBREAKERS = [
+    "🌅 If you could wake up anywhere tomorrow, where would your heart choose?",
+    "✨ What's one small moment today that made your soul sparkle?",
+    "🌙 Share a truth, a dream, and a beautiful lie about yourself...",
+    "💫 What's your secret comfort that makes everything feel magical?",
+    "🌹 If we met in a different universe, what do you think we'd be doing?",
+    "💭 What's a feeling you've never quite found the words for?",
+    "🎭 If you could whisper one secret to the stars, what would it be?",
+    "🌸 What's something that makes you feel alive and completely yourself?"
+]
+
+def _reset_menu_guard(a: int, b: int):
+    # reset menu guard for both sides for this new chat
+    _last_menu_at.pop(a, None)
+    _last_menu_at.pop(b, None)
+
+async def _announce_pair(a: int, b: int, context: ContextTypes.DEFAULT_TYPE, icebreakers: list[str],
+                         requeue: list[MatchProfile], how: str, rematch: bool = False) -> bool:
+    """
+    Unlocked half of pairing: build both intros and send them concurrently.
+    If neither user could be reached the pair is undone, the snapshots in requeue
+    go back to the front of the queue and a re-match intent is restored.
+    """
+    _reset_menu_guard(a, b)
+    ice = random.choice(icebreakers)
+    build = _intro_text_quick if FAST_INTRO else _intro_text_for
+    loop = asyncio.get_running_loop()
+
+    async def _intro(viewer: int, partner: int):
+        text = await loop.run_in_executor(None, build, viewer, partner, ice)
+        # hide bottom menu during chat
+        sent = await outbound.send_message(context.bot, viewer, text, priority=Priority.INTRO,
+                                           reply_markup=ReplyKeyboardRemove())
+        if sent is None:
+            raise RuntimeError("intro dropped by the send scheduler")
 
-    # Viewer wants only verified?
-    if _viewer_wants_verified_only(viewer_id) and not _candidate_verified(cand_id):
+    t0 = time.time()
+    # Load the pair's friendship now so the relay only ever reads it from the cache
+    results = await asyncio.gather(_intro(a, b), _intro(b, a), user_snapshots.awarm_friends(a, b),
+                                   return_exceptions=True)
+    results = results[:2]
+    failed = [r for r in results if isinstance(r, Exception)]
+
+    if len(failed) == len(results):
+        if await match_backend.release_pair(a, b, requeue) and rematch:
+            REMATCH_TARGET[a] = b
+            REMATCH_TARGET[b] = a
+        log.warning(f"Intro to {a} and {b} failed ({failed[0]!r}); pair rolled back")
         return False
+    for err in failed:
+        log.warning(f"Intro failed for pair {a} <-> {b}: {err!r}")
 
-    return True
+    log.info(f"Intro sent in {time.time() - t0:.3f}s")
+    log.info(f"Matched {a} <-> {b} ({how})")
 
-def _mutual_ok(a: int, b: int) -> bool:
-    """Both sides accept each other."""
-    return _allows(a, b) and _allows(b, a)
+    if FAST_INTRO:
+        # Enrich premium users later (gender/age/ratings/shared) without blocking
+        for viewer, partner in ((a, b), (b, a)):
+            try:
+                if await db_repo.has_active_premium(viewer):
+                    asyncio.create_task(_send_details_async(viewer, partner, context))
+            except Exception:
+                pass
+
+    # Bump dialog counters AFTER sending (buffered, no DB round-trip here)
+    increment_dialogs(a)
+    increment_dialogs(b)
+    return True
 
 async def start_search(update: Update, context: ContextTypes.DEFAULT_TYPE, mode: str | None = None):
     uid = update.effective_user.id
@@ -696,212 +731,75 @@ async def start_search(update: Update, context: ContextTypes.DEFAULT_TYPE, mode:
         _last_mode[uid] = mode
     mode = _last_mode.get(uid, MODE_RANDOM)
 
-    is_premium = reg.has_active_premium(uid)
+    me = await _match_profile(uid)
 
-    # Viewer age window 
-    min_age, max_age = reg.get_age_pref(uid)
-    has_custom_age = (min_age, max_age) != (18, 99)
-
-    def _ok(cand_id: int) -> bool:
-        """Whether candidate satisfies viewer filters."""
-        if mode == MODE_RANDOM:
-            return True
-        try:
-            cp = reg.get_profile(cand_id) or {}
-            
-            # City filter (MODE_CITY)
-            if mode == MODE_CITY:
-                search_city = _city_search.get(uid, "").strip().lower()
-                cand_city = (cp.get("city") or "").strip().lower()
-                if not search_city or not cand_city:
-                    return False
-                if search_city != cand_city:
-                    return False
-            
-            # Gender filter (MODE_GIRLS/BOYS)
-            if mode in (MODE_GIRLS, MODE_BOYS):
-                g = (cp.get("gender") or "").strip().lower()
-                gkey = g[0] if g else ""
-                need = "f" if mode == MODE_GIRLS else "m"
-                if gkey != need:
-                    return False
-            
-            # Age filter (premium only)
-            if is_premium and has_custom_age:
-                a = cp.get("age")
-                if a is None or not (min_age <= int(a) <= max_age):
-                    return False
-        except Exception:
-            return False
-        return True
-
-    async with queue_lock:
-        # Priority to sticky re-match target
-        target = REMATCH_TARGET.get(uid)
-        if target:
-            if target in queue and not in_chat(target):
-                # Directly match with the sticky target
-                queue.remove(target)
-                candidate_id = target
-                # Remove sticky mapping
-                REMATCH_TARGET.pop(uid, None)
-                REMATCH_TARGET.pop(target, None)
-
-                # Proceed with pairing logic
-                partner = candidate_id
-                peers[uid] = partner
-                peers[partner] = uid
-                _last_menu_at.pop(uid, None)
-                _last_menu_at.pop(partner, None)
-
-                ice = random.choice([
-                    "Two truths and a lie?",
-                    "Go-to comfort food?",
-                    "Teleport once today — where?",
-                    "What tiny thing made you smile this week?"
-                ])
-
-                t0 = time.time()
-                if FAST_INTRO:
-                    quick_u = _intro_text_quick(uid, partner, ice)
-                    quick_p = _intro_text_quick(partner, uid, ice)
-                    await context.bot.send_message(chat_id=uid, text=quick_u, reply_markup=ReplyKeyboardRemove())
-                    await context.bot.send_message(chat_id=partner, text=quick_p, reply_markup=ReplyKeyboardRemove())
-                    if reg.has_active_premium(uid): asyncio.create_task(_send_details_async(uid, partner, context))
-                    if reg.has_active_premium(partner): asyncio.create_task(_send_details_async(partner, uid, context))
-                else:
-                    txt_u1 = _intro_text_for(uid, partner, ice)
-                    txt_u2 = _intro_text_for(partner, uid, ice)
-                    for who, text in ((uid, txt_u1), (partner, txt_u2)):
-                        await context.bot.send_message(chat_id=who, text=text, reply_markup=ReplyKeyboardRemove())
-                log.info(f"Intro sent in {time.time() - t0:.3f}s")
-                log.info(f"Matched {uid} <-> {partner} (sticky re-match)")
-
-                async def _bump_dialogs_async(a: int, b: int):
-                    loop = asyncio.get_running_loop()
-                    await loop.run_in_executor(None, increment_dialogs, a)
-                    await loop.run_in_executor(None, increment_dialogs, b)
-                asyncio.create_task(_bump_dialogs_async(uid, partner))
-                return # Early return after sticky match
-
-
-        # If no sticky target or target not in queue, proceed with normal queue scan
-        if uid in queue:
-            # For city mode, allow user to change cities by removing from queue and re-searching
-            if mode == MODE_CITY:
-                queue.remove(uid)
-                # Continue to search with the new city (don't return here)
-            else:
-                await send_safe(context.bot, chat_id=uid, text="🔎 Still searching…")
-                return
-
-        partner = None
-        qn = len(queue)
-        for _ in range(qn):
-            cand = queue.popleft()
-            if cand == uid or cand in peers:
-                continue
-            if _mutual_ok(uid, cand):
-                partner = cand
-                break
-            queue.append(cand)
-
-        if partner is None:
-            queue.append(uid)
-            if mode == MODE_CITY:
-                city_name = _city_search.get(uid, "your city")
-                msg = f"🏙️ No one from {city_name} is online right now.\n\n💡 Try again later or use regular matching!\n\n🔄 Type another city name to search:"
-                
-                # Re-enable city input state so user can type another city without clicking button again
-                from handlers.text_framework import set_state
-                set_state(context, "city_match", "input_city", ttl_minutes=5)
-            elif mode == MODE_GIRLS:
-                msg = "🔎 Finding a girl partner soon...\nIf the search takes too long, try changing your settings (/settings)."
-            elif mode == MODE_BOYS:
-                msg = "🔎 Finding a boy partner soon...\nIf the search takes too long, try changing your settings (/settings)."
-            else:
-                msg = "💫🔮 Seeking your mysterious soulmate... 🔮💫"
-            await send_safe(context.bot, chat_id=uid, text=msg)
-            log.info(f"{uid} queued (mode={mode}, age={min_age}-{max_age})")
+    # Priority to sticky re-match target
+    target = REMATCH_TARGET.get(uid)
+    if target and not in_chat(target):
+        removed = await match_backend.claim_target(uid, target)
+        if removed is not None:
+            # Directly matched with the sticky target; remove sticky mapping
+            REMATCH_TARGET.pop(uid, None)
+            REMATCH_TARGET.pop(target, None)
+            await _announce_pair(uid, target, context, _REMATCH_ICEBREAKERS, removed + [me],
+                                 "sticky re-match", rematch=True)
             return
 
-        peers[uid] = partner
-        peers[partner] = uid
-
-        # reset menu guard for both sides for this new chat
-        _last_menu_at.pop(uid, None)
-        _last_menu_at.pop(partner, None)
-
-    # Announce match to both; hide bottom menu while chatting
-    ice = random.choice([
-        "🌅 If you could wake up anywhere tomorrow, where would your heart choose?",
-        "✨ What's one small moment today that made your soul sparkle?",
-        "🌙 Share a truth, a dream, and a beautiful lie about yourself...",
-        "💫 What's your secret comfort that makes everything feel magical?",
-        "🌹 If we met in a different universe, what do you think we'd be doing?",
-        "💭 What's a feeling you've never quite found the words for?",
-        "🎭 If you could whisper one secret to the stars, what would it be?",
-        "🌸 What's something that makes you feel alive and completely yourself?"
-    ])
-
-    t0 = time.time()
-
-    if FAST_INTRO:
-        # Send per-viewer quick intro (includes Verified for everyone)
-        quick_u = _intro_text_quick(uid, partner, ice)
-        quick_p = _intro_text_quick(partner, uid, ice)
-        await context.bot.send_message(chat_id=uid,     text=quick_u, reply_markup=ReplyKeyboardRemove())
-        await context.bot.send_message(chat_id=partner, text=quick_p, reply_markup=ReplyKeyboardRemove())
+    # No sticky target (or target not waiting): normal queue scan.
+    # For city mode, allow user to change cities by leaving the queue and re-searching
+    status, cand, removed = await match_backend.search(me, keep_place=mode != MODE_CITY)
 
-        # Enrich premium users later (gender/age/ratings/shared) without blocking
-        if reg.has_active_premium(uid):
-            asyncio.create_task(_send_details_async(uid, partner, context))
-        if reg.has_active_premium(partner):
-            asyncio.create_task(_send_details_async(partner, uid, context))
-    else:
-        # Rich intro path (with DB)
-        txt_u1 = _intro_text_for(uid, partner, ice)
-        txt_u2 = _intro_text_for(partner, uid, ice)
-        for who, text in ((uid, txt_u1), (partner, txt_u2)):
-            await context.bot.send_message(
-                chat_id=who,
-                text=text,
-                reply_markup=ReplyKeyboardRemove(),  # hide bottom menu during chat
-            )
+    if status == SEARCHING:
+        await send_safe(context.bot, chat_id=uid, text="🔎 Still searching…")
+        return
+    if status == IN_CHAT:
+        await send_safe(context.bot, chat_id=uid, text="You're in a chat. Use /next or /stop first.")
+        return
 
-    log.info(f"Intro sent in {time.time() - t0:.3f}s")
-    log.info(f"Matched {uid} <-> {partner} (mode={mode})")
+    if cand is None:
+        if mode == MODE_CITY:
+            city_name = _city_search.get(uid, "your city")
+            msg = f"🏙️ No one from {city_name} is online right now.\n\n💡 Try again later or use regular matching!\n\n🔄 Type another city name to search:"
+            
+            # Re-enable city input state so user can type another city without clicking button again
+            from handlers.text_framework import set_state
+            set_state(context, "city_match", "input_city", ttl_minutes=5)
+        elif mode == MODE_GIRLS:
+            msg = "🔎 Finding a girl partner soon...\nIf the search takes too long, try changing your settings (/settings)."
+        elif mode == MODE_BOYS:
+            msg = "🔎 Finding a boy partner soon...\nIf the search takes too long, try changing your settings (/settings)."
+        else:
+            msg = "💫🔮 Seeking your mysterious soulmate... 🔮💫"
+        await send_safe(context.bot, chat_id=uid, text=msg)
+        log.info(f"{uid} queued (mode={mode}, age={me.age_window or 'any'})")
+        return
 
-    # Bump dialog counters AFTER sending (non-blocking)
-    async def _bump_dialogs_async(a: int, b: int):
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, increment_dialogs, a)
-        await loop.run_in_executor(None, increment_dialogs, b)
-    asyncio.create_task(_bump_dialogs_async(uid, partner))
+    # Announce match to both outside the lock
+    await _announce_pair(uid, cand.uid, context, _MATCH_ICEBREAKERS, removed + [me], f"mode={mode}")
 
 # ------------------------------------------------------------------------------
 # Commands
 # ------------------------------------------------------------------------------
 
 async def cmd_find(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
     await start_search(update, context, mode=MODE_RANDOM)
 
 async def cmd_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
     await start_search(update, context, mode=MODE_RANDOM)
 
 async def cmd_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
@@ -911,8 +809,8 @@ async def cmd_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
     log.info(f"{uid} ran /next")
 
 async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
@@ -947,8 +845,8 @@ async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_end(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """End friend chat specifically"""
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
@@ -986,8 +884,8 @@ async def cmd_end(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # /secret — start chooser (ONLY inviter must be Premium)
 async def cmd_secret(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
@@ -1016,8 +914,8 @@ async def cmd_secret(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # /endsecret — manual end
 async def cmd_endsecret(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if reg.is_banned(update.effective_user.id):
-        until, reason, _ = reg.get_ban_info(update.effective_user.id)
+    if await db_repo.is_banned(update.effective_user.id):
+        until, reason, _ = await db_repo.get_ban_info(update.effective_user.id)
         pretty = "lifetime" if until.year >= 9999 else until.strftime("%Y-%m-%d %H:%M UTC")
         await update.message.reply_text(f"🚫 You are banned till {pretty}.\nReason: {reason or '—'}")
         return
@@ -1026,6 +924,7 @@ async def cmd_endsecret(update: Update, context: ContextTypes.DEFAULT_TYPE):
     partner = s["partner"] if s else None
     if partner:
         secret_sessions.pop(partner, None)
+        timers.cancel(_secret_timer_key(uid, partner))
         try: 
             await context.bot.send_message(partner, "⏳ Secret Chat ended by your partner.")
         except Exception:
@@ -1044,12 +943,8 @@ async def cmd_boost(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("⏳ Please wait a few minutes before boosting again.")
 
     # put at front of queue
-    async with queue_lock:
-        try:
-            queue.remove(uid)
-        except ValueError:
-            pass
-        queue.appendleft(uid)
+    me = await _match_profile(uid)
+    await match_backend.enqueue(me, front=True)
     _last_boost_at[uid] = now
     await update.message.reply_text("🚀 Boost activated! You have been moved to the front of the queue.")
 
@@ -1430,9 +1325,8 @@ async def start_search_for_uid(uid: int, context: ContextTypes.DEFAULT_TYPE):
 
     # If not paired instantly, normal queue flow
     if not in_chat(uid):
-        async with queue_lock:
-            if uid not in queue:
-                queue.append(uid)
+        me = await _match_profile(uid)
+        await match_backend.enqueue(me, if_absent=True)
         try:
             await context.bot.send_message(chat_id=uid, text="💫🔮 Seeking your mysterious soulmate... 🔮💫")
         except Exception:
@@ -1444,64 +1338,15 @@ async def _try_pair_instant(uid: int, context: ContextTypes.DEFAULT_TYPE):
     if not target:
         return
 
-    async with queue_lock:
-        if target in queue and not in_chat(target) and not in_chat(uid):
-            # Remove both from queue
-            try:
-                queue.remove(uid)
-            except Exception:
-                pass
-            try:
-                queue.remove(target)
-            except Exception:
-                pass
-
-            # Create the pair
-            peers[uid] = target
-            peers[target] = uid
-
-            # Clear sticky intent
-            REMATCH_TARGET.pop(uid, None)
-            REMATCH_TARGET.pop(target, None)
-
-            # Reset menu guard for both sides
-            _last_menu_at.pop(uid, None)
-            _last_menu_at.pop(target, None)
-
-            # Send intro messages
-            ice = random.choice([
-                "Two truths and a lie?",
-                "Go-to comfort food?",
-                "Teleport once today — where?",
-                "What tiny thing made you smile this week?"
-            ])
-
-            t0 = time.time()
-
-            if FAST_INTRO:
-                quick_u = _intro_text_quick(uid, target, ice)
-                quick_p = _intro_text_quick(target, uid, ice)
-                await context.bot.send_message(chat_id=uid, text=quick_u, reply_markup=ReplyKeyboardRemove())
-                await context.bot.send_message(chat_id=target, text=quick_p, reply_markup=ReplyKeyboardRemove())
-                if reg.has_active_premium(uid):
-                    asyncio.create_task(_send_details_async(uid, target, context))
-                if reg.has_active_premium(target):
-                    asyncio.create_task(_send_details_async(target, uid, context))
-            else:
-                txt_u1 = _intro_text_for(uid, target, ice)
-                txt_u2 = _intro_text_for(target, uid, ice)
-                await context.bot.send_message(chat_id=uid, text=txt_u1, reply_markup=ReplyKeyboardRemove())
-                await context.bot.send_message(chat_id=target, text=txt_u2, reply_markup=ReplyKeyboardRemove())
-
-            log.info(f"Intro sent in {time.time() - t0:.3f}s")
-            log.info(f"Matched {uid} <-> {target} (auto re-match)")
+    requeue = await match_backend.claim_target(uid, target)
+    if requeue is None:
+        return
+    # Clear sticky intent
+    REMATCH_TARGET.pop(uid, None)
+    REMATCH_TARGET.pop(target, None)
 
-            # Bump dialog counters
-            async def _bump_dialogs_async(a: int, b: int):
-                loop = asyncio.get_running_loop()
-                await loop.run_in_executor(None, increment_dialogs, a)
-                await loop.run_in_executor(None, increment_dialogs, b)
-            asyncio.create_task(_bump_dialogs_async(uid, target))
+    await _announce_pair(uid, target, context, _REMATCH_ICEBREAKERS, requeue,
+                         "auto re-match", rematch=True)
 
 async def on_rm_ask(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
@@ -1555,17 +1400,9 @@ async def on_rm_decide(update: Update, context: ContextTypes.DEFAULT_TYPE):
     REMATCH_TARGET[other] = me
 
     # 2) Put both at front of queue
-    async with queue_lock:
-        try:
-            queue.remove(me)
-        except Exception:
-            pass
-        try:
-            queue.remove(other)
-        except Exception:
-            pass
-        queue.appendleft(me)
-        queue.appendleft(other)
+    me_profile, other_profile = await _match_profile(me), await _match_profile(other)
+    await match_backend.enqueue(me_profile, front=True)
+    await match_backend.enqueue(other_profile, front=True)
 
     # 3) Auto-trigger search for both users
     try:
@@ -1785,7 +1622,7 @@ async def on_secret_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
             dur = int(m["dur"])
         except:
             return
-        pending_secret_invites.setdefault(uid, {})["dur"] = dur
+        pending_secret_invites[uid] = {**pending_secret_invites.get(uid, {}), "dur": dur}
         await q.answer("Timer selected.")
         return await q.edit_message_text(f"⏱ Timer = {dur} min\nNow pick Self-destruct:", reply_markup=InlineKeyboardMarkup([[
             InlineKeyboardButton("5s",  callback_data="secret:set_ttl:5"),
@@ -1815,7 +1652,7 @@ async def on_secret_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
             ttl = int(m["ttl"])
         except:
             return
-        pending_secret_invites.setdefault(uid, {})["ttl"] = ttl
+        pending_secret_invites[uid] = {**pending_secret_invites.get(uid, {}), "ttl": ttl}
         await q.answer("Self-destruct selected.")
         sel = pending_secret_invites[uid]
         return await q.edit_message_text(
@@ -1910,9 +1747,9 @@ async def on_secret_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
         # SCHEDULE auto end notification at expiry
         try:
-            asyncio.create_task(_auto_end_secret(uid, inviter, expires, context.application))
+            timers.schedule("secret_end", expires, {"a": uid, "b": inviter}, key=_secret_timer_key(uid, inviter))
         except Exception:
-            pass
+            log.exception("Failed to schedule secret chat expiry")
 
         await q.answer("Accepted.")
         await q.edit_message_text("🔐 Secret Chat started. Messages will auto-delete.")
@@ -1971,12 +1808,15 @@ async def relay(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if pstate.startswith("poll:"):
         return
 
+    # Registration/ban/premium/forward checks come from one cached snapshot
+    snap = await user_snapshots.aget(uid)
+
     # Registration check - let registration handlers process text first
-    if not reg.is_registered(uid):
+    if snap is None or not snap.registered:
         return
 
     # Ban gate - silent drop for banned users
-    if reg.is_banned(uid):
+    if snap.is_banned():
         try:
             await update.message.reply_text("🚫 You are banned. Chat disabled.")
         except Exception:
@@ -2013,13 +1853,13 @@ async def relay(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return await update.message.reply_text("⛔ Forwarding is disabled in Secret Chat.")
 
         # Check user's forwarding preference for normal chat
-        allow_forward = reg.get_allow_forward(uid)  # DB truth
+        allow_forward = snap.allow_forward  # invalidated by reg.set_allow_forward
         if is_fwd and not allow_forward and not secret_mode:
             return await update.message.reply_text("⛔ Forwarding is disabled by your settings.")
 
         # Media rule (applies in Secret AND normal): only premium sender may send media
         is_media = any([msg.photo, msg.video, msg.animation, msg.document, msg.voice, msg.sticker])
-        if is_media and not reg.has_active_premium(uid):
+        if is_media and not snap.has_premium():
             # offer Ask-for-Premium
             from telegram import InlineKeyboardMarkup, InlineKeyboardButton
             kb = InlineKeyboardMarkup([[
@@ -2090,34 +1930,30 @@ async def relay(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 left = 3 - strikes
                 return await update.message.reply_text(f"⚠️ Mind your language. ({strikes}/3) — {left} warning(s) left.")
 
-            sent_msg = await context.bot.send_message(chat_id=partner, text=msg.text)
+            send = lambda: context.bot.send_message(chat_id=partner, text=msg.text)
         elif msg.photo:
-            sent_msg = await context.bot.send_photo(chat_id=partner, photo=msg.photo[-1].file_id, caption=msg.caption)
+            send = lambda: context.bot.send_photo(chat_id=partner, photo=msg.photo[-1].file_id, caption=msg.caption)
         elif msg.video:
-            sent_msg = await context.bot.send_video(chat_id=partner, video=msg.video.file_id, caption=msg.caption)
+            send = lambda: context.bot.send_video(chat_id=partner, video=msg.video.file_id, caption=msg.caption)
         elif msg.document:
-            sent_msg = await context.bot.send_document(chat_id=partner, document=msg.document.file_id, caption=msg.caption)
+            send = lambda: context.bot.send_document(chat_id=partner, document=msg.document.file_id, caption=msg.caption)
         elif msg.sticker:
-            sent_msg = await context.bot.send_sticker(chat_id=partner, sticker=msg.sticker.file_id)
+            send = lambda: context.bot.send_sticker(chat_id=partner, sticker=msg.sticker.file_id)
         elif msg.animation:
-            sent_msg = await context.bot.send_animation(chat_id=partner, animation=msg.animation.file_id, caption=msg.caption)
+            send = lambda: context.bot.send_animation(chat_id=partner, animation=msg.animation.file_id, caption=msg.caption)
         elif msg.voice:
-            sent_msg = await context.bot.send_voice(chat_id=partner, voice=msg.voice.file_id)
+            send = lambda: context.bot.send_voice(chat_id=partner, voice=msg.voice.file_id)
         else:
             return  # unsupported message type
+        # Queued behind the partner's earlier messages; None if the partner's queue is full
+        sent_msg = await outbound.call(partner, send, Priority.RELAY)
 
         # Self-destruct in Secret mode
         if secret_mode and sent_msg and ttl:
-            async def _erase(mid, chat_id):
-                try:
-                    await asyncio.sleep(ttl)
-                    await context.bot.delete_message(chat_id=chat_id, message_id=mid)
-                except Exception:
-                    pass
             # recipient & sender both
-            asyncio.create_task(_erase(sent_msg.message_id, partner))
+            delete_message_later(partner, sent_msg.message_id, ttl)
             try:
-                asyncio.create_task(_erase(msg.message_id, update.effective_chat.id))
+                delete_message_later(update.effective_chat.id, msg.message_id, ttl)
             except Exception:
                 pass
 
@@ -2127,16 +1963,17 @@ async def relay(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             log.warning(f"metrics bump failed: {e}")
         
-        # Update friendship level if they are friends
+        # Update friendship level if they are friends (cached lookup, buffered write)
         try:
-            if reg.is_friends(uid, partner):
-                reg.update_friendship_level(uid, partner)
+            if user_snapshots.is_friends(uid, partner):
+                friendship_interactions.add((uid, partner), interaction_count=1)
         except Exception as e:
             log.warning(f"friendship level update failed: {e}")
         
-        # Check and award badges for message activity
+        # Check and award badges for message activity (throttled per user)
         try:
-            reg.check_and_award_badges(uid)
+            if user_snapshots.badge_check_due(uid):
+                reg.check_and_award_badges(uid)
         except Exception as e:
             log.warning(f"badge check failed: {e}")
             
@@ -2478,16 +2315,10 @@ async def on_secret_media_decide(update: Update, context: ContextTypes.DEFAULT_T
 
         # TTL: delete both sides if active
         if sent_msg and ttl:
-            async def _erase(mid, chat_id):
-                try:
-                    await asyncio.sleep(ttl)
-                    await context.bot.delete_message(chat_id=chat_id, message_id=mid)
-                except Exception:
-                    pass
-            asyncio.create_task(_erase(sent_msg.message_id, partner))
+            delete_message_later(partner, sent_msg.message_id, ttl)
             # delete sender's original too (optional; keep it consistent with your session policy)
             try:
-                asyncio.create_task(_erase(sender_mid, uid))
+                delete_message_later(uid, sender_mid, ttl)
             except Exception:
                 pass
 
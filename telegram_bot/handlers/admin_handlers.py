@@ -28,6 +28,7 @@ from admin import (
     runtime_counts, q_all, get_pending_vault_content
 )
 import registration as reg
+from utils.send_scheduler import Priority, outbound
 from handlers.blur_vault import approve_vault_content, delete_vault_content
 from utils.db_migration import run_all_migrations
 from utils.cb import cb_match, CBError
@@ -305,13 +306,15 @@ async def handle_admin_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if mode == "bcast":
         ids = [row[0] for row in q_all("SELECT tg_user_id FROM users;")]
         sent = 0
-        for uid in ids:
-            try:
-                await context.bot.send_message(uid, text, disable_web_page_preview=True)
-                sent += 1
-                await asyncio.sleep(0.06)  # ~16 msgs/sec
-            except Exception:
-                pass
+        # Lowest priority in the outbound scheduler, which paces it under Telegram's limits;
+        # queued in chunks so a large audience never fills the scheduler's broadcast share
+        for i in range(0, len(ids), 500):
+            results = await asyncio.gather(
+                *(outbound.send_message(context.bot, uid, text, priority=Priority.BROADCAST,
+                                        disable_web_page_preview=True) for uid in ids[i:i + 500]),
+                return_exceptions=True,
+            )
+            sent += sum(1 for r in results if r is not None and not isinstance(r, Exception))
         await update.effective_message.reply_text(f"📣 Broadcast sent to {sent} users.")
         context.user_data.pop(UD_MODE, None)
         await open_admin(update, context)
@@ -8,6 +8,7 @@ from telegram.ext import (ContextTypes, CommandHandler, CallbackQueryHandler,
                           MessageHandler, filters)
 
 import registration as reg
+from utils.timers import delete_message_later
 from handlers.text_framework import (
     claim_or_reject, clear_state, FEATURE_KEY, MODE_KEY, make_cancel_kb
 )
@@ -386,22 +387,11 @@ def _save_prompt(session_id:int, kind:str, payload:dict) -> int | None:
     return int(row[0]) if row else None
 
 def _schedule_delete(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, ttl_sec: int):
-    """Schedule message deletion after TTL seconds"""
-    jq = getattr(context, "job_queue", None)
-    if jq:
-        jq.run_once(_delete_message_job, when=ttl_sec, 
-                    data={"chat_id": chat_id, "message_id": message_id})
-
-async def _delete_message_job(context: ContextTypes.DEFAULT_TYPE):
-    """Job to delete a message"""
-    data = context.job.data or {}
-    chat_id = data.get("chat_id")
-    message_id = data.get("message_id")
-    if chat_id and message_id:
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        except Exception as e:
-            log.debug(f"[AD] delete message fail: {e}")
+    """Schedule message deletion after TTL seconds (persisted, survives restarts)"""
+    try:
+        delete_message_later(chat_id, message_id, ttl_sec)
+    except Exception as e:
+        log.debug(f"[AD] schedule delete fail: {e}")
 
 # =============== ENTRY / LOBBY =================
 async def _blocked_non_premium(update:Update, context:ContextTypes.DEFAULT_TYPE)->bool:
@@ -1,6 +1,7 @@
 
 # handlers/left_menu_handlers.py
 from __future__ import annotations
+from collections.abc import MutableMapping
 from typing import Optional
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
@@ -37,7 +38,11 @@ async def _silent_leave(uid: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """
     try:
         partner = None
-        if hasattr(chat, "peers") and isinstance(chat.peers, dict):
+        backend = getattr(chat, "match_backend", None)
+        if backend is not None:
+            # shared backend: leaves the queue and the pair in one step
+            partner = await backend.end_pair(uid)
+        elif hasattr(chat, "peers") and isinstance(chat.peers, MutableMapping):
             partner = chat.peers.pop(uid, None)
             if partner:
                 chat.peers.pop(partner, None)
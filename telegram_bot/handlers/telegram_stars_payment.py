@@ -6,6 +6,7 @@ from telegram import Update, LabeledPrice, InlineKeyboardButton, InlineKeyboardM
 from telegram.ext import ContextTypes, CommandHandler, PreCheckoutQueryHandler, MessageHandler, filters
 import logging
 import registration as reg
+from utils.user_snapshot import invalidate_user
 
 logger = logging.getLogger(__name__)
 
@@ -190,6 +191,7 @@ async def successful_payment_callback(update: Update, context: ContextTypes.DEFA
                 WHERE tg_user_id = %s
             """, (duration_days, uid))
             con.commit()
+        invalidate_user(uid)
         
         # Also update MongoDB (webapp database) - CRITICAL FOR WEBAPP
         try:
@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters, ApplicationHandlerStop
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters, ApplicationHandlerStop, TypeHandler
 from telegram.error import TelegramError, TimedOut, RetryAfter, NetworkError, Forbidden
 import re  # Added re import for regex escaping
 
@@ -138,6 +138,12 @@ from utils.monitoring import metrics
 from utils.db_integrity import apply_missing_constraints
 from utils.maintenance import maintenance_system
 from utils.privacy_compliance import privacy_manager
+from utils import db_repo
+from utils.counter_buffer import chat_counters, friendship_interactions
+from utils.send_scheduler import Priority, outbound
+from utils.timers import timers
+from utils.chat_state import chat_state
+from utils import sharding
 from admin_commands import bulletproof_handlers
 from profile_metrics import ensure_metric_columns
 from handlers.settings_handlers import register as register_settings_handlers
@@ -275,28 +281,17 @@ log = logging.getLogger("luvbot")
 
 BOT_TOKEN = os.environ["BOT_TOKEN"]
 
-# Safe send wrapper for network reliability
+# Safe send wrapper: queued through the outbound scheduler (rate limits, FloodWait)
 async def safe_send(bot, chat_id, text, **kwargs):
-    """Send message with retry logic for network issues"""
-    for attempt in range(3):
-        try:
-            return await bot.send_message(chat_id, text, **kwargs)
-        except RetryAfter as e:
-            wait_time = int(getattr(e, "retry_after", 2)) + 1
-            log.info(f"Rate limited, waiting {wait_time}s...")
-            await asyncio.sleep(wait_time)
-        except (TimedOut, NetworkError) as e:
-            wait_time = 2 * (attempt + 1)
-            log.warning(f"Network timeout (attempt {attempt+1}/3), retrying in {wait_time}s: {e}")
-            await asyncio.sleep(wait_time)
-        except Forbidden:
-            log.info(f"User {chat_id} blocked the bot")
-            return None
-        except Exception as e:
-            log.error(f"[safe_send] Unexpected error: {e}")
-            return None
-    log.error(f"[safe_send] Failed to send after 3 attempts to {chat_id}")
-    return None
+    """Send message via utils.send_scheduler; None if blocked, refused or failed"""
+    try:
+        return await outbound.send_message(bot, chat_id, text, priority=Priority.NUDGE, **kwargs)
+    except Forbidden:
+        log.info(f"User {chat_id} blocked the bot")
+        return None
+    except Exception as e:
+        log.error(f"[safe_send] Failed to send to {chat_id}: {e}")
+        return None
 
 # ---- Stories cleanup loop (if you enabled Stories) ----
 async def _stories_cleanup(app):
@@ -354,6 +349,26 @@ async def _on_startup(app: Application):
     _stories_task = app.create_task(_stories_cleanup(app))
     print("[startup] stories cleanup task started")
 
+    # asyncpg pool for utils.db_repo (falls back to threaded psycopg2 if unavailable)
+    await db_repo.start()
+    print(f"[startup] async DB layer: {'asyncpg' if db_repo.stats()['async'] else 'threaded psycopg2'}")
+
+    # write-behind chat counters (messages/dialogs/ratings/reports) and friendship interactions
+    chat_counters.start()
+    friendship_interactions.start()
+
+    # central timer driver (secret-chat expiry, self-destructing messages)
+    await timers.start(app.bot)
+    print(f"[startup] timers: {timers.stats()['pending']} pending")
+
+    # idle eviction + periodic size report for chat.py runtime state
+    chat_state.start()
+
+    # search queue + active pairs (shared across workers with MATCH_BACKEND=postgres)
+    await chat.match_backend.start()
+    print(f"[startup] match backend: {chat.match_backend.stats()} "
+          f"(worker {sharding.WORKER_INDEX + 1}/{sharding.WORKER_COUNT})")
+
 async def _on_shutdown(app: Application):
     """PTB post-shutdown hook: cancel background tasks cleanly."""
     global _stories_task
@@ -365,14 +380,23 @@ async def _on_shutdown(app: Application):
             pass
         _stories_task = None
     print("[shutdown] stories cleanup task stopped")
+    await chat.match_backend.stop()
+    await chat_state.stop()
+    await timers.stop()
+    await outbound.stop()
+    print(f"[shutdown] outbound scheduler stopped: {outbound.stats()}")
+    await chat_counters.stop()
+    await friendship_interactions.stop()
+    print(f"[shutdown] chat counters flushed: {chat_counters.stats()}")
+    await db_repo.close()
 
 # ---------- Ban gate helper ----------
 async def _ban_gate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if user is banned and show message if so. Return True if banned."""
     uid = update.effective_user.id
     try:
-        if reg.is_banned(uid):
-            until, reason, _ = reg.get_ban_info(uid)
+        if await db_repo.is_banned(uid):
+            until, reason, _ = await db_repo.get_ban_info(uid)
             msg = "🚫 You are banned."
             if until:
                 try:
@@ -796,7 +820,8 @@ async def on_btn_match_city(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Clear any existing search/chat state for continuous searching
     if chat.in_chat(uid):
         await chat._end_pair(uid, context, notify_partner=False)
-    await chat._remove_from_queue(uid)
+    else:
+        await chat.match_backend.end_pair(uid)  # leaves the queue
     
     from handlers.text_framework import set_state
     set_state(context, "city_match", "input_city", ttl_minutes=3)
@@ -991,6 +1016,10 @@ def main():
     # Add error handler for cleaner logs
     app.add_error_handler(on_error)
 
+    # Multi-worker: drop updates for users another worker owns, before any other group
+    if sharding.WORKER_COUNT > 1:
+        app.add_handler(TypeHandler(Update, sharding.shard_gate), group=sharding.GATE_GROUP)
+
     # Registration handlers MUST be first
     from handlers.registration_handlers import register as register_registration_handlers
     register_registration_handlers(app)
@@ -1422,12 +1451,18 @@ def main():
     global _bot_lock_connection
     _bot_lock_connection = None
     
+    try:
+        sharding.validate()
+    except ValueError as e:
+        log.error(f"🚨 Invalid worker configuration: {e}")
+        sys.exit(1)
+
     try:
         # Acquire database advisory lock to prevent concurrent bot instances
         with reg._conn() as con, con.cursor() as cur:
             
-            # Try to acquire advisory lock 900001 (bot instance lock)
-            cur.execute("SELECT pg_try_advisory_lock(900001)")
+            # Try to acquire the bot instance lock (one per worker when sharded)
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (sharding.instance_lock_key(),))
             lock_acquired = cur.fetchone()[0]
             
             if not lock_acquired:
@@ -1457,19 +1492,35 @@ def main():
         PORT = int(os.environ.get("PORT", "8443"))  # Replit sets PORT for you
         EXTERNAL_URL = os.environ["EXTERNAL_URL"].rstrip("/")  # https://<project>.<user>.repl.co
         WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "hook")
-        SECRET_TOKEN = os.environ.get("SECRET_TOKEN")  # optional
+        SECRET_TOKEN = os.environ.get("SECRET_TOKEN")
+        if not SECRET_TOKEN:
+            if sharding.WORKER_COUNT > 1:
+                log.error("🚨 SECRET_TOKEN must be set when running several webhook workers")
+                sys.exit(1)
+            # Telegram echoes it in X-Telegram-Bot-Api-Secret-Token; forged posts get 403
+            import secrets
+            SECRET_TOKEN = secrets.token_urlsafe(32)
+            log.warning("SECRET_TOKEN not set; generated one for this run")
 
-        log.info("🚀 Bot starting in WEBHOOK mode")
-        app.run_webhook(
-            listen="0.0.0.0",
+        log.info("🚀 Bot starting in WEBHOOK mode (bounded ingest queue)")
+        import asyncio
+        from utils.update_ingest import serve_webhook
+        asyncio.run(serve_webhook(
+            app,
             port=PORT,
             url_path=WEBHOOK_PATH,
             webhook_url=f"{EXTERNAL_URL}/{WEBHOOK_PATH}",
             secret_token=SECRET_TOKEN,
-            drop_pending_updates=True,
             allowed_updates=["message","edited_message","callback_query","pre_checkout_query"],
-            stop_signals=None,
-        )
+            drop_pending_updates=True,
+            # workers behind a fan-out ingress share one URL; the first registers it
+            set_webhook=sharding.WORKER_INDEX == 0,
+            metrics_sink=metrics,
+        ))
+    elif sharding.WORKER_COUNT > 1:
+        # getUpdates allows a single consumer per token
+        log.error("🚨 WORKER_COUNT > 1 requires RUN_MODE=webhook behind a fan-out ingress")
+        sys.exit(1)
     else:
         log.info("🚀 Bot starting in POLLING mode with API server on port 8080")
 
@@ -9,7 +9,7 @@ from datetime import datetime, timezone, timedelta
 from contextlib import contextmanager
 
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
 )
@@ -17,12 +17,17 @@ from telegram.ext import ContextTypes
 
 from menu import main_menu_kb  # shared reply keyboard for the app
 import chat # imported for in_chat check
+from utils.user_snapshot import invalidate_user
 
 DB_URL = os.environ.get("DATABASE_URL")
 log = logging.getLogger("luvbot")
 
 # --- SSL-enforced canonical connection pool ---
-_POOL: SimpleConnectionPool | None = None
+_POOL: ThreadedConnectionPool | None = None
+# Connections idle longer than this are pinged on checkout; busier ones are
+# trusted (async code uses utils.db_repo, which health-checks on a timer)
+_PING_IDLE_AFTER = float(os.environ.get("DB_PING_IDLE_AFTER", "30"))
+_CONN_LAST_USED: dict[int, float] = {}
 
 def _dsn_with_ssl(url: str) -> str:
     """Ensure SSL is enforced in connection string"""
@@ -34,12 +39,15 @@ def _dsn_with_ssl(url: str) -> str:
         url = f"{url}{sep}sslmode=require"
     return url
 
-def _get_pool() -> SimpleConnectionPool:
-    """Get or create connection pool with SSL enforcement"""
+def _get_pool() -> ThreadedConnectionPool:
+    """
+    Get or create connection pool with SSL enforcement. Thread-safe: it is used
+    from handlers, utils.db_async.run_db threads and run_in_executor calls.
+    """
     global _POOL
     if _POOL is None:
         dsn = _dsn_with_ssl(DB_URL)
-        _POOL = SimpleConnectionPool(
+        _POOL = ThreadedConnectionPool(
             minconn=2, maxconn=15, dsn=dsn,
             keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=5,
             connect_timeout=3, application_name="luvhive-bot"
@@ -119,10 +127,11 @@ def _conn():
                 conn = None
                 continue
 
-            # Test connection with a simple query
-            with conn.cursor() as test_cur:
-                test_cur.execute("SELECT 1")
-                test_cur.fetchone()
+            # Only ping connections that sat idle long enough to have gone stale
+            if time.monotonic() - _CONN_LAST_USED.get(id(conn), 0.0) > _PING_IDLE_AFTER:
+                with conn.cursor() as test_cur:
+                    test_cur.execute("SELECT 1")
+                    test_cur.fetchone()
 
             yield conn
             return  # Success, exit the retry loop
@@ -154,6 +163,7 @@ def _conn():
                         conn.rollback()
                     except:
                         pass
+                    _CONN_LAST_USED[id(conn)] = time.monotonic()
                     pool.putconn(conn)
                 except:
                     try:
@@ -242,6 +252,7 @@ def set_is_premium(tg_id: int, value: bool) -> None:
             (tg_id, value),
         )
         con.commit()  # ← REQUIRED to persist the change
+    invalidate_user(tg_id)
 
 def has_active_premium(tg_user_id: int) -> bool:
     """True if premium_until in future OR legacy is_premium True."""
@@ -272,6 +283,7 @@ def set_premium_until(tg_id: int, dt: datetime) -> None:
             DO UPDATE SET is_premium=TRUE, premium_until=EXCLUDED.premium_until;
         """, (tg_id, dt))
         con.commit()
+    invalidate_user(tg_id)
 
 def ensure_verification_columns():
     """Add verification columns to users table if they don't exist."""
@@ -437,6 +449,7 @@ def set_allow_forward(tg_user_id: int, value: bool):
             DO UPDATE SET allow_forward = EXCLUDED.allow_forward
         """, (tg_user_id, value))
         con.commit()
+    invalidate_user(tg_user_id)
 
 def get_allow_forward(tg_user_id: int) -> bool:
     with _conn() as con, con.cursor() as cur:
@@ -1005,6 +1018,7 @@ def set_shadow_ban(tg_user_id: int, banned: bool = True) -> bool:
                     WHERE tg_user_id = %s
                 """, (tg_user_id,))
             con.commit()
+            invalidate_user(tg_user_id)
             return True
         except Exception:
             return False
@@ -1253,6 +1267,7 @@ def add_friend(a: int, b: int):
         cur.execute("INSERT INTO friends (user_id, friend_id) VALUES (%s,%s) ON CONFLICT DO NOTHING", (a,b))
         cur.execute("INSERT INTO friends (user_id, friend_id) VALUES (%s,%s) ON CONFLICT DO NOTHING", (b,a))
         con.commit()
+    invalidate_user(a, b)
 
 def is_friends(a: int, b: int) -> bool:
     with _conn() as con, con.cursor() as cur:
@@ -1338,6 +1353,7 @@ def remove_friend(a: int, b: int):
         cur.execute("DELETE FROM friends WHERE user_id=%s AND friend_id=%s", (a,b))
         cur.execute("DELETE FROM friends WHERE user_id=%s AND friend_id=%s", (b,a))
         con.commit()
+    invalidate_user(a, b)
 
 # ------- Referrals -------
 def add_referral(inviter: int, invitee: int):
@@ -1424,11 +1440,13 @@ def set_ban(tg_id: int, until_ts, reason: str, by_admin: int):
                           banned_by=EXCLUDED.banned_by
         """, (tg_id, until_ts, reason, by_admin))
         con.commit()
+    invalidate_user(tg_id)
 
 def clear_ban(tg_id: int):
     with _conn() as con, con.cursor() as cur:
         cur.execute("UPDATE users SET banned_until=NULL, banned_reason=NULL, banned_by=NULL WHERE tg_user_id=%s", (tg_id,))
         con.commit()
+    invalidate_user(tg_id)
 
 def add_strike(uid: int) -> int:
     """Return current strikes after adding; auto-resets if >24h old."""
@@ -1582,6 +1600,7 @@ def redeem_premium_with_coins(uid: int, need: int = 500, days: int = 3):
             (new_balance, new_until, uid)
         )
         con.commit()
+    invalidate_user(uid)
     return (True, new_balance, new_until)
 
 def get_ban_info(tg_id: int):
@@ -1681,6 +1700,7 @@ def persist_registration(tg_user_id: int, reg_data: dict, selected: Set[str]):
         for key in selected:
             cur.execute("INSERT INTO user_interests (user_id, interest_key) VALUES (%s, %s);", (user_id, key))
         conn.commit()
+    invalidate_user(tg_user_id)
 
 # ---------- Registration flow ----------
 #   reg_state: "GENDER"|"AGE"|"COUNTRY"|"CITY"|"INTERESTS"
@@ -1991,6 +2011,7 @@ async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> boo
                         for key in keys:
                             cur.execute("INSERT INTO user_interests (user_id, interest_key) VALUES (%s, %s);", (user_id, key))
                         conn.commit()
+                invalidate_user(uid)
 
                 for k in ("reg_state","sel_interests","edit_mode","_interests_from_settings"):
                     context.user_data.pop(k, None)
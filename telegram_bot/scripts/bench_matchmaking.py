@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Matchmaking benchmark - bucketed MatchIndex vs. the old linear queue scan
+
+Usage (from telegram_bot/):
+    python scripts/bench_matchmaking.py
+    python scripts/bench_matchmaking.py --sizes 1000,10000,100000 --searches 2000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.matchmaking import MODES, MatchIndex, MatchProfile, mutual_ok
+
+CITIES = ("delhi", "mumbai", "pune", "jaipur", "lucknow", "kolkata", "chennai", "indore")
+
+
+def random_profile(rng: random.Random, uid: int) -> MatchProfile:
+    mode = rng.choices(MODES, weights=(70, 12, 12, 6))[0]
+    lo = rng.choice((18, 22, 25, 30))
+    window = (lo, lo + rng.choice((4, 8, 15))) if rng.random() < 0.2 else None
+    return MatchProfile(
+        uid,
+        mode=mode,
+        gender=rng.choice(("f", "m", "m", "")),
+        city=rng.choice(CITIES),
+        age=rng.randint(18, 55) if rng.random() < 0.9 else None,
+        verified=rng.random() < 0.3,
+        age_window=window,
+        verified_only=rng.random() < 0.05,
+    )
+
+
+def selective_profile(rng: random.Random, uid: int) -> MatchProfile:
+    """Viewers few waiting users fit: girls mode, verified only, narrow premium window"""
+    lo = rng.choice((19, 24, 31))
+    return MatchProfile(uid, mode="girls", gender="m", city=rng.choice(CITIES), age=rng.randint(20, 40),
+                        verified=True, age_window=(lo, lo + 2), verified_only=True)
+
+
+def linear_find(waiting, viewer):
+    """
+    What start_search did before the index: first mutual match in queue order.
+    Returns (match, candidates examined); each examined candidate used to cost
+    several profile queries under queue_lock.
+    """
+    for checked, cand in enumerate(waiting, 1):
+        if cand.uid != viewer.uid and mutual_ok(viewer, cand):
+            return cand, checked
+    return None, len(waiting)
+
+
+def bench(size: int, searches: int, seed: int, selective: bool):
+    rng = random.Random(seed)
+    index = MatchIndex()
+    waiting = []
+    for uid in range(size):
+        profile = random_profile(rng, uid)
+        index.append(profile)
+        waiting.append(profile)
+    make_viewer = selective_profile if selective else random_profile
+    viewers = [make_viewer(rng, size + i) for i in range(searches)]
+
+    started = time.perf_counter()
+    hits = sum(1 for viewer in viewers if index.find(viewer) is not None)
+    index_us = (time.perf_counter() - started) / searches * 1e6
+
+    started = time.perf_counter()
+    linear = [linear_find(waiting, viewer) for viewer in viewers]
+    linear_us = (time.perf_counter() - started) / searches * 1e6
+    linear_hits = sum(1 for match, _ in linear if match is not None)
+    linear_checked = sum(checked for _, checked in linear) / searches
+
+    stats = index.stats()
+    print(f"{size:>8} waiting  index {index_us:8.1f} us, {stats['avg_candidates_checked']:6.1f} checked  "
+          f"linear {linear_us:9.1f} us, {linear_checked:9.1f} checked  hits {hits}/{linear_hits}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,2000,8000,32000")
+    parser.add_argument("--searches", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    for selective in (False, True):
+        print("selective viewers" if selective else "mixed viewers")
+        for size in (int(s) for s in args.sizes.split(",")):
+            bench(size, args.searches, args.seed, selective)
+
+
+if __name__ == "__main__":
+    main()
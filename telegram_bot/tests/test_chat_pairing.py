@@ -0,0 +1,115 @@
+"""
+Tests for pairing in chat.start_search - claim under queue_lock, announce outside it
+Profiles, intros and the Bot are in-memory fakes - no database or Telegram required
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+from utils.matchmaking import MatchProfile
+from utils.send_scheduler import SendScheduler
+
+INTRO_DELAY = 0.2
+
+
+class FakeBot:
+    """Intros take INTRO_DELAY (a slow Telegram round-trip); other sends are instant"""
+
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if text.startswith("intro"):
+            await asyncio.sleep(INTRO_DELAY)
+            if chat_id in self.fail_for:
+                raise RuntimeError("Forbidden: bot was blocked by the user")
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent), chat_id=chat_id)
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    async def match_profile(uid):
+        return MatchProfile(uid, gender="m", age=25)
+    monkeypatch.setattr(chat, "_match_profile", match_profile)
+    monkeypatch.setattr(chat, "_intro_text_for", lambda viewer, partner, ice: f"intro {partner}")
+    monkeypatch.setattr(chat, "increment_dialogs", lambda uid: None)
+    monkeypatch.setattr(chat, "FAST_INTRO", False)
+    # Per-chat pacing is covered in test_send_scheduler
+    monkeypatch.setattr(chat, "outbound", SendScheduler(per_chat_rate=1000, global_rate=1000))
+    for state in (chat.peers, chat.REMATCH_TARGET, chat._last_mode):
+        state.clear()
+    chat.queue.clear()
+    yield FakeBot()
+    for state in (chat.peers, chat.REMATCH_TARGET, chat._last_mode):
+        state.clear()
+    chat.queue.clear()
+
+
+def search(uid, bot):
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=uid))
+    return chat.start_search(update, SimpleNamespace(bot=bot), mode=chat.MODE_RANDOM)
+
+
+class TestPairing:
+    @pytest.mark.asyncio
+    async def test_pair_claimed_then_announced(self, bot):
+        await search(1, bot)
+        assert 1 in chat.queue
+        await search(2, bot)
+        assert chat.peers == {1: 2, 2: 1} and len(chat.queue) == 0
+        assert {(1, "intro 2"), (2, "intro 1")} <= set(bot.sent)
+
+    @pytest.mark.asyncio
+    async def test_searches_not_serialized_behind_intros(self, bot):
+        for uid in (1, 3, 5, 7):
+            await search(uid, bot)
+        started = time.monotonic()
+        await asyncio.gather(*(search(uid, bot) for uid in (2, 4, 6, 8)))
+        elapsed = time.monotonic() - started
+        # Four pairs announced concurrently: about one intro round-trip, not four
+        assert elapsed < INTRO_DELAY * 2
+        assert len(chat.peers) == 8
+
+    @pytest.mark.asyncio
+    async def test_lock_free_while_announcing(self, bot):
+        await search(1, bot)
+        announcing = asyncio.create_task(search(2, bot))
+        await asyncio.sleep(INTRO_DELAY / 4)
+        assert chat.peers.get(2) == 1 and not chat.queue_lock.locked()
+        await search(3, bot)
+        assert 3 in chat.queue
+        await announcing
+
+    @pytest.mark.asyncio
+    async def test_rollback_when_both_intros_fail(self, bot):
+        bot.fail_for = {1, 2}
+        await search(1, bot)
+        await search(2, bot)
+        assert chat.peers == {}
+        # The user who was already waiting keeps the head of the queue
+        assert list(chat.queue) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_one_failed_intro_keeps_pair(self, bot):
+        bot.fail_for = {1}
+        await search(1, bot)
+        await search(2, bot)
+        assert chat.peers == {1: 2, 2: 1}
+
+    @pytest.mark.asyncio
+    async def test_sticky_rematch_restored_on_rollback(self, bot):
+        bot.fail_for = {1, 2}
+        await search(1, bot)
+        chat.REMATCH_TARGET.update({1: 2, 2: 1})
+        await search(2, bot)
+        assert chat.peers == {} and chat.REMATCH_TARGET == {1: 2, 2: 1}
+        assert 1 in chat.queue and 2 in chat.queue
@@ -0,0 +1,110 @@
+"""
+Tests for the bounded chat state maps behind chat.py
+Pure in-memory - no database required
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+from utils.chat_state import ChatState, StateMap
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStateMap:
+    def test_behaves_like_a_dict(self):
+        m = StateMap("m")
+        m.update({1: "a", 2: "b"})
+        m[3] = "c"
+        assert m == {1: "a", 2: "b", 3: "c"} and len(m) == 3 and 2 in m
+        assert m.get(9) is None and m.pop(9, None) is None and m.pop(1) == "a"
+        del m[2]
+        assert dict(m.items()) == {3: "c"}
+        m.clear()
+        assert not m
+
+    def test_idle_entries_evicted_reads_refresh(self):
+        clock = FakeClock()
+        m = StateMap("m", idle_ttl=60, clock=clock)
+        m[1], m[2], m[3] = "a", "b", "c"
+        clock.now += 50
+        m.get(1)
+        m.peek(2)
+        clock.now += 20
+        assert m.sweep() == 2
+        assert list(m) == [1] and m.evicted_idle == 2
+
+    def test_lru_cap(self):
+        m = StateMap("m", max_entries=3)
+        for uid in range(3):
+            m[uid] = uid
+        m.get(0)
+        m[3] = 3
+        assert sorted(m) == [0, 2, 3] and m.evicted_lru == 1
+
+    def test_size_report(self):
+        state = ChatState()
+        small, big = state.map("small"), state.map("big")
+        small[1] = 1
+        for uid in range(1000):
+            big[uid] = {"partner": uid + 1, "ttl": 10}
+        report = state.report()
+        assert report["entries"] == 1001
+        assert report["maps"]["big"]["approx_bytes"] > 100 * report["maps"]["small"]["approx_bytes"]
+        assert report["approx_bytes"] == sum(m["approx_bytes"] for m in report["maps"].values())
+
+
+class TestChatMaps:
+    def test_idle_pair_evicted_as_a_whole(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr(chat.peers, "_clock", clock)
+        chat.peers.clear()
+        try:
+            chat.peers.update({1: 2, 2: 1, 3: 4, 4: 3})
+            clock.now += chat.PAIR_IDLE_TTL / 2
+            # only user 3 talks; partner_of keeps both sides of that pair fresh
+            assert chat.partner_of(3) == 4
+            clock.now += chat.PAIR_IDLE_TTL / 2 + 1
+            chat.peers.sweep()
+            assert chat.peers == {3: 4, 4: 3}
+        finally:
+            chat.peers.clear()
+
+    def test_idle_secret_session_evicted_for_both_sides(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr(chat.secret_sessions, "_clock", clock)
+        chat.secret_sessions.clear()
+        try:
+            chat.secret_sessions[1] = {"partner": 2}
+            clock.now += 10
+            chat.secret_sessions[2] = {"partner": 1}
+            chat.secret_sessions[3] = {"partner": 4}
+            clock.now += chat.PAIR_IDLE_TTL - 5
+            # only 1's half is idle, but the session ends as a whole
+            assert chat.secret_sessions.sweep() == 1
+            assert dict(chat.secret_sessions.items()) == {3: {"partner": 4}}
+        finally:
+            chat.secret_sessions.clear()
+
+    def test_postgres_pairs_are_not_idle_evicted(self):
+        # Run in a fresh interpreter: the backend is chosen at import time
+        import subprocess
+        code = "import chat; print(chat.match_backend.name, chat.peers.idle_ttl)"
+        env = dict(os.environ, MATCH_BACKEND="postgres")
+        out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                             env=env, capture_output=True, text=True, timeout=60)
+        assert out.stdout.split()[-2:] == ["postgres", "None"], out.stderr
+
+    def test_every_runtime_map_is_bounded(self):
+        for name in ("peers", "rematch_target", "last_mode", "city_search", "last_menu_at",
+                     "secret_sessions", "pending_secret_media"):
+            m = chat.chat_state.maps[name]
+            assert m.idle_ttl is not None or m.max_entries is not None
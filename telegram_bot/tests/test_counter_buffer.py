@@ -0,0 +1,126 @@
+"""
+Tests for the write-behind chat counter buffer
+The batch executor is an in-memory fake - no database required
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+from utils.counter_buffer import FRIENDSHIP_COLUMNS, CounterBuffer, build_flush_sql, friend_pair
+
+
+class FakeExecutor:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, columns, rows):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("server closed the connection")
+        self.batches.append((tuple(columns), sorted(rows)))
+
+
+class TestAggregation:
+    def test_deltas_merge_into_one_statement_per_column_set(self):
+        ex = FakeExecutor()
+        buf = CounterBuffer(executor=ex)
+        for _ in range(50):
+            buf.add(1, messages_sent=1)
+            buf.add(2, messages_sent=1)
+        buf.add(1, messages_sent=0)
+        assert buf.flush() == 2
+        assert ex.batches == [(("messages_sent",), [(1, 50), (2, 50)])]
+        assert buf.flush() == 0 and buf.stats()["statements"] == 1
+
+    def test_sql_shape(self):
+        statement, template = build_flush_sql(("messages_sent", "rating_up"))
+        assert statement.startswith("UPDATE users AS u SET messages_sent = COALESCE(u.messages_sent, 0) + v.messages_sent")
+        assert "FROM (VALUES %s) AS v(tg_user_id, messages_sent, rating_up)" in statement
+        assert template == "(%s::bigint, %s::int, %s::int)"
+        with pytest.raises(ValueError):
+            build_flush_sql(("tg_user_id; DROP TABLE users",))
+
+    def test_chat_helpers_buffer(self, monkeypatch):
+        ex = FakeExecutor()
+        buf = CounterBuffer(executor=ex)
+        monkeypatch.setattr(chat, "chat_counters", buf)
+        monkeypatch.setattr(chat, "_exec_noresult", lambda *a: pytest.fail("per-event UPDATE"))
+        chat.increment_sent(1)
+        chat.increment_received(2)
+        chat.increment_dialogs(1)
+        chat.bump_rating_counters(2, 1)
+        chat.bump_rating_counters(2, 0)
+        chat.bump_report_counter(2)
+        buf.flush()
+        assert sorted(ex.batches) == [
+            (("messages_recv", "rating_up", "report_count"), [(2, 1, 1, 1)]),
+            (("messages_sent", "dialogs_total", "dialogs_today"), [(1, 1, 1, 1)]),
+        ]
+
+
+class TestFriendshipInteractions:
+    def test_pairs_merge_regardless_of_direction(self):
+        ex = FakeExecutor()
+        buf = CounterBuffer(executor=ex, columns=FRIENDSHIP_COLUMNS, key=friend_pair)
+        for _ in range(3):
+            buf.add((9, 4), interaction_count=1)
+            buf.add((4, 9), interaction_count=1)
+        buf.add((1, 2), interaction_count=1)
+        with pytest.raises(ValueError):
+            buf.add((1, 2), messages_sent=1)
+        assert buf.flush() == 2
+        assert ex.batches == [(("interaction_count",), [((1, 2), 1), ((4, 9), 6)])]
+
+
+class TestFailureHandling:
+    def test_failed_flush_is_retried(self):
+        ex = FakeExecutor(fail=1)
+        buf = CounterBuffer(executor=ex)
+        buf.add(1, report_count=1)
+        assert buf.flush() == 0 and buf.stats()["failures"] == 1
+        buf.add(1, report_count=2)
+        assert buf.flush() == 1
+        assert ex.batches == [(("report_count",), [(1, 3)])]
+
+    def test_pending_cap_forces_flush(self):
+        ex = FakeExecutor()
+        buf = CounterBuffer(max_pending=3, executor=ex)
+        for uid in range(5):
+            buf.add(uid, messages_recv=1)
+        assert len(ex.batches) == 1 and len(ex.batches[0][1]) == 3
+        assert buf.stats()["pending_users"] == 2
+
+
+class TestLifecycle:
+    @pytest.mark.asyncio
+    async def test_periodic_flush_and_final_flush_on_stop(self):
+        ex = FakeExecutor()
+        buf = CounterBuffer(interval=0.02, executor=ex)
+        buf.start()
+        buf.add(1, messages_sent=1)
+        await asyncio.sleep(0.08)
+        assert ex.batches == [(("messages_sent",), [(1, 1)])]
+        buf.interval = 60
+        await asyncio.sleep(0.03)
+        buf.add(2, messages_sent=1)
+        await buf.stop()
+        assert ex.batches[-1] == (("messages_sent",), [(2, 1)])
+
+    @pytest.mark.asyncio
+    async def test_pending_cap_wakes_running_flusher(self):
+        ex = FakeExecutor()
+        buf = CounterBuffer(interval=60, max_pending=2, executor=ex)
+        buf.start()
+        await asyncio.sleep(0)
+        buf.add(1, messages_sent=1)
+        buf.add(2, messages_sent=1)
+        assert ex.batches == []
+        await asyncio.sleep(0.05)
+        assert len(ex.batches) == 1
+        await buf.stop()
@@ -0,0 +1,135 @@
+"""
+Tests for the asyncpg repository layer and its threaded psycopg2 fallback
+The asyncpg pool is an in-memory fake - no database required
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import registration as reg
+from utils import db_repo, user_snapshot
+from utils.user_snapshot import UserSnapshot, UserSnapshotCache
+
+
+class FakeRecord(dict):
+    def __iter__(self):
+        return iter(self.values())
+
+
+class FakePool:
+    def __init__(self, rows=None, fail_ping=False):
+        self.rows = rows or {}
+        self.fail_ping = fail_ping
+        self.queries = []
+        self.expired = 0
+
+    async def fetchrow(self, sql, *args):
+        self.queries.append((sql, args))
+        return self.rows.get(args[0])
+
+    async def fetchval(self, sql, *args):
+        self.queries.append((sql, args))
+        if sql == "SELECT 1" and self.fail_ping:
+            raise ConnectionError("server closed the connection")
+        row = self.rows.get(args[0]) if args else None
+        return next(iter(row.values())) if row else (1 if sql == "SELECT 1" else None)
+
+    async def execute(self, sql, *args):
+        self.queries.append((sql, args))
+
+    async def expire_connections(self):
+        self.expired += 1
+
+    def get_size(self):
+        return 2
+
+    def get_idle_size(self):
+        return 2
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool()
+    monkeypatch.setattr(db_repo, "_pool", fake)
+    return fake
+
+
+class TestFallback:
+    @pytest.mark.asyncio
+    async def test_sync_function_runs_off_the_loop(self, monkeypatch):
+        monkeypatch.setattr(db_repo, "_pool", None)
+        monkeypatch.setattr(db_repo, "ASYNC_DB", False)
+        seen = {}
+
+        def get_age_pref(uid):
+            seen["thread"] = threading.current_thread() is threading.main_thread()
+            return (21, 30)
+        monkeypatch.setattr(reg, "get_age_pref", get_age_pref)
+        before = db_repo.stats()["fallback_calls"]
+        assert await db_repo.get_age_pref(5) == (21, 30)
+        assert seen["thread"] is False
+        assert db_repo.stats()["fallback_calls"] == before + 1
+
+
+class TestAsyncPath:
+    @pytest.mark.asyncio
+    async def test_ban_and_premium(self, pool):
+        future = datetime.now(timezone.utc) + timedelta(days=1)
+        pool.rows[1] = FakeRecord(banned_until=future, banned_reason="spam", banned_by=9)
+        pool.rows[2] = FakeRecord(flag=False, premium_until=future)
+        assert await db_repo.is_banned(1) is True
+        assert await db_repo.get_ban_info(1) == (future, "spam", 9)
+        assert await db_repo.get_ban_info(3) == (None, None, None)
+        assert await db_repo.has_active_premium(2) is True
+        assert await db_repo.has_active_premium(3) is False
+        assert all("$1" in sql for sql, _ in pool.queries)
+
+    @pytest.mark.asyncio
+    async def test_setters_invalidate_snapshot(self, pool, monkeypatch):
+        cache = UserSnapshotCache(ttl=60, loader=lambda uid: UserSnapshot(uid))
+        monkeypatch.setattr(user_snapshot, "user_snapshots", cache)
+        cache.get(1)
+        await db_repo.set_ban(1, datetime(2030, 1, 1), "spam", 0)
+        assert 1 not in cache._snapshots
+        cache.get(1)
+        await db_repo.set_is_premium(1, True)
+        assert 1 not in cache._snapshots
+
+    @pytest.mark.asyncio
+    async def test_snapshot_loader(self, pool):
+        pool.rows[4] = FakeRecord(gender="f", age=24, verified=True, premium=False, premium_until=None,
+                                  banned_until=None, allow_forward=True, shadow_banned=False, interests=True)
+        snap = await db_repo.load_user_snapshot(4)
+        assert snap.registered and snap.allow_forward and snap.gender == "f"
+        assert "%s" not in pool.queries[-1][0]
+        assert not (await db_repo.load_user_snapshot(5)).registered
+
+
+class TestHealthChecks:
+    @pytest.mark.asyncio
+    async def test_pings_only_when_idle(self, pool, monkeypatch):
+        monkeypatch.setattr(db_repo, "IDLE_PING_AFTER", 0.05)
+        monkeypatch.setattr(db_repo, "_last_used", time.monotonic())
+        task = asyncio.create_task(db_repo._health_loop(0.02))
+        await asyncio.sleep(0.03)
+        assert not [sql for sql, _ in pool.queries if sql == "SELECT 1"]
+        await asyncio.sleep(0.1)
+        task.cancel()
+        assert [sql for sql, _ in pool.queries if sql == "SELECT 1"]
+
+    @pytest.mark.asyncio
+    async def test_failed_ping_recycles_connections(self, monkeypatch):
+        fake = FakePool(fail_ping=True)
+        monkeypatch.setattr(db_repo, "_pool", fake)
+        monkeypatch.setattr(db_repo, "IDLE_PING_AFTER", 0)
+        task = asyncio.create_task(db_repo._health_loop(0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        assert fake.expired >= 1
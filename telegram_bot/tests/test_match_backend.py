@@ -0,0 +1,278 @@
+"""
+Tests for the pluggable matchmaking backend and worker sharding
+The memory backend runs as-is; Postgres is covered at the SQL/notification level - no database required
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from telegram.ext import ApplicationHandlerStop
+
+from utils import sharding
+from utils.chat_state import StateMap
+from utils.match_backend import (
+    MATCHED, QUEUED, SEARCHING, MatchBackend, MemoryMatchBackend, PostgresMatchBackend,
+    _lock_key, candidate_query, create_backend,
+)
+from utils.matchmaking import MatchIndex, MatchProfile
+
+
+def profile(uid, **kwargs):
+    kwargs.setdefault("gender", "m")
+    kwargs.setdefault("age", 25)
+    return MatchProfile(uid, **kwargs)
+
+
+@pytest.fixture
+def memory():
+    return MemoryMatchBackend(MatchIndex(), {}, asyncio.Lock())
+
+
+class TestMemoryBackend:
+    @pytest.mark.asyncio
+    async def test_queue_then_match(self, memory):
+        assert await memory.search(profile(1)) == (QUEUED, None, [])
+        assert await memory.is_waiting(1)
+        status, cand, removed = await memory.search(profile(2))
+        assert status == MATCHED and cand.uid == 1
+        assert [p.uid for p in removed] == [1]
+        assert memory.peers == {1: 2, 2: 1}
+        assert not await memory.is_waiting(1)
+
+    @pytest.mark.asyncio
+    async def test_keep_place_refreshes(self, memory):
+        await memory.search(profile(1))
+        status, _, _ = await memory.search(profile(1, mode="girls"))
+        assert status == SEARCHING
+        assert memory.queue.get(1).mode == "girls"
+        # keep_place=False (city mode) re-enters instead
+        assert (await memory.search(profile(1), keep_place=False))[0] == QUEUED
+
+    @pytest.mark.asyncio
+    async def test_claim_target_and_release(self, memory):
+        await memory.enqueue(profile(5))
+        assert await memory.claim_target(1, 9) is None
+        removed = await memory.claim_target(1, 5)
+        assert [p.uid for p in removed] == [5]
+        assert await memory.claim_target(2, 5) is None  # already paired
+        assert await memory.release_pair(1, 5, removed + [profile(1)])
+        assert memory.peers == {}
+        assert list(memory.queue) == [5, 1]
+        # A second release of the same pair is a no-op
+        assert not await memory.release_pair(1, 5, [])
+
+    @pytest.mark.asyncio
+    async def test_end_pair_and_enqueue(self, memory):
+        await memory.search(profile(1))
+        await memory.search(profile(2))
+        assert await memory.end_pair(2) == 1
+        assert memory.peers == {}
+        assert await memory.end_pair(2) is None
+        await memory.enqueue(profile(3))
+        await memory.enqueue(profile(4), front=True)
+        await memory.enqueue(profile(3, mode="boys"), if_absent=True)
+        assert list(memory.queue) == [4, 3]
+        assert memory.queue.get(3).mode == "random"
+        assert memory.stats()["waiting"] == 2
+
+    def test_factory(self):
+        assert isinstance(create_backend("postgres", MatchIndex(), {}, asyncio.Lock()), PostgresMatchBackend)
+        assert isinstance(create_backend("bogus", MatchIndex(), {}, asyncio.Lock()), MemoryMatchBackend)
+
+
+class TestPostgresBackend:
+    def test_candidate_query_filters(self):
+        sql, args = candidate_query(profile(7, mode="girls", gender="m", city="Pune",
+                                            age_window=(20, 30), verified=False))
+        assert sql.endswith("ORDER BY q.pos LIMIT 32 FOR UPDATE SKIP LOCKED")
+        assert "q.gender = 'f'" in sql
+        assert "q.age BETWEEN $2 AND $3" in sql
+        assert "q.mode = 'boys'" in sql and "q.mode = 'girls'" not in sql
+        assert "NOT q.verified_only" in sql
+        assert "NOT EXISTS (SELECT 1 FROM chat_pairs" in sql
+        assert args == [7, 20, 30, "pune", 25]
+
+    def test_city_search_without_city(self):
+        sql, _ = candidate_query(profile(7, mode="city"))
+        assert "FALSE" in sql
+
+    def test_lock_keys_are_namespaced(self):
+        assert _lock_key(1) != _lock_key(2)
+        assert _lock_key(123) >> 48 == 0x4D41
+        assert _lock_key(123) & 0xFFFF == 123
+
+    def test_notifications_update_peers(self):
+        backend = PostgresMatchBackend({})
+        backend._on_notify(None, 0, "chat_pairs", "pair:1:2:other-worker")
+        assert backend.peers == {1: 2, 2: 1}
+        # Our own events were applied locally already
+        backend._on_notify(None, 0, "chat_pairs", f"end:1:2:{backend._origin}")
+        assert backend.peers == {1: 2, 2: 1}
+        backend._on_notify(None, 0, "chat_pairs", "end:2:1:other-worker")
+        assert backend.peers == {}
+        backend._on_notify(None, 0, "chat_pairs", "garbage")
+        assert backend.stats()["remote_events"] == 2
+
+    def test_end_keeps_newer_pair(self):
+        backend = PostgresMatchBackend({1: 3, 3: 1, 2: 4, 4: 2})
+        backend._apply("end", 1, 2)
+        assert backend.peers == {1: 3, 3: 1, 2: 4, 4: 2}
+
+    def test_backend_is_abstract(self):
+        with pytest.raises(TypeError):
+            MatchBackend({})
+
+
+class FakeStateConnection:
+    """Runs the shared-state writer's statements against a dict and queues its NOTIFYs"""
+
+    def __init__(self, rows, outbox):
+        self.rows = rows
+        self.outbox = outbox
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def executemany(self, sql, args):
+        for row in args:
+            if sql.startswith("DELETE"):
+                self.rows.pop(tuple(row), None)
+            elif sql.startswith("INSERT"):
+                self.rows[(row[0], row[1])] = row[3]
+            else:
+                self.outbox.append(row[1])
+
+
+class FakeStatePool:
+    def __init__(self):
+        self.rows = {}
+        self.outbox = []
+
+    def acquire(self):
+        return FakeStateConnection(self.rows, self.outbox)
+
+
+def sharing_worker(pool):
+    backend = PostgresMatchBackend({})
+    backend._pool = pool
+    sessions = StateMap("secret_sessions")
+    media = StateMap("pending_secret_media")
+    backend.share(sessions)
+    backend.share(media, user_of=lambda key: key[0])
+    return backend, sessions, media
+
+
+def deliver(pool, *workers):
+    """NOTIFYs reach every listener, the sender included, in commit order"""
+    for payload in pool.outbox:
+        for backend in workers:
+            backend._on_state_notify(None, 0, "chat_user_state", payload)
+    pool.outbox.clear()
+
+
+class TestSharedState:
+    @pytest.mark.asyncio
+    async def test_writes_reach_other_workers(self):
+        import datetime
+        pool = FakeStatePool()
+        a, a_sessions, a_media = sharing_worker(pool)
+        b, b_sessions, b_media = sharing_worker(pool)
+        expires = datetime.datetime(2026, 1, 1, 12, 0)
+        a_sessions[1] = {"partner": 2, "expires_at": expires}
+        a_sessions[2] = {"partner": 1, "expires_at": expires}
+        a_media[(1, 77)] = {"partner": 2, "file_id": "f"}
+        await a._flush_state()
+        deliver(pool, a, b)
+        assert b_sessions[2] == {"partner": 1, "expires_at": expires}
+        assert b_media[(1, 77)] == {"partner": 2, "file_id": "f"}
+        assert pool.rows[("pending_secret_media", "[1, 77]")] == '{"partner": 2, "file_id": "f"}'
+
+        b_sessions.pop(1, None)
+        b_sessions.pop(2, None)
+        await b._flush_state()
+        deliver(pool, a, b)
+        assert dict(a_sessions.items()) == {} and ("secret_sessions", "1") not in pool.rows
+        assert not a._state_pending and not b._state_pending
+
+    @pytest.mark.asyncio
+    async def test_workers_converge_on_last_commit(self):
+        pool = FakeStatePool()
+        a, a_sessions, _ = sharing_worker(pool)
+        b, b_sessions, _ = sharing_worker(pool)
+        # Both write key 5 before seeing each other's change; A commits first
+        a_sessions[5] = {"partner": 6}
+        b_sessions[5] = {"partner": 7}
+        await a._flush_state()
+        await b._flush_state()
+        deliver(pool, a, b)
+        assert a_sessions[5] == b_sessions[5] == {"partner": 7}
+        assert b.stats()["state_remote_events"] == 0
+
+    def test_only_the_owner_evicts_everywhere(self, monkeypatch):
+        pool = FakeStatePool()
+        a, a_sessions, _ = sharing_worker(pool)
+        monkeypatch.setattr(sharding, "WORKER_COUNT", 2)
+        monkeypatch.setattr(sharding, "WORKER_INDEX", 0)
+        a_sessions.apply(3, {"partner": 4})
+        a_sessions.apply(4, {"partner": 3})
+        a_sessions.idle_ttl = 0
+        assert a_sessions.sweep(now=a_sessions._clock() + 1) == 2
+        # 4 is ours (4 % 2 == 0): its removal is shared; 3 belongs to worker 1
+        assert [(key, value) for _, key, _, value, _ in a._state_writes] == [("4", None)]
+
+
+class FakeUser:
+    def __init__(self, uid):
+        self.id = uid
+
+
+class TestSharding:
+    def test_ownership(self):
+        assert sharding.owns(7, count=1, index=0)
+        assert sharding.owns(7, count=3, index=1)
+        assert not sharding.owns(7, count=3, index=0)
+        assert sharding.owns(None, count=3, index=0)
+        assert not sharding.owns(None, count=3, index=2)
+
+    def test_instance_lock_keys(self):
+        assert sharding.instance_lock_key(count=1, index=0) == 900001
+        keys = {sharding.instance_lock_key(count=4, index=i) for i in range(4)}
+        assert len(keys) == 4 and 900001 not in keys
+
+    def test_validate(self, monkeypatch):
+        monkeypatch.setattr(sharding, "WORKER_COUNT", 2)
+        monkeypatch.setattr(sharding, "WORKER_INDEX", 1)
+        monkeypatch.setenv("MATCH_BACKEND", "memory")
+        with pytest.raises(ValueError):
+            sharding.validate()
+        monkeypatch.setenv("MATCH_BACKEND", "postgres")
+        sharding.validate()
+        monkeypatch.setattr(sharding, "WORKER_INDEX", 2)
+        with pytest.raises(ValueError):
+            sharding.validate()
+
+    @pytest.mark.asyncio
+    async def test_gate(self, monkeypatch):
+        from telegram import Update
+
+        monkeypatch.setattr(sharding, "WORKER_COUNT", 2)
+        monkeypatch.setattr(sharding, "WORKER_INDEX", 0)
+
+        def update_from(uid):
+            update = Update(update_id=1)
+            monkeypatch.setattr(Update, "effective_user", property(lambda self: FakeUser(uid)))
+            return update
+
+        await sharding.shard_gate(update_from(4), None)
+        with pytest.raises(ApplicationHandlerStop):
+            await sharding.shard_gate(update_from(5), None)
@@ -0,0 +1,112 @@
+"""
+Tests for the bucketed matchmaking index behind chat.start_search
+Profiles are in-memory snapshots - no database required
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.matchmaking import (
+    MatchIndex, MatchProfile, age_band, bands_for_window, mutual_ok,
+)
+
+
+def profile(uid, **kwargs):
+    kwargs.setdefault("gender", "m")
+    kwargs.setdefault("age", 25)
+    return MatchProfile(uid, **kwargs)
+
+
+class TestFilters:
+    def test_age_bands(self):
+        assert [age_band(a) for a in (None, 18, 21, 22, 49, 50, 80)] == [-1, 0, 0, 1, 5, 6, 6]
+        assert bands_for_window((23, 27)) == (1, 2)
+        assert -1 in bands_for_window(None) and -1 not in bands_for_window((18, 30))
+
+    def test_mutual_rules(self):
+        boy = profile(1, gender="m", mode="girls")
+        girl = profile(2, gender="f")
+        assert mutual_ok(boy, girl)
+        assert not mutual_ok(boy, profile(3, gender="m"))
+        # Candidate's own filters count too
+        assert not mutual_ok(girl, profile(4, gender="f", mode="boys"))
+        assert not mutual_ok(profile(5, verified_only=True), profile(6, verified=False))
+        assert not mutual_ok(profile(7, age_window=(30, 40)), profile(8, age=None))
+        assert mutual_ok(profile(9, age_window=(18, 99)), profile(10, age=None))
+        assert not mutual_ok(profile(11, mode="city", city="Pune"), profile(12, city="delhi"))
+        assert mutual_ok(profile(13, mode="city", city="Pune"), profile(14, city="pune"))
+
+
+class TestMatchIndex:
+    def test_fifo_within_bucket_and_boost(self):
+        index = MatchIndex()
+        for uid in (1, 2, 3):
+            index.append(profile(uid))
+        assert index.find(profile(9)).uid == 1
+        index.appendleft(profile(3))
+        assert list(index) == [3, 1, 2]
+        assert index.find(profile(9)).uid == 3
+
+    def test_oldest_across_buckets(self):
+        index = MatchIndex()
+        index.append(profile(1, gender="f", age=40, city="pune"))
+        index.append(profile(2, gender="m", age=20, verified=True))
+        assert index.find(profile(9)).uid == 1
+        assert index.find(profile(9, mode="boys")).uid == 2
+        assert index.find(profile(9, verified_only=True)).uid == 2
+        assert index.find(profile(9, mode="city", city="pune")).uid == 1
+        assert index.find(profile(9, mode="city", city="delhi")) is None
+
+    def test_deque_surface_and_refresh(self):
+        index = MatchIndex()
+        index.append(profile(1))
+        index.append(profile(2))
+        assert 1 in index and len(index) == 2
+        index.refresh(profile(1, mode="girls"))
+        assert list(index) == [1, 2] and index.get(1).mode == "girls"
+        index.remove(1)
+        with pytest.raises(ValueError):
+            index.remove(1)
+        assert list(index) == [2] and index.stats()["buckets"] == 1
+        index.clear()
+        assert len(index) == 0
+
+    def test_refresh_keeps_oldest_first(self):
+        index = MatchIndex()
+        for uid in (1, 2, 3):
+            index.append(profile(uid))
+        index.refresh(profile(1, age_window=(18, 40)))
+        assert index.find(profile(9)).uid == 1
+        # Boosted entries refreshed in place stay ahead too
+        index.appendleft(profile(4))
+        index.appendleft(profile(5))
+        index.refresh(profile(4))
+        assert list(index) == [5, 4, 1, 2, 3]
+        index.discard(5)
+        assert index.find(profile(9)).uid == 4
+
+    def test_stale_entries_dropped(self):
+        index = MatchIndex()
+        for uid in (1, 2):
+            index.append(profile(uid))
+        assert index.find(profile(9), is_stale=lambda uid: uid == 1).uid == 2
+        assert 1 not in index and 2 in index
+
+    def test_work_does_not_grow_with_queue(self):
+        rng = random.Random(3)
+        checked = {}
+        for size in (200, 20000):
+            index = MatchIndex()
+            for uid in range(size):
+                index.append(profile(uid, gender=rng.choice("fm"), age=rng.randint(18, 60),
+                                     verified=rng.random() < 0.3, city=rng.choice(("a", "b", "c")),
+                                     age_window=(30, 35) if rng.random() < 0.5 else None))
+            for uid in range(size, size + 200):
+                index.find(profile(uid, mode=rng.choice(("random", "girls", "boys"))))
+            checked[size] = index.stats()["avg_candidates_checked"]
+        # Bounded by buckets probed x scan_per_bucket, not by queue length
+        assert checked[20000] < 30 and checked[200] < 30
@@ -0,0 +1,119 @@
+"""
+Tests for the outbound send scheduler
+The Bot is an in-memory fake that can inject RetryAfter - no network required
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import Forbidden, RetryAfter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+from utils.send_scheduler import Priority, SendScheduler
+
+
+class FakeBot:
+    def __init__(self, flood_on=()):
+        self.flood_on = set(flood_on)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if text in self.flood_on:
+            self.flood_on.discard(text)
+            raise RetryAfter(timedelta(milliseconds=150))
+        if text == "blocked":
+            raise Forbidden("bot was blocked by the user")
+        self.sent.append((chat_id, text, time.monotonic()))
+        return SimpleNamespace(message_id=len(self.sent), chat_id=chat_id)
+
+
+def _scheduler(**kwargs):
+    opts = dict(per_chat_rate=1000, per_chat_burst=1, global_rate=1000)
+    opts.update(kwargs)
+    return SendScheduler(**opts)
+
+
+class TestOrderingAndPriority:
+    @pytest.mark.asyncio
+    async def test_fifo_per_chat(self):
+        sched, bot = _scheduler(per_chat_rate=50), FakeBot()
+        await asyncio.gather(*(sched.send_message(bot, 1, f"m{i}") for i in range(5)))
+        assert [t for _, t, _ in bot.sent] == ["m0", "m1", "m2", "m3", "m4"]
+        await sched.stop()
+
+    @pytest.mark.asyncio
+    async def test_relay_overtakes_queued_broadcasts(self):
+        sched, bot = _scheduler(global_rate=20), FakeBot()
+        sched._global_tokens = 0
+        pending = [sched.submit(100 + i, lambda i=i: bot.send_message(100 + i, f"b{i}"), Priority.BROADCAST)
+                   for i in range(5)]
+        pending.append(sched.submit(1, lambda: bot.send_message(1, "relay"), Priority.RELAY))
+        pending.append(sched.submit(2, lambda: bot.send_message(2, "intro"), Priority.INTRO))
+        await asyncio.gather(*pending)
+        assert [t for _, t, _ in bot.sent][:2] == ["relay", "intro"]
+        await sched.stop()
+
+    @pytest.mark.asyncio
+    async def test_per_chat_rate(self):
+        sched, bot = _scheduler(per_chat_rate=20), FakeBot()
+        await asyncio.gather(*(sched.send_message(bot, 1, f"m{i}") for i in range(4)))
+        times = [ts for _, _, ts in bot.sent]
+        assert times[-1] - times[0] >= 3 / 20 * 0.9
+        await sched.stop()
+
+
+class TestFloodWait:
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_every_chat(self):
+        sched, bot = _scheduler(), FakeBot(flood_on={"first"})
+        t0 = time.monotonic()
+        first = asyncio.ensure_future(sched.send_message(bot, 1, "first"))
+        await asyncio.sleep(0.02)
+        other = sched.send_message(bot, 2, "other")
+        msg, _ = await asyncio.gather(first, other)
+        assert msg.chat_id == 1
+        assert all(ts - t0 >= 0.15 for _, _, ts in bot.sent)
+        stats = sched.stats()
+        assert stats["flood_waits"] == 1 and stats["retries"] == 1 and stats["sent"]["NUDGE"] == 2
+        await sched.stop()
+
+    @pytest.mark.asyncio
+    async def test_other_errors_reach_the_caller(self):
+        sched, bot = _scheduler(), FakeBot()
+        with pytest.raises(Forbidden):
+            await sched.send_message(bot, 1, "blocked")
+        assert sched.stats()["failed"] == 1
+        await sched.stop()
+
+
+class TestBounds:
+    @pytest.mark.asyncio
+    async def test_bounded_queues_drop_with_metrics(self):
+        sched, bot = _scheduler(max_per_chat=2, max_queued=6, global_rate=1), FakeBot()
+        sched._global_tokens = 0
+        futures = [sched.submit(1, lambda: bot.send_message(1, "x"), Priority.RELAY) for _ in range(3)]
+        futures += [sched.submit(i, lambda i=i: bot.send_message(i, "b"), Priority.BROADCAST) for i in (5, 6, 7)]
+        # Broadcasts may only fill half of max_queued
+        assert futures[2].result() is None
+        assert futures[4].result() is None and futures[5].result() is None
+        dropped = sched.stats()["dropped"]
+        assert dropped["RELAY"]["chat_full"] == 1 and dropped["BROADCAST"]["queue_full"] == 2
+        await sched.stop()
+        assert all(f.done() for f in futures)
+
+
+class TestSendSafe:
+    @pytest.mark.asyncio
+    async def test_rate_limited_send_is_delivered_not_dropped(self, monkeypatch):
+        sched, bot = _scheduler(per_chat_rate=20), FakeBot(flood_on={"hello 1"})
+        monkeypatch.setattr(chat, "outbound", sched)
+        results = await asyncio.gather(*(chat.send_safe(bot, chat_id=1, text=f"hello {i}") for i in range(8)))
+        assert all(r is not None for r in results)
+        assert [t for _, t, _ in bot.sent] == [f"hello {i}" for i in range(8)]
+        await sched.stop()
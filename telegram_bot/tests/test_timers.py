@@ -0,0 +1,165 @@
+"""
+Tests for the central timer service (secret-chat expiry, timed deletes)
+The pending_timers table and the Bot are in-memory fakes - no database required
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+from utils import timers as timers_mod
+from utils.timers import TimerService
+
+
+class MemoryStore:
+    def __init__(self, rows=None):
+        self.rows = dict(rows or {})
+
+    def ensure_table(self):
+        pass
+
+    def load(self):
+        return [(tid, kind, payload, at) for tid, (kind, payload, at) in self.rows.items()]
+
+    def insert(self, handle):
+        self.rows[handle.timer_id] = (handle.kind, handle.payload, handle.deadline)
+
+    def delete(self, timer_id):
+        self.rows.pop(timer_id, None)
+
+    async def claim(self, timer_ids, now):
+        return [tid for tid in timer_ids if tid in self.rows and self.rows[tid][2] <= now
+                and self.rows.pop(tid)]
+
+
+class FakeBot:
+    def __init__(self):
+        self.deleted = []
+        self.sent = []
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestTimerService:
+    @pytest.mark.asyncio
+    async def test_fires_in_deadline_order_on_one_task(self):
+        store, bot = MemoryStore(), FakeBot()
+        svc = TimerService(store=store)
+        fired = []
+
+        async def handler(b, payload):
+            fired.append(payload["n"])
+        svc.register("t", handler)
+        await svc.start(bot)
+        tasks_before = len(asyncio.all_tasks())
+        for n, delay in ((3, 0.09), (1, 0.03), (2, 0.06)):
+            svc.schedule("t", delay, {"n": n})
+        assert len(asyncio.all_tasks()) == tasks_before
+        assert svc.stats()["pending"] == 3 and len(store.rows) == 3
+        await asyncio.sleep(0.15)
+        assert fired == [1, 2, 3] and not store.rows
+        assert svc.stats()["fired"] == 3 and svc.pending() == 0
+        await svc.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel_and_replace_by_key(self):
+        store, bot = MemoryStore(), FakeBot()
+        svc = TimerService(store=store)
+        fired = []
+
+        async def handler(b, payload):
+            fired.append(payload)
+        svc.register("t", handler)
+        await svc.start(bot)
+        handle = svc.schedule("t", 0.03, {"n": 1})
+        assert handle.timer_id in store.rows
+        assert svc.cancel(handle) and not svc.cancel(handle)
+        assert handle.timer_id not in store.rows
+        svc.schedule("t", 10, {"n": 2}, key="k")
+        svc.schedule("t", 0.03, {"n": 3}, key="k")
+        assert svc.pending() == 1 and store.rows["k"][1] == {"n": 3}
+        await asyncio.sleep(0.08)
+        assert fired == [{"n": 3}]
+        assert svc.stats()["cancelled"] == 2
+        await svc.stop()
+
+    @pytest.mark.asyncio
+    async def test_overdue_timers_fire_after_restart(self):
+        past = time.time() - 60
+        store = MemoryStore({"a": ("delete_message", {"chat_id": 5, "message_id": 9}, past),
+                             "b": ("delete_message", {"chat_id": 6, "message_id": 1}, time.time() + 3600)})
+        svc = TimerService(store=store)
+        svc.register("delete_message", timers_mod._delete_message)
+        bot = FakeBot()
+        await svc.start(bot)
+        await asyncio.sleep(0.02)
+        assert bot.deleted == [(5, 9)]
+        assert list(store.rows) == ["b"] and svc.stats()["pending_by_kind"] == {"delete_message": 1}
+        assert svc.stats()["max_lag"] >= 59
+        await svc.stop()
+
+    @pytest.mark.asyncio
+    async def test_each_timer_fires_in_one_worker(self):
+        past = time.time() - 1
+        store = MemoryStore({"a": ("t", {"n": 1}, past), "b": ("t", {"n": 2}, time.time() + 0.03)})
+        fired = []
+
+        async def handler(b, payload):
+            fired.append(payload["n"])
+        workers = [TimerService(store=store) for _ in range(3)]
+        for svc in workers:
+            svc.register("t", handler)
+            await svc.start(FakeBot())
+        # Cancelled by another worker: its row is gone, so nobody fires it
+        workers[0].schedule("t", 0.03, {"n": 3}, key="c")
+        store.delete("c")
+        await asyncio.sleep(0.08)
+        assert sorted(fired) == [1, 2] and not store.rows
+        assert workers[0].stats()["claimed_elsewhere"] >= 1
+        for svc in workers:
+            await svc.stop()
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_counted(self):
+        svc = TimerService(store=MemoryStore())
+
+        async def broken(b, payload):
+            raise RuntimeError("boom")
+        svc.register("t", broken)
+        await svc.start(FakeBot())
+        svc.schedule("t", 0)
+        svc.schedule("unknown", 0)
+        await asyncio.sleep(0.02)
+        assert svc.stats()["errors"] == 1 and svc.pending() == 0
+        await svc.stop()
+
+
+class TestSecretExpiry:
+    @pytest.mark.asyncio
+    async def test_secret_chat_expires_for_both_sides(self, monkeypatch):
+        svc = TimerService(store=MemoryStore())
+        svc.register("secret_end", chat._auto_end_secret)
+        monkeypatch.setattr(chat, "timers", svc)
+        bot = FakeBot()
+        await svc.start(bot)
+        expires = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(milliseconds=50)
+        chat.secret_sessions.update({1: {"partner": 2, "expires_at": expires, "ttl": 10, "inviter": 1},
+                                     2: {"partner": 1, "expires_at": expires, "ttl": 10, "inviter": 1}})
+        try:
+            svc.schedule("secret_end", expires, {"a": 1, "b": 2}, key=chat._secret_timer_key(1, 2))
+            await asyncio.sleep(0.1)
+            assert not chat.secret_sessions
+            assert sorted(uid for uid, _ in bot.sent) == [1, 2]
+        finally:
+            chat.secret_sessions.clear()
+        await svc.stop()
@@ -0,0 +1,183 @@
+"""
+Tests for webhook ingestion (secret check, bounded queue, per-chat ordering)
+Recorded Update JSON is posted to the ASGI app in-process - no network or bot token required
+"""
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from telegram import Update
+
+from utils.update_ingest import (
+    ACCEPTED, CHAT_FULL, QUEUE_FULL, SECRET_HEADER, UpdateIngest, create_webhook_app, ordering_key,
+)
+
+SECRET = "s3cret-token"
+
+# Captured from the Bot API (ids and names anonymised)
+RECORDED_UPDATES = json.loads("""[
+  {"update_id": 900001, "message": {"message_id": 11, "date": 1760000000,
+    "chat": {"id": 5001, "type": "private", "first_name": "A"},
+    "from": {"id": 5001, "is_bot": false, "first_name": "A"}, "text": "/start",
+    "entities": [{"offset": 0, "length": 6, "type": "bot_command"}]}},
+  {"update_id": 900002, "message": {"message_id": 12, "date": 1760000001,
+    "chat": {"id": 5001, "type": "private", "first_name": "A"},
+    "from": {"id": 5001, "is_bot": false, "first_name": "A"}, "text": "hello"}},
+  {"update_id": 900003, "callback_query": {"id": "4382", "chat_instance": "-77",
+    "from": {"id": 5002, "is_bot": false, "first_name": "B"}, "data": "rm:yes",
+    "message": {"message_id": 40, "date": 1760000002,
+      "chat": {"id": 5002, "type": "private", "first_name": "B"}, "text": "Chat again?"}}},
+  {"update_id": 900004, "message": {"message_id": 13, "date": 1760000003,
+    "chat": {"id": 5001, "type": "private", "first_name": "A"},
+    "from": {"id": 5001, "is_bot": false, "first_name": "A"},
+    "photo": [{"file_id": "AgAD", "file_unique_id": "u1", "width": 90, "height": 90}]}},
+  {"update_id": 900005, "pre_checkout_query": {"id": "pcq1", "currency": "XTR", "total_amount": 50,
+    "invoice_payload": "premium_30", "from": {"id": 5003, "is_bot": false, "first_name": "C"}}}
+]""")
+
+
+class Recorder:
+    """process(update) stand-in; gate lets a test hold updates in flight"""
+
+    def __init__(self):
+        self.seen = []
+        self.active = {}
+        self.overlap = False
+        self.gate = None
+
+    async def __call__(self, update):
+        key = ordering_key(update)
+        if self.active.get(key):
+            self.overlap = True
+        self.active[key] = True
+        if self.gate is not None:
+            await self.gate.wait()
+        await asyncio.sleep(0)
+        self.seen.append(update.update_id)
+        self.active[key] = False
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.gauges = {}
+        self.timings = []
+
+    def gauge(self, name, value, tags=None):
+        self.gauges[name] = value
+
+    def timer(self, name, duration_ms, tags=None):
+        self.timings.append(name)
+
+
+def client_for(ingest, secret=SECRET):
+    app = create_webhook_app(ingest, "hook", secret)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def update(update_id, chat_id):
+    return Update.de_json({"update_id": update_id, "message": {
+        "message_id": update_id, "date": 1760000000, "text": "x",
+        "chat": {"id": chat_id, "type": "private"}}}, None)
+
+
+class TestWebhookEndpoint:
+    @pytest.mark.asyncio
+    async def test_recorded_updates_are_processed_in_chat_order(self):
+        rec, sink = Recorder(), FakeMetrics()
+        ingest = UpdateIngest(rec, workers=4, metrics_sink=sink)
+        await ingest.start()
+        async with client_for(ingest) as client:
+            for data in RECORDED_UPDATES:
+                resp = await client.post("/hook", json=data, headers={SECRET_HEADER: SECRET})
+                assert resp.status_code == 200
+            await ingest.join()
+            stats = (await client.get("/hook/stats")).json()
+        await ingest.stop()
+
+        assert sorted(rec.seen) == [u["update_id"] for u in RECORDED_UPDATES]
+        chat_5001 = [uid for uid in rec.seen if uid in (900001, 900002, 900004)]
+        assert chat_5001 == [900001, 900002, 900004]
+        assert not rec.overlap
+        assert stats["processed"] == 5 and stats["queued"] == 0 and stats["errors"] == 0
+        assert sink.gauges["queue_depth"] == 0
+        assert sink.timings.count("update_processing_ms") == 5
+
+    @pytest.mark.asyncio
+    async def test_secret_and_body_checks(self):
+        ingest = UpdateIngest(Recorder(), workers=1)
+        await ingest.start()
+        async with client_for(ingest) as client:
+            body = RECORDED_UPDATES[0]
+            assert (await client.post("/hook", json=body)).status_code == 403
+            assert (await client.post("/hook", json=body, headers={SECRET_HEADER: "nope"})).status_code == 403
+            bad = await client.post("/hook", content=b"{not json", headers={SECRET_HEADER: SECRET})
+            assert bad.status_code == 400
+            assert (await client.get("/hook")).status_code == 405
+        await ingest.stop()
+        assert ingest.accepted == 0
+
+    @pytest.mark.asyncio
+    async def test_full_backlog_answers_503(self):
+        rec = Recorder()
+        rec.gate = asyncio.Event()
+        ingest = UpdateIngest(rec, workers=1, max_queued=2)
+        await ingest.start()
+        async with client_for(ingest) as client:
+            codes = []
+            for data in RECORDED_UPDATES[:4]:
+                resp = await client.post("/hook", json=data, headers={SECRET_HEADER: SECRET})
+                codes.append(resp.status_code)
+                await asyncio.sleep(0)
+            assert codes[-1] == 503
+            assert resp.headers["Retry-After"] == "1"
+            rec.gate.set()
+            await ingest.join()
+        await ingest.stop()
+        assert ingest.rejected[QUEUE_FULL] >= 1
+        assert ingest.max_depth == 2
+
+
+class TestUpdateIngest:
+    @pytest.mark.asyncio
+    async def test_chats_run_in_parallel_up_to_pool_size(self):
+        rec = Recorder()
+        rec.gate = asyncio.Event()
+        ingest = UpdateIngest(rec, workers=2)
+        await ingest.start()
+        for i, chat_id in enumerate((1, 2, 3, 1)):
+            assert ingest.submit(update(i, chat_id)) == ACCEPTED
+        await asyncio.sleep(0.01)
+        # two workers busy, chat 3 and chat 1's second update still waiting
+        assert ingest.stats()["busy"] == 2
+        assert ingest.stats()["queued"] == 2
+        rec.gate.set()
+        await ingest.join()
+        await ingest.stop()
+        assert rec.seen.index(0) < rec.seen.index(3)
+        assert not rec.overlap
+
+    @pytest.mark.asyncio
+    async def test_per_chat_cap_and_errors(self):
+        async def failing(upd):
+            raise RuntimeError("handler blew up")
+
+        ingest = UpdateIngest(failing, workers=1, max_per_chat=2)
+        await ingest.start()
+        results = [ingest.submit(update(i, 7)) for i in range(4)]
+        assert results[-1] == CHAT_FULL
+        await ingest.join()
+        await ingest.stop()
+        stats = ingest.stats()
+        assert stats["errors"] == stats["processed"] == results.count(ACCEPTED)
+        assert results == [ACCEPTED, ACCEPTED, CHAT_FULL, CHAT_FULL]
+        assert stats["rejected"][CHAT_FULL] == 2
+
+    def test_submit_requires_start(self):
+        with pytest.raises(RuntimeError):
+            UpdateIngest(Recorder()).submit(update(1, 1))
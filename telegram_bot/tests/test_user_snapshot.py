@@ -0,0 +1,198 @@
+"""
+Tests for the per-user snapshot cache used by chat.relay
+The snapshot loader and the Bot are in-memory fakes - no database required
+"""
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import chat
+import registration as reg
+from utils import user_snapshot
+from utils.counter_buffer import FRIENDSHIP_COLUMNS, CounterBuffer, friend_pair
+from utils.user_snapshot import UserSnapshot, UserSnapshotCache
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+class CountingLoader:
+    def __init__(self, **fields):
+        self.fields = fields
+        self.calls = 0
+
+    def __call__(self, uid):
+        self.calls += 1
+        return UserSnapshot(uid, **self.fields)
+
+    async def load_async(self, uid):
+        return self(uid)
+
+
+class TestSnapshot:
+    def test_expiry_by_timestamp(self):
+        snap = UserSnapshot(1, premium_until=NOW + timedelta(hours=1), banned_until=NOW + timedelta(minutes=5))
+        assert snap.has_premium(NOW) and snap.is_banned(NOW)
+        later = NOW + timedelta(hours=2)
+        assert not snap.has_premium(later) and not snap.is_banned(later)
+        # Legacy flag wins regardless of premium_until; naive timestamps are UTC
+        assert UserSnapshot(2, premium_flag=True).has_premium(later)
+        assert UserSnapshot(3, banned_until=datetime(9999, 1, 1)).is_banned(NOW)
+
+
+class TestCache:
+    def test_ttl_and_invalidation(self):
+        loader = CountingLoader(registered=True)
+        cache = UserSnapshotCache(ttl=60, loader=loader)
+        for _ in range(5):
+            assert cache.get(1).registered
+        assert loader.calls == 1 and cache.stats()["hits"] == 4
+        cache.invalidate(1)
+        cache.get(1)
+        assert loader.calls == 2 and cache.stats()["invalidations"] == 1
+        cache.ttl = 0
+        cache.get(1)
+        assert loader.calls == 3
+
+    def test_lru_cap_and_load_errors(self):
+        cache = UserSnapshotCache(ttl=60, max_users=2, loader=CountingLoader())
+        for uid in (1, 2, 1, 3):
+            cache.get(uid)
+        assert list(cache._snapshots) == [1, 3]
+
+        def broken(uid):
+            raise RuntimeError("connection refused")
+        cache = UserSnapshotCache(loader=broken)
+        assert cache.get(1) is None and cache.stats()["load_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_friendship_never_queried_inline(self, monkeypatch):
+        from utils import db_repo
+        lookups = []
+
+        async def is_friends(a, b):
+            lookups.append((a, b))
+            return True
+        monkeypatch.setattr(db_repo, "is_friends", is_friends)
+        monkeypatch.setattr(reg, "is_friends", lambda a, b: pytest.fail("blocking friendship lookup"))
+        cache = UserSnapshotCache(ttl=60)
+        # Miss: answers "not friends" at once and loads in the background, once
+        assert cache.is_friends(1, 2) is False and cache.is_friends(2, 1) is False
+        await asyncio.sleep(0)
+        assert cache.is_friends(2, 1) is True and lookups == [(1, 2)]
+        # Warmed at pair time: no miss on the first message
+        assert await cache.awarm_friends(3, 4) is True
+        assert cache.is_friends(4, 3) is True and len(lookups) == 2
+
+    def test_badge_check_throttled(self):
+        cache = UserSnapshotCache()
+        assert cache.badge_check_due(1, interval=60)
+        assert not cache.badge_check_due(1, interval=60)
+        assert cache.badge_check_due(2, interval=60)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def __init__(self):
+        self.cur = FakeCursor()
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+
+class TestSetterInvalidation:
+    def test_setters_invalidate(self, monkeypatch):
+        cache = UserSnapshotCache(ttl=60, loader=CountingLoader())
+        monkeypatch.setattr(user_snapshot, "user_snapshots", cache)
+
+        @contextmanager
+        def fake_conn():
+            yield FakeConn()
+        monkeypatch.setattr(reg, "_conn", fake_conn)
+
+        setters = (
+            lambda: reg.set_is_premium(1, True),
+            lambda: reg.set_premium_until(1, NOW),
+            lambda: reg.set_allow_forward(1, True),
+            lambda: reg.set_ban(1, NOW, "spam", 0),
+            lambda: reg.clear_ban(1),
+            lambda: reg.set_shadow_ban(1, True),
+        )
+        for setter in setters:
+            cache.get(1)
+            setter()
+            assert 1 not in cache._snapshots
+        assert cache.stats()["invalidations"] == len(setters)
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def _message(text):
+    return SimpleNamespace(text=text, photo=None, video=None, animation=None, document=None,
+                           voice=None, sticker=None, forward_origin=None, is_automatic_forward=False,
+                           message_id=7, caption=None)
+
+
+class TestRelay:
+    @pytest.mark.asyncio
+    async def test_steady_state_relay_skips_db(self, monkeypatch):
+        loader = CountingLoader(registered=True)
+        cache = UserSnapshotCache(ttl=60, loader=loader, async_loader=loader.load_async)
+        monkeypatch.setattr(chat, "user_snapshots", cache)
+        monkeypatch.setattr(cache, "is_friends", lambda a, b: True)
+        friend_writes = CounterBuffer(executor=lambda columns, rows: None, columns=FRIENDSHIP_COLUMNS,
+                                      key=friend_pair)
+        monkeypatch.setattr(chat, "friendship_interactions", friend_writes)
+        monkeypatch.setattr(chat, "_check_content_moderation", lambda text, uid: {"action": "allow"})
+        monkeypatch.setattr(chat, "increment_sent", lambda uid: None)
+        monkeypatch.setattr(chat, "increment_received", lambda uid: None)
+        monkeypatch.setattr(reg, "check_and_award_badges", lambda uid: None)
+
+        def no_db(*args, **kwargs):
+            raise AssertionError("relay went to the database")
+        for name in ("is_registered", "is_banned", "get_allow_forward", "has_active_premium",
+                     "is_friends", "update_friendship_level"):
+            monkeypatch.setattr(reg, name, no_db)
+
+        chat.peers.update({1: 2, 2: 1})
+        bot = FakeBot()
+        try:
+            for i in range(3):
+                update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=_message(f"hi {i}"),
+                                         effective_chat=SimpleNamespace(id=1))
+                await chat.relay(update, SimpleNamespace(bot=bot, user_data={}))
+        finally:
+            chat.peers.clear()
+        assert bot.sent == [(2, "hi 0"), (2, "hi 1"), (2, "hi 2")]
+        assert loader.calls == 1
+        # Friend messages are counted in memory and written in the next batch
+        assert friend_writes._pending == {(1, 2): {"interaction_count": 3}}
@@ -0,0 +1,279 @@
+# utils/chat_state.py - Bounded in-process chat state (idle TTL, LRU caps, footprint report)
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Seconds between eviction sweeps; each sweep also logs the footprint report
+SWEEP_INTERVAL = float(os.getenv("CHAT_STATE_SWEEP_INTERVAL", "300"))
+# Entries sampled per map when estimating bytes
+_SIZE_SAMPLE = 256
+
+_MISSING = object()
+# on_change value for an entry that was removed
+DELETED = object()
+
+
+class _Slot:
+    __slots__ = ("value", "touched")
+
+    def __init__(self, value: Any, touched: float):
+        self.value = value
+        self.touched = touched
+
+
+def _deep_size(obj: Any) -> int:
+    """getsizeof plus one level of container contents - an estimate, not an exact count"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(sys.getsizeof(v) for v in obj)
+    return size
+
+
+class StateMap(MutableMapping):
+    """
+    Dict-compatible map whose entries remember when they were last written or
+    read. Entries idle longer than idle_ttl are evicted by sweep(); with
+    max_entries set, inserts beyond the cap evict the least recently used
+    entry. on_evict(key, value) runs after an entry is evicted (not after an
+    explicit pop/del), so paired maps can drop the other side too.
+
+    A map shared between worker processes (see replicate()) reports each local
+    write and takes the other workers' writes through apply().
+    """
+
+    def __init__(self, name: str, idle_ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._on_evict = on_evict
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, _Slot]" = OrderedDict()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self._on_change: Optional[Callable[[Hashable, Any], None]] = None
+        self._owns: Optional[Callable[[Hashable], bool]] = None
+
+    # ---------- replication ----------
+
+    def replicate(self, on_change: Callable[[Hashable, Any], None],
+                  owns: Optional[Callable[[Hashable], bool]] = None):
+        """
+        Report every local write to on_change(key, value), value DELETED for
+        removals. With owns set, evicting a key this worker does not own is a
+        silent local drop: only the owner's eviction ends the entry everywhere.
+        """
+        self._on_change = on_change
+        self._owns = owns
+
+    def _changed(self, key, value):
+        if self._on_change is not None:
+            self._on_change(key, value)
+
+    def apply(self, key, value):
+        """Take a write made elsewhere (value DELETED removes); no on_change, no on_evict"""
+        if value is DELETED:
+            self._data.pop(key, None)
+        else:
+            self._store(key, value)
+
+    # ---------- mapping protocol ----------
+
+    def __getitem__(self, key):
+        slot = self._data[key]
+        slot.touched = self._clock()
+        self._data.move_to_end(key)
+        return slot.value
+
+    def __setitem__(self, key, value):
+        self._store(key, value)
+        self._changed(key, value)
+
+    def _store(self, key, value):
+        slot = self._data.get(key)
+        if slot is None:
+            self._data[key] = _Slot(value, self._clock())
+            if self.max_entries is not None and len(self._data) > self.max_entries:
+                self._evict_lru()
+        else:
+            slot.value = value
+            slot.touched = self._clock()
+            self._data.move_to_end(key)
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._changed(key, DELETED)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"StateMap({self.name!r}, {dict(self.items())!r})"
+
+    def get(self, key, default=None):
+        slot = self._data.get(key)
+        if slot is None:
+            return default
+        slot.touched = self._clock()
+        self._data.move_to_end(key)
+        return slot.value
+
+    def peek(self, key, default=None):
+        """get() without refreshing the entry"""
+        slot = self._data.get(key)
+        return default if slot is None else slot.value
+
+    def touch(self, key):
+        slot = self._data.get(key)
+        if slot is not None:
+            slot.touched = self._clock()
+            self._data.move_to_end(key)
+
+    def pop(self, key, default=_MISSING):
+        slot = self._data.pop(key, None)
+        # Reported even when absent here: this worker may have dropped its copy
+        self._changed(key, DELETED)
+        if slot is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return slot.value
+
+    def clear(self):
+        """Local only - never reported to on_change"""
+        self._data.clear()
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        # Snapshot without touching, so reporting and iteration do not refresh entries
+        return [(k, slot.value) for k, slot in self._data.items()]
+
+    def values(self) -> List[Any]:
+        return [slot.value for slot in self._data.values()]
+
+    # ---------- eviction ----------
+
+    def _evict(self, key, reason: str):
+        slot = self._data.pop(key, None)
+        if slot is None:
+            return
+        if reason == "idle":
+            self.evicted_idle += 1
+        else:
+            self.evicted_lru += 1
+        if self._owns is not None and not self._owns(key):
+            return
+        self._changed(key, DELETED)
+        if self._on_evict is not None:
+            try:
+                self._on_evict(key, slot.value)
+            except Exception as e:
+                log.warning(f"{self.name}: on_evict failed for {key!r}: {e}")
+
+    def _evict_lru(self):
+        while self.max_entries is not None and len(self._data) > self.max_entries:
+            self._evict(next(iter(self._data)), "lru")
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evict entries idle for longer than idle_ttl; returns how many went"""
+        if self.idle_ttl is None:
+            return 0
+        cutoff = (self._clock() if now is None else now) - self.idle_ttl
+        stale = []
+        # _data is kept in touch order, so idle entries are all at the front
+        for key, slot in self._data.items():
+            if slot.touched > cutoff:
+                break
+            stale.append(key)
+        for key in stale:
+            self._evict(key, "idle")
+        return len(stale)
+
+    def approx_bytes(self) -> int:
+        total = sys.getsizeof(self._data)
+        n = len(self._data)
+        if not n:
+            return total
+        sample = 0
+        for i, (key, slot) in enumerate(self._data.items()):
+            if i >= _SIZE_SAMPLE:
+                break
+            sample += sys.getsizeof(key) + sys.getsizeof(slot) + _deep_size(slot.value)
+        return total + int(sample * n / min(n, _SIZE_SAMPLE))
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "approx_bytes": self.approx_bytes(),
+            "idle_ttl": self.idle_ttl,
+            "max_entries": self.max_entries,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+        }
+
+
+class ChatState:
+    """Registry of the StateMaps behind chat.py; one task sweeps them all and logs sizes"""
+
+    def __init__(self, sweep_interval: float = SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self.maps: Dict[str, StateMap] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def map(self, name: str, **kwargs) -> StateMap:
+        state = self.maps[name] = StateMap(name, **kwargs)
+        return state
+
+    def sweep(self) -> int:
+        return sum(state.sweep() for state in self.maps.values())
+
+    def report(self) -> dict:
+        maps = {name: state.stats() for name, state in self.maps.items()}
+        return {
+            "maps": maps,
+            "entries": sum(m["size"] for m in maps.values()),
+            "approx_bytes": sum(m["approx_bytes"] for m in maps.values()),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                evicted = self.sweep()
+                report = self.report()
+                sizes = ", ".join(f"{name}={m['size']}" for name, m in report["maps"].items())
+                log.info(f"chat state: {report['entries']} entries, ~{report['approx_bytes'] // 1024} KiB "
+                         f"({sizes}); evicted {evicted} idle")
+            except Exception as e:
+                log.error(f"chat state sweep failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+chat_state = ChatState()
@@ -0,0 +1,246 @@
+# utils/counter_buffer.py - Write-behind aggregation of per-user chat counters
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# users.<column> counters that may be buffered
+COUNTER_COLUMNS = (
+    "messages_sent", "messages_recv", "dialogs_total", "dialogs_today",
+    "rating_up", "rating_down", "report_count",
+)
+# friendship_levels counters, keyed by the ordered (user1_id, user2_id) pair
+FRIENDSHIP_COLUMNS = ("interaction_count",)
+
+# Pending deltas are written every FLUSH_INTERVAL seconds, or as soon as this
+# many users have unflushed deltas - together they bound what a crash can lose
+FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "5"))
+MAX_PENDING_USERS = int(os.getenv("COUNTER_MAX_PENDING_USERS", "5000"))
+# Rows per UPDATE ... FROM (VALUES ...) statement
+FLUSH_BATCH = 1000
+# Deltas kept for retry after failed flushes; beyond this they are dropped and counted
+MAX_RETAINED_USERS = MAX_PENDING_USERS * 4
+
+
+def build_flush_sql(columns: Sequence[str]) -> Tuple[str, str]:
+    """(statement, VALUES row template) for execute_values over (tg_user_id, *columns)"""
+    unknown = set(columns) - set(COUNTER_COLUMNS)
+    if unknown:
+        raise ValueError(f"Not a buffered counter: {sorted(unknown)}")
+    assignments = ", ".join(f"{c} = COALESCE(u.{c}, 0) + v.{c}" for c in columns)
+    statement = (
+        f"UPDATE users AS u SET {assignments} "
+        f"FROM (VALUES %s) AS v(tg_user_id, {', '.join(columns)}) "
+        "WHERE u.tg_user_id = v.tg_user_id"
+    )
+    template = "(" + ", ".join(["%s::bigint"] + ["%s::int"] * len(columns)) + ")"
+    return statement, template
+
+
+def _execute_batch(columns: Sequence[str], rows: List[tuple]):
+    import registration as reg
+    from psycopg2.extras import execute_values
+
+    statement, template = build_flush_sql(columns)
+    with reg._conn() as con, con.cursor() as cur:
+        execute_values(cur, statement, rows, template=template, page_size=FLUSH_BATCH)
+        con.commit()
+
+
+def friend_pair(pair: Tuple[int, int]) -> Tuple[int, int]:
+    """friendship_levels stores each pair once, lower id first"""
+    a, b = int(pair[0]), int(pair[1])
+    return (a, b) if a < b else (b, a)
+
+
+_FRIENDSHIP_UPSERT = (
+    "INSERT INTO friendship_levels AS f (user1_id, user2_id, interaction_count, level, last_interaction) "
+    "VALUES %s "
+    "ON CONFLICT (user1_id, user2_id) DO UPDATE SET "
+    "interaction_count = COALESCE(f.interaction_count, 0) + EXCLUDED.interaction_count, "
+    "last_interaction = NOW() "
+    "RETURNING f.user1_id, f.user2_id, f.interaction_count, f.level"
+)
+_FRIENDSHIP_LEVELS = (
+    "UPDATE friendship_levels AS f SET level = v.level "
+    "FROM (VALUES %s) AS v(user1_id, user2_id, level) "
+    "WHERE f.user1_id = v.user1_id AND f.user2_id = v.user2_id"
+)
+
+
+def _execute_friendship_batch(columns: Sequence[str], rows: List[tuple]):
+    """Add buffered interactions, then move the pairs that crossed a threshold up a level"""
+    import registration as reg
+    from psycopg2.extras import execute_values
+
+    values = [(a, b, n, reg.calculate_friendship_level(n)) for (a, b), n in rows]
+    with reg._conn() as con, con.cursor() as cur:
+        totals = execute_values(cur, _FRIENDSHIP_UPSERT, values,
+                                template="(%s::bigint, %s::bigint, %s::int, %s::int, NOW())",
+                                page_size=FLUSH_BATCH, fetch=True)
+        moved = [(a, b, reg.calculate_friendship_level(count)) for a, b, count, level in totals
+                 if reg.calculate_friendship_level(count) != level]
+        if moved:
+            execute_values(cur, _FRIENDSHIP_LEVELS, moved,
+                           template="(%s::bigint, %s::bigint, %s::int)", page_size=FLUSH_BATCH)
+        con.commit()
+
+
+class CounterBuffer:
+    """
+    Accumulates counter deltas per (user, column) in memory and writes them in
+    batched UPDATE ... FROM (VALUES ...) statements instead of one UPDATE per
+    event. add() is thread-safe and never touches the database on the caller's
+    path unless no flusher is running and MAX_PENDING_USERS is reached.
+    columns/key/executor adapt it to other counter tables (see friendship_interactions).
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING_USERS,
+                 executor: Callable[[Sequence[str], List[tuple]], None] = _execute_batch,
+                 columns: Sequence[str] = COUNTER_COLUMNS, key: Callable[[Hashable], Hashable] = int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._executor = executor
+        self.columns = tuple(columns)
+        self._key = key
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Hashable, Dict[str, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.events = 0
+        self.flushes = 0
+        self.statements = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_at = 0.0
+
+    def add(self, user_id: Hashable, **deltas: int):
+        deltas = {c: int(d) for c, d in deltas.items() if d}
+        if not deltas:
+            return
+        for column in deltas:
+            if column not in self.columns:
+                raise ValueError(f"Not a buffered counter: {column}")
+        with self._lock:
+            row = self._pending.setdefault(self._key(user_id), {})
+            for column, delta in deltas.items():
+                row[column] = row.get(column, 0) + delta
+            self.events += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._request_flush()
+
+    def _request_flush(self):
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and self._task is not None and not self._task.done():
+            loop.call_soon_threadsafe(wake.set)
+        else:
+            self.flush()
+
+    def _merge_back(self, pending: Dict[Hashable, Dict[str, int]]):
+        """Return deltas from a failed flush so the next one retries them"""
+        with self._lock:
+            for user_id, deltas in pending.items():
+                if user_id not in self._pending and len(self._pending) >= MAX_RETAINED_USERS:
+                    self.dropped += sum(abs(d) for d in deltas.values())
+                    continue
+                row = self._pending.setdefault(user_id, {})
+                for column, delta in deltas.items():
+                    row[column] = row.get(column, 0) + delta
+
+    def flush(self) -> int:
+        """Write all pending deltas; returns the number of user rows written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            # One statement shape per combination of touched columns
+            groups: Dict[Tuple[str, ...], List[tuple]] = {}
+            for user_id, deltas in pending.items():
+                columns = tuple(c for c in self.columns if deltas.get(c))
+                if columns:
+                    groups.setdefault(columns, []).append((user_id,) + tuple(deltas[c] for c in columns))
+            written = 0
+            failed: Dict[Hashable, Dict[str, int]] = {}
+            for columns, rows in groups.items():
+                for start in range(0, len(rows), FLUSH_BATCH):
+                    batch = rows[start:start + FLUSH_BATCH]
+                    try:
+                        self._executor(columns, batch)
+                    except Exception as e:
+                        self.failures += 1
+                        log.warning(f"Counter flush failed for {len(batch)} users: {e}")
+                        for row in batch:
+                            failed[row[0]] = dict(zip(columns, row[1:]))
+                        continue
+                    self.statements += 1
+                    written += len(batch)
+            if failed:
+                self._merge_back(failed)
+            self.flushes += 1
+            self.rows_written += written
+            self.last_flush_at = time.time()
+            return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                log.error(f"Counter flusher error: {e}")
+
+    def start(self):
+        """Start the periodic flusher on the running loop (PTB post_init)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is pending (PTB post_shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_users = len(self._pending)
+        return {
+            "pending_users": pending_users,
+            "events": self.events,
+            "flushes": self.flushes,
+            "statements": self.statements,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "interval": self.interval,
+        }
+
+
+chat_counters = CounterBuffer()
+# Messages between friends, per pair; replaces a read-modify-write per relayed message
+friendship_interactions = CounterBuffer(executor=_execute_friendship_batch, columns=FRIENDSHIP_COLUMNS,
+                                        key=friend_pair)
+# Last-chance flush on a normal interpreter exit
+atexit.register(chat_counters.flush)
+atexit.register(friendship_interactions.flush)
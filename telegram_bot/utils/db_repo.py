@@ -0,0 +1,388 @@
+# utils/db_repo.py - asyncpg repository for the bot's hot registration queries
+"""
+Async equivalents of the registration functions handlers call on every update
+(profile, premium, ban, age preference, coins, friends), served from an asyncpg
+pool so they never block the PTB event loop.
+
+Compatibility shim: every function here falls back to running the sync
+registration function in a worker thread (utils.db_async.run_db) when asyncpg
+is not installed, DATABASE_URL is unset, ASYNC_DB=0, or the pool cannot be
+created. Handlers can switch from `reg.x(...)` to `await db_repo.x(...)` one
+call site at a time.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # optional: fall back to psycopg2 in threads
+    asyncpg = None
+
+log = logging.getLogger(__name__)
+
+ASYNC_DB = os.getenv("ASYNC_DB", "1") == "1"
+POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX", "15"))
+COMMAND_TIMEOUT = float(os.getenv("ASYNC_DB_COMMAND_TIMEOUT", "5"))
+# Health checks run on a timer and only ping when the pool has been idle this
+# long, instead of a SELECT 1 on every checkout
+HEALTH_CHECK_INTERVAL = float(os.getenv("ASYNC_DB_HEALTH_INTERVAL", "30"))
+IDLE_PING_AFTER = float(os.getenv("ASYNC_DB_IDLE_PING_AFTER", "30"))
+# Idle connections are closed by asyncpg after this many seconds
+MAX_INACTIVE_LIFETIME = float(os.getenv("ASYNC_DB_MAX_INACTIVE", "300"))
+
+_pool = None
+_pool_lock: Optional[asyncio.Lock] = None
+_pool_failed_at = 0.0
+_health_task: Optional[asyncio.Task] = None
+_last_used = 0.0
+_stats = {"async_calls": 0, "fallback_calls": 0, "health_pings": 0, "health_failures": 0}
+
+# Retry pool creation at most this often after a failure
+_POOL_RETRY_AFTER = 30.0
+
+
+def _dsn() -> Optional[str]:
+    import registration as reg
+
+    if not reg.DB_URL:
+        return None
+    return reg._dsn_with_ssl(reg.DB_URL)
+
+
+async def get_pool():
+    """The shared asyncpg pool, created on first use; None when unavailable"""
+    global _pool, _pool_lock, _pool_failed_at
+    if _pool is not None:
+        return _pool
+    if asyncpg is None or not ASYNC_DB:
+        return None
+    if time.monotonic() - _pool_failed_at < _POOL_RETRY_AFTER and _pool_failed_at:
+        return None
+    dsn = _dsn()
+    if not dsn:
+        return None
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = await asyncpg.create_pool(
+                    dsn,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    command_timeout=COMMAND_TIMEOUT,
+                    max_inactive_connection_lifetime=MAX_INACTIVE_LIFETIME,
+                    server_settings={"application_name": "luvhive-bot-async"},
+                )
+                log.info("✅ asyncpg pool created")
+            except Exception as e:
+                _pool_failed_at = time.monotonic()
+                log.warning(f"asyncpg pool unavailable, using threaded psycopg2: {e}")
+                return None
+    return _pool
+
+
+async def _health_loop(interval: float):
+    global _last_used
+    while True:
+        await asyncio.sleep(interval)
+        pool = _pool
+        if pool is None or time.monotonic() - _last_used < IDLE_PING_AFTER:
+            continue
+        _stats["health_pings"] += 1
+        try:
+            await pool.fetchval("SELECT 1")
+            _last_used = time.monotonic()
+        except Exception as e:
+            _stats["health_failures"] += 1
+            log.warning(f"asyncpg health check failed, recycling connections: {e}")
+            try:
+                await pool.expire_connections()
+            except Exception:
+                pass
+
+
+async def start(health_interval: float = HEALTH_CHECK_INTERVAL):
+    """Create the pool and start the idle health checks (PTB post_init)"""
+    global _health_task
+    await get_pool()
+    if _health_task is None or _health_task.done():
+        _health_task = asyncio.create_task(_health_loop(health_interval))
+
+
+async def close():
+    """Stop health checks and close the pool (PTB post_shutdown)"""
+    global _pool, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _health_task = None
+    if _pool is not None:
+        try:
+            await _pool.close()
+        finally:
+            _pool = None
+
+
+def stats() -> Dict[str, Any]:
+    out = dict(_stats)
+    out["async"] = _pool is not None
+    if _pool is not None:
+        out["pool_size"] = _pool.get_size()
+        out["pool_idle"] = _pool.get_idle_size()
+    return out
+
+
+def _fallback(sync_name: str):
+    """
+    Run the async body on the asyncpg pool, or the registration function of the
+    same contract in a worker thread when the pool is unavailable.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            global _last_used
+            pool = await get_pool()
+            if pool is None:
+                import registration as reg
+                from utils.db_async import run_db
+
+                _stats["fallback_calls"] += 1
+                return await run_db(getattr(reg, sync_name), *args, **kwargs)
+            _stats["async_calls"] += 1
+            _last_used = time.monotonic()
+            return await fn(pool, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _invalidate(*uids: int):
+    from utils.user_snapshot import invalidate_user
+
+    invalidate_user(*uids)
+
+
+# ---------- Profile ----------
+
+@_fallback("get_profile")
+async def get_profile(pool, tg_user_id: int) -> dict:
+    row = await pool.fetchrow(
+        """
+        SELECT u.id, u.gender, u.age, u.country, u.city, u.is_premium,
+               COALESCE(u.is_verified, FALSE) AS is_verified,
+               COALESCE(u.verify_status, 'none') AS verify_status,
+               COALESCE(u.feed_username, '') AS feed_username,
+               COALESCE(ARRAY(SELECT i.interest_key FROM user_interests i WHERE i.user_id = u.id),
+                        '{}') AS interests
+          FROM users u WHERE u.tg_user_id = $1
+        """,
+        tg_user_id,
+    )
+    if not row:
+        return {"id": None, "gender": None, "age": None, "country": None, "city": None,
+                "is_premium": False, "is_verified": False, "verify_status": "none", "interests": set()}
+    return {"id": row["id"], "gender": row["gender"], "age": row["age"], "country": row["country"],
+            "city": row["city"], "is_premium": bool(row["is_premium"]), "is_verified": bool(row["is_verified"]),
+            "verify_status": str(row["verify_status"] or "none"), "interests": set(row["interests"]),
+            "username": (row["feed_username"] or None)}
+
+
+@_fallback("is_registered")
+async def is_registered(pool, tg_user_id: int) -> bool:
+    try:
+        return bool(await pool.fetchval(
+            """
+            SELECT u.gender IS NOT NULL AND u.gender <> '' AND COALESCE(u.age, 0) <> 0
+                   AND EXISTS (SELECT 1 FROM user_interests i WHERE i.user_id = u.id)
+              FROM users u WHERE u.tg_user_id = $1
+            """,
+            tg_user_id,
+        ))
+    except Exception:
+        return False
+
+
+@_fallback("get_match_verified_only")
+async def get_match_verified_only(pool, tg_id: int) -> bool:
+    return bool(await pool.fetchval(
+        "SELECT COALESCE(match_verified_only, FALSE) FROM users WHERE tg_user_id = $1", tg_id))
+
+
+# ---------- Premium ----------
+
+@_fallback("has_active_premium")
+async def has_active_premium(pool, tg_user_id: int) -> bool:
+    row = await pool.fetchrow(
+        "SELECT COALESCE(is_premium, FALSE) AS flag, premium_until FROM users WHERE tg_user_id = $1",
+        tg_user_id,
+    )
+    if not row:
+        return False
+    until = row["premium_until"]
+    return bool(row["flag"]) or (until is not None and until > datetime.now(timezone.utc))
+
+
+@_fallback("set_is_premium")
+async def set_is_premium(pool, tg_id: int, value: bool) -> None:
+    await pool.execute(
+        """
+        INSERT INTO users (tg_user_id, is_premium) VALUES ($1, $2)
+        ON CONFLICT (tg_user_id) DO UPDATE SET is_premium = EXCLUDED.is_premium
+        """,
+        tg_id, value,
+    )
+    _invalidate(tg_id)
+
+
+@_fallback("set_premium_until")
+async def set_premium_until(pool, tg_id: int, dt: datetime) -> None:
+    await pool.execute(
+        """
+        INSERT INTO users (tg_user_id, is_premium, premium_until) VALUES ($1, TRUE, $2)
+        ON CONFLICT (tg_user_id) DO UPDATE SET is_premium = TRUE, premium_until = EXCLUDED.premium_until
+        """,
+        tg_id, dt,
+    )
+    _invalidate(tg_id)
+
+
+# ---------- Ban ----------
+
+@_fallback("get_ban_info")
+async def get_ban_info(pool, tg_id: int):
+    """(until, reason, by_admin), all None when not banned or unknown"""
+    try:
+        row = await pool.fetchrow(
+            "SELECT banned_until, banned_reason, banned_by FROM users WHERE tg_user_id = $1", tg_id)
+    except Exception:
+        return (None, None, None)
+    return (row["banned_until"], row["banned_reason"], row["banned_by"]) if row else (None, None, None)
+
+
+@_fallback("is_banned")
+async def is_banned(pool, tg_id: int) -> bool:
+    until, _, _ = await get_ban_info(tg_id)
+    if not until:
+        return False
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    return until > datetime.now(timezone.utc)
+
+
+@_fallback("set_ban")
+async def set_ban(pool, tg_id: int, until_ts, reason: str, by_admin: int):
+    await pool.execute(
+        """
+        INSERT INTO users (tg_user_id, banned_until, banned_reason, banned_by) VALUES ($1, $2, $3, $4)
+        ON CONFLICT (tg_user_id) DO UPDATE SET banned_until = EXCLUDED.banned_until,
+                                               banned_reason = EXCLUDED.banned_reason,
+                                               banned_by = EXCLUDED.banned_by
+        """,
+        tg_id, until_ts, reason, by_admin,
+    )
+    _invalidate(tg_id)
+
+
+@_fallback("clear_ban")
+async def clear_ban(pool, tg_id: int):
+    await pool.execute(
+        "UPDATE users SET banned_until = NULL, banned_reason = NULL, banned_by = NULL WHERE tg_user_id = $1",
+        tg_id,
+    )
+    _invalidate(tg_id)
+
+
+# ---------- Age preference ----------
+
+@_fallback("get_age_pref")
+async def get_age_pref(pool, tg_user_id: int) -> Tuple[int, int]:
+    row = await pool.fetchrow(
+        "SELECT COALESCE(min_age_pref, 18) AS lo, COALESCE(max_age_pref, 99) AS hi FROM users WHERE tg_user_id = $1",
+        tg_user_id,
+    )
+    return (int(row["lo"]), int(row["hi"])) if row else (18, 99)
+
+
+@_fallback("set_age_pref")
+async def set_age_pref(pool, tg_user_id: int, lo: int, hi: int):
+    await pool.execute(
+        """
+        INSERT INTO users (tg_user_id, min_age_pref, max_age_pref) VALUES ($1, $2, $3)
+        ON CONFLICT (tg_user_id) DO UPDATE SET min_age_pref = EXCLUDED.min_age_pref,
+                                               max_age_pref = EXCLUDED.max_age_pref
+        """,
+        tg_user_id, lo, hi,
+    )
+
+
+# ---------- Coins ----------
+
+@_fallback("get_coins")
+async def get_coins(pool, uid: int) -> int:
+    return int(await pool.fetchval("SELECT COALESCE(coins, 0) FROM users WHERE tg_user_id = $1", uid) or 0)
+
+
+@_fallback("add_coins")
+async def add_coins(pool, uid: int, amount: int) -> int:
+    return int(await pool.fetchval(
+        "UPDATE users SET coins = COALESCE(coins, 0) + $2 WHERE tg_user_id = $1 RETURNING coins",
+        uid, amount,
+    ) or 0)
+
+
+# ---------- Friends ----------
+
+@_fallback("is_friends")
+async def is_friends(pool, a: int, b: int) -> bool:
+    return await pool.fetchval("SELECT 1 FROM friends WHERE user_id = $1 AND friend_id = $2", a, b) is not None
+
+
+@_fallback("list_friends")
+async def list_friends(pool, uid: int, limit: int = 50) -> List[int]:
+    rows = await pool.fetch(
+        "SELECT friend_id FROM friends WHERE user_id = $1 ORDER BY added_at DESC LIMIT $2", uid, limit)
+    return [r["friend_id"] for r in rows]
+
+
+@_fallback("add_friend")
+async def add_friend(pool, a: int, b: int):
+    async with pool.acquire() as con, con.transaction():
+        await con.executemany(
+            "INSERT INTO friends (user_id, friend_id) VALUES ($1, $2) ON CONFLICT DO NOTHING", [(a, b), (b, a)])
+    _invalidate(a, b)
+
+
+@_fallback("remove_friend")
+async def remove_friend(pool, a: int, b: int):
+    await pool.execute(
+        "DELETE FROM friends WHERE (user_id = $1 AND friend_id = $2) OR (user_id = $2 AND friend_id = $1)", a, b)
+    _invalidate(a, b)
+
+
+# ---------- Relay snapshot ----------
+
+async def load_user_snapshot(uid: int):
+    """utils.user_snapshot.load_snapshot over asyncpg (one query)"""
+    from utils.user_snapshot import _SNAPSHOT_SQL, load_snapshot, snapshot_from_row
+
+    pool = await get_pool()
+    if pool is None:
+        from utils.db_async import run_db
+
+        _stats["fallback_calls"] += 1
+        return await run_db(load_snapshot, uid)
+    global _last_used
+    _stats["async_calls"] += 1
+    _last_used = time.monotonic()
+    # The shared SQL uses psycopg2 placeholders
+    row = await pool.fetchrow(_SNAPSHOT_SQL.replace("%s", "$1"), uid)
+    return snapshot_from_row(uid, tuple(row) if row is not None else None)
@@ -0,0 +1,643 @@
+# utils/match_backend.py - Pluggable matchmaking state (search queue + active pairs)
+import asyncio
+import datetime
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Hashable, List, MutableMapping, Optional, Tuple
+
+from utils import sharding
+from utils.chat_state import DELETED, StateMap
+from utils.matchmaking import MODE_BOYS, MODE_CITY, MODE_GIRLS, MatchIndex, MatchProfile, mutual_ok
+
+log = logging.getLogger(__name__)
+
+# "memory" keeps everything in this process; "postgres" shares it between workers
+MATCH_BACKEND = os.getenv("MATCH_BACKEND", "memory").strip().lower()
+# Waiting rows locked and checked per search in the Postgres backend
+PG_CANDIDATE_BATCH = 32
+PAIRS_CHANNEL = "chat_pairs"
+STATE_CHANNEL = "chat_user_state"
+# Shared-state writes sent per transaction by the Postgres writer task
+STATE_WRITE_BATCH = 200
+# Namespace for per-user pair-claim advisory locks (bigint key = namespace | uid)
+_PAIR_LOCK_NS = 0x4D41 << 48
+
+SEARCHING = "searching"  # already waiting; profile refreshed, place kept
+IN_CHAT = "in_chat"      # paired by another worker while this search ran
+QUEUED = "queued"        # nobody compatible; viewer now waiting
+MATCHED = "matched"      # pair claimed
+
+
+class MatchBackend(ABC):
+    """
+    Where the search queue and active pairs live. chat.py talks to this
+    interface for every queue/pair mutation; `peers` stays the process-local
+    uid -> partner view that in_chat()/partner_of() read, and each backend
+    keeps it in sync. Other pair-spanning chat state is registered with
+    share() and kept in sync the same way.
+    """
+    name = "base"
+
+    def __init__(self, peers: MutableMapping):
+        self.peers = peers
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def share(self, state: StateMap, user_of: Callable[[Hashable], int] = int):
+        """Keep state the same on every worker; user_of maps a key to the user who owns it"""
+
+    @abstractmethod
+    async def search(self, me: MatchProfile, keep_place: bool = True) -> Tuple[str, Optional[MatchProfile], List[MatchProfile]]:
+        """
+        One search step for me: keep an existing place (keep_place), else claim the
+        oldest compatible waiting user, else join the queue. Returns (status,
+        candidate, snapshots removed from the queue - for release_pair)
+        """
+
+    @abstractmethod
+    async def claim_target(self, uid: int, target: int) -> Optional[List[MatchProfile]]:
+        """Pair uid with a specific waiting target (sticky re-match); None if not possible"""
+
+    @abstractmethod
+    async def release_pair(self, a: int, b: int, requeue: List[MatchProfile]) -> bool:
+        """Undo a claimed pair whose intros both failed; requeue goes back to the front"""
+
+    @abstractmethod
+    async def end_pair(self, uid: int) -> Optional[int]:
+        """Leave the queue and any chat; returns the former partner"""
+
+    @abstractmethod
+    async def enqueue(self, profile: MatchProfile, front: bool = False, if_absent: bool = False):
+        """Add profile to the queue (front: ahead of everyone; if_absent: keep an existing place)"""
+
+    @abstractmethod
+    async def is_waiting(self, uid: int) -> bool:
+        """Whether uid is in the search queue"""
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "pairs": len(self.peers) // 2}
+
+
+class MemoryMatchBackend(MatchBackend):
+    """Single-process backend over chat.py's MatchIndex, peers map and queue_lock"""
+    name = "memory"
+
+    def __init__(self, queue: MatchIndex, peers: MutableMapping, lock: asyncio.Lock):
+        super().__init__(peers)
+        self.queue = queue
+        self.lock = lock
+
+    def _claim(self, a: int, b: int) -> List[MatchProfile]:
+        removed = [p for p in (self.queue.get(a), self.queue.get(b)) if p is not None]
+        self.queue.discard(a)
+        self.queue.discard(b)
+        self.peers[a] = b
+        self.peers[b] = a
+        return removed
+
+    async def search(self, me, keep_place=True):
+        async with self.lock:
+            if keep_place and me.uid in self.queue:
+                # Keep their place but pick up a changed mode/profile
+                self.queue.refresh(me)
+                return SEARCHING, None, []
+            self.queue.discard(me.uid)
+            # Bucket lookup + in-memory mutual check (no DB calls under the lock)
+            cand = self.queue.find(me, is_stale=lambda uid: uid in self.peers)
+            if cand is None:
+                self.queue.append(me)
+                return QUEUED, None, []
+            return MATCHED, cand, self._claim(me.uid, cand.uid)
+
+    async def claim_target(self, uid, target):
+        async with self.lock:
+            if not (target in self.queue and target not in self.peers and uid not in self.peers):
+                return None
+            return self._claim(uid, target)
+
+    async def release_pair(self, a, b, requeue):
+        async with self.lock:
+            if self.peers.get(a) != b or self.peers.get(b) != a:
+                return False
+            self.peers.pop(a, None)
+            self.peers.pop(b, None)
+            for profile in reversed(requeue):
+                if profile.uid not in self.queue and profile.uid not in self.peers:
+                    self.queue.appendleft(profile)
+            return True
+
+    async def end_pair(self, uid):
+        async with self.lock:
+            self.queue.discard(uid)
+            partner = self.peers.pop(uid, None)
+            if partner is not None:
+                self.peers.pop(partner, None)
+            return partner
+
+    async def enqueue(self, profile, front=False, if_absent=False):
+        async with self.lock:
+            if if_absent and profile.uid in self.queue:
+                return
+            if front:
+                self.queue.appendleft(profile)
+            else:
+                self.queue.append(profile)
+
+    async def is_waiting(self, uid):
+        return uid in self.queue
+
+    def stats(self):
+        return {**super().stats(), "waiting": len(self.queue)}
+
+
+# ---------------------------------------------------------------------------
+# Postgres
+# ---------------------------------------------------------------------------
+
+_PG_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS match_queue (
+        tg_user_id    BIGINT PRIMARY KEY,
+        pos           DOUBLE PRECISION NOT NULL,
+        mode          TEXT NOT NULL,
+        gender        TEXT NOT NULL DEFAULT '',
+        city          TEXT NOT NULL DEFAULT '',
+        age           INT,
+        verified      BOOLEAN NOT NULL DEFAULT FALSE,
+        age_min       INT,
+        age_max       INT,
+        verified_only BOOLEAN NOT NULL DEFAULT FALSE,
+        enqueued_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_match_queue_pos ON match_queue(pos)",
+    "CREATE INDEX IF NOT EXISTS idx_match_queue_gender_pos ON match_queue(gender, pos)",
+    """
+    CREATE TABLE IF NOT EXISTS chat_pairs (
+        tg_user_id BIGINT PRIMARY KEY,
+        partner_id BIGINT NOT NULL,
+        paired_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_user_state (
+        state_name TEXT NOT NULL,
+        state_key  TEXT NOT NULL,
+        tg_user_id BIGINT NOT NULL,
+        value      JSONB NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (state_name, state_key)
+    )
+    """,
+)
+
+_QUEUE_COLUMNS = "tg_user_id, mode, gender, city, age, verified, age_min, age_max, verified_only"
+_BACK_POS = "EXTRACT(EPOCH FROM clock_timestamp())"
+_FRONT_POS = "(SELECT COALESCE(MIN(pos), 0) - 1 FROM match_queue)"
+
+
+class _Rollback(Exception):
+    pass
+
+
+# Shared state rows: keys and values as JSON (tuple keys as arrays, datetimes tagged)
+
+def _encode_key(key: Hashable) -> str:
+    return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+
+def _decode_key(text: str) -> Hashable:
+    key = json.loads(text)
+    return tuple(key) if isinstance(key, list) else key
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_object(obj: dict):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _encode_value(value: Any) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+def _decode_value(text: str) -> Any:
+    return json.loads(text, object_hook=_json_object)
+
+
+def _lock_key(uid: int) -> int:
+    return _PAIR_LOCK_NS | (int(uid) & ((1 << 48) - 1))
+
+
+def _profile_row(p: MatchProfile) -> tuple:
+    lo, hi = p.age_window if p.age_window else (None, None)
+    return (p.uid, p.mode, p.gender, p.city, p.age, p.verified, lo, hi, p.verified_only)
+
+
+def _profile_from_record(r) -> MatchProfile:
+    window = (r["age_min"], r["age_max"]) if r["age_min"] is not None else None
+    return MatchProfile(r["tg_user_id"], mode=r["mode"], gender=r["gender"], city=r["city"], age=r["age"],
+                        verified=r["verified"], age_window=window, verified_only=r["verified_only"])
+
+
+def candidate_query(me: MatchProfile) -> Tuple[str, list]:
+    """
+    Oldest waiting users both sides accept, locked with SKIP LOCKED so workers
+    claiming at the same time never block on (or double-claim) the same row.
+    Same rules as utils.matchmaking.allows, in both directions.
+    """
+    args: list = [me.uid]
+
+    def arg(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    where = ["q.tg_user_id <> $1",
+             "NOT EXISTS (SELECT 1 FROM chat_pairs p WHERE p.tg_user_id = q.tg_user_id)"]
+    # what the viewer accepts
+    if me.mode == MODE_GIRLS:
+        where.append("q.gender = 'f'")
+    elif me.mode == MODE_BOYS:
+        where.append("q.gender = 'm'")
+    elif me.mode == MODE_CITY:
+        # a city search without a city matches nobody, as in allows()
+        where.append(f"q.city = {arg(me.city)}" if me.city else "FALSE")
+    if me.age_window is not None:
+        where.append(f"q.age BETWEEN {arg(me.age_window[0])} AND {arg(me.age_window[1])}")
+    if me.verified_only:
+        where.append("q.verified")
+    # what the candidate accepts
+    accepts = ["q.mode = 'random'"]
+    if me.city:
+        accepts.append(f"(q.mode = 'city' AND q.city = {arg(me.city)})")
+    if me.gender == "f":
+        accepts.append("q.mode = 'girls'")
+    elif me.gender == "m":
+        accepts.append("q.mode = 'boys'")
+    where.append("(" + " OR ".join(accepts) + ")")
+    if me.age is None:
+        where.append("q.age_min IS NULL")
+    else:
+        where.append(f"(q.age_min IS NULL OR {arg(me.age)} BETWEEN q.age_min AND q.age_max)")
+    if not me.verified:
+        where.append("NOT q.verified_only")
+    sql = (f"SELECT {_QUEUE_COLUMNS} FROM match_queue q WHERE " + " AND ".join(where) +
+           f" ORDER BY q.pos LIMIT {PG_CANDIDATE_BATCH} FOR UPDATE SKIP LOCKED")
+    return sql, args
+
+
+class PostgresMatchBackend(MatchBackend):
+    """
+    Queue and pairs in Postgres so several worker processes share them and
+    active chats survive a restart:
+    - match_queue rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED
+    - a claim takes per-user transaction advisory locks on both users, so a
+      user being claimed as someone's candidate cannot claim in parallel
+    - chat_pairs holds both directions of every active pair; changes are
+      published on NOTIFY chat_pairs and applied to each worker's peers view
+    - shared StateMaps are mirrored the same way through chat_user_state:
+      local writes go out in order from one writer task and NOTIFY
+      chat_user_state; while a key has a write of ours in flight, other
+      workers' changes to it are skipped (ours commits later and wins)
+    """
+    name = "postgres"
+
+    def __init__(self, peers: MutableMapping, pool_getter: Optional[Callable] = None):
+        super().__init__(peers)
+        self._pool_getter = pool_getter
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._listen_con = None
+        self._pool = None
+        self.searches = 0
+        self.claims = 0
+        self.lock_skips = 0
+        self.remote_events = 0
+        self._shared: Dict[str, StateMap] = {}
+        # (state, key, owner uid, value JSON or None for a delete, seq) not yet written
+        self._state_writes: List[Tuple[str, str, int, Optional[str], int]] = []
+        self._state_wakeup = asyncio.Event()
+        self._state_task: Optional[asyncio.Task] = None
+        self._state_seq = 0
+        # (state, key) -> seq of our newest write there, until its NOTIFY comes back
+        self._state_pending: Dict[Tuple[str, str], int] = {}
+        self.state_writes = 0
+        self.state_remote_events = 0
+
+    async def _get_pool(self):
+        if self._pool is None:
+            if self._pool_getter is None:
+                from utils import db_repo
+                self._pool = await db_repo.get_pool()
+            else:
+                self._pool = await self._pool_getter()
+            if self._pool is None:
+                raise RuntimeError("MATCH_BACKEND=postgres needs the asyncpg pool (utils.db_repo)")
+        return self._pool
+
+    async def start(self):
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            for ddl in _PG_SCHEMA:
+                await con.execute(ddl)
+            rows = await con.fetch("SELECT tg_user_id, partner_id FROM chat_pairs")
+            state_rows = await con.fetch(
+                "SELECT state_name, state_key, value FROM chat_user_state WHERE state_name = ANY($1::text[])",
+                list(self._shared))
+        for r in rows:
+            self.peers[r["tg_user_id"]] = r["partner_id"]
+        for r in state_rows:
+            self._shared[r["state_name"]].apply(_decode_key(r["state_key"]), _decode_value(r["value"]))
+        log.info(f"Match backend: postgres, restored {len(rows) // 2} active chats, "
+                 f"{len(state_rows)} shared state entries")
+        self._listen_con = await pool.acquire()
+        await self._listen_con.add_listener(PAIRS_CHANNEL, self._on_notify)
+        await self._listen_con.add_listener(STATE_CHANNEL, self._on_state_notify)
+        self._state_task = asyncio.get_running_loop().create_task(self._state_writer())
+
+    async def stop(self):
+        if self._state_task is not None:
+            self._state_task.cancel()
+            try:
+                await self._state_task
+            except asyncio.CancelledError:
+                pass
+            self._state_task = None
+            await self._flush_state()
+        if self._listen_con is not None:
+            try:
+                await self._listen_con.remove_listener(PAIRS_CHANNEL, self._on_notify)
+                await self._listen_con.remove_listener(STATE_CHANNEL, self._on_state_notify)
+            finally:
+                await self._pool.release(self._listen_con)
+                self._listen_con = None
+
+    # ---------- pair events ----------
+
+    def _apply(self, event: str, a: int, b: int):
+        if event == "pair":
+            self.peers[a] = b
+            self.peers[b] = a
+        else:
+            for x, y in ((a, b), (b, a)):
+                if self.peers.get(x) == y:
+                    self.peers.pop(x, None)
+
+    def _on_notify(self, con, pid, channel, payload: str):
+        try:
+            event, a, b, origin = payload.split(":", 3)
+            if origin == self._origin:
+                return
+            self.remote_events += 1
+            self._apply(event, int(a), int(b))
+        except Exception as e:
+            log.warning(f"Bad {PAIRS_CHANNEL} notification {payload!r}: {e}")
+
+    async def _publish(self, con, event: str, a: int, b: int):
+        # delivered to listeners when the transaction commits
+        await con.execute("SELECT pg_notify($1, $2)", PAIRS_CHANNEL, f"{event}:{a}:{b}:{self._origin}")
+
+    async def _insert_pair(self, con, a: int, b: int):
+        await con.execute(
+            "INSERT INTO chat_pairs (tg_user_id, partner_id) VALUES ($1, $2), ($2, $1) "
+            "ON CONFLICT (tg_user_id) DO UPDATE SET partner_id = EXCLUDED.partner_id, paired_at = NOW()",
+            a, b,
+        )
+        await self._publish(con, "pair", a, b)
+
+    # ---------- shared state ----------
+
+    def share(self, state, user_of=int):
+        self._shared[state.name] = state
+        state.replicate(lambda key, value: self._state_changed(state.name, user_of, key, value),
+                        owns=lambda key: sharding.owns(user_of(key)))
+
+    def _state_changed(self, name: str, user_of: Callable[[Hashable], int], key: Hashable, value: Any):
+        try:
+            row_key = _encode_key(key)
+            row_value = None if value is DELETED else _encode_value(value)
+        except (TypeError, ValueError) as e:
+            log.error(f"{name}[{key!r}] cannot be shared: {e}")
+            return
+        self._state_seq += 1
+        self._state_pending[(name, row_key)] = self._state_seq
+        self._state_writes.append((name, row_key, int(user_of(key)), row_value, self._state_seq))
+        self._state_wakeup.set()
+
+    async def _write_state(self, batch):
+        # Only the last change per key matters; it also carries that key's newest seq
+        latest = {}
+        for change in batch:
+            latest[change[:2]] = change
+        changes = list(latest.values())
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            async with con.transaction():
+                deletes = [(name, key) for name, key, _, value, _ in changes if value is None]
+                upserts = [(name, key, uid, value) for name, key, uid, value, _ in changes if value is not None]
+                if deletes:
+                    await con.executemany(
+                        "DELETE FROM chat_user_state WHERE state_name = $1 AND state_key = $2", deletes)
+                if upserts:
+                    await con.executemany(
+                        "INSERT INTO chat_user_state (state_name, state_key, tg_user_id, value) "
+                        "VALUES ($1, $2, $3, $4::jsonb) ON CONFLICT (state_name, state_key) "
+                        "DO UPDATE SET tg_user_id = EXCLUDED.tg_user_id, value = EXCLUDED.value, updated_at = NOW()",
+                        upserts)
+                # delivered to listeners when the transaction commits
+                await con.executemany(
+                    "SELECT pg_notify($1, $2)",
+                    [(STATE_CHANNEL, json.dumps([name, key, value, self._origin, seq]))
+                     for name, key, _, value, seq in changes])
+        self.state_writes += len(changes)
+
+    async def _flush_state(self, attempts: int = 3):
+        while self._state_writes:
+            batch = self._state_writes[:STATE_WRITE_BATCH]
+            for attempt in range(attempts):
+                try:
+                    await self._write_state(batch)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.error(f"Shared chat state write failed ({len(batch)} changes, try {attempt + 1}): {e}")
+                    await asyncio.sleep(attempt + 1)
+            else:
+                # Dropped: stop waiting for their NOTIFY so other workers' changes apply again
+                for name, key, _, _, seq in batch:
+                    if self._state_pending.get((name, key)) == seq:
+                        self._state_pending.pop((name, key), None)
+            del self._state_writes[:len(batch)]
+
+    async def _state_writer(self):
+        while True:
+            await self._state_wakeup.wait()
+            self._state_wakeup.clear()
+            await self._flush_state()
+
+    def _on_state_notify(self, con, pid, channel, payload: str):
+        try:
+            name, key, value, origin, seq = json.loads(payload)
+            state = self._shared.get(name)
+            if state is None:
+                return
+            pending = self._state_pending.get((name, key))
+            if origin == self._origin:
+                if pending == seq:
+                    self._state_pending.pop((name, key), None)
+                return
+            if pending is not None:
+                return
+            self.state_remote_events += 1
+            state.apply(_decode_key(key), DELETED if value is None else _decode_value(value))
+        except Exception as e:
+            log.warning(f"Bad {STATE_CHANNEL} notification {payload[:200]!r}: {e}")
+
+    async def _queued(self, con, uid: int):
+        return await con.fetchrow(f"SELECT {_QUEUE_COLUMNS} FROM match_queue WHERE tg_user_id = $1", uid)
+
+    # ---------- interface ----------
+
+    async def search(self, me, keep_place=True):
+        pool = await self._get_pool()
+        self.searches += 1
+        async with pool.acquire() as con:
+            async with con.transaction():
+                await con.execute("SELECT pg_advisory_xact_lock($1)", _lock_key(me.uid))
+                if await con.fetchval("SELECT 1 FROM chat_pairs WHERE tg_user_id = $1", me.uid):
+                    return IN_CHAT, None, []
+                mine = await self._queued(con, me.uid)
+                if keep_place and mine is not None:
+                    await con.execute(
+                        "UPDATE match_queue SET mode=$2, gender=$3, city=$4, age=$5, verified=$6, "
+                        "age_min=$7, age_max=$8, verified_only=$9 WHERE tg_user_id=$1", *_profile_row(me))
+                    return SEARCHING, None, []
+                await con.execute("DELETE FROM match_queue WHERE tg_user_id = $1", me.uid)
+
+                sql, args = candidate_query(me)
+                for r in await con.fetch(sql, *args):
+                    cand = _profile_from_record(r)
+                    if not mutual_ok(me, cand):
+                        continue
+                    # cand may be running its own search right now; never wait on it
+                    if not await con.fetchval("SELECT pg_try_advisory_xact_lock($1)", _lock_key(cand.uid)):
+                        self.lock_skips += 1
+                        continue
+                    await con.execute("DELETE FROM match_queue WHERE tg_user_id = $1", cand.uid)
+                    await self._insert_pair(con, me.uid, cand.uid)
+                    self.claims += 1
+                    break
+                else:
+                    await con.execute(
+                        f"INSERT INTO match_queue ({_QUEUE_COLUMNS}, pos) "
+                        f"VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, {_BACK_POS})", *_profile_row(me))
+                    return QUEUED, None, []
+        self._apply("pair", me.uid, cand.uid)
+        return MATCHED, cand, [cand]
+
+    async def claim_target(self, uid, target):
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            try:
+                async with con.transaction():
+                    for key in sorted((_lock_key(uid), _lock_key(target))):
+                        await con.execute("SELECT pg_advisory_xact_lock($1)", key)
+                    if await con.fetchval("SELECT 1 FROM chat_pairs WHERE tg_user_id = ANY($1::bigint[])",
+                                          [uid, target]):
+                        return None
+                    rows = await con.fetch(
+                        f"DELETE FROM match_queue WHERE tg_user_id = ANY($1::bigint[]) RETURNING {_QUEUE_COLUMNS}",
+                        [uid, target])
+                    removed = {r["tg_user_id"]: _profile_from_record(r) for r in rows}
+                    if target not in removed:
+                        # target is no longer waiting; undo the delete of uid's row
+                        raise _Rollback()
+                    await self._insert_pair(con, uid, target)
+            except _Rollback:
+                return None
+        self._apply("pair", uid, target)
+        return [removed[u] for u in (uid, target) if u in removed]
+
+    async def release_pair(self, a, b, requeue):
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            async with con.transaction():
+                for key in sorted((_lock_key(a), _lock_key(b))):
+                    await con.execute("SELECT pg_advisory_xact_lock($1)", key)
+                deleted = await con.fetchval(
+                    "WITH d AS (DELETE FROM chat_pairs WHERE (tg_user_id = $1 AND partner_id = $2) "
+                    "OR (tg_user_id = $2 AND partner_id = $1) RETURNING 1) SELECT count(*) FROM d", a, b)
+                if not deleted:
+                    return False
+                for profile in reversed(requeue):
+                    await con.execute(
+                        f"INSERT INTO match_queue ({_QUEUE_COLUMNS}, pos) "
+                        f"VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, {_FRONT_POS}) "
+                        "ON CONFLICT (tg_user_id) DO NOTHING", *_profile_row(profile))
+                await self._publish(con, "end", a, b)
+        self._apply("end", a, b)
+        return True
+
+    async def end_pair(self, uid):
+        pool = await self._get_pool()
+        async with pool.acquire() as con:
+            async with con.transaction():
+                await con.execute("SELECT pg_advisory_xact_lock($1)", _lock_key(uid))
+                await con.execute("DELETE FROM match_queue WHERE tg_user_id = $1", uid)
+                partner = await con.fetchval(
+                    "DELETE FROM chat_pairs WHERE tg_user_id = $1 RETURNING partner_id", uid)
+                if partner is None:
+                    return None
+                await con.execute("DELETE FROM chat_pairs WHERE tg_user_id = $1 AND partner_id = $2", partner, uid)
+                await self._publish(con, "end", uid, partner)
+        self._apply("end", uid, partner)
+        return partner
+
+    async def enqueue(self, profile, front=False, if_absent=False):
+        pool = await self._get_pool()
+        conflict = ("DO NOTHING" if if_absent else
+                    "DO UPDATE SET mode=EXCLUDED.mode, gender=EXCLUDED.gender, city=EXCLUDED.city, "
+                    "age=EXCLUDED.age, verified=EXCLUDED.verified, age_min=EXCLUDED.age_min, "
+                    "age_max=EXCLUDED.age_max, verified_only=EXCLUDED.verified_only, pos=EXCLUDED.pos")
+        await pool.execute(
+            f"INSERT INTO match_queue ({_QUEUE_COLUMNS}, pos) "
+            f"VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, {_FRONT_POS if front else _BACK_POS}) "
+            f"ON CONFLICT (tg_user_id) {conflict}", *_profile_row(profile))
+
+    async def is_waiting(self, uid):
+        pool = await self._get_pool()
+        return bool(await pool.fetchval("SELECT 1 FROM match_queue WHERE tg_user_id = $1", uid))
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "searches": self.searches,
+            "claims": self.claims,
+            "lock_skips": self.lock_skips,
+            "remote_events": self.remote_events,
+            "shared_maps": len(self._shared),
+            "state_writes": self.state_writes,
+            "state_backlog": len(self._state_writes),
+            "state_remote_events": self.state_remote_events,
+        }
+
+
+def create_backend(kind: str, queue: MatchIndex, peers: MutableMapping, lock: asyncio.Lock) -> MatchBackend:
+    if kind == "postgres":
+        return PostgresMatchBackend(peers)
+    if kind != "memory":
+        log.warning(f"Unknown MATCH_BACKEND {kind!r}; using memory")
+    return MemoryMatchBackend(queue, peers, lock)
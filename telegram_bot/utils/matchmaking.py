@@ -0,0 +1,257 @@
+# utils/matchmaking.py - Bucketed matchmaking index for the chat search queue
+import itertools
+import logging
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MODE_RANDOM = "random"
+MODE_GIRLS = "girls"
+MODE_BOYS = "boys"
+MODE_CITY = "city"
+MODES = (MODE_RANDOM, MODE_GIRLS, MODE_BOYS, MODE_CITY)
+
+GENDERS = ("f", "m", "")
+
+# Lower bounds of the age bands; band -1 is "age unknown"
+AGE_BAND_STARTS = (18, 22, 26, 30, 35, 40, 50)
+AGE_BANDS = tuple(range(-1, len(AGE_BAND_STARTS)))
+DEFAULT_AGE_WINDOW = (18, 99)
+
+# Entries looked at from the head of each bucket before moving on. Buckets
+# already satisfy the viewer's filters, so this only absorbs the candidate's
+# own filters (their age window / verified-only) rejecting the viewer.
+SCAN_PER_BUCKET = 8
+
+
+def age_band(age: Optional[int]) -> int:
+    if age is None:
+        return -1
+    return max(0, bisect_right(AGE_BAND_STARTS, int(age)) - 1)
+
+
+def bands_for_window(window: Optional[Tuple[int, int]]) -> Tuple[int, ...]:
+    """Bands that can hold an age inside window (all bands when there is no window)"""
+    if window is None:
+        return AGE_BANDS
+    lo, hi = window
+    ends = AGE_BAND_STARTS[1:] + (1000,)
+    return tuple(band for band, (start, end) in enumerate(zip(AGE_BAND_STARTS, ends))
+                 if start <= hi and end > lo)
+
+
+class MatchProfile:
+    """
+    What matching needs to know about a waiting user, captured once at enqueue so
+    candidate checks never go back to Postgres.
+    """
+    __slots__ = ("uid", "mode", "gender", "city", "age", "verified", "age_window", "verified_only", "seq")
+
+    def __init__(self, uid: int, mode: str = MODE_RANDOM, gender: str = "", city: str = "",
+                 age: Optional[int] = None, verified: bool = False,
+                 age_window: Optional[Tuple[int, int]] = None, verified_only: bool = False):
+        self.uid = uid
+        self.mode = mode if mode in MODES else MODE_RANDOM
+        self.gender = (gender or "").strip().lower()[:1]
+        # City-mode users are matched on the city they searched for, others on their profile city
+        self.city = (city or "").strip().lower()
+        self.age = int(age) if age is not None else None
+        self.verified = bool(verified)
+        # Only premium users with a non-default window filter by age
+        self.age_window = age_window if age_window and tuple(age_window) != DEFAULT_AGE_WINDOW else None
+        self.verified_only = bool(verified_only)
+        self.seq = 0
+
+    def bucket_key(self) -> Tuple:
+        return (self.mode, self.gender, self.city, self.verified, age_band(self.age))
+
+    def __repr__(self):
+        return f"MatchProfile({self.uid}, {self.mode}, {self.gender or '?'}, {self.city or '-'}, {self.age})"
+
+
+def allows(viewer: MatchProfile, cand: MatchProfile) -> bool:
+    """Does viewer accept candidate (mode, premium age window, verified-only)?"""
+    if viewer.mode == MODE_CITY and (not viewer.city or viewer.city != cand.city):
+        return False
+    if viewer.mode == MODE_GIRLS and cand.gender != "f":
+        return False
+    if viewer.mode == MODE_BOYS and cand.gender != "m":
+        return False
+    if viewer.age_window is not None:
+        lo, hi = viewer.age_window
+        if cand.age is None or not (lo <= cand.age <= hi):
+            return False
+    if viewer.verified_only and not cand.verified:
+        return False
+    return True
+
+
+def mutual_ok(a: MatchProfile, b: MatchProfile) -> bool:
+    return allows(a, b) and allows(b, a)
+
+
+class MatchIndex:
+    """
+    Waiting users bucketed by (mode, gender, city, verified, age band), FIFO within a bucket.
+
+    A viewer's filters map to a bounded set of buckets (at most modes x genders x
+    verified x bands, city fixed or ignored), so finding a partner costs the same
+    with 50 or 50,000 people waiting. Buckets are also kept without the city
+    component for viewers who do not filter by city. The oldest acceptable
+    candidate across the probed buckets wins.
+
+    Also supports the deque operations chat.py used on the old queue
+    (append/appendleft/remove/in/len) so call sites stay small.
+    """
+
+    def __init__(self, scan_per_bucket: int = SCAN_PER_BUCKET):
+        self.scan_per_bucket = scan_per_bucket
+        self._entries: Dict[int, MatchProfile] = {}
+        self._buckets: Dict[Tuple, OrderedDict] = {}
+        self._any_city: Dict[Tuple, OrderedDict] = {}
+        self._back = itertools.count(1)
+        self._front = itertools.count(-1, -1)
+        self.searches = 0
+        self.buckets_probed = 0
+        self.candidates_checked = 0
+
+    # -- deque-compatible surface -------------------------------------------
+    def __contains__(self, uid: int) -> bool:
+        return uid in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[int]:
+        """Waiting uids, oldest (or boosted) first"""
+        return iter(sorted(self._entries, key=lambda uid: self._entries[uid].seq))
+
+    def append(self, profile: MatchProfile):
+        self._add(profile, next(self._back))
+
+    def appendleft(self, profile: MatchProfile):
+        """Queue ahead of everyone (boost, rematch)"""
+        self._add(profile, next(self._front))
+
+    def refresh(self, profile: MatchProfile):
+        """Replace a waiting user's snapshot without losing their place"""
+        current = self._entries.get(profile.uid)
+        if current is None:
+            self.append(profile)
+        else:
+            self._add(profile, current.seq)
+
+    def remove(self, uid: int):
+        if not self.discard(uid):
+            raise ValueError(f"{uid} is not waiting")
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+        self._any_city.clear()
+
+    # -- index --------------------------------------------------------------
+    def get(self, uid: int) -> Optional[MatchProfile]:
+        return self._entries.get(uid)
+
+    def discard(self, uid: int) -> bool:
+        profile = self._entries.pop(uid, None)
+        if profile is None:
+            return False
+        key = profile.bucket_key()
+        for buckets, bucket_key in ((self._buckets, key), (self._any_city, key[:2] + key[3:])):
+            bucket = buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.pop(uid, None)
+                if not bucket:
+                    del buckets[bucket_key]
+        return True
+
+    def _add(self, profile: MatchProfile, seq: int):
+        self.discard(profile.uid)
+        profile.seq = seq
+        self._entries[profile.uid] = profile
+        key = profile.bucket_key()
+        for buckets, bucket_key in ((self._buckets, key), (self._any_city, key[:2] + key[3:])):
+            self._place(buckets.setdefault(bucket_key, OrderedDict()), profile)
+
+    @staticmethod
+    def _place(bucket: OrderedDict, profile: MatchProfile):
+        """Insert keeping the bucket sorted by seq; find() relies on it to stop early"""
+        seq = profile.seq
+        last = next(reversed(bucket.values()), None)
+        first = next(iter(bucket.values()), None)
+        bucket[profile.uid] = profile
+        if last is None or last.seq < seq:
+            return
+        if first.seq > seq:
+            bucket.move_to_end(profile.uid, last=False)
+            return
+        # A refresh keeping an old seq: everyone queued after it goes back behind it
+        for uid in [uid for uid, cand in bucket.items() if cand.seq > seq]:
+            bucket.move_to_end(uid)
+
+    def _candidate_buckets(self, viewer: MatchProfile) -> Iterator[OrderedDict]:
+        if viewer.mode == MODE_GIRLS:
+            genders = ("f",)
+        elif viewer.mode == MODE_BOYS:
+            genders = ("m",)
+        else:
+            genders = GENDERS
+        verified = (True,) if viewer.verified_only else (True, False)
+        bands = bands_for_window(viewer.age_window)
+        # Candidates in girls/boys mode only take the matching gender
+        modes = [MODE_RANDOM, MODE_CITY]
+        if viewer.gender == "f":
+            modes.append(MODE_GIRLS)
+        elif viewer.gender == "m":
+            modes.append(MODE_BOYS)
+        for mode in modes:
+            by_city = viewer.mode == MODE_CITY or mode == MODE_CITY
+            if by_city and not viewer.city:
+                continue
+            for gender, flag, band in itertools.product(genders, verified, bands):
+                if by_city:
+                    bucket = self._buckets.get((mode, gender, viewer.city, flag, band))
+                else:
+                    bucket = self._any_city.get((mode, gender, flag, band))
+                if bucket:
+                    yield bucket
+
+    def find(self, viewer: MatchProfile,
+             is_stale: Optional[Callable[[int], bool]] = None) -> Optional[MatchProfile]:
+        """
+        Oldest waiting user that viewer and candidate both accept, or None. Entries
+        for which is_stale(uid) is true (already chatting) are dropped on the way.
+        """
+        self.searches += 1
+        best: Optional[MatchProfile] = None
+        stale = []
+        for bucket in self._candidate_buckets(viewer):
+            self.buckets_probed += 1
+            for checked, cand in enumerate(bucket.values()):
+                if checked >= self.scan_per_bucket or (best is not None and cand.seq > best.seq):
+                    break
+                self.candidates_checked += 1
+                if cand.uid == viewer.uid:
+                    continue
+                if is_stale is not None and is_stale(cand.uid):
+                    stale.append(cand.uid)
+                    continue
+                if mutual_ok(viewer, cand):
+                    best = cand
+                    break
+        for uid in stale:
+            self.discard(uid)
+        return best
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "waiting": len(self._entries),
+            "buckets": len(self._buckets),
+            "searches": self.searches,
+            "avg_buckets_probed": round(self.buckets_probed / self.searches, 2) if self.searches else 0.0,
+            "avg_candidates_checked": round(self.candidates_checked / self.searches, 2) if self.searches else 0.0,
+        }
@@ -6,6 +6,8 @@ from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from enum import Enum
 
+from utils.user_snapshot import invalidate_user
+
 log = logging.getLogger(__name__)
 
 class PaymentStatus(Enum):
@@ -215,6 +217,8 @@ class PaymentSafetySystem:
                         return {"success": False, "error": f"Failed to grant benefits: {grant_result['error']}"}
                 
                 con.commit()
+                if new_status == PaymentStatus.SUCCEEDED and payment_type == "premium":
+                    invalidate_user(user_id)
                 
                 log.info(f"💰 Payment {payment_id} updated: {current_status} -> {new_status.value}")
                 
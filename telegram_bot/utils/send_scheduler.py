@@ -0,0 +1,305 @@
+# utils/send_scheduler.py - Prioritised outbound send queue with Telegram rate limits
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from datetime import timedelta
+from enum import IntEnum
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import NetworkError, RetryAfter
+
+log = logging.getLogger(__name__)
+
+# Telegram allows ~1 msg/s to one chat (short bursts tolerated) and ~30 msg/s overall
+PER_CHAT_RATE = float(os.getenv("SEND_PER_CHAT_RATE", "1"))
+PER_CHAT_BURST = float(os.getenv("SEND_PER_CHAT_BURST", "3"))
+GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+MAX_PER_CHAT = int(os.getenv("SEND_MAX_PER_CHAT", "50"))
+MAX_QUEUED = int(os.getenv("SEND_MAX_QUEUED", "20000"))
+# Attempts per message across FloodWait / network retries
+MAX_ATTEMPTS = 4
+
+
+class Priority(IntEnum):
+    RELAY = 0
+    INTRO = 1
+    NUDGE = 2
+    BROADCAST = 3
+
+
+# Share of MAX_QUEUED each priority may fill, so a backlog sheds broadcasts first
+_ADMIT_SHARE = {
+    Priority.RELAY: 1.0,
+    Priority.INTRO: 0.9,
+    Priority.NUDGE: 0.75,
+    Priority.BROADCAST: 0.5,
+}
+
+
+def _retry_seconds(err: RetryAfter) -> float:
+    ra = err.retry_after
+    return ra.total_seconds() if isinstance(ra, timedelta) else float(ra)
+
+
+class _Outbound:
+    __slots__ = ("chat_id", "priority", "factory", "future", "attempts", "enqueued_at")
+
+    def __init__(self, chat_id: int, priority: Priority, factory: Callable[[], Awaitable], future: asyncio.Future):
+        self.chat_id = chat_id
+        self.priority = priority
+        self.factory = factory
+        self.future = future
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class SendScheduler:
+    """
+    Every outbound Bot call is queued per chat and dispatched by a single loop:
+    - chats are served by the priority of their oldest message, FIFO within a chat
+    - per-chat and global token buckets keep under Telegram's limits
+    - RetryAfter pauses all sends for the requested time and retries the message
+    - queues are bounded; refused messages resolve to None and are counted
+    """
+
+    def __init__(self, per_chat_rate: float = PER_CHAT_RATE, per_chat_burst: float = PER_CHAT_BURST,
+                 global_rate: float = GLOBAL_RATE, max_per_chat: int = MAX_PER_CHAT,
+                 max_queued: int = MAX_QUEUED, max_attempts: int = MAX_ATTEMPTS):
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_rate = global_rate
+        self.max_per_chat = max_per_chat
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+
+        self._queues: Dict[int, Deque[_Outbound]] = {}
+        self._chat_tokens: Dict[int, Tuple[float, float]] = {}
+        self._ready: List[Tuple[int, int, int]] = []       # (priority, seq, chat_id)
+        self._waiting: List[Tuple[float, int, int]] = []   # (ready_at, seq, chat_id)
+        self._scheduled: Set[int] = set()                  # in a heap or in flight
+        self._seq = itertools.count()
+        self._queued = 0
+        self._global_tokens = global_rate
+        self._global_ts = time.monotonic()
+        self._paused_until = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        self.sent = {p.name: 0 for p in Priority}
+        self.dropped = {p.name: {"queue_full": 0, "chat_full": 0} for p in Priority}
+        self.failed = 0
+        self.flood_waits = 0
+        self.retries = 0
+        self.max_wait = 0.0
+
+    # ---------- public API ----------
+
+    def submit(self, chat_id: int, factory: Callable[[], Awaitable],
+               priority: Priority = Priority.NUDGE) -> asyncio.Future:
+        """Queue factory() for chat_id; the future resolves to its result, or None if refused"""
+        self._ensure_running()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        reason = None
+        if self._queued >= self.max_queued * _ADMIT_SHARE[priority]:
+            reason = "queue_full"
+        elif len(self._queues.get(chat_id, ())) >= self.max_per_chat:
+            reason = "chat_full"
+        if reason:
+            self.dropped[priority.name][reason] += 1
+            log.warning(f"Outbound {priority.name} to {chat_id} dropped ({reason}, {self._queued} queued)")
+            future.set_result(None)
+            return future
+
+        self._queues.setdefault(chat_id, deque()).append(_Outbound(chat_id, priority, factory, future))
+        self._queued += 1
+        if chat_id not in self._scheduled:
+            self._schedule(chat_id, time.monotonic())
+        return future
+
+    async def call(self, chat_id: int, factory: Callable[[], Awaitable],
+                   priority: Priority = Priority.NUDGE):
+        return await self.submit(chat_id, factory, priority)
+
+    async def send_message(self, bot, chat_id: int, text: str,
+                           priority: Priority = Priority.NUDGE, **kwargs):
+        return await self.call(chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority)
+
+    async def stop(self):
+        """Stop dispatching; messages still queued resolve to None"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in self._queues.values():
+            for item in queue:
+                if not item.future.done():
+                    item.future.set_result(None)
+        self._queues.clear()
+        self._ready.clear()
+        self._waiting.clear()
+        self._scheduled.clear()
+        self._queued = 0
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queued,
+            "chats": len(self._queues),
+            "in_flight": len(self._inflight),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "sent": dict(self.sent),
+            "dropped": {name: dict(reasons) for name, reasons in self.dropped.items()},
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "retries": self.retries,
+            "max_wait": round(self.max_wait, 3),
+        }
+
+    # ---------- dispatch ----------
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is not loop:
+            # Started on a loop that has since gone away; its queue state is dead too
+            self._task = None
+            self._queues.clear()
+            self._ready.clear()
+            self._waiting.clear()
+            self._scheduled.clear()
+            self._queued = 0
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    def _schedule(self, chat_id: int, now: float):
+        """Put a chat with queued messages into the ready or waiting heap"""
+        self._scheduled.add(chat_id)
+        tokens, ts = self._chat_tokens.get(chat_id, (self.per_chat_burst, now))
+        tokens = min(self.per_chat_burst, tokens + (now - ts) * self.per_chat_rate)
+        self._chat_tokens[chat_id] = (tokens, now)
+        if tokens >= 1.0:
+            head = self._queues[chat_id][0]
+            heapq.heappush(self._ready, (head.priority, next(self._seq), chat_id))
+        else:
+            ready_at = now + (1.0 - tokens) / self.per_chat_rate
+            heapq.heappush(self._waiting, (ready_at, next(self._seq), chat_id))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _promote_waiting(self, now: float):
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, chat_id = heapq.heappop(self._waiting)
+            self._scheduled.discard(chat_id)
+            if self._queues.get(chat_id):
+                self._schedule(chat_id, now)
+
+    def _prune_idle_chats(self, now: float):
+        full_after = self.per_chat_burst / self.per_chat_rate
+        for chat_id, (_, ts) in list(self._chat_tokens.items()):
+            if chat_id not in self._scheduled and now - ts >= full_after:
+                del self._chat_tokens[chat_id]
+
+    async def _sleep(self, timeout: Optional[float]):
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._promote_waiting(now)
+            if not self._ready:
+                if not self._waiting:
+                    self._prune_idle_chats(now)
+                timeout = self._waiting[0][0] - now if self._waiting else None
+                await self._sleep(timeout)
+                continue
+
+            self._global_tokens = min(self.global_rate,
+                                      self._global_tokens + (now - self._global_ts) * self.global_rate)
+            self._global_ts = now
+            if self._global_tokens < 1.0:
+                await asyncio.sleep((1.0 - self._global_tokens) / self.global_rate)
+                continue
+            self._global_tokens -= 1.0
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            tokens, ts = self._chat_tokens[chat_id]
+            self._chat_tokens[chat_id] = (tokens - 1.0, ts)
+            item = self._queues[chat_id].popleft()
+            self._queued -= 1
+            if item.future.done():
+                # Caller gave up (cancelled) while it was queued
+                self._scheduled.discard(chat_id)
+                if self._queues[chat_id]:
+                    self._schedule(chat_id, now)
+                else:
+                    del self._queues[chat_id]
+                continue
+            task = asyncio.create_task(self._deliver(item))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, item: _Outbound):
+        chat_id = item.chat_id
+        retry = False
+        try:
+            item.attempts += 1
+            result = await item.factory()
+        except RetryAfter as e:
+            wait = _retry_seconds(e) + 0.1
+            self.flood_waits += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            log.warning(f"FloodWait {wait:.1f}s on send to {chat_id}; pausing all sends")
+            retry = item.attempts < self.max_attempts and not item.future.done()
+            if not retry:
+                self.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+        except NetworkError as e:  # includes TimedOut
+            retry = item.attempts < self.max_attempts and not item.future.done()
+            log.warning(f"Network error sending to {chat_id} (attempt {item.attempts}): {e}")
+            if not retry:
+                self.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+        except Exception as e:
+            self.failed += 1
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            waited = time.monotonic() - item.enqueued_at
+            self.max_wait = max(self.max_wait, waited)
+            self.sent[item.priority.name] += 1
+            if not item.future.done():
+                item.future.set_result(result)
+
+        queue = self._queues.get(chat_id)
+        if retry:
+            self.retries += 1
+            if queue is None:
+                queue = self._queues[chat_id] = deque()
+            # Back at the head so the chat keeps its order
+            queue.appendleft(item)
+            self._queued += 1
+        self._scheduled.discard(chat_id)
+        if queue:
+            self._schedule(chat_id, time.monotonic())
+        elif queue is not None:
+            del self._queues[chat_id]
+
+
+outbound = SendScheduler()
@@ -0,0 +1,58 @@
+# utils/sharding.py - Partition users across bot worker processes (user_id % WORKER_COUNT)
+import logging
+import os
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+log = logging.getLogger(__name__)
+
+WORKER_COUNT = max(1, int(os.getenv("WORKER_COUNT", "1")))
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))
+# Handler group for the gate; must run before every other group
+GATE_GROUP = -1000
+
+# Base of the per-process instance lock; a single worker keeps the historical key
+_INSTANCE_LOCK = 900001
+_WORKER_LOCK_BASE = 900100
+
+
+def validate():
+    if not 0 <= WORKER_INDEX < WORKER_COUNT:
+        raise ValueError(f"WORKER_INDEX={WORKER_INDEX} is outside 0..{WORKER_COUNT - 1}")
+    if WORKER_COUNT > 1 and os.getenv("MATCH_BACKEND", "memory").strip().lower() != "postgres":
+        raise ValueError("WORKER_COUNT > 1 needs MATCH_BACKEND=postgres so workers share the queue")
+
+
+def worker_for(user_id: int, count: Optional[int] = None) -> int:
+    return int(user_id) % (count or WORKER_COUNT)
+
+
+def owns(user_id: Optional[int], count: Optional[int] = None, index: Optional[int] = None) -> bool:
+    """Updates without a user (channel posts etc.) belong to worker 0"""
+    count = WORKER_COUNT if count is None else count
+    index = WORKER_INDEX if index is None else index
+    if count <= 1:
+        return True
+    if user_id is None:
+        return index == 0
+    return worker_for(user_id, count) == index
+
+
+def instance_lock_key(count: Optional[int] = None, index: Optional[int] = None) -> int:
+    count = WORKER_COUNT if count is None else count
+    index = WORKER_INDEX if index is None else index
+    return _INSTANCE_LOCK if count <= 1 else _WORKER_LOCK_BASE + index
+
+
+async def shard_gate(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Group GATE_GROUP handler: drop updates for users owned by another worker.
+    The ingress delivers every update to every worker; exactly one handles it.
+    """
+    if WORKER_COUNT <= 1 or not isinstance(update, Update):
+        return
+    user = update.effective_user
+    if not owns(user.id if user else None):
+        raise ApplicationHandlerStop
@@ -0,0 +1,315 @@
+# utils/timers.py - Central deadline scheduler (one driver task, persisted timers)
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+# Due timers are fired in chunks of this size so a backlog (e.g. after a restart)
+# does not put thousands of handler coroutines on the loop at once
+FIRE_BATCH = int(os.getenv("TIMER_FIRE_BATCH", "100"))
+# Cancelled entries are dropped from the heap lazily; rebuild once they dominate
+_COMPACT_MIN = 1024
+
+TimerCallback = Callable[[object, dict], Awaitable[None]]
+
+
+def _epoch(when: Union[float, int, datetime]) -> float:
+    """Delay in seconds, or an absolute datetime (naive = UTC), to epoch seconds"""
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return when.timestamp()
+    return time.time() + max(0.0, float(when))
+
+
+class TimerHandle:
+    __slots__ = ("timer_id", "kind", "payload", "deadline", "persist", "cancelled")
+
+    def __init__(self, timer_id: str, kind: str, payload: dict, deadline: float, persist: bool):
+        self.timer_id = timer_id
+        self.kind = kind
+        self.payload = payload
+        self.deadline = deadline
+        self.persist = persist
+        self.cancelled = False
+
+
+class PgTimerStore:
+    """pending_timers table; every write goes through one worker thread so a
+    cancel (or a claim) can never overtake the insert it refers to"""
+
+    def __init__(self):
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timers")
+
+    def ensure_table(self):
+        import registration as reg
+
+        with reg._conn() as con, con.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS pending_timers (
+                    timer_id   TEXT PRIMARY KEY,
+                    kind       TEXT NOT NULL,
+                    payload    JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    fire_at    TIMESTAMPTZ NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_pending_timers_fire_at ON pending_timers(fire_at)")
+            con.commit()
+
+    def load(self) -> List[Tuple[str, str, dict, float]]:
+        import registration as reg
+
+        with reg._conn() as con, con.cursor() as cur:
+            cur.execute("SELECT timer_id, kind, payload, EXTRACT(EPOCH FROM fire_at) FROM pending_timers")
+            rows = cur.fetchall()
+        return [(tid, kind, payload if isinstance(payload, dict) else json.loads(payload), float(at))
+                for tid, kind, payload, at in rows]
+
+    def _run(self, sql: str, params: tuple):
+        import registration as reg
+
+        try:
+            with reg._conn() as con, con.cursor() as cur:
+                cur.execute(sql, params)
+                con.commit()
+        except Exception as e:
+            log.warning(f"pending_timers write failed: {e}")
+
+    def insert(self, handle: TimerHandle):
+        self._writer.submit(
+            self._run,
+            "INSERT INTO pending_timers (timer_id, kind, payload, fire_at) "
+            "VALUES (%s, %s, %s::jsonb, to_timestamp(%s)) "
+            "ON CONFLICT (timer_id) DO UPDATE SET payload = EXCLUDED.payload, fire_at = EXCLUDED.fire_at",
+            (handle.timer_id, handle.kind, json.dumps(handle.payload), handle.deadline),
+        )
+
+    def delete(self, timer_id: str):
+        self._writer.submit(self._run, "DELETE FROM pending_timers WHERE timer_id = %s", (timer_id,))
+
+    def _claim(self, timer_ids: List[str], now: float) -> List[str]:
+        import registration as reg
+
+        with reg._conn() as con, con.cursor() as cur:
+            cur.execute(
+                "DELETE FROM pending_timers WHERE timer_id = ANY(%s) AND fire_at <= to_timestamp(%s) "
+                "RETURNING timer_id",
+                (list(timer_ids), now),
+            )
+            claimed = [row[0] for row in cur.fetchall()]
+            con.commit()
+        return claimed
+
+    async def claim(self, timer_ids: List[str], now: float) -> List[str]:
+        """
+        Delete the due rows among timer_ids and return the ids that were deleted.
+        Every worker loads every row, so this is what makes exactly one process
+        fire a timer; rows cancelled or rescheduled elsewhere are not returned.
+        """
+        return await asyncio.wrap_future(self._writer.submit(self._claim, timer_ids, now))
+
+
+class TimerService:
+    """
+    Min-heap of deadlines driven by a single task, replacing one sleeping task
+    per TTL event. Handlers are registered per kind and called as
+    handler(bot, payload); payloads must be JSON-serialisable. Persisted timers
+    are written to pending_timers and reloaded on start(), so deadlines that
+    passed while the bot was down fire right after the restart. A persisted
+    timer only fires in the process that claims (deletes) its row, so with
+    several bot workers each timer fires once.
+    """
+
+    def __init__(self, store: Optional[PgTimerStore] = None, fire_batch: int = FIRE_BATCH):
+        self._store = store if store is not None else PgTimerStore()
+        self.fire_batch = fire_batch
+        self._handlers: Dict[str, TimerCallback] = {}
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._by_id: Dict[str, TimerHandle] = {}
+        self._seq = itertools.count()
+        self._cancelled_in_heap = 0
+        self._bot = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.fired = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.claimed_elsewhere = 0
+        self.max_lag = 0.0
+
+    def register(self, kind: str, handler: TimerCallback):
+        self._handlers[kind] = handler
+
+    def schedule(self, kind: str, when: Union[float, int, datetime], payload: Optional[dict] = None,
+                 key: Optional[str] = None, persist: bool = True) -> TimerHandle:
+        """
+        Fire handler(kind) at `when` (seconds from now, or a datetime). A key makes
+        the timer addressable: scheduling the same key again replaces it and
+        cancel(key) removes it.
+        """
+        timer_id = key or uuid.uuid4().hex
+        if timer_id in self._by_id:
+            self.cancel(timer_id, _replaced=True)
+        handle = TimerHandle(timer_id, kind, payload or {}, _epoch(when), persist)
+        self._push(handle)
+        if persist:
+            self._store.insert(handle)
+        return handle
+
+    def cancel(self, handle_or_key: Union[TimerHandle, str], _replaced: bool = False) -> bool:
+        timer_id = handle_or_key.timer_id if isinstance(handle_or_key, TimerHandle) else handle_or_key
+        handle = self._by_id.pop(timer_id, None)
+        if handle is None or handle.cancelled:
+            return False
+        handle.cancelled = True
+        self._cancelled_in_heap += 1
+        self.cancelled += 1
+        if handle.persist and not _replaced:
+            self._store.delete(timer_id)
+        if self._cancelled_in_heap > max(_COMPACT_MIN, len(self._heap) // 2):
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled_in_heap = 0
+        return True
+
+    def _push(self, handle: TimerHandle):
+        self._by_id[handle.timer_id] = handle
+        heapq.heappush(self._heap, (handle.deadline, next(self._seq), handle))
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---------- lifecycle ----------
+
+    async def start(self, bot):
+        """Reload persisted deadlines and start the driver (PTB post_init)"""
+        self._bot = bot
+        try:
+            await asyncio.to_thread(self._store.ensure_table)
+            rows = await asyncio.to_thread(self._store.load)
+        except Exception as e:
+            log.error(f"Could not load pending timers: {e}")
+            rows = []
+        for timer_id, kind, payload, deadline in rows:
+            if timer_id not in self._by_id:
+                self._push(TimerHandle(timer_id, kind, payload, deadline, True))
+        if rows:
+            log.info(f"Restored {len(rows)} pending timers")
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the driver; persisted timers stay in the table for the next start"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------- driver ----------
+
+    def _pop_due(self, now: float) -> List[TimerHandle]:
+        due = []
+        while self._heap and len(due) < self.fire_batch:
+            deadline, _, handle = self._heap[0]
+            if handle.cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled_in_heap -= 1
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            self._by_id.pop(handle.timer_id, None)
+            due.append(handle)
+        return due
+
+    async def _claim(self, due: List[TimerHandle], now: float) -> List[TimerHandle]:
+        """Persisted timers whose row this process won; the rest fired (or were cancelled) elsewhere"""
+        ids = [h.timer_id for h in due if h.persist]
+        if not ids:
+            return due
+        try:
+            claimed = set(await self._store.claim(ids, now))
+        except Exception as e:
+            # Without the table we cannot coordinate; firing late-but-local beats dropping
+            log.warning(f"pending_timers claim failed, firing {len(ids)} timers unclaimed: {e}")
+            for timer_id in ids:
+                self._store.delete(timer_id)
+            return due
+        self.claimed_elsewhere += len(ids) - len(claimed)
+        return [h for h in due if not h.persist or h.timer_id in claimed]
+
+    async def _fire(self, handle: TimerHandle, now: float):
+        self.max_lag = max(self.max_lag, now - handle.deadline)
+        handler = self._handlers.get(handle.kind)
+        try:
+            if handler is None:
+                log.warning(f"No timer handler for kind {handle.kind!r}; dropping {handle.timer_id}")
+            else:
+                await handler(self._bot, handle.payload)
+            self.fired += 1
+        except Exception as e:
+            self.errors += 1
+            log.warning(f"Timer {handle.kind} ({handle.timer_id}) failed: {e}")
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            due = self._pop_due(now)
+            if due:
+                due = await self._claim(due, now)
+                await asyncio.gather(*(self._fire(h, now) for h in due))
+                continue
+            self._wake.clear()
+            timeout = max(0.0, self._heap[0][0] - now) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def pending(self) -> int:
+        return len(self._by_id)
+
+    def stats(self) -> dict:
+        by_kind: Dict[str, int] = {}
+        for handle in self._by_id.values():
+            by_kind[handle.kind] = by_kind.get(handle.kind, 0) + 1
+        return {
+            "pending": len(self._by_id),
+            "pending_by_kind": by_kind,
+            "heap_size": len(self._heap),
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "claimed_elsewhere": self.claimed_elsewhere,
+            "max_lag": round(self.max_lag, 3),
+        }
+
+
+async def _delete_message(bot, payload: dict):
+    try:
+        await bot.delete_message(chat_id=payload["chat_id"], message_id=payload["message_id"])
+    except Exception as e:
+        # Already gone, or the user blocked the bot
+        log.debug(f"timed delete failed for {payload}: {e}")
+
+
+timers = TimerService()
+timers.register("delete_message", _delete_message)
+
+
+def delete_message_later(chat_id: int, message_id: int, delay: float) -> TimerHandle:
+    """Delete a sent message after delay seconds; survives restarts"""
+    return timers.schedule("delete_message", delay, {"chat_id": chat_id, "message_id": message_id})
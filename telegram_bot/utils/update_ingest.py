@@ -0,0 +1,279 @@
+# utils/update_ingest.py - Webhook ingestion: bounded update queue + fixed worker pool
+import asyncio
+import hmac
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+from telegram import Update
+
+log = logging.getLogger(__name__)
+
+# Updates processed at once; each worker handles one update at a time
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "16"))
+# Updates waiting in total; beyond this the endpoint answers 503 and Telegram redelivers later
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "2000"))
+# Updates waiting for one chat; beyond this that chat's updates are dropped (acknowledged)
+INGEST_MAX_PER_CHAT = int(os.getenv("INGEST_MAX_PER_CHAT", "100"))
+# Seconds stop() waits for the backlog to drain before cancelling workers
+DRAIN_TIMEOUT = 10.0
+# Latency samples kept for percentiles
+_SAMPLES = 1024
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# submit() outcomes
+ACCEPTED = "accepted"
+QUEUE_FULL = "queue_full"
+CHAT_FULL = "chat_full"
+
+
+def ordering_key(update: Update) -> Hashable:
+    """Updates sharing a key are handled one at a time, in arrival order"""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    # inline queries, polls etc. without a chat: no ordering needed
+    return ("update", update.update_id)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class _Queued:
+    __slots__ = ("update", "enqueued_at")
+
+    def __init__(self, update: Update, enqueued_at: float):
+        self.update = update
+        self.enqueued_at = enqueued_at
+
+
+class UpdateIngest:
+    """
+    Webhook updates go into per-chat FIFO lanes and a fixed pool of workers
+    runs process(update) for them:
+    - a chat's lane is served by at most one worker at a time, so its updates
+      are handled in order; different chats run in parallel up to `workers`
+    - the total backlog is bounded; submit() refuses instead of growing it
+    - queue depth, wait time and processing time are tracked for stats()
+      and, if given, pushed to metrics_sink (utils.monitoring.metrics)
+    """
+
+    def __init__(self, process: Callable[[Update], Awaitable], workers: int = INGEST_WORKERS,
+                 max_queued: int = INGEST_MAX_QUEUED, max_per_chat: int = INGEST_MAX_PER_CHAT,
+                 metrics_sink=None):
+        self._process = process
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_per_chat = max_per_chat
+        self._metrics = metrics_sink
+        self._lanes: Dict[Hashable, Deque[_Queued]] = {}
+        self._ready: Optional[asyncio.Queue] = None  # lane keys with work and no worker
+        self._tasks: List[asyncio.Task] = []
+        self._queued = 0
+        self._busy = 0
+        self._idle: Optional[asyncio.Event] = None
+
+        self.accepted = 0
+        self.processed = 0
+        self.errors = 0
+        self.rejected = {QUEUE_FULL: 0, CHAT_FULL: 0}
+        self.max_depth = 0
+        self._wait_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self._run_ms: Deque[float] = deque(maxlen=_SAMPLES)
+
+    # ---------- intake ----------
+
+    def submit(self, update: Update) -> str:
+        if self._ready is None:
+            raise RuntimeError("UpdateIngest.start() has not been called")
+        if self._queued >= self.max_queued:
+            self.rejected[QUEUE_FULL] += 1
+            return QUEUE_FULL
+        key = ordering_key(update)
+        lane = self._lanes.get(key)
+        if lane is not None and len(lane) >= self.max_per_chat:
+            self.rejected[CHAT_FULL] += 1
+            log.warning(f"Update {update.update_id} for {key} dropped: {len(lane)} already queued")
+            return CHAT_FULL
+
+        item = _Queued(update, time.monotonic())
+        if lane is None:
+            # New lane: nobody is working on this key, hand it to the pool
+            self._lanes[key] = deque([item])
+            self._ready.put_nowait(key)
+        else:
+            lane.append(item)
+        self._queued += 1
+        self._idle.clear()
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, self._queued)
+        if self._metrics is not None:
+            self._metrics.gauge("queue_depth", self._queued, {"queue": "updates"})
+        return ACCEPTED
+
+    # ---------- workers ----------
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            item = lane.popleft()
+            self._queued -= 1
+            self._busy += 1
+            started = time.monotonic()
+            self._wait_ms.append((started - item.enqueued_at) * 1000)
+            try:
+                await self._process(item.update)
+            except Exception as e:
+                self.errors += 1
+                log.error(f"Update {item.update.update_id} failed: {e}")
+            finally:
+                elapsed = (time.monotonic() - started) * 1000
+                self._run_ms.append(elapsed)
+                self.processed += 1
+                self._busy -= 1
+                # Keep the lane only while it has work, so it is never served twice at once
+                if lane:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._lanes[key]
+                if self._metrics is not None:
+                    self._metrics.timer("update_processing_ms", elapsed)
+                    self._metrics.gauge("queue_depth", self._queued, {"queue": "updates"})
+                if not self._queued and not self._busy:
+                    self._idle.set()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def join(self):
+        """Wait until every accepted update has been processed"""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT):
+        """Give the backlog drain_timeout seconds to finish, then cancel the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Update ingest stopped with {self._queued} updates unprocessed")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        wait, run = sorted(self._wait_ms), sorted(self._run_ms)
+        return {
+            "queued": self._queued,
+            "busy": self._busy,
+            "chats": len(self._lanes),
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "accepted": self.accepted,
+            "processed": self.processed,
+            "errors": self.errors,
+            "rejected": dict(self.rejected),
+            "wait_ms": {"p50": round(_percentile(wait, 0.5), 1), "p95": round(_percentile(wait, 0.95), 1)},
+            "processing_ms": {"p50": round(_percentile(run, 0.5), 1), "p95": round(_percentile(run, 0.95), 1),
+                              "max": round(run[-1], 1) if run else 0.0},
+        }
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+
+def create_webhook_app(ingest: UpdateIngest, url_path: str, secret_token: Optional[str], bot=None):
+    """
+    Starlette app: POST /<url_path> takes Telegram updates, GET /<url_path>/stats
+    reports the ingest queue. Status codes:
+    200 queued (or dropped for a flooding chat), 400 bad JSON, 403 wrong secret,
+    503 backlog full - Telegram keeps the update and retries.
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    path = "/" + url_path.strip("/")
+    expected = secret_token.encode() if secret_token else None
+
+    async def receive(request):
+        if expected is not None:
+            given = request.headers.get(SECRET_HEADER, "").encode()
+            if not hmac.compare_digest(given, expected):
+                return Response(status_code=403)
+        try:
+            data = json.loads(await request.body())
+            update = Update.de_json(data, bot)
+        except Exception as e:
+            log.warning(f"Rejected malformed webhook body: {e}")
+            return Response(status_code=400)
+        if ingest.submit(update) == QUEUE_FULL:
+            return Response(status_code=503, headers={"Retry-After": "1"})
+        return Response(status_code=200)
+
+    async def stats(request):
+        return JSONResponse(ingest.stats())
+
+    return Starlette(routes=[
+        Route(path, receive, methods=["POST"]),
+        Route(path + "/stats", stats, methods=["GET"]),
+    ])
+
+
+async def serve_webhook(application, *, port: int, url_path: str, webhook_url: str,
+                        secret_token: Optional[str], allowed_updates: Optional[List[str]] = None,
+                        drop_pending_updates: bool = False, set_webhook: bool = True,
+                        workers: int = INGEST_WORKERS, metrics_sink=None,
+                        listen: str = "0.0.0.0"):
+    """
+    Run a PTB Application behind our own webhook endpoint instead of
+    Application.run_webhook: same post_init/post_shutdown hooks, but updates
+    go through UpdateIngest rather than the unbounded concurrent_updates path.
+    Returns when uvicorn shuts down (SIGINT/SIGTERM).
+    """
+    import uvicorn
+
+    ingest = UpdateIngest(application.process_update, workers=workers, metrics_sink=metrics_sink)
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await ingest.start()
+    try:
+        if set_webhook:
+            await application.bot.set_webhook(url=webhook_url, secret_token=secret_token,
+                                              allowed_updates=allowed_updates,
+                                              drop_pending_updates=drop_pending_updates)
+        asgi = create_webhook_app(ingest, url_path, secret_token, bot=application.bot)
+        server = uvicorn.Server(uvicorn.Config(asgi, host=listen, port=port, log_level="info", lifespan="off"))
+        log.info(f"Webhook ingest listening on {listen}:{port}/{url_path.strip('/')} "
+                 f"({ingest.workers} workers, backlog {ingest.max_queued})")
+        await server.serve()
+    finally:
+        await ingest.stop()
+        log.info(f"Webhook ingest stopped: {ingest.stats()}")
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
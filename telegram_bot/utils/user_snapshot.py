@@ -0,0 +1,256 @@
+# utils/user_snapshot.py - Per-user snapshot cache for the chat relay hot path
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+# Seconds a snapshot is served before it is reloaded; setters invalidate sooner
+SNAPSHOT_TTL = float(os.getenv("USER_SNAPSHOT_TTL", "30"))
+SNAPSHOT_MAX_USERS = int(os.getenv("USER_SNAPSHOT_MAX_USERS", "50000"))
+# Per-user badge checks from the relay are throttled to this interval
+BADGE_CHECK_INTERVAL = float(os.getenv("BADGE_CHECK_INTERVAL", "600"))
+
+_SNAPSHOT_SQL = """
+    SELECT u.gender, u.age, COALESCE(u.is_verified, FALSE),
+           COALESCE(u.is_premium, FALSE), u.premium_until, u.banned_until,
+           COALESCE(u.allow_forward, FALSE), COALESCE(u.shadow_banned, FALSE),
+           EXISTS (SELECT 1 FROM user_interests i WHERE i.user_id = u.id)
+      FROM users u
+     WHERE u.tg_user_id = %s
+"""
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+class UserSnapshot:
+    """
+    What the relay checks on every message, read in one query. Ban and premium
+    expiry are stored as timestamps and compared on use, so a snapshot stays
+    correct when a ban or premium period runs out mid-TTL.
+    """
+    __slots__ = ("uid", "registered", "gender", "age", "is_verified", "premium_flag",
+                 "premium_until", "banned_until", "allow_forward", "shadow_banned", "loaded_at")
+
+    def __init__(self, uid: int, registered: bool = False, gender: Optional[str] = None,
+                 age: Optional[int] = None, is_verified: bool = False, premium_flag: bool = False,
+                 premium_until: Optional[datetime] = None, banned_until: Optional[datetime] = None,
+                 allow_forward: bool = False, shadow_banned: bool = False):
+        self.uid = uid
+        self.registered = registered
+        self.gender = gender
+        self.age = age
+        self.is_verified = is_verified
+        self.premium_flag = premium_flag
+        self.premium_until = _aware(premium_until)
+        self.banned_until = _aware(banned_until)
+        self.allow_forward = allow_forward
+        self.shadow_banned = shadow_banned
+        self.loaded_at = time.monotonic()
+
+    def is_banned(self, now: Optional[datetime] = None) -> bool:
+        """Same rule as registration.is_banned"""
+        if self.banned_until is None:
+            return False
+        return self.banned_until > (now or datetime.now(timezone.utc))
+
+    def has_premium(self, now: Optional[datetime] = None) -> bool:
+        """Same rule as registration.has_active_premium"""
+        if self.premium_flag:
+            return True
+        return self.premium_until is not None and self.premium_until > (now or datetime.now(timezone.utc))
+
+
+def snapshot_from_row(uid: int, row: Optional[tuple]) -> UserSnapshot:
+    if not row:
+        return UserSnapshot(uid)
+    gender, age, verified, premium, premium_until, banned_until, allow_forward, shadow_banned, has_interests = row
+    return UserSnapshot(
+        uid,
+        # Same rule as registration.is_registered
+        registered=bool(gender and age and has_interests),
+        gender=gender,
+        age=age,
+        is_verified=bool(verified),
+        premium_flag=bool(premium),
+        premium_until=premium_until,
+        banned_until=banned_until,
+        allow_forward=bool(allow_forward),
+        shadow_banned=bool(shadow_banned),
+    )
+
+
+def load_snapshot(uid: int) -> UserSnapshot:
+    import registration as reg
+
+    with reg._conn() as con, con.cursor() as cur:
+        cur.execute(_SNAPSHOT_SQL, (uid,))
+        row = cur.fetchone()
+    return snapshot_from_row(uid, row)
+
+
+async def aload_snapshot(uid: int) -> UserSnapshot:
+    from utils import db_repo
+
+    return await db_repo.load_user_snapshot(uid)
+
+
+class UserSnapshotCache:
+    """
+    TTL + LRU cache of UserSnapshot by Telegram user id. Setters in registration
+    (premium, forward preference, ban/unban, shadowban, registration) call
+    invalidate() so changes show up on the user's next message. Thread-safe:
+    setters also run from executor threads.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL, max_users: int = SNAPSHOT_MAX_USERS,
+                 loader=load_snapshot, async_loader=aload_snapshot):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._loader = loader
+        self._async_loader = async_loader
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, UserSnapshot]" = OrderedDict()
+        self._friends: Dict[Tuple[int, int], Tuple[bool, float]] = {}
+        self._friends_loading: Set[Tuple[int, int]] = set()
+        self._badges_checked: Dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.load_errors = 0
+
+    def _cached(self, uid: int) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            snap = self._snapshots.get(uid)
+            if snap is not None and now - snap.loaded_at < self.ttl:
+                self._snapshots.move_to_end(uid)
+                self.hits += 1
+                return snap
+            self.misses += 1
+        return None
+
+    def _store(self, uid: int, snap: UserSnapshot) -> UserSnapshot:
+        with self._lock:
+            self._snapshots[uid] = snap
+            self._snapshots.move_to_end(uid)
+            while len(self._snapshots) > self.max_users:
+                self._snapshots.popitem(last=False)
+        return snap
+
+    def get(self, uid: int) -> Optional[UserSnapshot]:
+        """Cached snapshot, reloaded when older than ttl; None if it cannot be loaded"""
+        snap = self._cached(uid)
+        if snap is not None:
+            return snap
+        try:
+            return self._store(uid, self._loader(uid))
+        except Exception as e:
+            self.load_errors += 1
+            log.warning(f"User snapshot load failed for {uid}: {e}")
+            return None
+
+    async def aget(self, uid: int) -> Optional[UserSnapshot]:
+        """get() for async handlers: misses load through utils.db_repo, off the event loop"""
+        snap = self._cached(uid)
+        if snap is not None:
+            return snap
+        try:
+            return self._store(uid, await self._async_loader(uid))
+        except Exception as e:
+            self.load_errors += 1
+            log.warning(f"User snapshot load failed for {uid}: {e}")
+            return None
+
+    def invalidate(self, uid: int):
+        with self._lock:
+            if self._snapshots.pop(uid, None) is not None:
+                self.invalidations += 1
+            for pair in [pair for pair in self._friends if uid in pair]:
+                del self._friends[pair]
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._friends.clear()
+            self._badges_checked.clear()
+
+    async def awarm_friends(self, a: int, b: int) -> bool:
+        """Load is_friends for a chat pair through utils.db_repo (called when the pair is made)"""
+        from utils import db_repo
+
+        pair = (min(a, b), max(a, b))
+        try:
+            friends = await db_repo.is_friends(a, b)
+        except Exception as e:
+            self.load_errors += 1
+            log.warning(f"Friendship lookup failed for {pair}: {e}")
+            friends = False
+        finally:
+            self._friends_loading.discard(pair)
+        with self._lock:
+            if len(self._friends) >= self.max_users:
+                self._friends.clear()
+            self._friends[pair] = (friends, time.monotonic())
+        return friends
+
+    def is_friends(self, a: int, b: int) -> bool:
+        """
+        Cached friendship for a chat pair; never queries on the caller's path.
+        A missing or expired entry answers the last known value (False if
+        unknown) and is reloaded in the background for the next message.
+        """
+        pair = (min(a, b), max(a, b))
+        cached = self._friends.get(pair)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        if pair not in self._friends_loading:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                self._friends_loading.add(pair)
+                loop.create_task(self.awarm_friends(a, b))
+        return cached[0] if cached is not None else False
+
+    def badge_check_due(self, uid: int, interval: float = BADGE_CHECK_INTERVAL) -> bool:
+        """True at most once per interval per user"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._badges_checked.get(uid)
+            if last is not None and now - last < interval:
+                return False
+            if len(self._badges_checked) >= self.max_users:
+                self._badges_checked.clear()
+            self._badges_checked[uid] = now
+            return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "load_errors": self.load_errors,
+            "ttl": self.ttl,
+        }
+
+
+user_snapshots = UserSnapshotCache()
+
+
+def invalidate_user(*uids: int):
+    for uid in uids:
+        user_snapshots.invalidate(uid)